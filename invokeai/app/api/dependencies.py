@@ -18,11 +18,13 @@ from invokeai.app.services.image_files.image_files_disk import DiskImageFileStor
 from invokeai.app.services.image_records.image_records_sqlite import SqliteImageRecordStorage
 from invokeai.app.services.images.images_default import ImageService
 from invokeai.app.services.invocation_cache.invocation_cache_memory import MemoryInvocationCache
+from invokeai.app.services.invocation_cache.invocation_cache_sqlite import SqliteInvocationCache
 from invokeai.app.services.invocation_services import InvocationServices
 from invokeai.app.services.invocation_stats.invocation_stats_default import InvocationStatsService
 from invokeai.app.services.invoker import Invoker
 from invokeai.app.services.model_images.model_images_default import ModelImageFileStorageDisk
 from invokeai.app.services.model_manager.model_manager_default import ModelManagerService
+from invokeai.app.services.model_prefetch.model_prefetch_default import ModelPrefetchService
 from invokeai.app.services.model_records.model_records_sql import ModelRecordServiceSQL
 from invokeai.app.services.model_relationship_records.model_relationship_records_sqlite import (
     SqliteModelRelationshipRecordStorage,
@@ -36,6 +38,7 @@ from invokeai.app.services.session_processor.session_processor_default import (
     DefaultSessionRunner,
 )
 from invokeai.app.services.session_queue.session_queue_sqlite import SqliteSessionQueue
+from invokeai.app.services.shared.object_cache import ObjectCache
 from invokeai.app.services.shared.sqlite.sqlite_util import init_db
 from invokeai.app.services.style_preset_images.style_preset_images_disk import StylePresetImageFileStorageDisk
 from invokeai.app.services.style_preset_records.style_preset_records_sqlite import SqliteStylePresetRecordsStorage
@@ -92,7 +95,14 @@ class ApiDependencies:
         if output_folder is None:
             raise ValueError("Output folder is not set")
 
-        image_files = DiskImageFileStorage(f"{output_folder}/images")
+        # Images, latents and conditioning share one memory budget
+        object_cache = ObjectCache(int(config.object_cache_ram_gb * 2**30))
+        image_files = DiskImageFileStorage(
+            f"{output_folder}/images",
+            cache=object_cache,
+            save_threads=config.image_save_threads,
+            layout=config.image_layout,
+        )
 
         model_images_folder = config.models_path
         style_presets_folder = config.style_presets_path
@@ -111,13 +121,19 @@ class ApiDependencies:
         bulk_download = BulkDownloadService()
         image_records = SqliteImageRecordStorage(db=db)
         images = ImageService()
-        invocation_cache = MemoryInvocationCache(max_cache_size=config.node_cache_size)
+        invocation_cache = (
+            SqliteInvocationCache(db=db, max_cache_size=config.node_cache_size)
+            if config.persist_node_cache
+            else MemoryInvocationCache(max_cache_size=config.node_cache_size)
+        )
         tensors = ObjectSerializerForwardCache(
             ObjectSerializerDisk[torch.Tensor](
                 output_folder / "tensors",
                 safe_globals=[torch.Tensor],
                 ephemeral=True,
             ),
+            cache=object_cache,
+            cache_type="tensors",
         )
         conditioning = ObjectSerializerForwardCache(
             ObjectSerializerDisk[ConditioningFieldData](
@@ -132,19 +148,26 @@ class ApiDependencies:
                 ],
                 ephemeral=True,
             ),
+            cache=object_cache,
+            cache_type="conditioning",
         )
         download_queue_service = DownloadQueueService(app_config=configuration, event_bus=events)
-        model_images_service = ModelImageFileStorageDisk(model_images_folder / "model_images")
+        model_images_service = ModelImageFileStorageDisk(
+            model_images_folder / "model_images", layout=config.image_layout
+        )
         model_manager = ModelManagerService.build_model_manager(
             app_config=configuration,
             model_record_service=ModelRecordServiceSQL(db=db, logger=logger),
             download_queue=download_queue_service,
             events=events,
         )
+        model_prefetch = ModelPrefetchService(
+            enabled=configuration.model_prefetch, lookahead=configuration.model_prefetch_sessions
+        )
         model_relationships = ModelRelationshipsService()
         model_relationship_records = SqliteModelRelationshipRecordStorage(db=db)
         names = SimpleNameService()
-        performance_statistics = InvocationStatsService()
+        performance_statistics = InvocationStatsService(object_cache=object_cache)
         session_processor = DefaultSessionProcessor(session_runner=DefaultSessionRunner())
         session_queue = SqliteSessionQueue(db=db)
         urls = LocalUrlService()
@@ -169,6 +192,7 @@ class ApiDependencies:
             logger=logger,
             model_images=model_images_service,
             model_manager=model_manager,
+            model_prefetch=model_prefetch,
             model_relationships=model_relationships,
             model_relationship_records=model_relationship_records,
             download_queue=download_queue_service,
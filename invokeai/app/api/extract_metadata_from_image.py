@@ -1,6 +1,7 @@
 import json
 import logging
 from dataclasses import dataclass
+from typing import Any, Mapping
 
 from PIL import Image
 
@@ -24,6 +25,28 @@ def extract_metadata_from_image(
     """
     Extracts the "invokeai_metadata", "invokeai_workflow", and "invokeai_graph" data embedded in the PIL Image.
 
+    See `extract_metadata_from_image_info`.
+    """
+    return extract_metadata_from_image_info(
+        image_info=pil_image.info,
+        invokeai_metadata_override=invokeai_metadata_override,
+        invokeai_workflow_override=invokeai_workflow_override,
+        invokeai_graph_override=invokeai_graph_override,
+        logger=logger,
+    )
+
+
+def extract_metadata_from_image_info(
+    image_info: Mapping[str, Any],
+    invokeai_metadata_override: str | None,
+    invokeai_workflow_override: str | None,
+    invokeai_graph_override: str | None,
+    logger: logging.Logger,
+) -> ExtractedMetadata:
+    """
+    Extracts the "invokeai_metadata", "invokeai_workflow", and "invokeai_graph" data from an image's info - either a PIL
+    Image's `info`, or the text chunks read from a PNG file with `read_png_text`.
+
     These items are stored as stringified JSON in the image file's metadata, so we need to do some parsing to validate
     them. Once parsed, the values are returned as they came (as strings), or None if they are not present or invalid.
 
@@ -34,7 +57,7 @@ def extract_metadata_from_image(
     metadata embedded in the image file.
 
     Args:
-        pil_image: The PIL Image object.
+        image_info: The image's info.
         invokeai_metadata_override: The metadata override provided by the client.
         invokeai_workflow_override: The workflow override provided by the client.
         invokeai_graph_override: The graph override provided by the client.
@@ -48,7 +71,7 @@ def extract_metadata_from_image(
     stringified_metadata: str | None = None
 
     # Use the metadata override if provided, else attempt to extract it from the image file.
-    metadata_raw = invokeai_metadata_override or pil_image.info.get("invokeai_metadata", None)
+    metadata_raw = invokeai_metadata_override or image_info.get("invokeai_metadata", None)
 
     # If the metadata is present in the image file, we will attempt to parse it as JSON. When we create images,
     # we always store metadata as a stringified JSON dict. So, we expect it to be a string here.
@@ -66,7 +89,7 @@ def extract_metadata_from_image(
 
     # We expect the workflow, if embedded in the image, to be a JSON-stringified WorkflowWithoutID. We will store it
     # as a string.
-    workflow_raw: str | None = invokeai_workflow_override or pil_image.info.get("invokeai_workflow", None)
+    workflow_raw: str | None = invokeai_workflow_override or image_info.get("invokeai_workflow", None)
 
     # The fallback value for workflow is None.
     stringified_workflow: str | None = None
@@ -85,7 +108,7 @@ def extract_metadata_from_image(
 
     # We expect the workflow, if embedded in the image, to be a JSON-stringified Graph. We will store it as a
     # string.
-    graph_raw: str | None = invokeai_graph_override or pil_image.info.get("invokeai_graph", None)
+    graph_raw: str | None = invokeai_graph_override or image_info.get("invokeai_graph", None)
 
     # The fallback value for graph is None.
     stringified_graph: str | None = None
@@ -1,21 +1,29 @@
 import io
 import json
+import os
 import traceback
-from typing import ClassVar, Optional
+from email.utils import parsedate
+from typing import ClassVar, Optional, cast
+from urllib.parse import quote
 
 from fastapi import BackgroundTasks, Body, HTTPException, Path, Query, Request, Response, UploadFile
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.routing import APIRouter
 from PIL import Image
 from pydantic import BaseModel, Field, model_validator
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.staticfiles import NotModifiedResponse
 
 from invokeai.app.api.dependencies import ApiDependencies
-from invokeai.app.api.extract_metadata_from_image import extract_metadata_from_image
+from invokeai.app.api.extract_metadata_from_image import extract_metadata_from_image_info
 from invokeai.app.invocations.fields import MetadataField
+from invokeai.app.services.board_records.board_records_common import BoardRecordNotFoundException
 from invokeai.app.services.image_records.image_records_common import (
     ImageCategory,
     ImageNamesResult,
     ImageRecordChanges,
+    ImageRecordNotFoundException,
     ResourceOrigin,
 )
 from invokeai.app.services.images.images_common import (
@@ -25,9 +33,17 @@ from invokeai.app.services.images.images_common import (
     StarredImagesResult,
     UnstarredImagesResult,
 )
-from invokeai.app.services.shared.pagination import OffsetPaginatedResults
+from invokeai.app.services.shared.pagination import InvalidCursorError, KeysetPaginatedResults, OffsetPaginatedResults
 from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
 from invokeai.app.util.controlnet_utils import heuristic_resize_fast
+from invokeai.app.util.png_metadata import INVOKEAI_TEXT_KEYS, read_png_text
+from invokeai.app.util.thumbnails import (
+    DEFAULT_THUMBNAIL_SIZE,
+    THUMBNAIL_SIZES,
+    ThumbnailFormat,
+    ThumbnailSize,
+    is_thumbnail_format_available,
+)
 from invokeai.backend.image_util.util import np_to_pil, pil_to_np
 
 images_router = APIRouter(prefix="/v1/images", tags=["images"])
@@ -91,6 +107,12 @@ async def upload_image(
         ApiDependencies.invoker.services.logger.error(traceback.format_exc())
         raise HTTPException(status_code=415, detail="Failed to read image")
 
+    # Read from the file's text chunks, as PIL only parses those before the pixel data. The info is taken before
+    # cropping or resizing, which make new images without it.
+    image_info = (
+        read_png_text(io.BytesIO(contents), INVOKEAI_TEXT_KEYS) if pil_image.format == "PNG" else pil_image.info
+    )
+
     if crop_visible:
         try:
             bbox = pil_image.getbbox()
@@ -114,8 +136,8 @@ async def upload_image(
         except Exception:
             raise HTTPException(status_code=500, detail="Failed to resize image")
 
-    extracted_metadata = extract_metadata_from_image(
-        pil_image=pil_image,
+    extracted_metadata = extract_metadata_from_image_info(
+        image_info=image_info,
         invokeai_metadata_override=metadata,
         invokeai_workflow_override=None,
         invokeai_graph_override=None,
@@ -301,18 +323,15 @@ async def get_image_workflow(
     },
 )
 async def get_image_full(
+    request: Request,
     image_name: str = Path(description="The name of full-resolution image file to get"),
 ) -> Response:
-    """Gets a full-resolution image file"""
+    """Gets a full-resolution image file. Supports conditional and range requests."""
 
     try:
-        path = ApiDependencies.invoker.services.images.get_path(image_name)
-        with open(path, "rb") as f:
-            content = f.read()
-        response = Response(content, media_type="image/png")
-        response.headers["Cache-Control"] = f"max-age={IMAGE_MAX_AGE}"
-        response.headers["Content-Disposition"] = f'inline; filename="{image_name}"'
-        return response
+        # The image may still be being written, which must not block the event loop
+        path = await run_in_threadpool(ApiDependencies.invoker.services.images.get_path, image_name)
+        return await _image_file_response(request, path, "image/png", filename=image_name)
     except Exception:
         raise HTTPException(status_code=404)
 
@@ -324,27 +343,80 @@ async def get_image_full(
     responses={
         200: {
             "description": "Return the image thumbnail",
-            "content": {"image/webp": {}},
+            "content": {"image/webp": {}, "image/avif": {}},
         },
+        400: {"description": "Thumbnail format not supported"},
         404: {"description": "Image not found"},
     },
 )
 async def get_image_thumbnail(
+    request: Request,
     image_name: str = Path(description="The name of thumbnail image file to get"),
+    size: int = Query(
+        default=DEFAULT_THUMBNAIL_SIZE,
+        description=f"The size of the thumbnail's longest side. One of {', '.join(map(str, THUMBNAIL_SIZES))}.",
+    ),
+    format: ThumbnailFormat = Query(default="webp", description="The format of the thumbnail"),
 ) -> Response:
-    """Gets a thumbnail image file"""
+    """Gets a thumbnail image file. Thumbnails other than the default are made when first requested. Supports
+    conditional requests."""
+
+    if size not in THUMBNAIL_SIZES:
+        raise HTTPException(status_code=400, detail=f"Thumbnail size {size} is not supported")
+    if not is_thumbnail_format_available(format):
+        raise HTTPException(status_code=400, detail=f"Thumbnail format {format} is not supported")
 
     try:
-        path = ApiDependencies.invoker.services.images.get_path(image_name, thumbnail=True)
-        with open(path, "rb") as f:
-            content = f.read()
-        response = Response(content, media_type="image/webp")
-        response.headers["Cache-Control"] = f"max-age={IMAGE_MAX_AGE}"
-        return response
+        # Making a thumbnail takes a while, so it must not block the event loop
+        path = await run_in_threadpool(
+            ApiDependencies.invoker.services.images.get_thumbnail_path, image_name, cast(ThumbnailSize, size), format
+        )
+        return await _image_file_response(request, path, f"image/{format}")
     except Exception:
         raise HTTPException(status_code=404)
 
 
+async def _image_file_response(
+    request: Request, path: str, media_type: str, filename: Optional[str] = None
+) -> Response:
+    """
+    Streams an image file from disk without blocking the event loop or reading it into memory. The ETag and
+    Last-Modified headers come from the file's stat, and a 304 is returned if the client's copy is current. Range
+    requests are handled by the `FileResponse`.
+    """
+    stat_result = await run_in_threadpool(os.stat, path)
+    headers = {"Cache-Control": f"max-age={IMAGE_MAX_AGE}"}
+    response = FileResponse(
+        path,
+        media_type=media_type,
+        headers=headers,
+        filename=filename,
+        stat_result=stat_result,
+        content_disposition_type="inline",
+    )
+    if _is_not_modified(response.headers, request.headers):
+        return NotModifiedResponse(response.headers)
+    return response
+
+
+def _is_not_modified(response_headers: MutableHeaders, request_headers: Headers) -> bool:
+    """Checks a request's conditional headers against a response's validators."""
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since. ETags are compared weakly.
+        etag = response_headers["etag"].removeprefix("W/")
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since is not None:
+        since = parsedate(if_modified_since)
+        last_modified = parsedate(response_headers["last-modified"])
+        return since is not None and last_modified is not None and since >= last_modified
+
+    return False
+
+
 @images_router.get(
     "/i/{image_name}/urls",
     operation_id="get_image_urls",
@@ -395,6 +467,45 @@ async def list_image_dtos(
     return image_dtos
 
 
+@images_router.get(
+    "/cursor",
+    operation_id="list_image_dtos_by_cursor",
+    response_model=KeysetPaginatedResults[ImageDTO],
+)
+async def list_image_dtos_by_cursor(
+    image_origin: Optional[ResourceOrigin] = Query(default=None, description="The origin of images to list."),
+    categories: Optional[list[ImageCategory]] = Query(default=None, description="The categories of image to include."),
+    is_intermediate: Optional[bool] = Query(default=None, description="Whether to list intermediate images."),
+    board_id: Optional[str] = Query(
+        default=None,
+        description="The board id to filter by. Use 'none' to find images without a board.",
+    ),
+    cursor: Optional[str] = Query(default=None, description="The cursor of the page to get, from the previous page"),
+    limit: int = Query(default=10, description="The number of images per page"),
+    order_dir: SQLiteDirection = Query(default=SQLiteDirection.Descending, description="The order of sort"),
+    starred_first: bool = Query(default=True, description="Whether to sort by starred images first"),
+    search_term: Optional[str] = Query(default=None, description="The term to search for"),
+    include_total: bool = Query(default=False, description="Whether to count the total number of images"),
+) -> KeysetPaginatedResults[ImageDTO]:
+    """Gets a page of image DTOs, starting after the cursor"""
+
+    try:
+        return ApiDependencies.invoker.services.images.get_many_by_cursor(
+            limit=limit,
+            cursor=cursor,
+            starred_first=starred_first,
+            order_dir=order_dir,
+            image_origin=image_origin,
+            categories=categories,
+            is_intermediate=is_intermediate,
+            board_id=board_id,
+            search_term=search_term,
+            include_total=include_total,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @images_router.post("/delete", operation_id="delete_images_from_list", response_model=DeleteImagesResult)
 async def delete_images_from_list(
     image_names: list[str] = Body(description="The list of names of images to delete", embed=True),
@@ -531,6 +642,48 @@ async def download_images_from_list(
     return ImagesDownloaded(bulk_download_item_name=bulk_download_item_id + ".zip")
 
 
+@images_router.post(
+    "/download/stream",
+    operation_id="stream_images_download",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "The images, as a zip file that is created while it is downloaded",
+            "content": {"application/zip": {}},
+        },
+        404: {"description": "Image or board not found"},
+    },
+)
+async def stream_images_download(
+    image_names: Optional[list[str]] = Body(
+        default=None, description="The list of names of images to download", embed=True
+    ),
+    board_id: Optional[str] = Body(
+        default=None, description="The board from which image should be downloaded", embed=True
+    ),
+) -> StreamingResponse:
+    """Downloads images as a zip file that is streamed as it is created, without waiting for a bulk download item"""
+    if (image_names is None or len(image_names) == 0) and board_id is None:
+        raise HTTPException(status_code=400, detail="No images or board id specified.")
+
+    bulk_download = ApiDependencies.invoker.services.bulk_download
+    try:
+        bulk_download_item_id = await run_in_threadpool(bulk_download.generate_item_id, board_id)
+        chunks = await run_in_threadpool(bulk_download.stream, image_names, board_id, bulk_download_item_id)
+    except (ImageRecordNotFoundException, BoardRecordNotFoundException):
+        raise HTTPException(status_code=404, detail="Image or board not found")
+
+    filename = bulk_download_item_id + ".zip"
+    quoted_filename = quote(filename)
+    if quoted_filename != filename:
+        content_disposition = f"attachment; filename*=utf-8''{quoted_filename}"
+    else:
+        content_disposition = f'attachment; filename="{filename}"'
+
+    # The zip file is created by a sync generator, which starlette iterates in a thread
+    return StreamingResponse(chunks, media_type="application/zip", headers={"Content-Disposition": content_disposition})
+
+
 @images_router.api_route(
     "/download/{bulk_download_item_name}",
     methods=["GET"],
@@ -606,18 +759,7 @@ async def get_images_by_names(
     """Gets image DTOs for the specified image names. Maintains order of input names."""
 
     try:
-        image_service = ApiDependencies.invoker.services.images
-
-        # Fetch DTOs preserving the order of requested names
-        image_dtos: list[ImageDTO] = []
-        for name in image_names:
-            try:
-                dto = image_service.get_dto(name)
-                image_dtos.append(dto)
-            except Exception:
-                # Skip missing images - they may have been deleted between name fetch and DTO fetch
-                continue
-
-        return image_dtos
+        # Missing images are skipped - they may have been deleted between name fetch and DTO fetch
+        return ApiDependencies.invoker.services.images.get_many_by_names(image_names)
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to get image DTOs")
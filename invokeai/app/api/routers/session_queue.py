@@ -7,6 +7,7 @@ from pydantic import BaseModel
 from invokeai.app.api.dependencies import ApiDependencies
 from invokeai.app.services.session_processor.session_processor_common import SessionProcessorStatus
 from invokeai.app.services.session_queue.session_queue_common import (
+    QUEUE_ITEM_STATUS,
     Batch,
     BatchStatus,
     CancelAllExceptCurrentResult,
@@ -24,6 +25,7 @@ from invokeai.app.services.session_queue.session_queue_common import (
     SessionQueueItemNotFoundError,
     SessionQueueStatus,
 )
+from invokeai.app.services.shared.pagination import InvalidCursorError, KeysetPaginatedResults
 from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
 
 session_queue_router = APIRouter(prefix="/v1/queue", tags=["queue"])
@@ -78,6 +80,37 @@ async def list_all_queue_items(
         raise HTTPException(status_code=500, detail=f"Unexpected error while listing all queue items: {e}")
 
 
+@session_queue_router.get(
+    "/{queue_id}/list_by_cursor",
+    operation_id="list_queue_items_by_cursor",
+    responses={
+        200: {"model": KeysetPaginatedResults[SessionQueueItem]},
+    },
+)
+async def list_queue_items_by_cursor(
+    queue_id: str = Path(description="The queue id to perform this operation on"),
+    limit: int = Query(default=50, description="The number of items to fetch"),
+    cursor: Optional[str] = Query(default=None, description="The cursor of the page to get, from the previous page"),
+    status: Optional[QUEUE_ITEM_STATUS] = Query(default=None, description="The status of items to fetch"),
+    destination: Optional[str] = Query(default=None, description="The destination of queue items to fetch"),
+    include_total: bool = Query(default=False, description="Whether to count the total number of items"),
+) -> KeysetPaginatedResults[SessionQueueItem]:
+    """Gets a page of queue items, starting after the cursor"""
+    try:
+        return ApiDependencies.invoker.services.session_queue.list_queue_items_by_cursor(
+            queue_id=queue_id,
+            limit=limit,
+            cursor=cursor,
+            status=status,
+            destination=destination,
+            include_total=include_total,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error while listing queue items: {e}")
+
+
 @session_queue_router.get(
     "/{queue_id}/item_ids",
     operation_id="get_queue_item_ids",
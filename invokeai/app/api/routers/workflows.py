@@ -7,7 +7,7 @@ from fastapi.responses import FileResponse
 from PIL import Image
 
 from invokeai.app.api.dependencies import ApiDependencies
-from invokeai.app.services.shared.pagination import PaginatedResults
+from invokeai.app.services.shared.pagination import InvalidCursorError, KeysetPaginatedResults, PaginatedResults
 from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
 from invokeai.app.services.workflow_records.workflow_records_common import (
     Workflow,
@@ -135,6 +135,56 @@ async def list_workflows(
     )
 
 
+@workflows_router.get(
+    "/cursor",
+    operation_id="list_workflows_by_cursor",
+    responses={
+        200: {"model": KeysetPaginatedResults[WorkflowRecordListItemWithThumbnailDTO]},
+    },
+)
+async def list_workflows_by_cursor(
+    cursor: Optional[str] = Query(default=None, description="The cursor of the page to get, from the previous page"),
+    limit: int = Query(default=50, description="The number of workflows per page"),
+    order_by: WorkflowRecordOrderBy = Query(
+        default=WorkflowRecordOrderBy.Name, description="The attribute to order by"
+    ),
+    direction: SQLiteDirection = Query(default=SQLiteDirection.Ascending, description="The direction to order by"),
+    categories: Optional[list[WorkflowCategory]] = Query(default=None, description="The categories of workflow to get"),
+    tags: Optional[list[str]] = Query(default=None, description="The tags of workflow to get"),
+    query: Optional[str] = Query(default=None, description="The text to query by (matches name and description)"),
+    has_been_opened: Optional[bool] = Query(default=None, description="Whether to include/exclude recent workflows"),
+    include_total: bool = Query(default=False, description="Whether to count the total number of workflows"),
+) -> KeysetPaginatedResults[WorkflowRecordListItemWithThumbnailDTO]:
+    """Gets a page of workflows, starting after the cursor"""
+    try:
+        workflows = ApiDependencies.invoker.services.workflow_records.get_many_by_cursor(
+            order_by=order_by,
+            direction=direction,
+            categories=categories,
+            limit=limit,
+            cursor=cursor,
+            query=query,
+            tags=tags,
+            has_been_opened=has_been_opened,
+            include_total=include_total,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    workflows_with_thumbnails = [
+        WorkflowRecordListItemWithThumbnailDTO(
+            thumbnail_url=ApiDependencies.invoker.services.workflow_thumbnails.get_url(workflow.workflow_id),
+            **workflow.model_dump(),
+        )
+        for workflow in workflows.items
+    ]
+    return KeysetPaginatedResults[WorkflowRecordListItemWithThumbnailDTO](
+        items=workflows_with_thumbnails,
+        limit=workflows.limit,
+        next_cursor=workflows.next_cursor,
+        total=workflows.total,
+    )
+
+
 @workflows_router.put(
     "/i/{workflow_id}/thumbnail",
     operation_id="set_workflow_thumbnail",
@@ -40,9 +40,11 @@ from invokeai.app.services.shared.invocation_context import InvocationContext
 from invokeai.app.util.controlnet_utils import prepare_control_image
 from invokeai.backend.ip_adapter.ip_adapter import IPAdapter
 from invokeai.backend.model_manager.configs.factory import AnyModelConfig
+from invokeai.backend.model_manager.load.model_cache.model_cache import get_model_cache_key
 from invokeai.backend.model_manager.taxonomy import BaseModelType, ModelVariantType
 from invokeai.backend.model_patcher import ModelPatcher
 from invokeai.backend.patches.layer_patcher import LayerPatcher
+from invokeai.backend.patches.lora_patch_cache import make_lora_patch_cache_key
 from invokeai.backend.patches.model_patch_raw import ModelPatchRaw
 from invokeai.backend.stable_diffusion import PipelineIntermediateState
 from invokeai.backend.stable_diffusion.denoise_context import DenoiseContext, DenoiseInputs
@@ -1014,13 +1016,21 @@ class DenoiseLatentsInvocation(BaseInvocation):
             context.models.load(self.unet.unet).model_on_device() as (cached_weights, unet),
             ModelPatcher.apply_freeu(unet, self.unet.freeu_config),
             SeamlessExt.static_patch_model(unet, self.unet.seamless_axes),  # FIXME
-            # Apply the LoRA after unet has been moved to its target device for faster patching.
+            # Apply the LoRA after unet has been moved to its target device for faster patching. The patches are left
+            # applied for the next session that uses the same LoRAs.
             LayerPatcher.apply_smart_model_patches(
                 model=unet,
                 patches=_lora_loader(),
                 prefix="lora_unet_",
                 dtype=unet.dtype,
                 cached_weights=cached_weights,
+                patch_cache=context._services.model_manager.load.lora_patch_cache,
+                patch_cache_key=make_lora_patch_cache_key(
+                    model_key=get_model_cache_key(self.unet.unet.key, self.unet.unet.submodel_type),
+                    prefix="lora_unet_",
+                    loras=[(lora.lora.key, lora.weight) for lora in self.unet.loras],
+                    dtype=unet.dtype,
+                ),
             ),
         ):
             assert isinstance(unet, UNet2DConditionModel)
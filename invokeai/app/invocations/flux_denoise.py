@@ -48,9 +48,11 @@ from invokeai.backend.flux.sampling_utils import (
     unpack,
 )
 from invokeai.backend.flux.text_conditioning import FluxReduxConditioning, FluxTextConditioning
+from invokeai.backend.model_manager.load.model_cache.model_cache import get_model_cache_key
 from invokeai.backend.model_manager.taxonomy import BaseModelType, FluxVariantType, ModelFormat, ModelType
 from invokeai.backend.patches.layer_patcher import LayerPatcher
 from invokeai.backend.patches.lora_conversions.flux_lora_constants import FLUX_LORA_TRANSFORMER_PREFIX
+from invokeai.backend.patches.lora_patch_cache import make_lora_patch_cache_key
 from invokeai.backend.patches.model_patch_raw import ModelPatchRaw
 from invokeai.backend.rectified_flow.rectified_flow_inpaint_extension import RectifiedFlowInpaintExtension
 from invokeai.backend.stable_diffusion.diffusers_pipeline import PipelineIntermediateState
@@ -380,6 +382,8 @@ class FluxDenoiseInvocation(BaseInvocation):
 
             # Apply LoRA models to the transformer.
             # Note: We apply the LoRA after the transformer has been moved to its target device for faster patching.
+            # The patches are left applied for the next session that uses the same LoRAs.
+            loras = [*self.transformer.loras, *([self.control_lora] if self.control_lora else [])]
             exit_stack.enter_context(
                 LayerPatcher.apply_smart_model_patches(
                     model=transformer,
@@ -388,6 +392,15 @@ class FluxDenoiseInvocation(BaseInvocation):
                     dtype=inference_dtype,
                     cached_weights=cached_weights,
                     force_sidecar_patching=model_is_quantized,
+                    patch_cache=context._services.model_manager.load.lora_patch_cache,
+                    patch_cache_key=make_lora_patch_cache_key(
+                        model_key=get_model_cache_key(
+                            self.transformer.transformer.key, self.transformer.transformer.submodel_type
+                        ),
+                        prefix=FLUX_LORA_TRANSFORMER_PREFIX,
+                        loras=[(lora.lora.key, lora.weight) for lora in loras],
+                        dtype=inference_dtype,
+                    ),
                 )
             )
 
@@ -42,6 +42,14 @@ class BoardImageRecordStorageBase(ABC):
         """Gets an image's board id, if it has one."""
         pass
 
+    @abstractmethod
+    def get_boards_for_images(
+        self,
+        image_names: list[str],
+    ) -> dict[str, str]:
+        """Gets the board ids of many images. Images without a board are omitted."""
+        pass
+
     @abstractmethod
     def get_image_count_for_board(
         self,
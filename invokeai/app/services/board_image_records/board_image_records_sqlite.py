@@ -1,3 +1,4 @@
+import json
 import sqlite3
 from typing import Optional, cast
 
@@ -52,7 +53,7 @@ class SqliteBoardImageRecordStorage(BoardImageRecordStorageBase):
         offset: int = 0,
         limit: int = 10,
     ) -> OffsetPaginatedResults[ImageRecord]:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
                 SELECT images.*
@@ -81,7 +82,7 @@ class SqliteBoardImageRecordStorage(BoardImageRecordStorageBase):
         categories: list[ImageCategory] | None,
         is_intermediate: bool | None,
     ) -> list[str]:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             params: list[str | bool] = []
 
             # Base query is a join between images and board_images
@@ -137,7 +138,7 @@ class SqliteBoardImageRecordStorage(BoardImageRecordStorageBase):
         self,
         image_name: str,
     ) -> Optional[str]:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
                     SELECT board_id
@@ -151,8 +152,25 @@ class SqliteBoardImageRecordStorage(BoardImageRecordStorageBase):
             return None
         return cast(str, result[0])
 
+    def get_boards_for_images(
+        self,
+        image_names: list[str],
+    ) -> dict[str, str]:
+        with self._db.read() as cursor:
+            # The names are passed as a single JSON array, so there is no limit on their number
+            cursor.execute(
+                """--sql
+                    SELECT board_images.image_name, board_images.board_id
+                    FROM json_each(?) AS names
+                    INNER JOIN board_images ON board_images.image_name = names.value;
+                    """,
+                (json.dumps(image_names),),
+            )
+            result = cast(list[sqlite3.Row], cursor.fetchall())
+        return {row[0]: row[1] for row in result}
+
     def get_image_count_for_board(self, board_id: str) -> int:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             # Convert the enum values to unique list of strings
             category_strings = [c.value for c in set(IMAGE_CATEGORIES)]
             # Create the correct length of placeholders
@@ -171,7 +189,7 @@ class SqliteBoardImageRecordStorage(BoardImageRecordStorageBase):
         return count
 
     def get_asset_count_for_board(self, board_id: str) -> int:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             # Convert the enum values to unique list of strings
             category_strings = [c.value for c in set(ASSETS_CATEGORIES)]
             # Create the correct length of placeholders
@@ -57,7 +57,7 @@ class SqliteBoardRecordStorage(BoardRecordStorageBase):
         self,
         board_id: str,
     ) -> BoardRecord:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             try:
                 cursor.execute(
                     """--sql
@@ -127,7 +127,7 @@ class SqliteBoardRecordStorage(BoardRecordStorageBase):
         limit: int = 10,
         include_archived: bool = False,
     ) -> OffsetPaginatedResults[BoardRecord]:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             # Build base query
             base_query = """
                     SELECT *
@@ -173,7 +173,7 @@ class SqliteBoardRecordStorage(BoardRecordStorageBase):
     def get_all(
         self, order_by: BoardRecordOrderBy, direction: SQLiteDirection, include_archived: bool = False
     ) -> list[BoardRecord]:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             if order_by == BoardRecordOrderBy.Name:
                 base_query = """
                         SELECT *
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Iterator, Optional
 
 
 class BulkDownloadBase(ABC):
@@ -17,6 +17,20 @@ class BulkDownloadBase(ABC):
         :param bulk_download_item_id: The bulk_download_item_id that will be used to retrieve the bulk download item when it is prepared, if none is provided a uuid will be generated.
         """
 
+    @abstractmethod
+    def stream(
+        self, image_names: Optional[list[str]], board_id: Optional[str], bulk_download_item_id: str
+    ) -> Iterator[bytes]:
+        """
+        Create a zip file containing the images specified by the given image names or board id, as a stream of chunks.
+        Nothing is written to disk. The images are looked up before this returns, and read while the stream is consumed.
+
+        :param image_names: A list of image names to include in the zip file.
+        :param board_id: The ID of the board. If provided, all images associated with the board will be included in the zip file.
+        :param bulk_download_item_id: The bulk_download_item_id that will be used in the events emitted for the download.
+        :return: The chunks of the zip file.
+        """
+
     @abstractmethod
     def get_path(self, bulk_download_item_name: str) -> str:
         """
@@ -1,7 +1,11 @@
+import io
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from typing import Optional, Union
-from zipfile import ZipFile
+from typing import Iterator, Optional, Union
+from zipfile import ZIP_STORED, ZipFile, ZipInfo
 
 from invokeai.app.services.board_records.board_records_common import BoardRecordNotFoundException
 from invokeai.app.services.bulk_download.bulk_download_base import BulkDownloadBase
@@ -16,6 +20,30 @@ from invokeai.app.services.images.images_common import ImageDTO
 from invokeai.app.services.invoker import Invoker
 from invokeai.app.util.misc import uuid_string
 
+# The number of threads that read image files, and the number of files that may be read ahead of the one being zipped
+_READ_THREADS = 4
+_MAX_READ_AHEAD = 16
+
+
+class _ChunkWriter(io.RawIOBase):
+    """An unseekable file that collects what is written to it, so a zip file can be streamed in chunks."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:  # pyright: ignore [reportIncompatibleMethodOverride]
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def pop(self) -> bytes:
+        """Gets and clears everything written since the last call."""
+        chunk = b"".join(self._chunks)
+        self._chunks.clear()
+        return chunk
+
 
 class BulkDownloadService(BulkDownloadBase):
     def start(self, invoker: Invoker) -> None:
@@ -59,6 +87,48 @@ class BulkDownloadService(BulkDownloadBase):
             self._invoker.services.logger.error("Problem bulk downloading images.")
             raise e
 
+    def stream(
+        self, image_names: Optional[list[str]], board_id: Optional[str], bulk_download_item_id: str
+    ) -> Iterator[bytes]:
+        bulk_download_id: str = DEFAULT_BULK_DOWNLOAD_ID
+        bulk_download_item_name = bulk_download_item_id + ".zip"
+
+        if board_id:
+            image_dtos = self._board_handler(board_id)
+        elif image_names:
+            image_dtos = self._image_handler(image_names)
+        else:
+            raise BulkDownloadParametersException()
+
+        return self._stream_zip_file(image_dtos, bulk_download_id, bulk_download_item_id, bulk_download_item_name)
+
+    def _stream_zip_file(
+        self,
+        image_dtos: list[ImageDTO],
+        bulk_download_id: str,
+        bulk_download_item_id: str,
+        bulk_download_item_name: str,
+    ) -> Iterator[bytes]:
+        self._signal_job_started(bulk_download_id, bulk_download_item_id, bulk_download_item_name)
+        try:
+            writer = _ChunkWriter()
+            with ZipFile(writer, "w") as zip_file:
+                for _ in self._write_images(zip_file, image_dtos):
+                    yield writer.pop()
+            # The central directory is written when the zip file is closed
+            yield writer.pop()
+        except GeneratorExit:
+            # The client went away before the download finished
+            self._signal_job_failed(
+                bulk_download_id, bulk_download_item_id, bulk_download_item_name, Exception("Download interrupted")
+            )
+            raise
+        except Exception as e:
+            self._signal_job_failed(bulk_download_id, bulk_download_item_id, bulk_download_item_name, e)
+            self._invoker.services.logger.error("Problem streaming bulk download of images.")
+            raise
+        self._signal_job_completed(bulk_download_id, bulk_download_item_id, bulk_download_item_name)
+
     def _image_handler(self, image_names: list[str]) -> list[ImageDTO]:
         return [self._invoker.services.images.get_dto(image_name) for image_name in image_names]
 
@@ -90,13 +160,48 @@ class BulkDownloadService(BulkDownloadBase):
         zip_file_path = self._bulk_downloads_folder / (zip_file_name)
 
         with ZipFile(zip_file_path, "w") as zip_file:
-            for image_dto in image_dtos:
-                image_zip_path = Path(image_dto.image_category.value) / image_dto.image_name
-                image_disk_path = self._invoker.services.images.get_path(image_dto.image_name)
-                zip_file.write(image_disk_path, arcname=image_zip_path)
+            for _ in self._write_images(zip_file, image_dtos):
+                pass
 
         return str(zip_file_name)
 
+    def _write_images(self, zip_file: ZipFile, image_dtos: list[ImageDTO]) -> Iterator[ImageDTO]:
+        """
+        Writes images to a zip file, yielding each image after it is written. The files are read in parallel, and are
+        stored without compression - images are already compressed, so deflating them again only costs time.
+        """
+        for zip_info, data, image_dto in self._read_images(image_dtos):
+            zip_file.writestr(zip_info, data)
+            yield image_dto
+
+    def _read_images(self, image_dtos: list[ImageDTO]) -> Iterator[tuple[ZipInfo, bytes, ImageDTO]]:
+        """Reads the files of images in parallel, yielding them in order. Only a few files are read ahead."""
+        with ThreadPoolExecutor(max_workers=_READ_THREADS, thread_name_prefix="bulk_download") as executor:
+            remaining = iter(image_dtos)
+            reads: deque[tuple[Future[tuple[ZipInfo, bytes]], ImageDTO]] = deque(
+                (executor.submit(self._read_image, image_dto), image_dto)
+                for image_dto in islice(remaining, _MAX_READ_AHEAD)
+            )
+            try:
+                while reads:
+                    read, image_dto = reads.popleft()
+                    next_image_dto = next(remaining, None)
+                    if next_image_dto is not None:
+                        reads.append((executor.submit(self._read_image, next_image_dto), next_image_dto))
+                    zip_info, data = read.result()
+                    yield zip_info, data, image_dto
+            finally:
+                for read, _ in reads:
+                    read.cancel()
+
+    def _read_image(self, image_dto: ImageDTO) -> tuple[ZipInfo, bytes]:
+        image_zip_path = Path(image_dto.image_category.value) / image_dto.image_name
+        image_disk_path = self._invoker.services.images.get_path(image_dto.image_name)
+        zip_info = ZipInfo.from_file(image_disk_path, arcname=image_zip_path)
+        zip_info.compress_type = ZIP_STORED
+        with open(image_disk_path, "rb") as file:
+            return zip_info, file.read()
+
     # from https://stackoverflow.com/questions/7406102/create-sane-safe-filename-from-any-unsafe-string
     def _clean_string_to_path_safe(self, s: str) -> str:
         """Clean a string to be path safe."""
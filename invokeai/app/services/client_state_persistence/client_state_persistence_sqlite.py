@@ -20,7 +20,7 @@ class ClientStatePersistenceSqlite(ClientStatePersistenceABC):
         self._invoker = invoker
 
     def _get(self) -> dict[str, str] | None:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 f"""
                 SELECT data FROM client_state
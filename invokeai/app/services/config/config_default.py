@@ -18,6 +18,7 @@ from pydantic import BaseModel, Field, PrivateAttr, field_validator
 from pydantic_settings import BaseSettings, PydanticBaseSettingsSource, SettingsConfigDict
 
 import invokeai.configs as model_configs
+from invokeai.app.util.sharded_layout import ImageLayout
 from invokeai.backend.model_hash.model_hash import HASHING_ALGORITHMS
 from invokeai.frontend.cli.arg_parser import InvokeAIArgs
 
@@ -29,6 +30,7 @@ ATTENTION_TYPE = Literal["auto", "normal", "xformers", "sliced", "torch-sdp"]
 ATTENTION_SLICE_SIZE = Literal["auto", "balanced", "max", 1, 2, 3, 4, 5, 6, 7, 8]
 LOG_FORMAT = Literal["plain", "color", "syslog", "legacy"]
 LOG_LEVEL = Literal["debug", "info", "warning", "error", "critical"]
+CACHE_EVICTION_POLICY = Literal["lru", "smallest_first", "gdsf", "reload_cost"]
 CONFIG_SCHEMA_VERSION = "4.0.2"
 
 
@@ -78,6 +80,7 @@ class InvokeAIAppConfig(BaseSettings):
         log_sql: Log SQL queries. `log_level` must be `debug` for this to do anything. Extremely verbose.
         log_level_network: Log level for network-related messages. 'info' and 'debug' are very verbose.<br>Valid values: `debug`, `info`, `warning`, `error`, `critical`
         use_memory_db: Use in-memory database. Useful for development.
+        db_read_pool_size: Number of read-only database connections used to serve queries concurrently with writes. Set to 0 to serve all queries from the single writer connection. Has no effect with `use_memory_db`.
         dev_reload: Automatically reload when Python sources are changed. Does not reload node definitions.
         profile_graphs: Enable graph profiling using `cProfile`.
         profile_prefix: An optional prefix for profile output files.
@@ -88,6 +91,14 @@ class InvokeAIAppConfig(BaseSettings):
         device_working_mem_gb: The amount of working memory to keep available on the compute device (in GB). Has no effect if running on CPU. If you are experiencing OOM errors, try increasing this value.
         enable_partial_loading: Enable partial loading of models. This enables models to run with reduced VRAM requirements (at the cost of slower speed) by streaming the model from RAM to VRAM as its used. In some edge cases, partial loading can cause models to run more slowly if they were previously being fully loaded into VRAM.
         keep_ram_copy_of_weights: Whether to keep a full RAM copy of a model's weights when the model is loaded in VRAM. Keeping a RAM copy increases average RAM usage, but speeds up model switching and LoRA patching (assuming there is sufficient RAM). Set this to False if RAM pressure is consistently high.
+        lora_patch_cache: Leave the LoRA patches of a denoising model applied after use, so that the next session that uses the model with the same LoRAs and weights skips patching it. The original weights are restored before the model is used otherwise. Has no effect on quantized models, or if `keep_ram_copy_of_weights` is disabled.
+        lora_patch_cache_ram_gb: The amount of CPU RAM to use to keep the patched weights of recently used LoRA stacks in GB, so that switching back to a stack copies its weights instead of recomputing its patches. This RAM is not counted against `max_cache_ram_gb`, so it is off (0) by default.
+        object_cache_ram_gb: The amount of CPU RAM to use for caching recently used images, latents and conditioning in GB.
+        model_prefetch: Load the models of the current and next queued sessions into the RAM cache in the background, while other nodes run. Models are only prefetched if they fit in the cache without dropping models that are in use or needed soon.
+        model_prefetch_sessions: The number of pending queued sessions to prefetch models for, after the current session.
+        cache_ram_eviction_policy: The policy that chooses which models are dropped from the RAM cache to make room. `lru` drops the least recently used model. `smallest_first` drops the smallest model. `gdsf` (GreedyDual-Size-Frequency) drops the model that is used least often for its size, with old uses aging out. `reload_cost` is like `gdsf`, but weighs models by the time it takes to load them from disk.<br>Valid values: `lru`, `smallest_first`, `gdsf`, `reload_cost`
+        cache_vram_offload_policy: The policy that chooses which models are offloaded from VRAM to make room. Takes the same values as `cache_ram_eviction_policy`.<br>Valid values: `lru`, `smallest_first`, `gdsf`, `reload_cost`
+        cache_trace_file: If set, the model cache's hits, misses and evictions are appended to this file, relative to the root directory. The trace can be replayed against different eviction policies and cache sizes with `scripts/simulate_model_cache.py`.
         ram: DEPRECATED: This setting is no longer used. It has been replaced by `max_cache_ram_gb`, but most users will not need to use this config since automatic cache size limits should work well in most cases. This config setting will be removed once the new model cache behavior is stable.
         vram: DEPRECATED: This setting is no longer used. It has been replaced by `max_cache_vram_gb`, but most users will not need to use this config since automatic cache size limits should work well in most cases. This config setting will be removed once the new model cache behavior is stable.
         lazy_offload: DEPRECATED: This setting is no longer used. Lazy-offloading is enabled by default. This config setting will be removed once the new model cache behavior is stable.
@@ -99,11 +110,14 @@ class InvokeAIAppConfig(BaseSettings):
         attention_slice_size: Slice size, valid when attention_type=="sliced".<br>Valid values: `auto`, `balanced`, `max`, `1`, `2`, `3`, `4`, `5`, `6`, `7`, `8`
         force_tiled_decode: Whether to enable tiled VAE decode (reduces memory consumption with some performance penalty).
         pil_compress_level: The compress_level setting of PIL.Image.save(), used for PNG encoding. All settings are lossless. 0 = no compression, 1 = fastest with slightly larger filesize, 9 = slowest with smallest filesize. 1 is typically the best setting.
+        image_save_threads: The number of threads that encode and write images to disk in the background, so generation does not wait for PNG encoding. Set to 0 to save images on the thread that generates them.
+        image_layout: The layout of the folders that store images, thumbnails and model images. `sharded` stores them in nested subfolders named for a hash of their names (eg `ab/cd/<name>.png`), which keeps folders small when there are millions of images. Images that have not been migrated are still found in the flat layout. Migrate them with `python -m invokeai.backend.util.db_maintenance --operation shard`, then restart the app so it stops looking for them in the flat layout.<br>Valid values: `flat`, `sharded`
         max_queue_size: Maximum number of items in the session queue.
         clear_queue_on_startup: Empties session queue on startup.
         allow_nodes: List of nodes to allow. Omit to allow all.
         deny_nodes: List of nodes to deny. Omit to deny none.
         node_cache_size: How many cached nodes to keep in memory.
+        persist_node_cache: Store the node cache in the database, so cached outputs survive restarts and are shared by processes using the same database. Outputs referencing latents or conditioning are only reused by the process that created them.
         hashing_algorithm: Model hashing algorthim for model installs. 'blake3_multi' is best for SSDs. 'blake3_single' is best for spinning disk HDDs. 'random' disables hashing, instead assigning a UUID to models. Useful when using a memory db to reduce model installation time, or if you don't care about storing stable hashes for models. Alternatively, any other hashlib algorithm is accepted, though these are not nearly as performant as blake3.<br>Valid values: `blake3_multi`, `blake3_single`, `random`, `md5`, `sha1`, `sha224`, `sha256`, `sha384`, `sha512`, `blake2b`, `blake2s`, `sha3_224`, `sha3_256`, `sha3_384`, `sha3_512`, `shake_128`, `shake_256`
         remote_api_tokens: List of regular expression and token pairs used when downloading models from URLs. The download URL is tested against the regex, and if it matches, the token is provided in as a Bearer token.
         scan_models_on_startup: Scan the models directory on startup, registering orphaned models. This is typically only used in conjunction with `use_memory_db` for testing purposes.
@@ -156,6 +170,7 @@ class InvokeAIAppConfig(BaseSettings):
 
     # Development
     use_memory_db:                 bool = Field(default=False,              description="Use in-memory database. Useful for development.")
+    db_read_pool_size:              int = Field(default=4, ge=0,            description="Number of read-only database connections used to serve queries concurrently with writes. Set to 0 to serve all queries from the single writer connection. Has no effect with `use_memory_db`.")
     dev_reload:                    bool = Field(default=False,              description="Automatically reload when Python sources are changed. Does not reload node definitions.")
     profile_graphs:                bool = Field(default=False,              description="Enable graph profiling using `cProfile`.")
     profile_prefix:       Optional[str] = Field(default=None,               description="An optional prefix for profile output files.")
@@ -168,6 +183,14 @@ class InvokeAIAppConfig(BaseSettings):
     device_working_mem_gb:        float = Field(default=3,                  description="The amount of working memory to keep available on the compute device (in GB). Has no effect if running on CPU. If you are experiencing OOM errors, try increasing this value.")
     enable_partial_loading:        bool = Field(default=False,              description="Enable partial loading of models. This enables models to run with reduced VRAM requirements (at the cost of slower speed) by streaming the model from RAM to VRAM as its used. In some edge cases, partial loading can cause models to run more slowly if they were previously being fully loaded into VRAM.")
     keep_ram_copy_of_weights:      bool = Field(default=True,              description="Whether to keep a full RAM copy of a model's weights when the model is loaded in VRAM. Keeping a RAM copy increases average RAM usage, but speeds up model switching and LoRA patching (assuming there is sufficient RAM). Set this to False if RAM pressure is consistently high.")
+    lora_patch_cache:              bool = Field(default=True,               description="Leave the LoRA patches of a denoising model applied after use, so that the next session that uses the model with the same LoRAs and weights skips patching it. The original weights are restored before the model is used otherwise. Has no effect on quantized models, or if `keep_ram_copy_of_weights` is disabled.")
+    lora_patch_cache_ram_gb:      float = Field(default=0, ge=0,            description="The amount of CPU RAM to use to keep the patched weights of recently used LoRA stacks in GB, so that switching back to a stack copies its weights instead of recomputing its patches. This RAM is not counted against `max_cache_ram_gb`, so it is off (0) by default.")
+    object_cache_ram_gb:          float = Field(default=2, ge=0,            description="The amount of CPU RAM to use for caching recently used images, latents and conditioning in GB.")
+    model_prefetch:                bool = Field(default=True,               description="Load the models of the current and next queued sessions into the RAM cache in the background, while other nodes run. Models are only prefetched if they fit in the cache without dropping models that are in use or needed soon.")
+    model_prefetch_sessions:        int = Field(default=1, ge=0,            description="The number of pending queued sessions to prefetch models for, after the current session.")
+    cache_ram_eviction_policy: CACHE_EVICTION_POLICY = Field(default="lru", description="The policy that chooses which models are dropped from the RAM cache to make room. `lru` drops the least recently used model. `smallest_first` drops the smallest model. `gdsf` (GreedyDual-Size-Frequency) drops the model that is used least often for its size, with old uses aging out. `reload_cost` is like `gdsf`, but weighs models by the time it takes to load them from disk.")
+    cache_vram_offload_policy: CACHE_EVICTION_POLICY = Field(default="smallest_first", description="The policy that chooses which models are offloaded from VRAM to make room. Takes the same values as `cache_ram_eviction_policy`.")
+    cache_trace_file:    Optional[Path] = Field(default=None,               description="If set, the model cache's hits, misses and evictions are appended to this file, relative to the root directory. The trace can be replayed against different eviction policies and cache sizes with `scripts/simulate_model_cache.py`.")
     # Deprecated CACHE configs
     ram:                Optional[float] = Field(default=None, gt=0,         description="DEPRECATED: This setting is no longer used. It has been replaced by `max_cache_ram_gb`, but most users will not need to use this config since automatic cache size limits should work well in most cases. This config setting will be removed once the new model cache behavior is stable.")
     vram:               Optional[float] = Field(default=None, ge=0,         description="DEPRECATED: This setting is no longer used. It has been replaced by `max_cache_vram_gb`, but most users will not need to use this config since automatic cache size limits should work well in most cases. This config setting will be removed once the new model cache behavior is stable.")
@@ -186,6 +209,8 @@ class InvokeAIAppConfig(BaseSettings):
     attention_slice_size: ATTENTION_SLICE_SIZE = Field(default="auto",      description='Slice size, valid when attention_type=="sliced".')
     force_tiled_decode:            bool = Field(default=False,              description="Whether to enable tiled VAE decode (reduces memory consumption with some performance penalty).")
     pil_compress_level:             int = Field(default=1,                  description="The compress_level setting of PIL.Image.save(), used for PNG encoding. All settings are lossless. 0 = no compression, 1 = fastest with slightly larger filesize, 9 = slowest with smallest filesize. 1 is typically the best setting.")
+    image_save_threads:             int = Field(default=2, ge=0,            description="The number of threads that encode and write images to disk in the background, so generation does not wait for PNG encoding. Set to 0 to save images on the thread that generates them.")
+    image_layout:           ImageLayout = Field(default="flat",             description="The layout of the folders that store images, thumbnails and model images. `sharded` stores them in nested subfolders named for a hash of their names (eg `ab/cd/<name>.png`), which keeps folders small when there are millions of images. Images that have not been migrated are still found in the flat layout. Migrate them with `python -m invokeai.backend.util.db_maintenance --operation shard`, then restart the app so it stops looking for them in the flat layout.")
     max_queue_size:                 int = Field(default=10000, gt=0,        description="Maximum number of items in the session queue.")
     clear_queue_on_startup:        bool = Field(default=False,              description="Empties session queue on startup.")
 
@@ -193,6 +218,7 @@ class InvokeAIAppConfig(BaseSettings):
     allow_nodes:    Optional[list[str]] = Field(default=None,               description="List of nodes to allow. Omit to allow all.")
     deny_nodes:     Optional[list[str]] = Field(default=None,               description="List of nodes to deny. Omit to deny none.")
     node_cache_size:                int = Field(default=512,                description="How many cached nodes to keep in memory.")
+    persist_node_cache:            bool = Field(default=False,              description="Store the node cache in the database, so cached outputs survive restarts and are shared by processes using the same database. Outputs referencing latents or conditioning are only reused by the process that created them.")
 
     # MODEL INSTALL
     hashing_algorithm: HASHING_ALGORITHMS = Field(default="blake3_single",  description="Model hashing algorthim for model installs. 'blake3_multi' is best for SSDs. 'blake3_single' is best for spinning disk HDDs. 'random' disables hashing, instead assigning a UUID to models. Useful when using a memory db to reduce model installation time, or if you don't care about storing stable hashes for models. Alternatively, any other hashlib algorithm is accepted, though these are not nearly as performant as blake3.")
@@ -336,6 +362,11 @@ class InvokeAIAppConfig(BaseSettings):
         """Path to the graph profiles directory, resolved to an absolute path.."""
         return self._resolve(self.profiles_dir)
 
+    @property
+    def cache_trace_path(self) -> Optional[Path]:
+        """Path to the model cache trace file, resolved to an absolute path, if it is set."""
+        return self._resolve(self.cache_trace_file) if self.cache_trace_file else None
+
     @staticmethod
     def find_root() -> Path:
         """Choose the runtime root directory when not specified on command line or init file."""
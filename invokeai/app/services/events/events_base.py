@@ -5,6 +5,7 @@ from typing import TYPE_CHECKING, Optional
 
 from invokeai.app.services.events.events_common import (
     BatchEnqueuedEvent,
+    BatchEnqueueProgressEvent,
     BulkDownloadCompleteEvent,
     BulkDownloadErrorEvent,
     BulkDownloadStartedEvent,
@@ -38,6 +39,7 @@ if TYPE_CHECKING:
     from invokeai.app.services.model_install.model_install_common import ModelInstallJob
     from invokeai.app.services.session_processor.session_processor_common import ProgressImage
     from invokeai.app.services.session_queue.session_queue_common import (
+        Batch,
         BatchStatus,
         EnqueueBatchResult,
         RetryItemsResult,
@@ -102,6 +104,12 @@ class EventServiceBase:
         """Emitted when a batch is enqueued"""
         self.dispatch(BatchEnqueuedEvent.build(enqueue_result))
 
+    def emit_batch_enqueue_progress(
+        self, queue_id: str, batch: "Batch", enqueued: int, requested: int, priority: int
+    ) -> None:
+        """Emitted after each chunk of a batch's queue items is enqueued"""
+        self.dispatch(BatchEnqueueProgressEvent.build(queue_id, batch, enqueued, requested, priority))
+
     def emit_queue_items_retried(self, retry_result: "RetryItemsResult") -> None:
         """Emitted when a list of queue items are retried"""
         self.dispatch(QueueItemsRetriedEvent.build(retry_result))
@@ -8,6 +8,7 @@ from invokeai.app.services.model_install.model_install_common import ModelInstal
 from invokeai.app.services.session_processor.session_processor_common import ProgressImage
 from invokeai.app.services.session_queue.session_queue_common import (
     QUEUE_ITEM_STATUS,
+    Batch,
     BatchStatus,
     EnqueueBatchResult,
     RetryItemsResult,
@@ -288,6 +289,32 @@ class BatchEnqueuedEvent(QueueEventBase):
         )
 
 
+@payload_schema.register
+class BatchEnqueueProgressEvent(QueueEventBase):
+    """Event model for batch_enqueue_progress"""
+
+    __event_name__ = "batch_enqueue_progress"
+
+    batch_id: str = Field(description="The ID of the batch")
+    enqueued: int = Field(description="The number of invocations enqueued so far")
+    requested: int = Field(description="The number of invocations requested to be enqueued")
+    priority: int = Field(description="The priority of the batch")
+    origin: str | None = Field(default=None, description="The origin of the batch")
+
+    @classmethod
+    def build(
+        cls, queue_id: str, batch: Batch, enqueued: int, requested: int, priority: int
+    ) -> "BatchEnqueueProgressEvent":
+        return cls(
+            queue_id=queue_id,
+            batch_id=batch.batch_id,
+            origin=batch.origin,
+            enqueued=enqueued,
+            requested=requested,
+            priority=priority,
+        )
+
+
 @payload_schema.register
 class QueueItemsRetriedEvent(QueueEventBase):
     """Event model for queue_items_retried"""
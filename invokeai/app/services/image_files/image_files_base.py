@@ -4,6 +4,8 @@ from typing import Optional
 
 from PIL.Image import Image as PILImageType
 
+from invokeai.app.util.thumbnails import DEFAULT_THUMBNAIL_SIZE, ThumbnailFormat, ThumbnailSize
+
 
 class ImageFileStorageBase(ABC):
     """Low-level service responsible for storing and retrieving image files."""
@@ -18,6 +20,16 @@ class ImageFileStorageBase(ABC):
         """Gets the internal path to an image or thumbnail."""
         pass
 
+    @abstractmethod
+    def get_thumbnail_path(
+        self, image_name: str, size: ThumbnailSize = DEFAULT_THUMBNAIL_SIZE, format: ThumbnailFormat = "webp"
+    ) -> Path:
+        """
+        Gets the path to a thumbnail of an image at a size and in a format, making the thumbnail if it does not exist.
+        Raises an `ImageFileNotFoundException` if the image does not exist.
+        """
+        pass
+
     # TODO: We need to validate paths before starlette makes the FileResponse, else we get a
     # 500 internal server error. I don't like having this method on the service.
     @abstractmethod
@@ -34,8 +46,36 @@ class ImageFileStorageBase(ABC):
         workflow: Optional[str] = None,
         graph: Optional[str] = None,
         thumbnail_size: int = 256,
+        session_id: Optional[str] = None,
     ) -> None:
-        """Saves an image and a 256x256 WEBP thumbnail. Returns a tuple of the image name, thumbnail name, and created timestamp."""
+        """
+        Saves an image and a 256x256 WEBP thumbnail. Images saved by a session may be written in the background, and
+        are reported by `flush_session()`.
+        """
+        pass
+
+    @abstractmethod
+    def wait_for_pending(self, image_names: Optional[list[str]] = None) -> None:
+        """
+        Waits for the given images, or all images, to be written to disk if they were saved in the background. Errors
+        are left for `flush()` or `flush_session()` to raise.
+        """
+        pass
+
+    @abstractmethod
+    def flush(self, image_names: Optional[list[str]] = None) -> None:
+        """
+        Waits for the given images, or all images, to be written to disk if they were saved in the background.
+        Raises an `ImageFileSaveException` if any of them failed to be written.
+        """
+        pass
+
+    @abstractmethod
+    def flush_session(self, session_id: str) -> None:
+        """
+        Waits for the images saved by a session to be written to disk. Raises an `ImageFileSaveException` if any of
+        them failed to be written.
+        """
         pass
 
     @abstractmethod
@@ -1,6 +1,7 @@
 # Copyright (c) 2022 Kyle Schouviller (https://github.com/kyle0654) and the InvokeAI Team
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from queue import Queue
+from threading import BoundedSemaphore, Lock
 from typing import Optional, Union
 
 from PIL import Image, PngImagePlugin
@@ -13,25 +14,89 @@ from invokeai.app.services.image_files.image_files_common import (
     ImageFileSaveException,
 )
 from invokeai.app.services.invoker import Invoker
-from invokeai.app.util.thumbnails import get_thumbnail_name, make_thumbnail
+from invokeai.app.services.shared.object_cache import DEFAULT_OBJECT_CACHE_SIZE_BYTES, ObjectCache
+from invokeai.app.util.png_metadata import read_png_text
+from invokeai.app.util.sharded_layout import ImageLayout, get_layout_path, is_migrated, mark_migrated
+from invokeai.app.util.thumbnails import (
+    DEFAULT_THUMBNAIL_SIZE,
+    THUMBNAIL_FORMATS,
+    THUMBNAIL_SIZES,
+    ThumbnailFormat,
+    ThumbnailSize,
+    get_thumbnail_name,
+    get_thumbnail_subfolder,
+    make_thumbnail,
+    save_thumbnail,
+)
 
 
 class DiskImageFileStorage(ImageFileStorageBase):
-    """Stores images on disk"""
-
-    def __init__(self, output_folder: Union[str, Path]):
-        self.__cache: dict[Path, PILImageType] = {}
-        self.__cache_ids = Queue[Path]()
-        self.__max_cache_size = 10  # TODO: get this from config
+    """
+    Stores images on disk. Recently used images are kept in memory, in a cache that may be shared.
+
+    If `save_threads` is greater than 0, images saved by a session are encoded and written to disk in the background.
+    A saved image can be read from memory right away, and `flush_session()` waits for the session's images to be
+    written. Images saved outside a session are written by `save()`.
+
+    :param output_folder: The folder to store images in. Thumbnails are stored in its `thumbnails` subfolder.
+    :param cache: The cache for images. If not given, the storage has its own.
+    :param save_threads: The number of threads that write images. If 0, images are written by `save()`.
+    :param max_pending_saves: The number of images that may wait to be written. `save()` blocks when this many are
+        waiting, which limits the memory held by images that are not yet on disk.
+    :param thumbnail_threads: The number of threads that make thumbnails on demand.
+    :param layout: The layout of the images and thumbnails in their folders. In the sharded layout, images that have
+        not been migrated yet are still found in the flat layout.
+    """
+
+    def __init__(
+        self,
+        output_folder: Union[str, Path],
+        cache: Optional[ObjectCache] = None,
+        save_threads: int = 0,
+        max_pending_saves: int = 8,
+        thumbnail_threads: int = 2,
+        layout: ImageLayout = "flat",
+    ):
+        self.__layout: ImageLayout = layout
+        self.__cache = cache if cache is not None else ObjectCache(DEFAULT_OBJECT_CACHE_SIZE_BYTES)
 
         self.__output_folder = output_folder if isinstance(output_folder, Path) else Path(output_folder)
         self.__thumbnails_folder = self.__output_folder / "thumbnails"
         # Validate required output folders at launch
         self.__validate_storage_folders()
+        # The folders whose files are all in the sharded layout, so files are not looked for in the flat layout. A
+        # folder that is migrated while the app runs is only known to be once the app restarts.
+        self.__migrated_folders: set[Path] = (
+            {folder for folder in self.__get_storage_folders() if is_migrated(folder)} if layout == "sharded" else set()
+        )
+
+        self.__executor = (
+            ThreadPoolExecutor(max_workers=save_threads, thread_name_prefix="image_save") if save_threads > 0 else None
+        )
+        self.__pending_slots = BoundedSemaphore(max_pending_saves)
+        # Maps the names of images waiting to be written to the images and their writes. Pending images are kept here
+        # as well as in the cache, so they can still be read if the cache evicts them.
+        self.__pending: dict[str, tuple[PILImageType, Future[None]]] = {}
+        # Maps the names of images that failed to be written to their errors, until they are reported by `flush()`
+        self.__failed: dict[str, Exception] = {}
+        # Maps session ids to the names of their images that are waiting to be written or failed to be written
+        self.__session_images: dict[str, set[str]] = {}
+        self.__pending_lock = Lock()
+
+        self.__thumbnail_executor = ThreadPoolExecutor(max_workers=thumbnail_threads, thread_name_prefix="thumbnail")
+        # Maps the paths of thumbnails being made to their jobs, so a thumbnail requested twice is only made once
+        self.__thumbnail_jobs: dict[Path, Future[None]] = {}
+        self.__thumbnail_lock = Lock()
 
     def start(self, invoker: Invoker) -> None:
         self.__invoker = invoker
 
+    def stop(self, invoker: Invoker) -> None:
+        if self.__executor is not None:
+            # Pending images are still written
+            self.__executor.shutdown(wait=True)
+        self.__thumbnail_executor.shutdown(wait=True, cancel_futures=True)
+
     def get(self, image_name: str) -> PILImageType:
         try:
             image_path = self.get_path(image_name)
@@ -40,6 +105,11 @@ class DiskImageFileStorage(ImageFileStorageBase):
             if cache_item:
                 return cache_item
 
+            with self.__pending_lock:
+                pending = self.__pending.get(image_name)
+            if pending is not None:
+                return pending[0]
+
             image = Image.open(image_path)
             self.__set_cache(image_path, image)
             return image
@@ -54,9 +124,10 @@ class DiskImageFileStorage(ImageFileStorageBase):
         workflow: Optional[str] = None,
         graph: Optional[str] = None,
         thumbnail_size: int = 256,
+        session_id: Optional[str] = None,
     ) -> None:
         try:
-            self.__validate_storage_folders()
+            # The storage folders are made at launch, and `__write()` makes the image's folders if they are missing
             image_path = self.get_path(image_name)
 
             pnginfo = PngImagePlugin.PngInfo()
@@ -74,39 +145,83 @@ class DiskImageFileStorage(ImageFileStorageBase):
 
             # When saving the image, the image object's info field is not populated. We need to set it
             image.info = info_dict
-            image.save(
-                image_path,
-                "PNG",
-                pnginfo=pnginfo,
-                compress_level=self.__invoker.services.configuration.pil_compress_level,
-            )
 
-            thumbnail_name = get_thumbnail_name(image_name)
-            thumbnail_path = self.get_path(thumbnail_name, thumbnail=True)
-            thumbnail_image = make_thumbnail(image, thumbnail_size)
-            thumbnail_image.save(thumbnail_path)
+            if self.__executor is None or session_id is None:
+                self.__write(image, image_name, pnginfo, thumbnail_size)
+                self.__set_cache(image_path, image)
+                return
 
+            # The image is readable from the cache while it waits to be written
             self.__set_cache(image_path, image)
-            self.__set_cache(thumbnail_path, thumbnail_image)
+            self.__pending_slots.acquire()
+            try:
+                with self.__pending_lock:
+                    future = self.__executor.submit(
+                        self.__write_pending, image, image_name, pnginfo, thumbnail_size, session_id
+                    )
+                    self.__pending[image_name] = (image, future)
+                    self.__failed.pop(image_name, None)
+                    self.__session_images.setdefault(session_id, set()).add(image_name)
+            except Exception:
+                self.__pending_slots.release()
+                self.__delete_cache(image_path)
+                raise
         except Exception as e:
             raise ImageFileSaveException from e
 
+    def wait_for_pending(self, image_names: Optional[list[str]] = None) -> None:
+        with self.__pending_lock:
+            if image_names is None:
+                futures = [future for _, future in self.__pending.values()]
+            else:
+                futures = [self.__pending[name][1] for name in image_names if name in self.__pending]
+
+        wait(futures)
+
+    def flush_session(self, session_id: str) -> None:
+        with self.__pending_lock:
+            image_names = list(self.__session_images.pop(session_id, ()))
+        if image_names:
+            self.flush(image_names)
+
+    def flush(self, image_names: Optional[list[str]] = None) -> None:
+        self.wait_for_pending(image_names)
+
+        with self.__pending_lock:
+            failed_names = (
+                list(self.__failed) if image_names is None else [n for n in image_names if n in self.__failed]
+            )
+            errors = [self.__failed.pop(name) for name in failed_names]
+
+        if errors:
+            raise ImageFileSaveException(f"Failed to save images: {', '.join(failed_names)}") from errors[0]
+
     def delete(self, image_name: str) -> None:
         try:
+            # Let a pending write finish first, so it does not recreate the files. Whether it failed doesn't matter.
+            with self.__pending_lock:
+                pending = self.__pending.get(image_name)
+            if pending is not None:
+                wait([pending[1]])
+            with self.__pending_lock:
+                self.__failed.pop(image_name, None)
+
             image_path = self.get_path(image_name)
 
             if image_path.exists():
                 image_path.unlink()
-            if image_path in self.__cache:
-                del self.__cache[image_path]
+            self.__delete_cache(image_path)
 
             thumbnail_name = get_thumbnail_name(image_name)
             thumbnail_path = self.get_path(thumbnail_name, True)
 
             if thumbnail_path.exists():
                 thumbnail_path.unlink()
-            if thumbnail_path in self.__cache:
-                del self.__cache[thumbnail_path]
+
+            # Thumbnails of other sizes and formats are made on demand, so any of them may exist
+            for size in THUMBNAIL_SIZES:
+                for format in THUMBNAIL_FORMATS:
+                    self.__get_thumbnail_path(image_name, size, format).unlink(missing_ok=True)
         except Exception as e:
             raise ImageFileDeleteException from e
 
@@ -120,7 +235,7 @@ class DiskImageFileStorage(ImageFileStorageBase):
         if basename != filename:
             raise ValueError("Invalid image name, potential directory traversal detected")
 
-        image_path = base_folder / basename
+        image_path = get_layout_path(base_folder, basename, self.__layout, base_folder in self.__migrated_folders)
 
         # Ensure the image path is within the base folder to prevent directory traversal
         resolved_base = base_folder.resolve()
@@ -131,39 +246,149 @@ class DiskImageFileStorage(ImageFileStorageBase):
 
         return resolved_image_path
 
+    def get_thumbnail_path(
+        self, image_name: str, size: ThumbnailSize = DEFAULT_THUMBNAIL_SIZE, format: ThumbnailFormat = "webp"
+    ) -> Path:
+        image_path = self.get_path(image_name)
+        thumbnail_path = self.__get_thumbnail_path(image_name, size, format)
+        if thumbnail_path.exists():
+            return thumbnail_path
+
+        # The image may be waiting to be written with its default thumbnail. If it fails to be written, the error is
+        # left for its session to report.
+        self.wait_for_pending([image_name])
+        if thumbnail_path.exists():
+            return thumbnail_path
+        if not image_path.exists():
+            raise ImageFileNotFoundException
+
+        submitted = False
+        with self.__thumbnail_lock:
+            job = self.__thumbnail_jobs.get(thumbnail_path)
+            if job is None:
+                # Another caller may have made the thumbnail since we checked
+                if thumbnail_path.exists():
+                    return thumbnail_path
+                thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+                job = self.__thumbnail_executor.submit(save_thumbnail, image_path, thumbnail_path, size, format)
+                self.__thumbnail_jobs[thumbnail_path] = job
+                submitted = True
+        if submitted:
+            # Registered without the lock held, as the callback runs right away if the job is already done
+            job.add_done_callback(lambda _: self.__remove_thumbnail_job(thumbnail_path))
+        job.result()
+        return thumbnail_path
+
     def validate_path(self, path: Union[str, Path]) -> bool:
         """Validates the path given for an image or thumbnail."""
         path = path if isinstance(path, Path) else Path(path)
         return path.exists()
 
     def get_workflow(self, image_name: str) -> str | None:
-        image = self.get(image_name)
-        workflow = image.info.get("invokeai_workflow", None)
-        if isinstance(workflow, str):
-            return workflow
-        return None
+        return self.__get_text(image_name, "invokeai_workflow")
 
     def get_graph(self, image_name: str) -> str | None:
-        image = self.get(image_name)
-        graph = image.info.get("invokeai_graph", None)
-        if isinstance(graph, str):
-            return graph
-        return None
+        return self.__get_text(image_name, "invokeai_graph")
+
+    def __get_text(self, image_name: str, key: str) -> str | None:
+        """
+        Gets a text chunk of an image. Only the chunk is read from the file, so reading the workflow of a large image
+        neither decodes its pixels nor adds it to the cache.
+        """
+        try:
+            image_path = self.get_path(image_name)
+
+            with self.__pending_lock:
+                pending = self.__pending.get(image_name)
+            if pending is not None:
+                text = pending[0].info.get(key, None)
+                return text if isinstance(text, str) else None
+
+            return read_png_text(image_path, keys=[key]).get(key, None)
+        except FileNotFoundError as e:
+            raise ImageFileNotFoundException from e
+
+    def __write(self, image: PILImageType, image_name: str, pnginfo: PngImagePlugin.PngInfo, thumbnail_size: int):
+        image_path = self.get_path(image_name)
+        image_path.parent.mkdir(parents=True, exist_ok=True)
+        image.save(
+            image_path,
+            "PNG",
+            pnginfo=pnginfo,
+            compress_level=self.__invoker.services.configuration.pil_compress_level,
+        )
+
+        thumbnail_path = self.get_path(get_thumbnail_name(image_name), thumbnail=True)
+        thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+        thumbnail_image = make_thumbnail(image, thumbnail_size)
+        # Thumbnails are served from their files, so they are not cached
+        thumbnail_image.save(thumbnail_path)
+
+    def __write_pending(
+        self,
+        image: PILImageType,
+        image_name: str,
+        pnginfo: PngImagePlugin.PngInfo,
+        thumbnail_size: int,
+        session_id: str,
+    ) -> None:
+        """Writes an image in the background. Errors are recorded for `flush()` to raise, and are logged."""
+        try:
+            self.__write(image, image_name, pnginfo, thumbnail_size)
+            # Only images that failed to be written are left for their session to report
+            with self.__pending_lock:
+                session_images = self.__session_images.get(session_id)
+                if session_images is not None:
+                    session_images.discard(image_name)
+                    if not session_images:
+                        del self.__session_images[session_id]
+        except Exception as e:
+            self.__invoker.services.logger.error(f"Failed to save image {image_name}: {e}")
+            # The image must not be readable if it is not on disk
+            self.__delete_cache(self.get_path(image_name))
+            with self.__pending_lock:
+                self.__failed[image_name] = e
+        finally:
+            # Done before the future completes, so `flush()` sees the write's outcome as soon as it is done waiting
+            with self.__pending_lock:
+                pending = self.__pending.get(image_name)
+                if pending is not None and pending[0] is image:
+                    del self.__pending[image_name]
+            self.__pending_slots.release()
+
+    def __get_thumbnail_path(self, image_name: str, size: int, format: ThumbnailFormat) -> Path:
+        # The image name has been validated by `get_path()`
+        subfolder = get_thumbnail_subfolder(size, format)
+        thumbnail_name = get_thumbnail_name(image_name, format)
+        migrated = self.__thumbnails_folder / subfolder in self.__migrated_folders
+        return get_layout_path(self.__thumbnails_folder.resolve() / subfolder, thumbnail_name, self.__layout, migrated)
+
+    def __remove_thumbnail_job(self, thumbnail_path: Path) -> None:
+        with self.__thumbnail_lock:
+            self.__thumbnail_jobs.pop(thumbnail_path, None)
+
+    def __get_storage_folders(self) -> list[Path]:
+        """Gets the output folder, the thumbnails folder and the thumbnails' size subfolders."""
+        subfolders = {get_thumbnail_subfolder(size, format) for size in THUMBNAIL_SIZES for format in THUMBNAIL_FORMATS}
+        folders: list[Path] = [self.__output_folder, self.__thumbnails_folder]
+        folders.extend(self.__thumbnails_folder / subfolder for subfolder in sorted(subfolders) if subfolder)
+        return folders
 
     def __validate_storage_folders(self) -> None:
         """Checks if the required output folders exist and create them if they don't"""
-        folders: list[Path] = [self.__output_folder, self.__thumbnails_folder]
-        for folder in folders:
+        for folder in self.__get_storage_folders():
+            if folder.exists():
+                continue
             folder.mkdir(parents=True, exist_ok=True)
+            # A new folder has no files in the flat layout
+            if self.__layout == "sharded":
+                mark_migrated(folder)
+
+    def __get_cache(self, image_path: Path) -> Optional[PILImageType]:
+        return self.__cache.get("images", image_path)
+
+    def __set_cache(self, image_path: Path, image: PILImageType):
+        self.__cache.put("images", image_path, image)
 
-    def __get_cache(self, image_name: Path) -> Optional[PILImageType]:
-        return None if image_name not in self.__cache else self.__cache[image_name]
-
-    def __set_cache(self, image_name: Path, image: PILImageType):
-        if image_name not in self.__cache:
-            self.__cache[image_name] = image
-            self.__cache_ids.put(image_name)  # TODO: this should refresh position for LRU cache
-            if len(self.__cache) > self.__max_cache_size:
-                cache_id = self.__cache_ids.get()
-                if cache_id in self.__cache:
-                    del self.__cache[cache_id]
+    def __delete_cache(self, image_path: Path):
+        self.__cache.delete("images", image_path)
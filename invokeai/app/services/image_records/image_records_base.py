@@ -10,7 +10,7 @@ from invokeai.app.services.image_records.image_records_common import (
     ImageRecordChanges,
     ResourceOrigin,
 )
-from invokeai.app.services.shared.pagination import OffsetPaginatedResults
+from invokeai.app.services.shared.pagination import KeysetPaginatedResults, OffsetPaginatedResults
 from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
 
 
@@ -54,6 +54,34 @@ class ImageRecordStorageBase(ABC):
         """Gets a page of image records."""
         pass
 
+    @abstractmethod
+    def get_many_by_cursor(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        starred_first: bool = True,
+        order_dir: SQLiteDirection = SQLiteDirection.Descending,
+        image_origin: Optional[ResourceOrigin] = None,
+        categories: Optional[list[ImageCategory]] = None,
+        is_intermediate: Optional[bool] = None,
+        board_id: Optional[str] = None,
+        search_term: Optional[str] = None,
+        include_total: bool = False,
+    ) -> KeysetPaginatedResults[ImageRecord]:
+        """
+        Gets the page of image records after the cursor, or the first page if no cursor is given. Raises
+        `InvalidCursorError` if the cursor was not returned by a listing with the same ordering.
+
+        Search matches are not ordered by relevance, as it changes whenever images are added or deleted, and a cursor
+        must keep its position. Use `get_many()` to list matches by relevance.
+        """
+        pass
+
+    @abstractmethod
+    def get_many_by_names(self, image_names: list[str]) -> list[ImageRecord]:
+        """Gets many image records, in the order of the given names. Names without a record are skipped."""
+        pass
+
     # TODO: The database has a nullable `deleted_at` column, currently unused.
     # Should we implement soft deletes? Would need coordination with ImageFileStorage.
     @abstractmethod
@@ -1,3 +1,4 @@
+import json
 import sqlite3
 from datetime import datetime
 from typing import Optional, Union, cast
@@ -16,18 +17,132 @@ from invokeai.app.services.image_records.image_records_common import (
     ResourceOrigin,
     deserialize_image_record,
 )
-from invokeai.app.services.shared.pagination import OffsetPaginatedResults
-from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
+from invokeai.app.services.shared.pagination import (
+    KeysetPaginatedResults,
+    OffsetPaginatedResults,
+    decode_cursor,
+    encode_cursor,
+)
+from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection, build_keyset_condition
+from invokeai.app.services.shared.sqlite.sqlite_count_cache import SqliteCountCache
 from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
 
+# Terms shorter than this can't be matched by the trigram index
+_MIN_FTS_TERM_LENGTH = 3
+
+
+def _get_search_join(search_term: Optional[str], use_fts: bool = True) -> tuple[str, list[Union[int, str, bool]]]:
+    """
+    Builds the join that restricts a query to the images matching a search term, along with its params. Matching
+    images are provided as `search`, with a `rank` column - lower is more relevant.
+
+    The term is matched as a substring of the prompts, model, LoRAs, seed, scheduler and creation date of the images.
+    Without `use_fts`, e.g. if SQLite lacks FTS5, the full-text index is not used and all matches have the same rank.
+    """
+    if not search_term:
+        return "", []
+
+    if not use_fts or len(search_term) < _MIN_FTS_TERM_LENGTH:
+        columns = ["positive_prompt", "negative_prompt", "model", "loras", "seed", "scheduler", "created_at"]
+        conditions = " OR ".join(f"image_search.{c} LIKE ?" for c in columns)
+        search_join = f"""--sql
+        INNER JOIN (
+            SELECT image_search.image_name, 0 AS rank
+            FROM image_search
+            WHERE {conditions}
+        ) AS search ON search.image_name = images.image_name
+        """
+        return search_join, [f"%{search_term}%"] * len(columns)
+
+    search_join = """--sql
+    INNER JOIN (
+        SELECT image_search.image_name, images_fts.rank AS rank
+        FROM images_fts
+        INNER JOIN image_search ON image_search.id = images_fts.rowid
+        WHERE images_fts MATCH ?
+    ) AS search ON search.image_name = images.image_name
+    """
+    # Quote the term as a phrase, so FTS5 query syntax in it is matched literally
+    phrase = '"' + search_term.replace('"', '""') + '"'
+    return search_join, [phrase]
+
+
+def _get_filters(
+    image_origin: Optional[ResourceOrigin],
+    categories: Optional[list[ImageCategory]],
+    is_intermediate: Optional[bool],
+    board_id: Optional[str],
+    search_term: Optional[str],
+    use_fts: bool = True,
+) -> tuple[str, str, list[Union[int, str, bool]]]:
+    """
+    Builds the joins and conditions that filter image listings, along with their params. Joins `board_images`, and
+    `search` if there is a search term.
+    """
+    query_joins = """--sql
+    LEFT JOIN board_images ON board_images.image_name = images.image_name
+    """
+    query_conditions = ""
+    query_params: list[Union[int, str, bool]] = []
+
+    search_join, search_params = _get_search_join(search_term, use_fts)
+    query_joins += search_join
+    # The join comes first in the query, so do its params
+    query_params.extend(search_params)
+
+    if image_origin is not None:
+        query_conditions += """--sql
+        AND images.image_origin = ?
+        """
+        query_params.append(image_origin.value)
+
+    if categories is not None:
+        # Convert the enum values to unique list of strings
+        category_strings = [c.value for c in set(categories)]
+        # Create the correct length of placeholders
+        placeholders = ",".join("?" * len(category_strings))
+
+        query_conditions += f"""--sql
+        AND images.image_category IN ( {placeholders} )
+        """
+
+        # Unpack the included categories into the query params
+        for c in category_strings:
+            query_params.append(c)
+
+    if is_intermediate is not None:
+        query_conditions += """--sql
+        AND images.is_intermediate = ?
+        """
+        query_params.append(is_intermediate)
+
+    # board_id of "none" is reserved for images without a board
+    if board_id == "none":
+        query_conditions += """--sql
+        AND board_images.board_id IS NULL
+        """
+    elif board_id is not None:
+        query_conditions += """--sql
+        AND board_images.board_id = ?
+        """
+        query_params.append(board_id)
+
+    return query_joins, query_conditions, query_params
+
 
 class SqliteImageRecordStorage(ImageRecordStorageBase):
     def __init__(self, db: SqliteDatabase) -> None:
         super().__init__()
         self._db = db
+        # Counts are cached per filter until the next write, so paging through the gallery does not recount it
+        self._counts = SqliteCountCache(db)
+        # The full-text index is not created if SQLite lacks FTS5
+        with self._db.read() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'images_fts';")
+            self._use_fts = cursor.fetchone() is not None
 
     def get(self, image_name: str) -> ImageRecord:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             try:
                 cursor.execute(
                     f"""--sql
@@ -47,7 +162,7 @@ class SqliteImageRecordStorage(ImageRecordStorageBase):
         return deserialize_image_record(dict(result))
 
     def get_metadata(self, image_name: str) -> Optional[MetadataField]:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             try:
                 cursor.execute(
                     """--sql
@@ -135,104 +250,120 @@ class SqliteImageRecordStorage(ImageRecordStorageBase):
         board_id: Optional[str] = None,
         search_term: Optional[str] = None,
     ) -> OffsetPaginatedResults[ImageRecord]:
-        with self._db.transaction() as cursor:
-            # Manually build two queries - one for the count, one for the records
-            count_query = """--sql
-            SELECT COUNT(*)
-            FROM images
-            LEFT JOIN board_images ON board_images.image_name = images.image_name
-            WHERE 1=1
+        query_joins, query_conditions, query_params = _get_filters(
+            image_origin, categories, is_intermediate, board_id, search_term, self._use_fts
+        )
+        search_order = "search.rank, " if search_term else ""
+
+        if starred_first:
+            query_pagination = f"""--sql
+            ORDER BY images.starred DESC, {search_order}images.created_at {order_dir.value} LIMIT ? OFFSET ?
             """
-
-            images_query = f"""--sql
-            SELECT {IMAGE_DTO_COLS}
-            FROM images
-            LEFT JOIN board_images ON board_images.image_name = images.image_name
-            WHERE 1=1
+        else:
+            query_pagination = f"""--sql
+            ORDER BY {search_order}images.created_at {order_dir.value} LIMIT ? OFFSET ?
             """
 
-            query_conditions = ""
-            query_params: list[Union[int, str, bool]] = []
-
-            if image_origin is not None:
-                query_conditions += """--sql
-                AND images.image_origin = ?
-                """
-                query_params.append(image_origin.value)
-
-            if categories is not None:
-                # Convert the enum values to unique list of strings
-                category_strings = [c.value for c in set(categories)]
-                # Create the correct length of placeholders
-                placeholders = ",".join("?" * len(category_strings))
-
-                query_conditions += f"""--sql
-                AND images.image_category IN ( {placeholders} )
-                """
-
-                # Unpack the included categories into the query params
-                for c in category_strings:
-                    query_params.append(c)
-
-            if is_intermediate is not None:
-                query_conditions += """--sql
-                AND images.is_intermediate = ?
-                """
-
-                query_params.append(is_intermediate)
-
-            # board_id of "none" is reserved for images without a board
-            if board_id == "none":
-                query_conditions += """--sql
-                AND board_images.board_id IS NULL
-                """
-            elif board_id is not None:
-                query_conditions += """--sql
-                AND board_images.board_id = ?
-                """
-                query_params.append(board_id)
-
-            # Search term condition
-            if search_term:
-                query_conditions += """--sql
-                AND (
-                    images.metadata LIKE ?
-                    OR images.created_at LIKE ?
-                )
-                """
-                query_params.append(f"%{search_term.lower()}%")
-                query_params.append(f"%{search_term.lower()}%")
-
-            if starred_first:
-                query_pagination = f"""--sql
-                ORDER BY images.starred DESC, images.created_at {order_dir.value} LIMIT ? OFFSET ?
-                """
-            else:
-                query_pagination = f"""--sql
-                ORDER BY images.created_at {order_dir.value} LIMIT ? OFFSET ?
-                """
-
-            # Final images query with pagination
-            images_query += query_conditions + query_pagination + ";"
-            # Add all the parameters
-            images_params = query_params.copy()
-            # Add the pagination parameters
-            images_params.extend([limit, offset])
+        images_query = f"""--sql
+        SELECT {IMAGE_DTO_COLS}
+        FROM images
+        {query_joins}
+        WHERE 1=1{query_conditions}
+        {query_pagination};
+        """
 
+        with self._db.read() as cursor:
             # Build the list of images, deserializing each row
-            cursor.execute(images_query, images_params)
+            cursor.execute(images_query, [*query_params, limit, offset])
             result = cast(list[sqlite3.Row], cursor.fetchall())
 
-            images = [deserialize_image_record(dict(r)) for r in result]
-
-            # Set up and execute the count query, without pagination
-            count_query += query_conditions + ";"
-            count_params = query_params.copy()
-            cursor.execute(count_query, count_params)
-            count = cast(int, cursor.fetchone()[0])
+        images = [deserialize_image_record(dict(r)) for r in result]
+        count = self._count_images(query_joins, query_conditions, query_params)
 
         return OffsetPaginatedResults(items=images, offset=offset, limit=limit, total=count)
 
+    def get_many_by_cursor(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        starred_first: bool = True,
+        order_dir: SQLiteDirection = SQLiteDirection.Descending,
+        image_origin: Optional[ResourceOrigin] = None,
+        categories: Optional[list[ImageCategory]] = None,
+        is_intermediate: Optional[bool] = None,
+        board_id: Optional[str] = None,
+        search_term: Optional[str] = None,
+        include_total: bool = False,
+    ) -> KeysetPaginatedResults[ImageRecord]:
+        query_joins, query_conditions, query_params = _get_filters(
+            image_origin, categories, is_intermediate, board_id, search_term, self._use_fts
+        )
+
+        # The image name breaks ties, so every image has a unique position. Search matches are not ordered by rank, as
+        # bm25 depends on the whole index, so the rank of an image changes when others are added or deleted, and a
+        # stored cursor would then skip or repeat matches.
+        order: list[tuple[str, SQLiteDirection]] = []
+        if starred_first:
+            order.append(("images.starred", SQLiteDirection.Descending))
+        order.extend([("images.created_at", order_dir), ("images.image_name", order_dir)])
+        order_by = ", ".join(f"{column} {direction.value}" for column, direction in order)
+
+        page_condition = ""
+        page_params: list[Union[int, str, bool]] = []
+        if cursor is not None:
+            page_condition, page_params = build_keyset_condition(order, decode_cursor(cursor, order))
+            page_condition = f"AND {page_condition}"
+
+        sort_key_cols = ", ".join(f"{column} AS sort_key_{i}" for i, (column, _) in enumerate(order))
+        images_query = f"""--sql
+        SELECT {IMAGE_DTO_COLS}, {sort_key_cols}
+        FROM images
+        {query_joins}
+        WHERE 1=1{query_conditions}
+        {page_condition}
+        ORDER BY {order_by}
+        LIMIT ?;
+        """
+
+        with self._db.read() as cursor_:
+            # Get one extra row to find out if there is another page
+            cursor_.execute(images_query, [*query_params, *page_params, limit + 1])
+            result = cast(list[sqlite3.Row], cursor_.fetchall())
+
+        next_cursor: Optional[str] = None
+        if len(result) > limit:
+            result = result[:limit]
+            next_cursor = encode_cursor(order, [result[-1][f"sort_key_{i}"] for i in range(len(order))])
+
+        images = [deserialize_image_record(dict(r)) for r in result]
+        total = self._count_images(query_joins, query_conditions, query_params) if include_total else None
+
+        return KeysetPaginatedResults(items=images, limit=limit, next_cursor=next_cursor, total=total)
+
+    def get_many_by_names(self, image_names: list[str]) -> list[ImageRecord]:
+        with self._db.read() as cursor:
+            # The names are passed as a single JSON array, so there is no limit on their number
+            cursor.execute(
+                f"""--sql
+                SELECT {IMAGE_DTO_COLS}
+                FROM json_each(?) AS names
+                INNER JOIN images ON images.image_name = names.value
+                ORDER BY names.key;
+                """,
+                (json.dumps(image_names),),
+            )
+            result = cast(list[sqlite3.Row], cursor.fetchall())
+        return [deserialize_image_record(dict(r)) for r in result]
+
+    def _count_images(self, query_joins: str, query_conditions: str, query_params: list[Union[int, str, bool]]) -> int:
+        count_query = f"""--sql
+        SELECT COUNT(*)
+        FROM images
+        {query_joins}
+        WHERE 1=1{query_conditions};
+        """
+        return self._counts.get_count(count_query, query_params)
+
     def delete(self, image_name: str) -> None:
         with self._db.transaction() as cursor:
             try:
@@ -261,7 +392,7 @@ class SqliteImageRecordStorage(ImageRecordStorageBase):
                 raise ImageRecordDeleteException from e
 
     def get_intermediates_count(self) -> int:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
                 SELECT COUNT(*) FROM images
@@ -356,7 +487,7 @@ class SqliteImageRecordStorage(ImageRecordStorageBase):
         return created_at
 
     def get_most_recent_image_for_board(self, board_id: str) -> Optional[ImageRecord]:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
                 SELECT images.*
@@ -387,80 +518,40 @@ class SqliteImageRecordStorage(ImageRecordStorageBase):
         board_id: Optional[str] = None,
         search_term: Optional[str] = None,
     ) -> ImageNamesResult:
-        with self._db.transaction() as cursor:
-            # Build query conditions (reused for both starred count and image names queries)
-            query_conditions = ""
-            query_params: list[Union[int, str, bool]] = []
-
-            if image_origin is not None:
-                query_conditions += """--sql
-                AND images.image_origin = ?
-                """
-                query_params.append(image_origin.value)
-
-            if categories is not None:
-                category_strings = [c.value for c in set(categories)]
-                placeholders = ",".join("?" * len(category_strings))
-                query_conditions += f"""--sql
-                AND images.image_category IN ( {placeholders} )
-                """
-                for c in category_strings:
-                    query_params.append(c)
-
-            if is_intermediate is not None:
-                query_conditions += """--sql
-                AND images.is_intermediate = ?
-                """
-                query_params.append(is_intermediate)
-
-            if board_id == "none":
-                query_conditions += """--sql
-                AND board_images.board_id IS NULL
-                """
-            elif board_id is not None:
-                query_conditions += """--sql
-                AND board_images.board_id = ?
-                """
-                query_params.append(board_id)
-
-            if search_term:
-                query_conditions += """--sql
-                AND (
-                    images.metadata LIKE ?
-                    OR images.created_at LIKE ?
-                )
-                """
-                query_params.append(f"%{search_term.lower()}%")
-                query_params.append(f"%{search_term.lower()}%")
-
-            # Get starred count if starred_first is enabled
-            starred_count = 0
-            if starred_first:
-                starred_count_query = f"""--sql
-                SELECT COUNT(*)
-                FROM images
-                LEFT JOIN board_images ON board_images.image_name = images.image_name
-                WHERE images.starred = TRUE AND (1=1{query_conditions})
-                """
-                cursor.execute(starred_count_query, query_params)
-                starred_count = cast(int, cursor.fetchone()[0])
+        # Build query conditions (reused for both starred count and image names queries)
+        query_joins, query_conditions, query_params = _get_filters(
+            image_origin, categories, is_intermediate, board_id, search_term, self._use_fts
+        )
+        search_order = "search.rank, " if search_term else ""
+
+        # Get starred count if starred_first is enabled
+        starred_count = 0
+        if starred_first:
+            starred_count_query = f"""--sql
+            SELECT COUNT(*)
+            FROM images
+            {query_joins}
+            WHERE images.starred = TRUE AND (1=1{query_conditions})
+            """
+            starred_count = self._counts.get_count(starred_count_query, query_params)
 
+        with self._db.read() as cursor:
             # Get all image names with proper ordering
             if starred_first:
                 names_query = f"""--sql
                 SELECT images.image_name
                 FROM images
-                LEFT JOIN board_images ON board_images.image_name = images.image_name
+                {query_joins}
                 WHERE 1=1{query_conditions}
-                ORDER BY images.starred DESC, images.created_at {order_dir.value}
+                ORDER BY images.starred DESC, {search_order}images.created_at {order_dir.value}
                 """
             else:
                 names_query = f"""--sql
                 SELECT images.image_name
                 FROM images
-                LEFT JOIN board_images ON board_images.image_name = images.image_name
+                {query_joins}
                 WHERE 1=1{query_conditions}
-                ORDER BY images.created_at {order_dir.value}
+                ORDER BY {search_order}images.created_at {order_dir.value}
                 """
 
             cursor.execute(names_query, query_params)
@@ -12,8 +12,9 @@ from invokeai.app.services.image_records.image_records_common import (
     ResourceOrigin,
 )
 from invokeai.app.services.images.images_common import ImageDTO
-from invokeai.app.services.shared.pagination import OffsetPaginatedResults
+from invokeai.app.services.shared.pagination import KeysetPaginatedResults, OffsetPaginatedResults
 from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
+from invokeai.app.util.thumbnails import DEFAULT_THUMBNAIL_SIZE, ThumbnailFormat, ThumbnailSize
 
 
 class ImageServiceABC(ABC):
@@ -83,6 +84,11 @@ class ImageServiceABC(ABC):
         """Gets an image DTO."""
         pass
 
+    @abstractmethod
+    def get_many_by_names(self, image_names: list[str]) -> list[ImageDTO]:
+        """Gets many image DTOs, in the order of the given names. Names without an image are skipped."""
+        pass
+
     @abstractmethod
     def get_metadata(self, image_name: str) -> Optional[MetadataField]:
         """Gets an image's metadata."""
@@ -98,9 +104,16 @@ class ImageServiceABC(ABC):
         """Gets an image's workflow."""
         pass
 
+    @abstractmethod
+    def get_thumbnail_path(
+        self, image_name: str, size: ThumbnailSize = DEFAULT_THUMBNAIL_SIZE, format: ThumbnailFormat = "webp"
+    ) -> str:
+        """Gets the path of an image's thumbnail at a size and in a format, making the thumbnail if it does not exist."""
+        pass
+
     @abstractmethod
     def get_path(self, image_name: str, thumbnail: bool = False) -> str:
-        """Gets an image's path."""
+        """Gets an image's path, waiting for the image to be written to disk if it is being saved."""
         pass
 
     @abstractmethod
@@ -129,6 +142,23 @@ class ImageServiceABC(ABC):
         """Gets a paginated list of image DTOs with starred images first when starred_first=True."""
         pass
 
+    @abstractmethod
+    def get_many_by_cursor(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        starred_first: bool = True,
+        order_dir: SQLiteDirection = SQLiteDirection.Descending,
+        image_origin: Optional[ResourceOrigin] = None,
+        categories: Optional[list[ImageCategory]] = None,
+        is_intermediate: Optional[bool] = None,
+        board_id: Optional[str] = None,
+        search_term: Optional[str] = None,
+        include_total: bool = False,
+    ) -> KeysetPaginatedResults[ImageDTO]:
+        """Gets the page of image DTOs after the cursor, or the first page if no cursor is given."""
+        pass
+
     @abstractmethod
     def delete(self, image_name: str):
         """Deletes an image."""
@@ -23,8 +23,9 @@ from invokeai.app.services.image_records.image_records_common import (
 from invokeai.app.services.images.images_base import ImageServiceABC
 from invokeai.app.services.images.images_common import ImageDTO, image_record_to_dto
 from invokeai.app.services.invoker import Invoker
-from invokeai.app.services.shared.pagination import OffsetPaginatedResults
+from invokeai.app.services.shared.pagination import InvalidCursorError, KeysetPaginatedResults, OffsetPaginatedResults
 from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
+from invokeai.app.util.thumbnails import DEFAULT_THUMBNAIL_SIZE, ThumbnailFormat, ThumbnailSize
 
 
 class ImageService(ImageServiceABC):
@@ -80,8 +81,15 @@ class ImageService(ImageServiceABC):
                     )
                 except Exception as e:
                     self.__invoker.services.logger.warning(f"Failed to add image to board {board_id}: {str(e)}")
+            # Only images made by a session are written in the background, as the session reports whether they were
+            # written. Uploads are on disk before they are returned.
             self.__invoker.services.image_files.save(
-                image_name=image_name, image=image, metadata=metadata, workflow=workflow, graph=graph
+                image_name=image_name,
+                image=image,
+                metadata=metadata,
+                workflow=workflow,
+                graph=graph,
+                session_id=session_id if image_origin is ResourceOrigin.INTERNAL else None,
             )
             image_dto = self.get_dto(image_name)
 
@@ -153,6 +161,29 @@ class ImageService(ImageServiceABC):
             self.__invoker.services.logger.error("Problem getting image DTO")
             raise e
 
+    def get_many_by_names(self, image_names: list[str]) -> list[ImageDTO]:
+        try:
+            image_records = self.__invoker.services.image_records.get_many_by_names(image_names)
+            return self._records_to_dtos(image_records)
+        except Exception as e:
+            self.__invoker.services.logger.error("Problem getting image DTOs")
+            raise e
+
+    def _records_to_dtos(self, image_records: list[ImageRecord]) -> list[ImageDTO]:
+        """Converts image records to DTOs, getting the boards of all the images in one query."""
+        board_ids = self.__invoker.services.board_image_records.get_boards_for_images(
+            [r.image_name for r in image_records]
+        )
+        return [
+            image_record_to_dto(
+                image_record=r,
+                image_url=self.__invoker.services.urls.get_image_url(r.image_name),
+                thumbnail_url=self.__invoker.services.urls.get_image_url(r.image_name, True),
+                board_id=board_ids.get(r.image_name),
+            )
+            for r in image_records
+        ]
+
     def get_metadata(self, image_name: str) -> Optional[MetadataField]:
         try:
             return self.__invoker.services.image_records.get_metadata(image_name)
@@ -185,11 +216,25 @@ class ImageService(ImageServiceABC):
 
     def get_path(self, image_name: str, thumbnail: bool = False) -> str:
         try:
+            # The path is only useful once the file is on disk
+            self.__invoker.services.image_files.wait_for_pending([image_name])
             return str(self.__invoker.services.image_files.get_path(image_name, thumbnail))
         except Exception as e:
             self.__invoker.services.logger.error("Problem getting image path")
             raise e
 
+    def get_thumbnail_path(
+        self, image_name: str, size: ThumbnailSize = DEFAULT_THUMBNAIL_SIZE, format: ThumbnailFormat = "webp"
+    ) -> str:
+        try:
+            return str(self.__invoker.services.image_files.get_thumbnail_path(image_name, size, format))
+        except ImageFileNotFoundException:
+            self.__invoker.services.logger.error("Image file not found")
+            raise
+        except Exception as e:
+            self.__invoker.services.logger.error("Problem getting image thumbnail path")
+            raise e
+
     def validate_path(self, path: str) -> bool:
         try:
             return self.__invoker.services.image_files.validate_path(path)
@@ -229,15 +274,7 @@ class ImageService(ImageServiceABC):
                 search_term,
             )
 
-            image_dtos = [
-                image_record_to_dto(
-                    image_record=r,
-                    image_url=self.__invoker.services.urls.get_image_url(r.image_name),
-                    thumbnail_url=self.__invoker.services.urls.get_image_url(r.image_name, True),
-                    board_id=self.__invoker.services.board_image_records.get_board_for_image(r.image_name),
-                )
-                for r in results.items
-            ]
+            image_dtos = self._records_to_dtos(results.items)
 
             return OffsetPaginatedResults[ImageDTO](
                 items=image_dtos,
@@ -249,6 +286,47 @@ class ImageService(ImageServiceABC):
             self.__invoker.services.logger.error("Problem getting paginated image DTOs")
             raise e
 
+    def get_many_by_cursor(
+        self,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        starred_first: bool = True,
+        order_dir: SQLiteDirection = SQLiteDirection.Descending,
+        image_origin: Optional[ResourceOrigin] = None,
+        categories: Optional[list[ImageCategory]] = None,
+        is_intermediate: Optional[bool] = None,
+        board_id: Optional[str] = None,
+        search_term: Optional[str] = None,
+        include_total: bool = False,
+    ) -> KeysetPaginatedResults[ImageDTO]:
+        try:
+            results = self.__invoker.services.image_records.get_many_by_cursor(
+                limit=limit,
+                cursor=cursor,
+                starred_first=starred_first,
+                order_dir=order_dir,
+                image_origin=image_origin,
+                categories=categories,
+                is_intermediate=is_intermediate,
+                board_id=board_id,
+                search_term=search_term,
+                include_total=include_total,
+            )
+
+            image_dtos = self._records_to_dtos(results.items)
+
+            return KeysetPaginatedResults[ImageDTO](
+                items=image_dtos,
+                limit=results.limit,
+                next_cursor=results.next_cursor,
+                total=results.total,
+            )
+        except InvalidCursorError:
+            raise
+        except Exception as e:
+            self.__invoker.services.logger.error("Problem getting paginated image DTOs")
+            raise e
+
     def delete(self, image_name: str):
         try:
             self.__invoker.services.image_files.delete(image_name)
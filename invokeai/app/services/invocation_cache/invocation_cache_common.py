@@ -1,3 +1,5 @@
+from typing import Any
+
 from pydantic import BaseModel, Field
 
 
@@ -7,3 +9,28 @@ class InvocationCacheStatus(BaseModel):
     misses: int = Field(description="The number of cache misses")
     enabled: bool = Field(description="Whether the invocation cache is enabled")
     max_size: int = Field(description="The maximum size of the invocation cache")
+
+
+def get_object_references(obj: Any) -> set[tuple[str, str]]:
+    """
+    Gets the stored objects referenced by an invocation output, as `(field name, object name)` pairs. Stored objects
+    (images, tensors and conditioning) are referenced by `*_name` fields, e.g. `ImageField.image_name`.
+    """
+    references: set[tuple[str, str]] = set()
+    _collect_object_references(obj, references)
+    return references
+
+
+def _collect_object_references(obj: Any, references: set[tuple[str, str]]) -> None:
+    if isinstance(obj, BaseModel):
+        for field_name, value in obj:
+            if field_name.endswith("_name") and isinstance(value, str):
+                references.add((field_name, value))
+            else:
+                _collect_object_references(value, references)
+    elif isinstance(obj, (list, tuple, set)):
+        for value in obj:
+            _collect_object_references(value, references)
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            _collect_object_references(value, references)
@@ -5,18 +5,23 @@ from typing import Optional, Union
 
 from invokeai.app.invocations.baseinvocation import BaseInvocation, BaseInvocationOutput
 from invokeai.app.services.invocation_cache.invocation_cache_base import InvocationCacheBase
-from invokeai.app.services.invocation_cache.invocation_cache_common import InvocationCacheStatus
+from invokeai.app.services.invocation_cache.invocation_cache_common import (
+    InvocationCacheStatus,
+    get_object_references,
+)
 from invokeai.app.services.invoker import Invoker
 
 
 @dataclass(order=True)
 class CachedItem:
     invocation_output: BaseInvocationOutput = field(compare=False)
-    invocation_output_json: str = field(compare=False)
+    referenced_names: set[str] = field(compare=False)
 
 
 class MemoryInvocationCache(InvocationCacheBase):
     _cache: OrderedDict[Union[int, str], CachedItem]
+    # Maps the names of images, tensors and conditioning to the keys of the cached outputs that reference them
+    _keys_by_name: dict[str, set[Union[int, str]]]
     _max_cache_size: int
     _disabled: bool
     _hits: int
@@ -26,6 +31,7 @@ class MemoryInvocationCache(InvocationCacheBase):
 
     def __init__(self, max_cache_size: int = 0) -> None:
         self._cache = OrderedDict()
+        self._keys_by_name = {}
         self._max_cache_size = max_cache_size
         self._disabled = False
         self._hits = 0
@@ -59,21 +65,32 @@ class MemoryInvocationCache(InvocationCacheBase):
             # If the cache is full, we need to remove the least used
             number_to_delete = len(self._cache) + 1 - self._max_cache_size
             self._delete_oldest_access(number_to_delete)
-            self._cache[key] = CachedItem(
-                invocation_output,
-                invocation_output.model_dump_json(warnings=False, exclude_defaults=True, exclude_unset=True),
-            )
+            referenced_names = {name for _, name in get_object_references(invocation_output)}
+            self._cache[key] = CachedItem(invocation_output, referenced_names)
+            for name in referenced_names:
+                self._keys_by_name.setdefault(name, set()).add(key)
 
     def _delete_oldest_access(self, number_to_delete: int) -> None:
         number_to_delete = min(number_to_delete, len(self._cache))
         for _ in range(number_to_delete):
-            self._cache.popitem(last=False)
+            key, cached_item = self._cache.popitem(last=False)
+            self._unindex(key, cached_item)
+
+    def _unindex(self, key: Union[int, str], cached_item: CachedItem) -> None:
+        for name in cached_item.referenced_names:
+            keys = self._keys_by_name.get(name)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_name[name]
 
     def _delete(self, key: Union[int, str]) -> None:
         if self._max_cache_size == 0:
             return
-        if key in self._cache:
-            del self._cache[key]
+        cached_item = self._cache.pop(key, None)
+        if cached_item is not None:
+            self._unindex(key, cached_item)
 
     def delete(self, key: Union[int, str]) -> None:
         with self._lock:
@@ -84,6 +101,7 @@ class MemoryInvocationCache(InvocationCacheBase):
             if self._max_cache_size == 0:
                 return
             self._cache.clear()
+            self._keys_by_name.clear()
             self._misses = 0
             self._hits = 0
 
@@ -117,10 +135,7 @@ class MemoryInvocationCache(InvocationCacheBase):
         with self._lock:
             if self._max_cache_size == 0:
                 return
-            keys_to_delete = set()
-            for key, cached_item in self._cache.items():
-                if to_match in cached_item.invocation_output_json:
-                    keys_to_delete.add(key)
+            keys_to_delete = self._keys_by_name.pop(to_match, None)
             if not keys_to_delete:
                 return
             for key in keys_to_delete:
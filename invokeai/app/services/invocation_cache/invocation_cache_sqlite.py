@@ -0,0 +1,242 @@
+import json
+import os
+import sqlite3
+from threading import Lock
+from typing import Optional, Union
+
+import psutil
+from blake3 import blake3
+from pydantic import ValidationError
+
+from invokeai.app.invocations.baseinvocation import BaseInvocation, BaseInvocationOutput, InvocationRegistry
+from invokeai.app.services.invocation_cache.invocation_cache_base import InvocationCacheBase
+from invokeai.app.services.invocation_cache.invocation_cache_common import (
+    InvocationCacheStatus,
+    get_object_references,
+)
+from invokeai.app.services.invoker import Invoker
+from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
+from invokeai.app.util.misc import uuid_string
+
+# Fields naming objects that outlive the process. Tensors and conditioning are stored in temporary directories that
+# are removed when the process exits, so outputs referencing them are only valid in the process that created them.
+PERSISTENT_REFERENCE_FIELDS = {"image_name"}
+
+
+class SqliteInvocationCache(InvocationCacheBase):
+    """
+    Invocation cache stored in the database. Outputs survive restarts and are shared by all processes using the same
+    database. The least recently used outputs are evicted once the cache holds `max_cache_size` outputs.
+
+    Outputs that reference tensors or conditioning are scoped to the process that saved them, as those objects are
+    stored in temporary directories. A scope starts with its process's ID, so scoped outputs are removed once their
+    process is gone.
+
+    Hits only read the database. Their recency is recorded in memory and written with the next save, which is the only
+    time outputs are evicted, so lookups never wait for the write lock.
+    """
+
+    _db: SqliteDatabase
+    _max_cache_size: int
+    _disabled: bool
+    _hits: int
+    _misses: int
+    _scope: str
+    _accessed: dict[str, None]
+    _invoker: Invoker
+    _lock: Lock
+
+    def __init__(self, db: SqliteDatabase, max_cache_size: int = 0) -> None:
+        self._db = db
+        self._max_cache_size = max_cache_size
+        self._disabled = False
+        self._hits = 0
+        self._misses = 0
+        self._scope = f"{os.getpid()}:{uuid_string()}"
+        # The keys of outputs hit since the last save, least recently hit first
+        self._accessed = {}
+        self._lock = Lock()
+
+    def start(self, invoker: Invoker) -> None:
+        self._invoker = invoker
+        if self._max_cache_size == 0:
+            return
+        self._delete_orphaned_scopes()
+        self._invoker.services.images.on_deleted(self._delete_by_match)
+        self._invoker.services.tensors.on_deleted(self._delete_by_match)
+        self._invoker.services.conditioning.on_deleted(self._delete_by_match)
+
+    def stop(self, invoker: Invoker) -> None:
+        if self._max_cache_size == 0:
+            return
+        # Our scoped outputs reference objects that are removed when we exit
+        with self._db.transaction() as cursor:
+            self._write_accessed(cursor)
+            cursor.execute("DELETE FROM invocation_cache WHERE scope = ?;", (self._scope,))
+
+    def get(self, key: Union[int, str]) -> Optional[BaseInvocationOutput]:
+        with self._lock:
+            if self._max_cache_size == 0 or self._disabled:
+                return None
+
+        with self._db.read() as cursor:
+            cursor.execute(
+                "SELECT invocation_output FROM invocation_cache WHERE key = ? AND scope IN ('', ?);",
+                (str(key), self._scope),
+            )
+            rows = cursor.fetchall()
+
+        invocation_output: Optional[BaseInvocationOutput] = None
+        if rows:
+            try:
+                invocation_output = InvocationRegistry.get_output_typeadapter().validate_json(rows[0][0])
+            except ValidationError:
+                # The output's type has changed or is no longer available
+                self.delete(key)
+
+        with self._lock:
+            if invocation_output is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._accessed.pop(str(key), None)
+                self._accessed[str(key)] = None
+        return invocation_output
+
+    def save(self, key: Union[int, str], invocation_output: BaseInvocationOutput) -> None:
+        with self._lock:
+            if self._max_cache_size == 0 or self._disabled:
+                return
+
+        references = get_object_references(invocation_output)
+        is_persistent = all(field_name in PERSISTENT_REFERENCE_FIELDS for field_name, _ in references)
+        scope = "" if is_persistent else self._scope
+
+        with self._db.transaction() as cursor:
+            self._write_accessed(cursor)
+            cursor.execute(
+                """--sql
+                INSERT OR IGNORE INTO invocation_cache (key, scope, invocation_output, last_accessed)
+                VALUES (?, ?, ?, (SELECT IFNULL(MAX(last_accessed), 0) + 1 FROM invocation_cache));
+                """,
+                (str(key), scope, invocation_output.model_dump_json(warnings=False)),
+            )
+            if cursor.rowcount == 0:
+                # Already cached
+                return
+            cache_id = cursor.lastrowid
+            cursor.executemany(
+                "INSERT OR IGNORE INTO invocation_cache_references (name, cache_id) VALUES (?, ?);",
+                [(name, cache_id) for _, name in references],
+            )
+            # If the cache is full, we need to remove the least used
+            cursor.execute(
+                """--sql
+                DELETE FROM invocation_cache
+                WHERE id IN (
+                    SELECT id FROM invocation_cache
+                    ORDER BY last_accessed DESC
+                    LIMIT -1 OFFSET ?
+                );
+                """,
+                (self._max_cache_size,),
+            )
+
+    def delete(self, key: Union[int, str]) -> None:
+        if self._max_cache_size == 0:
+            return
+        with self._db.transaction() as cursor:
+            cursor.execute("DELETE FROM invocation_cache WHERE key = ? AND scope IN ('', ?);", (str(key), self._scope))
+
+    def clear(self) -> None:
+        if self._max_cache_size == 0:
+            return
+        with self._db.transaction() as cursor:
+            cursor.execute("DELETE FROM invocation_cache;")
+        with self._lock:
+            self._misses = 0
+            self._hits = 0
+            self._accessed.clear()
+
+    @staticmethod
+    def create_key(invocation: BaseInvocation) -> str:
+        # Hash canonical JSON, so the key is the same in every process. The node's version is included, so outputs
+        # cached by an older version of a node are not reused.
+        invocation_json = json.dumps(
+            invocation.model_dump(mode="json", exclude={"id"}, warnings=False), sort_keys=True, separators=(",", ":")
+        )
+        return blake3(f"{invocation.UIConfig.version}:{invocation_json}".encode()).hexdigest()
+
+    def disable(self) -> None:
+        with self._lock:
+            if self._max_cache_size == 0:
+                return
+            self._disabled = True
+
+    def enable(self) -> None:
+        with self._lock:
+            if self._max_cache_size == 0:
+                return
+            self._disabled = False
+
+    def get_status(self) -> InvocationCacheStatus:
+        with self._db.read() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM invocation_cache WHERE scope IN ('', ?);", (self._scope,))
+            size = cursor.fetchone()[0]
+        with self._lock:
+            return InvocationCacheStatus(
+                hits=self._hits,
+                misses=self._misses,
+                enabled=not self._disabled and self._max_cache_size > 0,
+                size=size,
+                max_size=self._max_cache_size,
+            )
+
+    def _write_accessed(self, cursor: sqlite3.Cursor) -> None:
+        """Marks the outputs hit since the last save as the most recently used, in the order they were hit."""
+        with self._lock:
+            accessed = list(self._accessed)
+            self._accessed.clear()
+        cursor.executemany(
+            """--sql
+            UPDATE invocation_cache
+            SET last_accessed = (SELECT IFNULL(MAX(last_accessed), 0) + 1 FROM invocation_cache)
+            WHERE key = ? AND scope IN ('', ?);
+            """,
+            [(key, self._scope) for key in accessed],
+        )
+
+    def _delete_orphaned_scopes(self) -> None:
+        """
+        Deletes the scoped outputs of processes that are gone, as the objects they reference no longer exist. Outputs
+        of other processes sharing the database are kept. If a process ID has been reused, its old outputs are left to
+        be evicted, as they are never read.
+        """
+        with self._db.read() as cursor:
+            cursor.execute("SELECT DISTINCT scope FROM invocation_cache WHERE scope != '';")
+            scopes = [row[0] for row in cursor.fetchall()]
+        orphaned = [(scope,) for scope in scopes if not self._is_scope_alive(scope)]
+        if not orphaned:
+            return
+        with self._db.transaction() as cursor:
+            cursor.executemany("DELETE FROM invocation_cache WHERE scope = ?;", orphaned)
+
+    @staticmethod
+    def _is_scope_alive(scope: str) -> bool:
+        pid, _, _ = scope.partition(":")
+        return pid.isdigit() and psutil.pid_exists(int(pid))
+
+    def _delete_by_match(self, to_match: str) -> None:
+        if self._max_cache_size == 0:
+            return
+        with self._db.transaction() as cursor:
+            cursor.execute(
+                """--sql
+                DELETE FROM invocation_cache
+                WHERE id IN (SELECT cache_id FROM invocation_cache_references WHERE name = ?);
+                """,
+                (to_match,),
+            )
+            deleted = cursor.rowcount
+        if deleted > 0:
+            self._invoker.services.logger.debug(f"Deleted {deleted} cached invocation outputs for {to_match}")
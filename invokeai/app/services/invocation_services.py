@@ -28,6 +28,7 @@ if TYPE_CHECKING:
     from invokeai.app.services.invocation_stats.invocation_stats_base import InvocationStatsServiceBase
     from invokeai.app.services.model_images.model_images_base import ModelImageFileStorageBase
     from invokeai.app.services.model_manager.model_manager_base import ModelManagerServiceBase
+    from invokeai.app.services.model_prefetch.model_prefetch_base import ModelPrefetchServiceBase
     from invokeai.app.services.model_relationship_records.model_relationship_records_base import (
         ModelRelationshipRecordStorageBase,
     )
@@ -59,6 +60,7 @@ class InvocationServices:
         logger: "Logger",
         model_images: "ModelImageFileStorageBase",
         model_manager: "ModelManagerServiceBase",
+        model_prefetch: "ModelPrefetchServiceBase",
         model_relationships: "ModelRelationshipsServiceABC",
         model_relationship_records: "ModelRelationshipRecordStorageBase",
         download_queue: "DownloadQueueServiceBase",
@@ -89,6 +91,7 @@ class InvocationServices:
         self.logger = logger
         self.model_images = model_images
         self.model_manager = model_manager
+        self.model_prefetch = model_prefetch
         self.model_relationships = model_relationships
         self.model_relationship_records = model_relationship_records
         self.download_queue = download_queue
@@ -1,5 +1,5 @@
 from collections import defaultdict
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
 from typing import Any, Optional
 
 
@@ -28,6 +28,25 @@ class ModelCacheStatsSummary:
     cache_misses: int
     models_cached: int
     models_cleared: int
+    prefetch_hits: int
+
+    @property
+    def prefetch_hit_rate(self) -> float:
+        """The fraction of the models that had to be loaded from disk that were loaded by the prefetcher."""
+        loads = self.prefetch_hits + self.cache_misses
+        return self.prefetch_hits / loads if loads else 0.0
+
+
+@dataclass
+class ObjectCacheStatsSummary:
+    """The stats for one type of object in the image, latents and conditioning cache."""
+
+    cache_type: str
+    cache_hits: int
+    cache_misses: int
+    evictions: int
+    objects_cached: int
+    cache_size_gb: float
 
 
 @dataclass
@@ -54,6 +73,7 @@ class InvocationStatsSummary:
     graph_stats: GraphExecutionStatsSummary
     model_cache_stats: ModelCacheStatsSummary
     node_stats: list[NodeExecutionStatsSummary]
+    object_cache_stats: list[ObjectCacheStatsSummary] = field(default_factory=list)
 
     def __str__(self) -> str:
         _str = ""
@@ -79,8 +99,14 @@ class InvocationStatsSummary:
         _str += f"   Model cache misses: {self.model_cache_stats.cache_misses}\n"
         _str += f"   Models cached: {self.model_cache_stats.models_cached}\n"
         _str += f"   Models cleared from cache: {self.model_cache_stats.models_cleared}\n"
+        _str += f"   Prefetch hits: {self.model_cache_stats.prefetch_hits} ({self.model_cache_stats.prefetch_hit_rate:.0%} of model loads)\n"
         _str += f"   Cache high water mark: {self.model_cache_stats.high_water_mark_gb:4.2f}/{self.model_cache_stats.cache_size_gb:4.2f}G\n"
 
+        if self.object_cache_stats:
+            _str += "Object cache statistics:\n"
+            for summary in self.object_cache_stats:
+                _str += f"   {summary.cache_type}: {summary.cache_hits} hits, {summary.cache_misses} misses, {summary.evictions} evictions, {summary.objects_cached} cached ({summary.cache_size_gb:4.2f}G)\n"
+
         return _str
 
     def as_dict(self) -> dict[str, Any]:
@@ -2,7 +2,7 @@ import json
 import time
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Generator
+from typing import Generator, Optional
 
 import psutil
 import torch
@@ -18,8 +18,10 @@ from invokeai.app.services.invocation_stats.invocation_stats_common import (
     ModelCacheStatsSummary,
     NodeExecutionStats,
     NodeExecutionStatsSummary,
+    ObjectCacheStatsSummary,
 )
 from invokeai.app.services.invoker import Invoker
+from invokeai.app.services.shared.object_cache import ObjectCache, ObjectCacheStats
 from invokeai.backend.model_manager.load.model_cache.cache_stats import CacheStats
 
 # Size of 1GB in bytes.
@@ -30,11 +32,14 @@ class InvocationStatsService(InvocationStatsServiceBase):
     """Accumulate performance information about a running graph. Collects time spent in each node,
     as well as the maximum and current VRAM utilisation for CUDA systems"""
 
-    def __init__(self):
+    def __init__(self, object_cache: Optional[ObjectCache] = None):
         # Maps graph_execution_state_id to GraphExecutionStats.
         self._stats: dict[str, GraphExecutionStats] = {}
         # Maps graph_execution_state_id to model manager CacheStats.
         self._cache_stats: dict[str, CacheStats] = {}
+        # The image, latents and conditioning cache, and its stats when each graph started executing.
+        self._object_cache = object_cache
+        self._object_cache_start_stats: dict[str, dict[str, ObjectCacheStats]] = {}
 
     def start(self, invoker: Invoker) -> None:
         self._invoker = invoker
@@ -48,6 +53,8 @@ class InvocationStatsService(InvocationStatsServiceBase):
             # First time we're seeing this graph_execution_state_id.
             self._stats[graph_execution_state_id] = GraphExecutionStats()
             self._cache_stats[graph_execution_state_id] = CacheStats()
+            if self._object_cache is not None:
+                self._object_cache_start_stats[graph_execution_state_id] = self._object_cache.get_stats()
 
         # Record state before the invocation.
         start_time = time.time()
@@ -76,11 +83,13 @@ class InvocationStatsService(InvocationStatsServiceBase):
     def reset_stats(self, graph_execution_state_id: str) -> None:
         self._stats.pop(graph_execution_state_id, None)
         self._cache_stats.pop(graph_execution_state_id, None)
+        self._object_cache_start_stats.pop(graph_execution_state_id, None)
 
     def get_stats(self, graph_execution_state_id: str) -> InvocationStatsSummary:
         graph_stats_summary = self._get_graph_summary(graph_execution_state_id)
         node_stats_summaries = self._get_node_summaries(graph_execution_state_id)
         model_cache_stats_summary = self._get_model_cache_summary(graph_execution_state_id)
+        object_cache_stats_summaries = self._get_object_cache_summaries(graph_execution_state_id)
         vram_usage_gb = torch.cuda.memory_allocated() / GB if torch.cuda.is_available() else None
 
         return InvocationStatsSummary(
@@ -88,6 +97,7 @@ class InvocationStatsService(InvocationStatsServiceBase):
             model_cache_stats=model_cache_stats_summary,
             node_stats=node_stats_summaries,
             vram_usage_gb=vram_usage_gb,
+            object_cache_stats=object_cache_stats_summaries,
         )
 
     def log_stats(self, graph_execution_state_id: str) -> None:
@@ -115,8 +125,30 @@ class InvocationStatsService(InvocationStatsServiceBase):
             total_usage_gb=sum(list(cache_stats.loaded_model_sizes.values())) / GB,
             models_cached=cache_stats.in_cache,
             models_cleared=cache_stats.cleared,
+            prefetch_hits=cache_stats.prefetch_hits,
         )
 
+    def _get_object_cache_summaries(self, graph_execution_state_id: str) -> list[ObjectCacheStatsSummary]:
+        if self._object_cache is None:
+            return []
+
+        # Hits, misses and evictions are counted from when the graph started. The cache contents are current.
+        start_stats = self._object_cache_start_stats.get(graph_execution_state_id, {})
+        summaries: list[ObjectCacheStatsSummary] = []
+        for cache_type, stats in sorted(self._object_cache.get_stats().items()):
+            start = start_stats.get(cache_type, ObjectCacheStats())
+            summaries.append(
+                ObjectCacheStatsSummary(
+                    cache_type=cache_type,
+                    cache_hits=stats.hits - start.hits,
+                    cache_misses=stats.misses - start.misses,
+                    evictions=stats.evictions - start.evictions,
+                    objects_cached=stats.items,
+                    cache_size_gb=stats.size_bytes / GB,
+                )
+            )
+        return summaries
+
     def _get_graph_summary(self, graph_execution_state_id: str) -> GraphExecutionStatsSummary:
         try:
             graph_stats = self._stats[graph_execution_state_id]
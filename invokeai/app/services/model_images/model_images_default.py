@@ -11,15 +11,19 @@ from invokeai.app.services.model_images.model_images_common import (
     ModelImageFileSaveException,
 )
 from invokeai.app.util.misc import uuid_string
+from invokeai.app.util.sharded_layout import ImageLayout, get_layout_path, is_migrated, mark_migrated
 from invokeai.app.util.thumbnails import make_thumbnail
 
 
 class ModelImageFileStorageDisk(ModelImageFileStorageBase):
     """Stores images on disk"""
 
-    def __init__(self, model_images_folder: Path):
+    def __init__(self, model_images_folder: Path, layout: ImageLayout = "flat"):
         self._model_images_folder = model_images_folder
+        self._layout: ImageLayout = layout
         self._validate_storage_folders()
+        # If all the images are in the sharded layout, they are not looked for in the flat layout
+        self._migrated = layout == "sharded" and is_migrated(model_images_folder)
 
     def start(self, invoker: Invoker) -> None:
         self._invoker = invoker
@@ -38,7 +42,8 @@ class ModelImageFileStorageDisk(ModelImageFileStorageBase):
     def save(self, image: PILImageType, model_key: str) -> None:
         try:
             self._validate_storage_folders()
-            image_path = self._model_images_folder / (model_key + ".webp")
+            image_path = self.get_path(model_key)
+            image_path.parent.mkdir(parents=True, exist_ok=True)
             thumbnail = make_thumbnail(image, 256)
             thumbnail.save(image_path, format="webp")
 
@@ -46,7 +51,7 @@ class ModelImageFileStorageDisk(ModelImageFileStorageBase):
             raise ModelImageFileSaveException from e
 
     def get_path(self, model_key: str) -> Path:
-        path = self._model_images_folder / (model_key + ".webp")
+        path = get_layout_path(self._model_images_folder, model_key + ".webp", self._layout, self._migrated)
 
         return path
 
@@ -80,4 +85,9 @@ class ModelImageFileStorageDisk(ModelImageFileStorageBase):
 
     def _validate_storage_folders(self) -> None:
         """Checks if the required folders exist and create them if they don't"""
+        if self._model_images_folder.exists():
+            return
         self._model_images_folder.mkdir(parents=True, exist_ok=True)
+        # A new folder has no images in the flat layout
+        if self._layout == "sharded":
+            mark_migrated(self._model_images_folder)
@@ -3,12 +3,13 @@
 
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Callable, Optional
+from typing import Callable, Collection, Optional
 
 from invokeai.backend.model_manager.configs.factory import AnyModelConfig
 from invokeai.backend.model_manager.load import LoadedModel, LoadedModelWithoutConfig
 from invokeai.backend.model_manager.load.model_cache.model_cache import ModelCache
 from invokeai.backend.model_manager.taxonomy import AnyModel, SubModelType
+from invokeai.backend.patches.lora_patch_cache import LoRAPatchCache
 
 
 class ModelLoadServiceBase(ABC):
@@ -23,11 +24,32 @@ class ModelLoadServiceBase(ABC):
         :param submodel: For main (pipeline models), the submodel to fetch.
         """
 
+    @abstractmethod
+    def prefetch_model(
+        self,
+        model_config: AnyModelConfig,
+        submodel_type: Optional[SubModelType] = None,
+        keep: Collection[str] = (),
+    ) -> bool:
+        """
+        Load a model into the RAM cache ahead of its use, if there is room for it without dropping locked models or the
+        models in `keep`. Returns whether the model is in the cache.
+
+        :param model_config: Model configuration record (as returned by ModelRecordBase.get_model())
+        :param submodel: For main (pipeline models), the submodel to fetch.
+        :param keep: The cache keys of models that will be needed soon.
+        """
+
     @property
     @abstractmethod
     def ram_cache(self) -> ModelCache:
         """Return the RAM cache used by this loader."""
 
+    @property
+    @abstractmethod
+    def lora_patch_cache(self) -> Optional[LoRAPatchCache]:
+        """Return the cache of LoRA patches applied to the loaded models, or None if LoRA patches are not cached."""
+
     @abstractmethod
     def load_model_from_path(
         self, model_path: Path, loader: Optional[Callable[[Path], AnyModel]] = None
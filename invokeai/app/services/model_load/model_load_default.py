@@ -2,11 +2,10 @@
 """Implementation of model loader service."""
 
 from pathlib import Path
-from typing import Callable, Optional, Type
+from typing import Callable, Collection, Optional, Type
 
 from picklescan.scanner import scan_file_path
 from safetensors.torch import load_file as safetensors_load_file
-from torch import load as torch_load
 
 from invokeai.app.services.config import InvokeAIAppConfig
 from invokeai.app.services.invoker import Invoker
@@ -21,8 +20,10 @@ from invokeai.backend.model_manager.load import (
 from invokeai.backend.model_manager.load.model_cache.model_cache import ModelCache
 from invokeai.backend.model_manager.load.model_loaders.generic_diffusers import GenericDiffusersLoader
 from invokeai.backend.model_manager.taxonomy import AnyModel, SubModelType
+from invokeai.backend.patches.lora_patch_cache import LoRAPatchCache
 from invokeai.backend.util.devices import TorchDevice
 from invokeai.backend.util.logging import InvokeAILogger
+from invokeai.backend.util.mmap_state_dict import load_state_dict_mmap
 
 
 class ModelLoadService(ModelLoadServiceBase):
@@ -33,6 +34,7 @@ class ModelLoadService(ModelLoadServiceBase):
         app_config: InvokeAIAppConfig,
         ram_cache: ModelCache,
         registry: Optional[Type[ModelLoaderRegistryBase]] = ModelLoaderRegistry,
+        lora_patch_cache: Optional[LoRAPatchCache] = None,
     ):
         """Initialize the model load service."""
         logger = InvokeAILogger.get_logger(self.__class__.__name__)
@@ -41,6 +43,7 @@ class ModelLoadService(ModelLoadServiceBase):
         self._app_config = app_config
         self._ram_cache = ram_cache
         self._registry = registry
+        self._lora_patch_cache = lora_patch_cache
 
     def start(self, invoker: Invoker) -> None:
         self._invoker = invoker
@@ -50,6 +53,11 @@ class ModelLoadService(ModelLoadServiceBase):
         """Return the RAM cache used by this loader."""
         return self._ram_cache
 
+    @property
+    def lora_patch_cache(self) -> Optional[LoRAPatchCache]:
+        """Return the cache of LoRA patches applied to the loaded models, or None if LoRA patches are not cached."""
+        return self._lora_patch_cache
+
     def load_model(self, model_config: AnyModelConfig, submodel_type: Optional[SubModelType] = None) -> LoadedModel:
         """
         Given a model's configuration, load it and return the LoadedModel object.
@@ -75,6 +83,20 @@ class ModelLoadService(ModelLoadServiceBase):
 
         return loaded_model
 
+    def prefetch_model(
+        self,
+        model_config: AnyModelConfig,
+        submodel_type: Optional[SubModelType] = None,
+        keep: Collection[str] = (),
+    ) -> bool:
+        # Prefetching does not emit model load events, as the model is not being loaded for a node
+        implementation, model_config, submodel_type = self._registry.get_implementation(model_config, submodel_type)  # type: ignore
+        return implementation(
+            app_config=self._app_config,
+            logger=self._logger,
+            ram_cache=self._ram_cache,
+        ).prefetch_model(model_config, submodel_type, keep)
+
     def load_model_from_path(
         self, model_path: Path, loader: Optional[Callable[[Path], AnyModel]] = None
     ) -> LoadedModelWithoutConfig:
@@ -103,8 +125,7 @@ class ModelLoadService(ModelLoadServiceBase):
                 else:
                     raise Exception(f"Error scanning model at {checkpoint} for malware. Aborting load.")
 
-            result = torch_load(checkpoint, map_location="cpu")
-            return result
+            return load_state_dict_mmap(checkpoint)
 
         def diffusers_load_directory(directory: Path) -> AnyModel:
             load_class = GenericDiffusersLoader(
@@ -120,6 +141,7 @@ class ModelLoadService(ModelLoadServiceBase):
             if model_path.is_dir()
             else torch_load_file
             if model_path.suffix.endswith((".ckpt", ".pt", ".pth", ".bin"))
+            # Any other file is a safetensors file, whatever its suffix, e.g. `.sft`
             else lambda path: safetensors_load_file(path, device="cpu")
         )
         assert loader is not None
@@ -1,7 +1,7 @@
 # Copyright (c) 2023 Lincoln D. Stein and the InvokeAI Team
 """Implementation of ModelManagerServiceBase."""
 
-from typing import Optional
+from typing import Callable, Optional
 
 import torch
 from typing_extensions import Self
@@ -16,8 +16,11 @@ from invokeai.app.services.model_load.model_load_base import ModelLoadServiceBas
 from invokeai.app.services.model_load.model_load_default import ModelLoadService
 from invokeai.app.services.model_manager.model_manager_base import ModelManagerServiceBase
 from invokeai.app.services.model_records.model_records_base import ModelRecordServiceBase
-from invokeai.backend.model_manager.load.model_cache.model_cache import ModelCache
+from invokeai.backend.model_manager.load.model_cache.cache_trace import CacheTraceRecorder
+from invokeai.backend.model_manager.load.model_cache.eviction_policy import build_eviction_policy
+from invokeai.backend.model_manager.load.model_cache.model_cache import GB, ModelCache
 from invokeai.backend.model_manager.load.model_loader_registry import ModelLoaderRegistry
+from invokeai.backend.patches.lora_patch_cache import LoRAPatchCache
 from invokeai.backend.util.devices import TorchDevice
 from invokeai.backend.util.logging import InvokeAILogger
 
@@ -37,10 +40,12 @@ class ModelManagerService(ModelManagerServiceBase):
         store: ModelRecordServiceBase,
         install: ModelInstallServiceBase,
         load: ModelLoadServiceBase,
+        stop_cache_trace: Optional[Callable[[], None]] = None,
     ):
         self._store = store
         self._install = install
         self._load = load
+        self._stop_cache_trace = stop_cache_trace
 
     @property
     def store(self) -> ModelRecordServiceBase:
@@ -63,6 +68,10 @@ class ModelManagerService(ModelManagerServiceBase):
         for service in [self._store, self._install, self._load]:
             if hasattr(service, "stop"):
                 service.stop(invoker)
+        # Writes the trace events that are still queued
+        if self._stop_cache_trace is not None:
+            self._stop_cache_trace()
+            self._stop_cache_trace = None
 
     @classmethod
     def build_model_manager(
@@ -89,11 +98,20 @@ class ModelManagerService(ModelManagerServiceBase):
             max_vram_cache_size_gb=app_config.max_cache_vram_gb,
             execution_device=execution_device or TorchDevice.choose_torch_device(),
             logger=logger,
+            ram_eviction_policy=build_eviction_policy(app_config.cache_ram_eviction_policy),
+            vram_offload_policy=build_eviction_policy(app_config.cache_vram_offload_policy),
         )
+        stop_cache_trace = None
+        if app_config.cache_trace_path:
+            stop_cache_trace = CacheTraceRecorder(app_config.cache_trace_path).attach(ram_cache)
+        lora_patch_cache = None
+        if app_config.lora_patch_cache:
+            lora_patch_cache = LoRAPatchCache(max_bytes=int(app_config.lora_patch_cache_ram_gb * GB))
         loader = ModelLoadService(
             app_config=app_config,
             ram_cache=ram_cache,
             registry=ModelLoaderRegistry,
+            lora_patch_cache=lora_patch_cache,
         )
         installer = ModelInstallService(
             app_config=app_config,
@@ -101,4 +119,4 @@ class ModelManagerService(ModelManagerServiceBase):
             download_queue=download_queue,
             event_bus=events,
         )
-        return cls(store=model_record_service, install=installer, load=loader)
+        return cls(store=model_record_service, install=installer, load=loader, stop_cache_trace=stop_cache_trace)
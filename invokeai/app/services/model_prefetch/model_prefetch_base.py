@@ -0,0 +1,19 @@
+from abc import ABC, abstractmethod
+
+from invokeai.app.services.session_queue.session_queue_common import SessionQueueItem
+
+
+class ModelPrefetchServiceBase(ABC):
+    """
+    Loads the models that queued sessions will use into the RAM cache, in the background, ahead of their use.
+
+    Models are only prefetched if they fit in the cache without dropping models that are locked or needed soon.
+    """
+
+    @abstractmethod
+    def prefetch(self, queue_item: SessionQueueItem) -> None:
+        """
+        Starts prefetching the models of a session that is about to run, then those of the sessions queued after it.
+        Prefetching for a previous session is stopped.
+        """
+        pass
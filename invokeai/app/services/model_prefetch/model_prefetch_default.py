@@ -0,0 +1,189 @@
+from collections import defaultdict
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Iterator, Optional
+
+from pydantic import BaseModel
+
+from invokeai.app.invocations.model import ModelIdentifierField
+from invokeai.app.services.invoker import Invoker
+from invokeai.app.services.model_prefetch.model_prefetch_base import ModelPrefetchServiceBase
+from invokeai.app.services.session_queue.session_queue_common import SessionQueueItem
+from invokeai.backend.model_manager.load.model_cache.model_cache import CacheEntrySnapshot, get_model_cache_key
+from invokeai.backend.model_manager.taxonomy import BaseModelType, ModelType, SubModelType
+
+# The submodels of main models that are worth prefetching, before any have been used. Tokenizers and schedulers load
+# quickly, so they are left out.
+MAIN_MODEL_SUBMODELS: dict[BaseModelType, tuple[SubModelType, ...]] = {
+    BaseModelType.StableDiffusion1: (SubModelType.TextEncoder, SubModelType.UNet, SubModelType.VAE),
+    BaseModelType.StableDiffusion2: (SubModelType.TextEncoder, SubModelType.UNet, SubModelType.VAE),
+    BaseModelType.StableDiffusionXL: (
+        SubModelType.TextEncoder,
+        SubModelType.TextEncoder2,
+        SubModelType.UNet,
+        SubModelType.VAE,
+    ),
+    BaseModelType.StableDiffusionXLRefiner: (SubModelType.TextEncoder2, SubModelType.UNet, SubModelType.VAE),
+    BaseModelType.StableDiffusion3: (
+        SubModelType.TextEncoder,
+        SubModelType.TextEncoder2,
+        SubModelType.Transformer,
+        SubModelType.VAE,
+    ),
+    BaseModelType.Flux: (SubModelType.Transformer,),
+    BaseModelType.CogView4: (SubModelType.TextEncoder, SubModelType.Transformer, SubModelType.VAE),
+}
+
+# Models of these types are loaded as submodels by some nodes and whole by others, so they are only prefetched once
+# it is known how they are used.
+AMBIGUOUS_MODEL_TYPES = {ModelType.T5Encoder, ModelType.CLIPEmbed, ModelType.VAE}
+
+
+def get_model_identifiers(value: Any) -> Iterator[ModelIdentifierField]:
+    """Gets the model identifiers in a value, such as a node, and in the fields and items it contains."""
+    if isinstance(value, ModelIdentifierField):
+        yield value
+    elif isinstance(value, BaseModel):
+        for field_value in value.__dict__.values():
+            yield from get_model_identifiers(field_value)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from get_model_identifiers(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from get_model_identifiers(item)
+
+
+class ModelPrefetchService(ModelPrefetchServiceBase):
+    """
+    Prefetches models on a background thread. The models of a session are found in the model identifiers of its graph's
+    nodes.
+
+    Main models and some others are loaded in parts, as submodels. The submodels that are prefetched for a model are
+    those that have been loaded for it before, or the usual ones for its base if it has not been used yet.
+    """
+
+    def __init__(self, enabled: bool = True, lookahead: int = 1):
+        """
+        Args:
+            enabled: Whether models are prefetched.
+            lookahead: The number of pending queue items to prefetch models for, after the current one.
+        """
+        self._enabled = enabled
+        self._lookahead = lookahead
+        self._lock = Lock()
+        self._queue_item: Optional[SessionQueueItem] = None
+        # The submodels that have been loaded for each model key. A model that is loaded whole has `None`.
+        self._used_submodels: defaultdict[str, set[Optional[SubModelType]]] = defaultdict(set)
+        self._wake_event = Event()
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+        self._unsubscribe: list[Callable[[], None]] = []
+
+    def start(self, invoker: Invoker) -> None:
+        self._invoker = invoker
+        if not self._enabled:
+            return
+        ram_cache = invoker.services.model_manager.load.ram_cache
+        self._unsubscribe = [
+            ram_cache.on_cache_hit(self._on_model_used),
+            ram_cache.on_cache_miss(self._on_model_used),
+        ]
+        self._stop_event.clear()
+        self._thread = Thread(name="model_prefetch", target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, *args, **kwargs) -> None:
+        for unsubscribe in self._unsubscribe:
+            unsubscribe()
+        self._unsubscribe = []
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def prefetch(self, queue_item: SessionQueueItem) -> None:
+        if not self._enabled:
+            return
+        with self._lock:
+            self._queue_item = queue_item
+        self._wake_event.set()
+
+    def get_targets(
+        self, queue_item: SessionQueueItem
+    ) -> list[tuple[str, ModelIdentifierField, Optional[SubModelType]]]:
+        """
+        Gets the models to prefetch for a session and the sessions queued after it, in the order they will be needed, as
+        tuples of the cache key, model identifier and submodel type.
+        """
+        queue_items = [queue_item]
+        if self._lookahead > 0:
+            queue_items.extend(
+                self._invoker.services.session_queue.list_queue_items_by_cursor(
+                    queue_id=queue_item.queue_id, limit=self._lookahead, status="pending"
+                ).items
+            )
+
+        targets: dict[str, tuple[str, ModelIdentifierField, Optional[SubModelType]]] = {}
+        for item in queue_items:
+            for node in item.session.graph.nodes.values():
+                for identifier in get_model_identifiers(node):
+                    for submodel_type in self._get_submodel_types(identifier):
+                        cache_key = get_model_cache_key(identifier.key, submodel_type)
+                        targets.setdefault(cache_key, (cache_key, identifier, submodel_type))
+        return list(targets.values())
+
+    def _get_submodel_types(self, identifier: ModelIdentifierField) -> list[Optional[SubModelType]]:
+        if identifier.submodel_type is not None:
+            return [identifier.submodel_type]
+        with self._lock:
+            used_submodels = list(self._used_submodels.get(identifier.key, ()))
+        if used_submodels:
+            return used_submodels
+        if identifier.type is ModelType.Main:
+            return list(MAIN_MODEL_SUBMODELS.get(identifier.base, ()))
+        if identifier.type in AMBIGUOUS_MODEL_TYPES:
+            return []
+        return [None]
+
+    def _on_model_used(self, model_key: str, cache_snapshot: dict[str, CacheEntrySnapshot]) -> None:
+        key, _, submodel = model_key.partition(":")
+        try:
+            submodel_type = SubModelType(submodel) if submodel else None
+        except ValueError:
+            # Models loaded by path have the path as their key, which may have a colon in it
+            return
+        with self._lock:
+            self._used_submodels[key].add(submodel_type)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            self._wake_event.wait()
+            self._wake_event.clear()
+            if self._stop_event.is_set():
+                break
+            with self._lock:
+                queue_item = self._queue_item
+            if queue_item is None:
+                continue
+            try:
+                self._prefetch_models(self.get_targets(queue_item))
+            except Exception as e:
+                self._invoker.services.logger.warning(f"Failed to prefetch models: {e}")
+
+    def _prefetch_models(self, targets: list[tuple[str, ModelIdentifierField, Optional[SubModelType]]]) -> None:
+        model_manager = self._invoker.services.model_manager
+        logger = self._invoker.services.logger
+        # None of the models to prefetch are dropped to make room for the others
+        keep = {cache_key for cache_key, _, _ in targets}
+        for cache_key, identifier, submodel_type in targets:
+            if self._wake_event.is_set() or self._stop_event.is_set():
+                # A new session has started, so its models come first
+                return
+            try:
+                config = model_manager.store.get_model(identifier.key)
+                if not model_manager.load.prefetch_model(config, submodel_type, keep=keep):
+                    logger.debug(f"Stopped prefetching models, as there is no room in the cache for {cache_key}")
+                    return
+            except Exception as e:
+                logger.warning(f"Failed to prefetch model {identifier.name} ({cache_key}): {e}")
@@ -204,7 +204,7 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
 
         Exceptions: UnknownModelException
         """
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
                 SELECT config FROM models
@@ -219,7 +219,7 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
         return model
 
     def get_model_by_hash(self, hash: str) -> AnyModelConfig:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
                 SELECT config FROM models
@@ -239,7 +239,7 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
 
         :param key: Unique key for the model to be deleted
         """
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
                 select count(*) FROM models
@@ -270,7 +270,7 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
         If none of the optional filters are passed, will return all
         models in the database.
         """
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             assert isinstance(order_by, ModelRecordOrderBy)
             ordering = {
                 ModelRecordOrderBy.Default: "type, base, name, format",
@@ -332,7 +332,7 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
 
     def search_by_path(self, path: Union[str, Path]) -> List[AnyModelConfig]:
         """Return models with the indicated path."""
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
                 SELECT config FROM models
@@ -345,7 +345,7 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
 
     def search_by_hash(self, hash: str) -> List[AnyModelConfig]:
         """Return models with the indicated hash."""
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
                 SELECT config FROM models
@@ -360,7 +360,7 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
         self, page: int = 0, per_page: int = 10, order_by: ModelRecordOrderBy = ModelRecordOrderBy.Default
     ) -> PaginatedResults[ModelSummary]:
         """Return a paginated summary listing of each model in the database."""
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             assert isinstance(order_by, ModelRecordOrderBy)
             ordering = {
                 ModelRecordOrderBy.Default: "type, base, name, format",
@@ -370,7 +370,7 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
                 ModelRecordOrderBy.Format: "format",
             }
 
-            # Lock so that the database isn't updated while we're doing the two queries.
+            # Both queries run in the same read snapshot, so the count matches the rows.
             # query1: get the total number of model configs
             cursor.execute(
                 """--sql
@@ -28,7 +28,7 @@ class SqliteModelRelationshipRecordStorage(ModelRelationshipRecordStorageBase):
             )
 
     def get_related_model_keys(self, model_key: str) -> list[str]:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """
                 SELECT model_key_2 FROM model_relationships WHERE model_key_1 = ?
@@ -41,7 +41,7 @@ class SqliteModelRelationshipRecordStorage(ModelRelationshipRecordStorageBase):
         return result
 
     def get_related_model_keys_batch(self, model_keys: list[str]) -> list[str]:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             key_list = ",".join("?" for _ in model_keys)
             cursor.execute(
                 f"""
@@ -1,7 +1,7 @@
-from queue import Queue
 from typing import TYPE_CHECKING, Optional, TypeVar
 
 from invokeai.app.services.object_serializer.object_serializer_base import ObjectSerializerBase
+from invokeai.app.services.shared.object_cache import DEFAULT_OBJECT_CACHE_SIZE_BYTES, ObjectCache
 
 T = TypeVar("T")
 
@@ -13,14 +13,22 @@ class ObjectSerializerForwardCache(ObjectSerializerBase[T]):
     """
     Provides a LRU cache for an instance of `ObjectSerializerBase`.
     Saving an object to the cache always writes through to the underlying storage.
+
+    :param underlying_storage: The storage to cache
+    :param cache: The cache to use. It may be shared with other stores. If omitted, a cache with a default size is used.
+    :param cache_type: The type the objects are cached and accounted under in the cache
     """
 
-    def __init__(self, underlying_storage: ObjectSerializerBase[T], max_cache_size: int = 20):
+    def __init__(
+        self,
+        underlying_storage: ObjectSerializerBase[T],
+        cache: Optional[ObjectCache] = None,
+        cache_type: str = "objects",
+    ):
         super().__init__()
         self._underlying_storage = underlying_storage
-        self._cache: dict[str, T] = {}
-        self._cache_ids = Queue[str]()
-        self._max_cache_size = max_cache_size
+        self._cache = cache if cache is not None else ObjectCache(DEFAULT_OBJECT_CACHE_SIZE_BYTES)
+        self._cache_type = cache_type
 
     def start(self, invoker: "Invoker") -> None:
         self._invoker = invoker
@@ -35,31 +43,20 @@ class ObjectSerializerForwardCache(ObjectSerializerBase[T]):
             stop_op(invoker)
 
     def load(self, name: str) -> T:
-        cache_item = self._get_cache(name)
+        cache_item = self._cache.get(self._cache_type, name)
         if cache_item is not None:
             return cache_item
 
         obj = self._underlying_storage.load(name)
-        self._set_cache(name, obj)
+        self._cache.put(self._cache_type, name, obj)
         return obj
 
     def save(self, obj: T) -> str:
         name = self._underlying_storage.save(obj)
-        self._set_cache(name, obj)
+        self._cache.put(self._cache_type, name, obj)
         return name
 
     def delete(self, name: str) -> None:
         self._underlying_storage.delete(name)
-        if name in self._cache:
-            del self._cache[name]
+        self._cache.delete(self._cache_type, name)
         self._on_deleted(name)
-
-    def _get_cache(self, name: str) -> Optional[T]:
-        return None if name not in self._cache else self._cache[name]
-
-    def _set_cache(self, name: str, data: T):
-        if name not in self._cache:
-            self._cache[name] = data
-            self._cache_ids.put(name)
-            if self._cache_ids.qsize() > self._max_cache_size:
-                self._cache.pop(self._cache_ids.get())
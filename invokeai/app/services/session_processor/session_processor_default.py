@@ -7,12 +7,12 @@ from typing import Optional
 
 from invokeai.app.invocations.baseinvocation import BaseInvocation, BaseInvocationOutput
 from invokeai.app.services.events.events_common import (
-    BatchEnqueuedEvent,
     FastAPIEvent,
     QueueClearedEvent,
     QueueItemStatusChangedEvent,
     register_events,
 )
+from invokeai.app.services.image_files.image_files_common import ImageFileSaveException
 from invokeai.app.services.invocation_stats.invocation_stats_common import GESStatsNotFoundError
 from invokeai.app.services.invoker import Invoker
 from invokeai.app.services.session_processor.session_processor_base import (
@@ -160,6 +160,7 @@ class DefaultSessionRunner(SessionRunnerBase):
         """Called before a session is run.
 
         - Start the profiler if profiling is enabled.
+        - Start prefetching the models of this session and the sessions queued after it.
         - Run any callbacks registered for this event.
         """
 
@@ -167,6 +168,8 @@ class DefaultSessionRunner(SessionRunnerBase):
             f"On before run session: queue item {queue_item.item_id}, session {queue_item.session_id}"
         )
 
+        self._services.model_prefetch.prefetch(queue_item)
+
         # If profiling is enabled, start the profiler
         if self._profiler is not None:
             self._profiler.start(profile_id=queue_item.session_id)
@@ -178,8 +181,9 @@ class DefaultSessionRunner(SessionRunnerBase):
         """Called after a session is run.
 
         - Stop the profiler if profiling is enabled.
+        - Wait for images saved in the background to be written to disk.
         - Update the queue item's session object in the database.
-        - If not already canceled or failed, complete the queue item.
+        - If not already canceled or failed, complete the queue item, or fail it if any image could not be written.
         - Log and reset performance statistics.
         - Run any callbacks registered for this event.
         """
@@ -196,6 +200,15 @@ class DefaultSessionRunner(SessionRunnerBase):
                 graph_execution_state_id=queue_item.session.id, output_path=stats_path
             )
 
+        # Images are written to disk in the background. This is the session's durability barrier - it only completes
+        # once all its images are on disk.
+        image_save_error: Optional[ImageFileSaveException] = None
+        try:
+            self._services.image_files.flush_session(queue_item.session_id)
+        except ImageFileSaveException as e:
+            image_save_error = e
+            self._services.logger.error(f"Error while saving images of session {queue_item.session_id}: {e}")
+
         try:
             # Update the queue item with the completed session. If the queue item has been removed from the queue,
             # we'll get a SessionQueueItemNotFoundError and we can ignore it. This can happen if the queue is cleared
@@ -204,7 +217,14 @@ class DefaultSessionRunner(SessionRunnerBase):
 
             # The queue item may have been canceled or failed while the session was running. We should only complete it
             # if it is not already canceled or failed.
-            if queue_item.status not in ["canceled", "failed"]:
+            if queue_item.status not in ["canceled", "failed"] and image_save_error is not None:
+                queue_item = self._services.session_queue.fail_queue_item(
+                    queue_item.item_id,
+                    error_type=image_save_error.__class__.__name__,
+                    error_message=f"{image_save_error}: {image_save_error.__cause__}",
+                    error_traceback="".join(traceback.format_exception(image_save_error)),
+                )
+            elif queue_item.status not in ["canceled", "failed"]:
                 queue_item = self._services.session_queue.complete_queue_item(queue_item.item_id)
 
             # We'll get a GESStatsNotFoundError if we try to log stats for an untracked graph, but in the processor
@@ -314,14 +334,19 @@ class DefaultSessionProcessor(SessionProcessorBase):
         session_runner: Optional[SessionRunnerBase] = None,
         on_non_fatal_processor_error_callbacks: Optional[list[OnNonFatalProcessorError]] = None,
         thread_limit: int = 1,
-        polling_interval: int = 1,
+        retry_interval: float = 1,
     ) -> None:
+        """
+        Args:
+            retry_interval: The time to wait before taking the next queue item after a non-fatal processor error, in
+                seconds. The processor does not poll the queue otherwise - it is woken when items become ready.
+        """
         super().__init__()
 
         self.session_runner = session_runner if session_runner else DefaultSessionRunner()
         self._on_non_fatal_processor_error_callbacks = on_non_fatal_processor_error_callbacks or []
         self._thread_limit = thread_limit
-        self._polling_interval = polling_interval
+        self._retry_interval = retry_interval
 
     def start(self, invoker: Invoker) -> None:
         self._invoker: Invoker = invoker
@@ -330,11 +355,11 @@ class DefaultSessionProcessor(SessionProcessorBase):
 
         self._resume_event = ThreadEvent()
         self._stop_event = ThreadEvent()
-        self._poll_now_event = ThreadEvent()
         self._cancel_event = ThreadEvent()
 
+        # There is no need to listen for enqueued batches - the session queue wakes the processor itself when items
+        # become ready.
         register_events(QueueClearedEvent, self._on_queue_cleared)
-        register_events(BatchEnqueuedEvent, self._on_batch_enqueued)
         register_events(QueueItemStatusChangedEvent, self._on_queue_item_status_changed)
 
         self._thread_semaphore = BoundedSemaphore(self._thread_limit)
@@ -357,7 +382,6 @@ class DefaultSessionProcessor(SessionProcessorBase):
             target=self._process,
             kwargs={
                 "stop_event": self._stop_event,
-                "poll_now_event": self._poll_now_event,
                 "resume_event": self._resume_event,
                 "cancel_event": self._cancel_event,
             },
@@ -366,17 +390,15 @@ class DefaultSessionProcessor(SessionProcessorBase):
 
     def stop(self, *args, **kwargs) -> None:
         self._stop_event.set()
+        self._invoker.services.session_queue.wake_waiters()
 
-    def _poll_now(self) -> None:
-        self._poll_now_event.set()
+    def _wake_processor(self) -> None:
+        self._invoker.services.session_queue.wake_waiters()
 
     async def _on_queue_cleared(self, event: FastAPIEvent[QueueClearedEvent]) -> None:
         if self._queue_item and self._queue_item.queue_id == event[1].queue_id:
             self._cancel_event.set()
-            self._poll_now()
-
-    async def _on_batch_enqueued(self, event: FastAPIEvent[BatchEnqueuedEvent]) -> None:
-        self._poll_now()
+            self._wake_processor()
 
     async def _on_queue_item_status_changed(self, event: FastAPIEvent[QueueItemStatusChangedEvent]) -> None:
         # Make sure the cancel event is for the currently processing queue item
@@ -392,7 +414,7 @@ class DefaultSessionProcessor(SessionProcessorBase):
             # is canceled, and if it is, raises a `CanceledException` to stop execution immediately.
             if event[1].status == "canceled":
                 self._cancel_event.set()
-            self._poll_now()
+            self._wake_processor()
 
     def resume(self) -> SessionProcessorStatus:
         if not self._resume_event.is_set():
@@ -413,7 +435,6 @@ class DefaultSessionProcessor(SessionProcessorBase):
     def _process(
         self,
         stop_event: ThreadEvent,
-        poll_now_event: ThreadEvent,
         resume_event: ThreadEvent,
         cancel_event: ThreadEvent,
     ):
@@ -425,7 +446,6 @@ class DefaultSessionProcessor(SessionProcessorBase):
             cancel_event.clear()
 
             while not stop_event.is_set():
-                poll_now_event.clear()
                 try:
                     # Any unhandled exception in this block is a nonfatal processor error and will be handled.
                     # If we are paused, wait for resume event
@@ -435,9 +455,9 @@ class DefaultSessionProcessor(SessionProcessorBase):
                     self._queue_item = self._invoker.services.session_queue.dequeue()
 
                     if self._queue_item is None:
-                        # The queue was empty, wait for next polling interval or event to try again
-                        self._invoker.services.logger.debug("Waiting for next polling interval or event")
-                        poll_now_event.wait(self._polling_interval)
+                        # The queue was empty, block until an item is ready or we are woken by an event
+                        self._invoker.services.logger.debug("Waiting for a queue item to become ready")
+                        self._invoker.services.session_queue.wait_for_ready()
                         continue
 
                     # GC-ing here can reduce peak memory usage of the invoke process by freeing allocated memory blocks.
@@ -464,8 +484,8 @@ class DefaultSessionProcessor(SessionProcessorBase):
                         error_message=error_message,
                         error_traceback=error_traceback,
                     )
-                    # Wait for next polling interval or event to try again
-                    poll_now_event.wait(self._polling_interval)
+                    # Wait a moment before trying again, so a persistent error doesn't spin the processor
+                    stop_event.wait(self._retry_interval)
                     continue
         except Exception as e:
             # Fatal error in processor, log and pass - we're done here
@@ -477,7 +497,6 @@ class DefaultSessionProcessor(SessionProcessorBase):
             pass
         finally:
             stop_event.clear()
-            poll_now_event.clear()
             self._queue_item = None
             self._thread_semaphore.release()
 
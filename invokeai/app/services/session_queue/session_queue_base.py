@@ -23,7 +23,7 @@ from invokeai.app.services.session_queue.session_queue_common import (
     SessionQueueStatus,
 )
 from invokeai.app.services.shared.graph import GraphExecutionState
-from invokeai.app.services.shared.pagination import CursorPaginatedResults
+from invokeai.app.services.shared.pagination import CursorPaginatedResults, KeysetPaginatedResults
 from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
 
 
@@ -35,6 +35,17 @@ class SessionQueueBase(ABC):
         """Dequeues the next session queue item."""
         pass
 
+    @abstractmethod
+    def wait_for_ready(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until a queue item is ready to be dequeued, `wake_waiters()` is called, or the timeout expires.
+        Returns True if a queue item is ready."""
+        pass
+
+    @abstractmethod
+    def wake_waiters(self) -> None:
+        """Wakes any threads blocked in `wait_for_ready()`."""
+        pass
+
     @abstractmethod
     def enqueue_batch(self, queue_id: str, batch: Batch, prepend: bool) -> Coroutine[Any, Any, EnqueueBatchResult]:
         """Enqueues all permutations of a batch for execution."""
@@ -150,6 +161,22 @@ class SessionQueueBase(ABC):
         """Gets a page of session queue items. Do not remove."""
         pass
 
+    @abstractmethod
+    def list_queue_items_by_cursor(
+        self,
+        queue_id: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        status: Optional[QUEUE_ITEM_STATUS] = None,
+        destination: Optional[str] = None,
+        include_total: bool = False,
+    ) -> KeysetPaginatedResults[SessionQueueItem]:
+        """
+        Gets the page of session queue items after the cursor, or the first page if no cursor is given. Items are
+        ordered by priority, then by the order they were enqueued.
+        """
+        pass
+
     @abstractmethod
     def list_all_queue_items(
         self,
@@ -1,7 +1,9 @@
 import datetime
+import heapq
 import json
+import threading
 from itertools import chain, product
-from typing import Generator, Literal, Optional, TypeAlias, Union
+from typing import Generator, Iterable, Literal, Optional, TypeAlias, Union
 
 from pydantic import (
     AliasChoices,
@@ -193,11 +195,30 @@ GraphExecutionStateValidator = TypeAdapter(GraphExecutionState)
 
 
 def get_session(queue_item_dict: dict) -> GraphExecutionState:
-    session_raw = queue_item_dict.get("session", "{}")
+    session_raw = queue_item_dict.get("session", None)
+    if session_raw is None:
+        # The session has not been saved yet - build it from the batch's graph
+        return materialize_session(
+            session_id=queue_item_dict["session_id"],
+            graph_raw=queue_item_dict["graph"],
+            field_values_raw=queue_item_dict.get("field_values", None),
+        )
     session = GraphExecutionStateValidator.validate_json(session_raw, strict=False)
     return session
 
 
+def materialize_session(session_id: str, graph_raw: str, field_values_raw: Optional[str]) -> GraphExecutionState:
+    """
+    Builds a queue item's session by substituting its field values into its batch's graph, the same way
+    `create_session_nfv_tuples()` does.
+    """
+    graph_as_dict = json.loads(graph_raw)
+    if field_values_raw is not None:
+        for nfv in json.loads(field_values_raw):
+            graph_as_dict["nodes"][nfv["node_path"]][nfv["field_name"]] = nfv["value"]
+    return GraphExecutionStateValidator.validate_python({"id": session_id, "graph": graph_as_dict}, strict=False)
+
+
 def get_workflow(queue_item_dict: dict) -> Optional[WorkflowWithoutID]:
     workflow_raw = queue_item_dict.get("workflow", None)
     if workflow_raw is not None:
@@ -256,10 +277,12 @@ class SessionQueueItem(BaseModel):
 
     @classmethod
     def queue_item_from_dict(cls, queue_item_dict: dict) -> "SessionQueueItem":
-        # must parse these manually
-        queue_item_dict["field_values"] = get_field_values(queue_item_dict)
+        # must parse these manually - the session first, as it may be built from the raw field values
         queue_item_dict["session"] = get_session(queue_item_dict)
+        queue_item_dict["field_values"] = get_field_values(queue_item_dict)
         queue_item_dict["workflow"] = get_workflow(queue_item_dict)
+        # the batch's graph is only needed to build the session
+        queue_item_dict.pop("graph", None)
         return SessionQueueItem(**queue_item_dict)
 
     model_config = ConfigDict(
@@ -402,6 +425,57 @@ class IsFullResult(BaseModel):
 # region Util
 
 
+def iter_batch_node_field_values(batch: Batch, maximum: int) -> Generator[list[dict], None, None]:
+    """
+    Given a batch and a maximum number of sessions to create, generate the flat list of node-field-value dicts that
+    each session substitutes into the batch's graph.
+
+    See `create_session_nfv_tuples()` for how the batch data is expanded into permutations.
+
+    Args:
+        batch: The batch to generate node-field-values from
+        maximum: The maximum number of sessions to generate node-field-values for
+
+    Returns:
+        A generator that yields a list of node-field-value dicts for each session. The generator will stop early if the
+        maximum number of sessions is reached.
+    """
+
+    data: list[list[tuple[dict]]] = []
+    batch_data_collection = batch.data if batch.data is not None else []
+
+    for batch_datum_list in batch_data_collection:
+        node_field_values_to_zip: list[list[dict]] = []
+        # Expand each BatchDatum into a list of dicts - one for each item in the BatchDatum
+        for batch_datum in batch_datum_list:
+            node_field_values = [
+                # Note: A tuple here is slightly faster than a dict, but we need the object in dict form to be inserted
+                # in the session_queue table anyways. So, overall creating NFVs as dicts is faster.
+                {"node_path": batch_datum.node_path, "field_name": batch_datum.field_name, "value": item}
+                for item in batch_datum.items
+            ]
+            node_field_values_to_zip.append(node_field_values)
+        # Zip the dicts together to create a list of dicts for each permutation
+        data.append(list(zip(*node_field_values_to_zip, strict=True)))  # type: ignore [arg-type]
+
+    count = 0
+
+    # Each batch may have multiple runs, so we need to generate the same number of sessions for each run. The total is
+    # still limited by the maximum number of sessions.
+    for _ in range(batch.runs):
+        for d in product(*data):
+            if count >= maximum:
+                # We've reached the maximum number of sessions we may generate
+                return
+
+            # Flatten the list of lists of dicts into a single list of dicts
+            # TODO(psyche): Is the a more efficient way to do this?
+            yield list(chain.from_iterable(d))
+
+            # Increment the count so we know when to stop
+            count += 1
+
+
 def create_session_nfv_tuples(batch: Batch, maximum: int) -> Generator[tuple[str, str, str], None, None]:
     """
     Given a batch and a maximum number of sessions to create, generate a tuple of session_id, session_json, and
@@ -432,23 +506,6 @@ def create_session_nfv_tuples(batch: Batch, maximum: int) -> Generator[tuple[str
 
     # TODO: Should this be a class method on Batch?
 
-    data: list[list[tuple[dict]]] = []
-    batch_data_collection = batch.data if batch.data is not None else []
-
-    for batch_datum_list in batch_data_collection:
-        node_field_values_to_zip: list[list[dict]] = []
-        # Expand each BatchDatum into a list of dicts - one for each item in the BatchDatum
-        for batch_datum in batch_datum_list:
-            node_field_values = [
-                # Note: A tuple here is slightly faster than a dict, but we need the object in dict form to be inserted
-                # in the session_queue table anyways. So, overall creating NFVs as dicts is faster.
-                {"node_path": batch_datum.node_path, "field_name": batch_datum.field_name, "value": item}
-                for item in batch_datum.items
-            ]
-            node_field_values_to_zip.append(node_field_values)
-        # Zip the dicts together to create a list of dicts for each permutation
-        data.append(list(zip(*node_field_values_to_zip, strict=True)))  # type: ignore [arg-type]
-
     # We serialize the graph and session once, then mutate the graph dict in place for each session.
     #
     # This sounds scary, but it's actually fine.
@@ -493,43 +550,27 @@ def create_session_nfv_tuples(batch: Batch, maximum: int) -> Generator[tuple[str
     session_dict = GraphExecutionState(graph=Graph()).model_dump(warnings=False, exclude_none=True)
 
     # Now we can create a generator that yields the session_id, session_json, and field_values_json for each session.
-    count = 0
-
-    # Each batch may have multiple runs, so we need to generate the same number of sessions for each run. The total is
-    # still limited by the maximum number of sessions.
-    for _ in range(batch.runs):
-        for d in product(*data):
-            if count >= maximum:
-                # We've reached the maximum number of sessions we may generate
-                return
-
-            # Flatten the list of lists of dicts into a single list of dicts
-            # TODO(psyche): Is the a more efficient way to do this?
-            flat_node_field_values = list(chain.from_iterable(d))
-
-            # Need a fresh ID for each session
-            session_id = uuid_string()
+    for flat_node_field_values in iter_batch_node_field_values(batch, maximum):
+        # Need a fresh ID for each session
+        session_id = uuid_string()
 
-            # Mutate the session dict in place
-            session_dict["id"] = session_id
+        # Mutate the session dict in place
+        session_dict["id"] = session_id
 
-            # Substitute the values into the graph
-            for nfv in flat_node_field_values:
-                graph_as_dict["nodes"][nfv["node_path"]][nfv["field_name"]] = nfv["value"]
+        # Substitute the values into the graph
+        for nfv in flat_node_field_values:
+            graph_as_dict["nodes"][nfv["node_path"]][nfv["field_name"]] = nfv["value"]
 
-            # Mutate the session dict in place
-            session_dict["graph"] = graph_as_dict
+        # Mutate the session dict in place
+        session_dict["graph"] = graph_as_dict
 
-            # Serialize the session and field values
-            # Note the use of pydantic's to_jsonable_python to handle serialization of any python object, including sets.
-            session_json = json.dumps(session_dict, default=to_jsonable_python)
-            field_values_json = json.dumps(flat_node_field_values, default=to_jsonable_python)
+        # Serialize the session and field values
+        # Note the use of pydantic's to_jsonable_python to handle serialization of any python object, including sets.
+        session_json = json.dumps(session_dict, default=to_jsonable_python)
+        field_values_json = json.dumps(flat_node_field_values, default=to_jsonable_python)
 
-            # Yield the session_id, session_json, and field_values_json
-            yield (session_id, session_json, field_values_json)
-
-            # Increment the count so we know when to stop
-            count += 1
+        # Yield the session_id, session_json, and field_values_json
+        yield (session_id, session_json, field_values_json)
 
 
 def calc_session_count(batch: Batch) -> int:
@@ -556,44 +597,48 @@ def calc_session_count(batch: Batch) -> int:
 
 ValueToInsertTuple: TypeAlias = tuple[
     str,  # queue_id
-    str,  # session (as stringified JSON)
+    str | None,  # session (optional, as stringified JSON - NULL if it is to be built from the batch's graph)
     str,  # session_id
     str,  # batch_id
     str | None,  # field_values (optional, as stringified JSON)
     int,  # priority
-    str | None,  # workflow (optional, as stringified JSON)
     str | None,  # origin (optional)
     str | None,  # destination (optional)
     int | None,  # retried_from_item_id (optional, this is always None for new items)
 ]
 """A type alias for the tuple of values to insert into the session queue table.
 
+The batch's workflow and graph are not part of the tuple - they are stored once per batch in the
+`session_queue_batches` table.
+
 **If you change this, be sure to update the `enqueue_batch` and `retry_items_by_id` methods in the session queue service!**
 """
 
 
-def prepare_values_to_insert(
+def iter_values_to_insert(
     queue_id: str, batch: Batch, priority: int, max_new_queue_items: int
-) -> list[ValueToInsertTuple]:
+) -> Generator[ValueToInsertTuple, None, None]:
     """
-    Given a batch, prepare the values to insert into the session queue table. The list of tuples can be used with an
-    `executemany` statement to insert multiple rows at once.
+    Given a batch, lazily generate the values to insert into the session queue table, one tuple per session.
+
+    The session itself is not serialized. Each queue item stores only its field values, and its session is built from
+    the batch's graph when it is read - see `materialize_session()`. Callers can insert the values in bounded chunks
+    without holding the whole batch in memory.
 
     Args:
         queue_id: The ID of the queue to insert the items into
         batch: The batch to prepare the values for
         priority: The priority of the queue items
-        max_new_queue_items: The maximum number of queue items to insert
+        max_new_queue_items: The maximum number of queue items to generate
 
     Returns:
-        A list of tuples to insert into the session queue table. Each tuple contains the following values:
+        A generator that yields tuples to insert into the session queue table. Each tuple contains the following values:
         - queue_id
-        - session (as stringified JSON)
+        - session (always None)
         - session_id
         - batch_id
         - field_values (optional, as stringified JSON)
         - priority
-        - workflow (optional, as stringified JSON)
         - origin (optional)
         - destination (optional)
         - retried_from_item_id (optional, this is always None for new items)
@@ -605,30 +650,140 @@ def prepare_values_to_insert(
     #
     # So, despite the inferior DX with normal tuples, we use one here for performance reasons.
 
-    values_to_insert: list[ValueToInsertTuple] = []
+    for flat_node_field_values in iter_batch_node_field_values(batch, max_new_queue_items):
+        # Note the use of pydantic's to_jsonable_python to handle serialization of any python object, including sets.
+        field_values_json = json.dumps(flat_node_field_values, default=to_jsonable_python)
+        yield (
+            queue_id,
+            None,
+            uuid_string(),
+            batch.batch_id,
+            field_values_json,
+            priority,
+            batch.origin,
+            batch.destination,
+            None,
+        )
+
+
+def prepare_values_to_insert(
+    queue_id: str, batch: Batch, priority: int, max_new_queue_items: int
+) -> list[ValueToInsertTuple]:
+    """
+    Given a batch, prepare the values to insert into the session queue table. The list of tuples can be used with an
+    `executemany` statement to insert multiple rows at once.
 
+    This materializes every session of the batch at once. Prefer `iter_values_to_insert` for large batches.
+    """
+    return list(
+        iter_values_to_insert(
+            queue_id=queue_id, batch=batch, priority=priority, max_new_queue_items=max_new_queue_items
+        )
+    )
+
+
+def serialize_batch_graph(graph: Graph) -> str:
+    """Serializes a batch's graph for the `session_queue_batches` table. Field values are substituted into it on read."""
+    return json.dumps(graph.model_dump(warnings=False, exclude_none=True), default=to_jsonable_python)
+
+
+def serialize_workflow(workflow: Optional[WorkflowWithoutID]) -> Optional[str]:
+    """Serializes a batch's workflow for the `session_queue_batches` table."""
     # pydantic's to_jsonable_python handles serialization of any python object, including sets, which json.dumps does
     # not support by default. Apparently there are sets somewhere in the graph.
+    return json.dumps(workflow, default=to_jsonable_python) if workflow else None
 
-    # The same workflow is used for all sessions in the batch - serialize it once
-    workflow_json = json.dumps(batch.workflow, default=to_jsonable_python) if batch.workflow else None
-
-    for session_id, session_json, field_values_json in create_session_nfv_tuples(batch, max_new_queue_items):
-        values_to_insert.append(
-            (
-                queue_id,
-                session_json,
-                session_id,
-                batch.batch_id,
-                field_values_json,
-                priority,
-                workflow_json,
-                batch.origin,
-                batch.destination,
-                None,
-            )
-        )
-    return values_to_insert
+
+class SessionQueueReadyIndex:
+    """
+    An in-memory index of pending queue items, ordered the same way the queue is processed: highest priority first,
+    then oldest (lowest item_id) first.
+
+    The index lets the queue find the next item to dequeue without sorting the pending rows in the database, and
+    doubles as a condition variable for the session processor, which blocks in `wait()` until an item is ready.
+
+    Removal is lazy: discarded items are dropped from the lookup immediately, and their heap entries are skipped when
+    they reach the top of the heap. The heap is compacted when stale entries outnumber live ones.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[int, int]] = []  # (-priority, item_id)
+        self._priorities: dict[int, int] = {}  # item_id -> priority
+        self._condition = threading.Condition()
+        self._notified = False
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._priorities)
+
+    def __contains__(self, item_id: int) -> bool:
+        with self._condition:
+            return item_id in self._priorities
+
+    def reset(self, items: Iterable[tuple[int, int]]) -> None:
+        """Replaces the contents of the index with the given (item_id, priority) pairs."""
+        with self._condition:
+            self._priorities = dict(items)
+            self._heap = [(-priority, item_id) for item_id, priority in self._priorities.items()]
+            heapq.heapify(self._heap)
+            if self._priorities:
+                self._condition.notify_all()
+
+    def add(self, items: Iterable[tuple[int, int]]) -> None:
+        """Adds (item_id, priority) pairs to the index and wakes any waiters."""
+        with self._condition:
+            added = False
+            for item_id, priority in items:
+                self._priorities[item_id] = priority
+                heapq.heappush(self._heap, (-priority, item_id))
+                added = True
+            if added:
+                self._condition.notify_all()
+
+    def discard(self, item_ids: Iterable[int]) -> None:
+        """Removes items from the index. Unknown item ids are ignored."""
+        with self._condition:
+            for item_id in item_ids:
+                self._priorities.pop(item_id, None)
+            if len(self._heap) > 2 * len(self._priorities) + 64:
+                self._heap = [(-priority, item_id) for item_id, priority in self._priorities.items()]
+                heapq.heapify(self._heap)
+
+    def pop(self) -> Optional[int]:
+        """Removes and returns the id of the next item to process, or None if the index is empty."""
+        entry = self.pop_with_priority()
+        return entry[0] if entry is not None else None
+
+    def pop_with_priority(self) -> Optional[tuple[int, int]]:
+        """
+        Removes and returns the (item_id, priority) pair of the next item to process, or None if the index is empty.
+        The pair can be passed back to `add()` if the item could not be processed.
+        """
+        with self._condition:
+            while self._heap:
+                neg_priority, item_id = heapq.heappop(self._heap)
+                # Skip entries for items that were discarded or re-added with a different priority
+                if self._priorities.get(item_id) == -neg_priority:
+                    del self._priorities[item_id]
+                    return item_id, -neg_priority
+            return None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until the index has an item, `notify()` is called, or the timeout expires.
+
+        Returns True if the index has an item.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: bool(self._priorities) or self._notified, timeout)
+            self._notified = False
+            return bool(self._priorities)
+
+    def notify(self) -> None:
+        """Wakes any threads blocked in `wait()`, even if the index is empty."""
+        with self._condition:
+            self._notified = True
+            self._condition.notify_all()
 
 
 # endregion Util
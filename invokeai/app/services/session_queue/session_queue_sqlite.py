@@ -1,6 +1,7 @@
 import asyncio
 import json
 import sqlite3
+from itertools import islice
 from typing import Optional, Union, cast
 
 from pydantic_core import to_jsonable_python
@@ -28,16 +29,28 @@ from invokeai.app.services.session_queue.session_queue_common import (
     SessionQueueCountsByDestination,
     SessionQueueItem,
     SessionQueueItemNotFoundError,
+    SessionQueueReadyIndex,
     SessionQueueStatus,
     ValueToInsertTuple,
     calc_session_count,
-    prepare_values_to_insert,
+    iter_values_to_insert,
+    serialize_batch_graph,
+    serialize_workflow,
 )
 from invokeai.app.services.shared.graph import GraphExecutionState
-from invokeai.app.services.shared.pagination import CursorPaginatedResults
-from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
+from invokeai.app.services.shared.pagination import (
+    CursorPaginatedResults,
+    KeysetPaginatedResults,
+    decode_cursor,
+    encode_cursor,
+)
+from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection, build_keyset_condition
+from invokeai.app.services.shared.sqlite.sqlite_count_cache import SqliteCountCache
 from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
 
+ENQUEUE_CHUNK_SIZE = 500
+"""The number of queue items inserted per transaction when enqueuing a batch."""
+
 
 class SqliteSessionQueue(SessionQueueBase):
     __invoker: Invoker
@@ -49,10 +62,34 @@ class SqliteSessionQueue(SessionQueueBase):
             clear_result = self.clear(DEFAULT_QUEUE_ID)
             if clear_result.deleted > 0:
                 self.__invoker.services.logger.info(f"Cleared all {clear_result.deleted} queue items")
+        self._load_ready_index()
 
     def __init__(self, db: SqliteDatabase) -> None:
         super().__init__()
         self._db = db
+        self._counts = SqliteCountCache(db)
+        # All writes that add or remove pending items go through this class, so it can keep an in-memory index of the
+        # pending items. `dequeue()` uses it to find the next item without sorting the pending rows.
+        self._ready_index = SessionQueueReadyIndex()
+
+    def _load_ready_index(self) -> None:
+        """Populates the ready index from the pending queue items in the database."""
+        with self._db.read() as cursor:
+            cursor.execute(
+                """--sql
+                SELECT item_id, priority
+                FROM session_queue
+                WHERE status = 'pending'
+                """
+            )
+            rows = cast(list[sqlite3.Row], cursor.fetchall())
+        self._ready_index.reset((row[0], row[1]) for row in rows)
+
+    def wait_for_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready_index.wait(timeout)
+
+    def wake_waiters(self) -> None:
+        self._ready_index.notify()
 
     def _set_in_progress_to_canceled(self) -> None:
         """
@@ -70,7 +107,7 @@ class SqliteSessionQueue(SessionQueueBase):
 
     def _get_current_queue_size(self, queue_id: str) -> int:
         """Gets the current number of pending queue items"""
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
                 SELECT count(*)
@@ -86,7 +123,7 @@ class SqliteSessionQueue(SessionQueueBase):
 
     def _get_highest_priority(self, queue_id: str) -> int:
         """Gets the highest priority value in the queue"""
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
                 SELECT MAX(priority)
@@ -113,37 +150,18 @@ class SqliteSessionQueue(SessionQueueBase):
             calc_session_count,
             batch=batch,
         )
-        values_to_insert = await asyncio.to_thread(
-            prepare_values_to_insert,
+        item_ids = await asyncio.to_thread(
+            self._insert_batch,
             queue_id=queue_id,
             batch=batch,
             priority=priority,
+            requested_count=requested_count,
             max_new_queue_items=max_new_queue_items,
         )
-        enqueued_count = len(values_to_insert)
-
-        with self._db.transaction() as cursor:
-            cursor.executemany(
-                """--sql
-                    INSERT INTO session_queue (queue_id, session, session_id, batch_id, field_values, priority, workflow, origin, destination, retried_from_item_id)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                values_to_insert,
-            )
-            cursor.execute(
-                """--sql
-                    SELECT item_id
-                    FROM session_queue
-                    WHERE batch_id = ?
-                    ORDER BY item_id DESC;
-                    """,
-                (batch.batch_id,),
-            )
-            item_ids = [row[0] for row in cursor.fetchall()]
         enqueue_result = EnqueueBatchResult(
             queue_id=queue_id,
             requested=requested_count,
-            enqueued=enqueued_count,
+            enqueued=len(item_ids),
             batch=batch,
             priority=priority,
             item_ids=item_ids,
@@ -151,32 +169,172 @@ class SqliteSessionQueue(SessionQueueBase):
         self.__invoker.services.events.emit_batch_enqueued(enqueue_result)
         return enqueue_result
 
+    def _insert_batch(
+        self, queue_id: str, batch: Batch, priority: int, requested_count: int, max_new_queue_items: int
+    ) -> list[int]:
+        """
+        Inserts the batch's queue items in chunks, each in its own short transaction. The batch's graph is stored once
+        and each queue item stores only its field values. They are generated lazily, so at most one chunk is held in
+        memory, and other DB users only wait for one chunk at a time.
+
+        If the batch is canceled or deleted while it is being inserted, the remaining chunks are not inserted. If
+        inserting a chunk fails, the pending items inserted so far are deleted, so a failed enqueue leaves nothing to
+        run.
+
+        Returns the IDs of the inserted queue items, newest first.
+        """
+        workflow_json = serialize_workflow(batch.workflow)
+        graph_json = serialize_batch_graph(batch.graph)
+        values_to_insert = iter_values_to_insert(
+            queue_id=queue_id,
+            batch=batch,
+            priority=priority,
+            max_new_queue_items=max_new_queue_items,
+        )
+        item_ids: list[int] = []
+        try:
+            while chunk := list(islice(values_to_insert, ENQUEUE_CHUNK_SIZE)):
+                with self._db.transaction() as cursor:
+                    if not item_ids:
+                        cursor.execute(
+                            """--sql
+                            INSERT OR IGNORE INTO session_queue_batches (batch_id, workflow, graph)
+                            VALUES (?, ?, ?)
+                            """,
+                            (batch.batch_id, workflow_json, graph_json),
+                        )
+                    elif self._is_enqueue_canceled(cursor, batch.batch_id, item_ids):
+                        break
+                    cursor.executemany(
+                        """--sql
+                        INSERT INTO session_queue (queue_id, session, session_id, batch_id, field_values, priority, origin, destination, retried_from_item_id)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        chunk,
+                    )
+                    # Writes are serialized, so the newest rows of this batch are the ones we just inserted
+                    cursor.execute(
+                        """--sql
+                        SELECT item_id
+                        FROM session_queue
+                        WHERE batch_id = ?
+                        ORDER BY item_id DESC
+                        LIMIT ?;
+                        """,
+                        (batch.batch_id, len(chunk)),
+                    )
+                    chunk_item_ids = [row[0] for row in cursor.fetchall()]
+                # Items become ready as soon as their chunk is committed, so the processor can start on them while the
+                # rest of the batch is still being inserted.
+                self._ready_index.add((item_id, priority) for item_id in chunk_item_ids)
+                item_ids[:0] = chunk_item_ids
+                self.__invoker.services.events.emit_batch_enqueue_progress(
+                    queue_id=queue_id,
+                    batch=batch,
+                    enqueued=len(item_ids),
+                    requested=requested_count,
+                    priority=priority,
+                )
+        except Exception:
+            self._delete_pending_items(item_ids)
+            raise
+        return item_ids
+
+    def _is_enqueue_canceled(self, cursor: sqlite3.Cursor, batch_id: str, item_ids: list[int]) -> bool:
+        """
+        Whether a batch was canceled or deleted while its items were being inserted, judging by all of the items
+        inserted so far. Canceling or deleting the batch, or the whole queue, leaves none of them pending, and cancels
+        or deletes at least one. Canceling or deleting some of its items, or running them, does not stop the enqueue.
+        """
+        cursor.execute(
+            """--sql
+            SELECT
+                COUNT(*),
+                COALESCE(SUM(status = 'pending'), 0),
+                COALESCE(SUM(status = 'canceled'), 0)
+            FROM session_queue
+            WHERE batch_id = ? AND item_id >= ?
+            """,
+            (batch_id, item_ids[-1]),
+        )
+        remaining, pending, canceled = cursor.fetchone()
+        return pending == 0 and (canceled > 0 or remaining < len(item_ids))
+
+    def _delete_pending_items(self, item_ids: list[int]) -> None:
+        """Deletes the given queue items that are still pending, e.g. those of a batch that failed to enqueue."""
+        with self._db.transaction() as cursor:
+            for start in range(0, len(item_ids), ENQUEUE_CHUNK_SIZE):
+                chunk = item_ids[start : start + ENQUEUE_CHUNK_SIZE]
+                placeholders = ", ".join("?" for _ in chunk)
+                cursor.execute(
+                    f"""--sql
+                    DELETE
+                    FROM session_queue
+                    WHERE item_id IN ({placeholders}) AND status = 'pending'
+                    """,
+                    chunk,
+                )
+        self._ready_index.discard(item_ids)
+
     def dequeue(self) -> Optional[SessionQueueItem]:
+        while True:
+            entry = self._ready_index.pop_with_priority()
+            if entry is None:
+                return None
+            item_id = entry[0]
+            try:
+                queue_item_dict = self._claim_queue_item(item_id)
+            except Exception:
+                # The claim was rolled back, so the item is still pending and must stay in the index
+                self._ready_index.add([entry])
+                raise
+            if queue_item_dict is None:
+                continue
+            queue_item = SessionQueueItem.queue_item_from_dict(queue_item_dict)
+            self._emit_queue_item_status_changed(queue_item)
+            return queue_item
+
+    def _claim_queue_item(self, item_id: int) -> Optional[dict]:
+        """Sets a pending queue item to in progress and returns its row, or None if the item is no longer pending."""
+        # Claim the item and read it back in a single statement. The status condition guards against an index entry
+        # that went stale, in which case we move on to the next item.
         with self._db.transaction() as cursor:
             cursor.execute(
                 """--sql
-                SELECT *
-                FROM session_queue
-                WHERE status = 'pending'
-                ORDER BY
-                    priority DESC,
-                    item_id ASC
-                LIMIT 1
-                """
+                UPDATE session_queue
+                SET
+                    status = 'in_progress',
+                    started_at = STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW'),
+                    updated_at = STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW')
+                WHERE item_id = ? AND status = 'pending'
+                RETURNING *
+                """,
+                (item_id,),
             )
             result = cast(Union[sqlite3.Row, None], cursor.fetchone())
-        if result is None:
-            return None
-        queue_item = SessionQueueItem.queue_item_from_dict(dict(result))
-        queue_item = self._set_queue_item_status(item_id=queue_item.item_id, status="in_progress")
-        return queue_item
+            if result is None:
+                return None
+            queue_item_dict = dict(result)
+            cursor.execute(
+                """--sql
+                SELECT workflow, graph
+                FROM session_queue_batches
+                WHERE batch_id = ?
+                """,
+                (queue_item_dict["batch_id"],),
+            )
+            batch_row = cast(Union[sqlite3.Row, None], cursor.fetchone())
+            if batch_row is not None:
+                queue_item_dict.update(batch_row)
+        return queue_item_dict
 
     def get_next(self, queue_id: str) -> Optional[SessionQueueItem]:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
-                SELECT *
+                SELECT session_queue.*, session_queue_batches.workflow, session_queue_batches.graph
                 FROM session_queue
+                LEFT JOIN session_queue_batches USING (batch_id)
                 WHERE
                     queue_id = ?
                     AND status = 'pending'
@@ -193,11 +351,12 @@ class SqliteSessionQueue(SessionQueueBase):
         return SessionQueueItem.queue_item_from_dict(dict(result))
 
     def get_current(self, queue_id: str) -> Optional[SessionQueueItem]:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
-                SELECT *
+                SELECT session_queue.*, session_queue_batches.workflow, session_queue_batches.graph
                 FROM session_queue
+                LEFT JOIN session_queue_batches USING (batch_id)
                 WHERE
                     queue_id = ?
                     AND status = 'in_progress'
@@ -243,15 +402,20 @@ class SqliteSessionQueue(SessionQueueBase):
                 """,
                 (status, error_type, error_message, error_traceback, item_id),
             )
+        if status != "pending":
+            self._ready_index.discard([item_id])
 
         queue_item = self.get_queue_item(item_id)
+        self._emit_queue_item_status_changed(queue_item)
+        return queue_item
+
+    def _emit_queue_item_status_changed(self, queue_item: SessionQueueItem) -> None:
         batch_status = self.get_batch_status(queue_id=queue_item.queue_id, batch_id=queue_item.batch_id)
         queue_status = self.get_queue_status(queue_id=queue_item.queue_id)
         self.__invoker.services.events.emit_queue_item_status_changed(queue_item, batch_status, queue_status)
-        return queue_item
 
     def is_empty(self, queue_id: str) -> IsEmptyResult:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
                 SELECT count(*)
@@ -264,7 +428,7 @@ class SqliteSessionQueue(SessionQueueBase):
         return IsEmptyResult(is_empty=is_empty)
 
     def is_full(self, queue_id: str) -> IsFullResult:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
                 SELECT count(*)
@@ -293,9 +457,12 @@ class SqliteSessionQueue(SessionQueueBase):
                 DELETE
                 FROM session_queue
                 WHERE queue_id = ?
+                RETURNING item_id
                 """,
                 (queue_id,),
             )
+            deleted_item_ids = [row[0] for row in cursor.fetchall()]
+        self._ready_index.discard(deleted_item_ids)
         self.__invoker.services.events.emit_queue_cleared(queue_id)
         return ClearResult(deleted=count)
 
@@ -327,6 +494,7 @@ class SqliteSessionQueue(SessionQueueBase):
                 """,
                 (queue_id,),
             )
+        # Only finished items are pruned, and those are never in the ready index
         return PruneResult(deleted=count)
 
     def cancel_queue_item(self, item_id: int) -> SessionQueueItem:
@@ -348,6 +516,7 @@ class SqliteSessionQueue(SessionQueueBase):
                 """,
                 (item_id,),
             )
+        self._ready_index.discard([item_id])
 
     def complete_queue_item(self, item_id: int) -> SessionQueueItem:
         queue_item = self._set_queue_item_status(item_id=item_id, status="completed")
@@ -397,10 +566,13 @@ class SqliteSessionQueue(SessionQueueBase):
                 f"""--sql
                 UPDATE session_queue
                 SET status = 'canceled'
-                {where};
+                {where}
+                RETURNING item_id;
                 """,
                 tuple(params),
             )
+            canceled_item_ids = [row[0] for row in cursor.fetchall()]
+        self._ready_index.discard(canceled_item_ids)
 
         if current_queue_item is not None and current_queue_item.batch_id in batch_ids:
             self._set_queue_item_status(current_queue_item.item_id, "canceled")
@@ -434,10 +606,13 @@ class SqliteSessionQueue(SessionQueueBase):
                 f"""--sql
                 UPDATE session_queue
                 SET status = 'canceled'
-                {where};
+                {where}
+                RETURNING item_id;
                 """,
                 params,
             )
+            canceled_item_ids = [row[0] for row in cursor.fetchall()]
+        self._ready_index.discard(canceled_item_ids)
         if current_queue_item is not None and current_queue_item.destination == destination:
             self._set_queue_item_status(current_queue_item.item_id, "canceled")
         return CancelByDestinationResult(canceled=count)
@@ -465,10 +640,13 @@ class SqliteSessionQueue(SessionQueueBase):
                 FROM session_queue
                 WHERE
                   queue_id = ?
-                  AND destination = ?;
+                  AND destination = ?
+                RETURNING item_id;
                 """,
                 params,
             )
+            deleted_item_ids = [row[0] for row in cursor.fetchall()]
+        self._ready_index.discard(deleted_item_ids)
         return DeleteByDestinationResult(deleted=count)
 
     def delete_all_except_current(self, queue_id: str) -> DeleteAllExceptCurrentResult:
@@ -491,10 +669,13 @@ class SqliteSessionQueue(SessionQueueBase):
                 f"""--sql
                 DELETE
                 FROM session_queue
-                {where};
+                {where}
+                RETURNING item_id;
                 """,
                 (queue_id,),
             )
+            deleted_item_ids = [row[0] for row in cursor.fetchall()]
+        self._ready_index.discard(deleted_item_ids)
         return DeleteAllExceptCurrentResult(deleted=count)
 
     def cancel_by_queue_id(self, queue_id: str) -> CancelByQueueIDResult:
@@ -523,10 +704,13 @@ class SqliteSessionQueue(SessionQueueBase):
                 f"""--sql
                 UPDATE session_queue
                 SET status = 'canceled'
-                {where};
+                {where}
+                RETURNING item_id;
                 """,
                 tuple(params),
             )
+            canceled_item_ids = [row[0] for row in cursor.fetchall()]
+        self._ready_index.discard(canceled_item_ids)
 
         if current_queue_item is not None and current_queue_item.queue_id == queue_id:
             self._set_queue_item_status(current_queue_item.item_id, "canceled")
@@ -552,17 +736,22 @@ class SqliteSessionQueue(SessionQueueBase):
                 f"""--sql
                 UPDATE session_queue
                 SET status = 'canceled'
-                {where};
+                {where}
+                RETURNING item_id;
                 """,
                 (queue_id,),
             )
+            canceled_item_ids = [row[0] for row in cursor.fetchall()]
+        self._ready_index.discard(canceled_item_ids)
         return CancelAllExceptCurrentResult(canceled=count)
 
     def get_queue_item(self, item_id: int) -> SessionQueueItem:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
-                SELECT * FROM session_queue
+                SELECT session_queue.*, session_queue_batches.workflow, session_queue_batches.graph
+                FROM session_queue
+                LEFT JOIN session_queue_batches USING (batch_id)
                 WHERE
                     item_id = ?
                 """,
@@ -598,11 +787,12 @@ class SqliteSessionQueue(SessionQueueBase):
         status: Optional[QUEUE_ITEM_STATUS] = None,
         destination: Optional[str] = None,
     ) -> CursorPaginatedResults[SessionQueueItem]:
-        with self._db.transaction() as cursor_:
+        with self._db.read() as cursor_:
             item_id = cursor
             query = """--sql
-                SELECT *
+                SELECT session_queue.*, session_queue_batches.workflow, session_queue_batches.graph
                 FROM session_queue
+                LEFT JOIN session_queue_batches USING (batch_id)
                 WHERE queue_id = ?
             """
             params: list[Union[str, int]] = [queue_id]
@@ -621,7 +811,7 @@ class SqliteSessionQueue(SessionQueueBase):
 
             if item_id is not None:
                 query += """--sql
-                    AND (priority < ?) OR (priority = ? AND item_id > ?)
+                    AND ((priority < ?) OR (priority = ? AND item_id > ?))
                     """
                 params.extend([priority, priority, item_id])
 
@@ -642,16 +832,71 @@ class SqliteSessionQueue(SessionQueueBase):
             has_more = True
         return CursorPaginatedResults(items=items, limit=limit, has_more=has_more)
 
+    def list_queue_items_by_cursor(
+        self,
+        queue_id: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        status: Optional[QUEUE_ITEM_STATUS] = None,
+        destination: Optional[str] = None,
+        include_total: bool = False,
+    ) -> KeysetPaginatedResults[SessionQueueItem]:
+        conditions = "queue_id = ?"
+        params: list[Union[str, int]] = [queue_id]
+
+        if status is not None:
+            conditions += " AND status = ?"
+            params.append(status)
+
+        if destination is not None:
+            conditions += " AND destination = ?"
+            params.append(destination)
+
+        order = [("priority", SQLiteDirection.Descending), ("item_id", SQLiteDirection.Ascending)]
+        page_condition = ""
+        page_params: list[Union[str, int]] = []
+        if cursor is not None:
+            page_condition, page_params = build_keyset_condition(order, decode_cursor(cursor, order))
+            page_condition = f"AND {page_condition}"
+
+        query = f"""--sql
+            SELECT session_queue.*, session_queue_batches.workflow, session_queue_batches.graph
+            FROM session_queue
+            LEFT JOIN session_queue_batches USING (batch_id)
+            WHERE {conditions}
+            {page_condition}
+            ORDER BY
+                priority DESC,
+                item_id ASC
+            LIMIT ?;
+            """
+        with self._db.read() as cursor_:
+            # Get one extra row to find out if there is another page
+            cursor_.execute(query, [*params, *page_params, limit + 1])
+            results = cast(list[sqlite3.Row], cursor_.fetchall())
+
+        next_cursor: Optional[str] = None
+        if len(results) > limit:
+            results = results[:limit]
+            next_cursor = encode_cursor(order, [results[-1]["priority"], results[-1]["item_id"]])
+
+        items = [SessionQueueItem.queue_item_from_dict(dict(result)) for result in results]
+        total: Optional[int] = None
+        if include_total:
+            total = self._counts.get_count(f"SELECT COUNT(*) FROM session_queue WHERE {conditions};", params)
+        return KeysetPaginatedResults(items=items, limit=limit, next_cursor=next_cursor, total=total)
+
     def list_all_queue_items(
         self,
         queue_id: str,
         destination: Optional[str] = None,
     ) -> list[SessionQueueItem]:
         """Gets all queue items that match the given parameters"""
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             query = """--sql
-                SELECT *
+                SELECT session_queue.*, session_queue_batches.workflow, session_queue_batches.graph
                 FROM session_queue
+                LEFT JOIN session_queue_batches USING (batch_id)
                 WHERE queue_id = ?
             """
             params: list[Union[str, int]] = [queue_id]
@@ -678,7 +923,7 @@ class SqliteSessionQueue(SessionQueueBase):
         queue_id: str,
         order_dir: SQLiteDirection = SQLiteDirection.Descending,
     ) -> ItemIdsResult:
-        with self._db.transaction() as cursor_:
+        with self._db.read() as cursor_:
             query = f"""--sql
                 SELECT item_id
                 FROM session_queue
@@ -694,7 +939,7 @@ class SqliteSessionQueue(SessionQueueBase):
         return ItemIdsResult(item_ids=item_ids, total_count=len(item_ids))
 
     def get_queue_status(self, queue_id: str) -> SessionQueueStatus:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
                 SELECT status, count(*)
@@ -723,7 +968,7 @@ class SqliteSessionQueue(SessionQueueBase):
         )
 
     def get_batch_status(self, queue_id: str, batch_id: str) -> BatchStatus:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
                 SELECT status, count(*), origin, destination
@@ -755,7 +1000,7 @@ class SqliteSessionQueue(SessionQueueBase):
         )
 
     def get_counts_by_destination(self, queue_id: str, destination: str) -> SessionQueueCountsByDestination:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
                 SELECT status, count(*)
@@ -786,6 +1031,7 @@ class SqliteSessionQueue(SessionQueueBase):
         """Retries the given queue items"""
         with self._db.transaction() as cursor:
             values_to_insert: list[ValueToInsertTuple] = []
+            batch_workflows: dict[str, Optional[str]] = {}
             retried_item_ids: list[int] = []
 
             for item_id in item_ids:
@@ -799,9 +1045,6 @@ class SqliteSessionQueue(SessionQueueBase):
                 field_values_json = (
                     json.dumps(queue_item.field_values, default=to_jsonable_python) if queue_item.field_values else None
                 )
-                workflow_json = (
-                    json.dumps(queue_item.workflow, default=to_jsonable_python) if queue_item.workflow else None
-                )
                 cloned_session = GraphExecutionState(graph=queue_item.session.graph)
                 cloned_session_json = cloned_session.model_dump_json(warnings=False, exclude_none=True)
 
@@ -818,23 +1061,39 @@ class SqliteSessionQueue(SessionQueueBase):
                     queue_item.batch_id,
                     field_values_json,
                     queue_item.priority,
-                    workflow_json,
                     queue_item.origin,
                     queue_item.destination,
                     retried_from_item_id,
                 )
                 values_to_insert.append(value_to_insert)
+                # The original item still exists, so its batch normally has a row already
+                batch_workflows[queue_item.batch_id] = serialize_workflow(queue_item.workflow)
 
             # TODO(psyche): Handle max queue size?
 
             cursor.executemany(
                 """--sql
-                INSERT INTO session_queue (queue_id, session, session_id, batch_id, field_values, priority, workflow, origin, destination, retried_from_item_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT OR IGNORE INTO session_queue_batches (batch_id, workflow)
+                VALUES (?, ?)
                 """,
-                values_to_insert,
+                batch_workflows.items(),
             )
 
+            # Insert one at a time so we get the new item ids back for the ready index
+            new_items: list[tuple[int, int]] = []
+            for value_to_insert in values_to_insert:
+                cursor.execute(
+                    """--sql
+                    INSERT INTO session_queue (queue_id, session, session_id, batch_id, field_values, priority, origin, destination, retried_from_item_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    RETURNING item_id, priority
+                    """,
+                    value_to_insert,
+                )
+                row = cursor.fetchone()
+                new_items.append((row[0], row[1]))
+        self._ready_index.add(new_items)
+
         retry_result = RetryItemsResult(
             queue_id=queue_id,
             retried_item_ids=retried_item_ids,
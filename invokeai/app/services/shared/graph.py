@@ -3,7 +3,9 @@
 import copy
 import itertools
 from collections import deque
-from typing import Any, Deque, Iterable, Optional, Type, TypeVar, Union, get_args, get_origin
+from enum import Enum
+from types import UnionType
+from typing import Annotated, Any, Deque, Iterable, Literal, Optional, Type, TypeVar, Union, get_args, get_origin
 
 import networkx as nx
 from pydantic import (
@@ -180,6 +182,73 @@ def copydeep(obj: T) -> T:
     return copy.deepcopy(obj)
 
 
+# Values of these types cannot be changed in place, so they are safe to share between nodes
+IMMUTABLE_TYPES: tuple[type, ...] = (str, int, float, complex, bool, bytes, NoneType, Enum)
+
+# Cache of model classes to whether their instances are treated as immutable values
+_immutable_model_types: dict[type[BaseModel], bool] = {}
+
+
+def is_immutable_type(t: Any) -> bool:
+    """
+    Determines if values of a type annotation can be shared between nodes without copying. This is true for scalars,
+    enums, literals, tuples and unions of those, and models whose fields are all immutable.
+    """
+    origin = get_origin(t)
+    if origin is Literal:
+        return True
+    if origin is Annotated:
+        return is_immutable_type(get_args(t)[0])
+    if origin is Union or origin is UnionType:
+        return all(is_immutable_type(arg) for arg in get_args(t))
+    if origin is tuple or origin is frozenset:
+        args = [arg for arg in get_args(t) if arg is not Ellipsis]
+        return len(args) > 0 and all(is_immutable_type(arg) for arg in args)
+    if origin is not None or not isinstance(t, type):
+        # Lists, dicts, Any, etc
+        return False
+    if issubclass(t, IMMUTABLE_TYPES):
+        return True
+    if issubclass(t, BaseModel):
+        return is_immutable_model_type(t)
+    return False
+
+
+def is_immutable_model_type(model_type: type[BaseModel]) -> bool:
+    """
+    Determines if instances of a model can be shared between nodes without copying. Models like `ImageField`, which
+    only hold names and scalars, are references to stored objects. Models holding lists or other mutable containers
+    (e.g. `UNetField.loras`) are not.
+    """
+    is_immutable = _immutable_model_types.get(model_type)
+    if is_immutable is None:
+        # Self-referencing models are treated as mutable. Mark the model before recursing to stop the recursion.
+        _immutable_model_types[model_type] = False
+        is_immutable = model_type.model_config.get("extra") != "allow" and all(
+            is_immutable_type(f.annotation) for f in model_type.model_fields.values()
+        )
+        _immutable_model_types[model_type] = is_immutable
+    return is_immutable
+
+
+def copy_input(obj: T) -> T:
+    """
+    Copies a value to be passed to a node's input. Immutable values are shared by reference. Lists, dicts and tuples
+    are copied, with their items copied the same way. Any other value is deep-copied.
+    """
+    if isinstance(obj, IMMUTABLE_TYPES):
+        return obj
+    if isinstance(obj, BaseModel) and is_immutable_model_type(type(obj)):
+        return obj
+    if type(obj) is list:
+        return [copy_input(v) for v in obj]  # type: ignore
+    if type(obj) is dict:
+        return {k: copy_input(v) for k, v in obj.items()}  # type: ignore
+    if type(obj) is tuple:
+        return tuple(copy_input(v) for v in obj)  # type: ignore
+    return copydeep(obj)
+
+
 class NodeAlreadyInGraphError(ValueError):
     pass
 
@@ -354,6 +423,24 @@ class Graph(BaseModel):
         default_factory=list,
     )
 
+    # Adjacency indexes over `edges`, keyed by node id and by (node id, field). They are derived data, so they are not
+    # serialized. `add_edge` and `delete_edge` keep them up to date. If `edges` is replaced or mutated directly (e.g.
+    # on deserialization), they are rebuilt on next use.
+    _input_edges: dict[str, list[Edge]] = PrivateAttr(default_factory=dict)
+    _output_edges: dict[str, list[Edge]] = PrivateAttr(default_factory=dict)
+    _input_edges_by_field: dict[tuple[str, str], list[Edge]] = PrivateAttr(default_factory=dict)
+    _output_edges_by_field: dict[tuple[str, str], list[Edge]] = PrivateAttr(default_factory=dict)
+    _indexed_edges: Optional[list[Edge]] = PrivateAttr(default=None)
+    _indexed_edge_count: int = PrivateAttr(default=0)
+    # Incremented by every method that changes the nodes or edges, so data derived from the graph can tell it is stale
+    _version: int = PrivateAttr(default=0)
+
+    def __eq__(self, other: object) -> bool:
+        # The edge indexes are private attributes, which pydantic would otherwise include in the comparison
+        if not isinstance(other, Graph):
+            return NotImplemented
+        return type(self) is type(other) and self.__dict__ == other.__dict__
+
     def add_node(self, node: BaseInvocation) -> None:
         """Adds a node to a graph
 
@@ -364,6 +451,7 @@ class Graph(BaseModel):
             raise NodeAlreadyInGraphError()
 
         self.nodes[node.id] = node
+        self._version += 1
 
     def delete_node(self, node_id: str) -> None:
         """Deletes a node from a graph"""
@@ -380,6 +468,7 @@ class Graph(BaseModel):
                 self.delete_edge(edge)
 
             del self.nodes[node_id]
+            self._version += 1
 
         except NodeNotFoundError:
             pass  # Ignore, not doesn't exist (should this throw?)
@@ -391,8 +480,10 @@ class Graph(BaseModel):
         """
 
         self._validate_edge(edge)
-        if edge not in self.edges:
+        if not self._has_edge(edge):
             self.edges.append(edge)
+            self._index_edge(edge)
+            self._version += 1
         else:
             raise InvalidEdgeError()
 
@@ -403,6 +494,9 @@ class Graph(BaseModel):
             self.edges.remove(edge)
         except ValueError:
             pass
+        else:
+            self._unindex_edge(edge)
+            self._version += 1
 
     def validate_self(self) -> None:
         """
@@ -526,9 +620,7 @@ class Graph(BaseModel):
             raise InvalidEdgeError(f"Edge already exists ({edge})")
 
         # Validate that no cycles would be created
-        g = self.nx_graph_flat()
-        g.add_edge(edge.source.node_id, edge.destination.node_id)
-        if not nx.is_directed_acyclic_graph(g):
+        if self._is_reachable(edge.destination.node_id, edge.source.node_id):
             raise InvalidEdgeError(f"Edge creates a cycle in the graph ({edge})")
 
         # Validate that the field types are compatible
@@ -593,6 +685,7 @@ class Graph(BaseModel):
 
         # Set the new node in the graph
         self.nodes[new_node.id] = new_node
+        self._version += 1
         if new_node.id != node.id:
             input_edges = self._get_input_edges(node_id)
             output_edges = self._get_output_edges(node_id)
@@ -619,26 +712,92 @@ class Graph(BaseModel):
 
     def _get_input_edges(self, node_id: str, field: Optional[str] = None) -> list[Edge]:
         """Gets all input edges for a node. If field is provided, only edges to that field are returned."""
-
-        edges = [e for e in self.edges if e.destination.node_id == node_id]
+        self._ensure_edge_indexes()
 
         if field is None:
-            return edges
+            return list(self._input_edges.get(node_id, ()))
 
-        filtered_edges = [e for e in edges if e.destination.field == field]
-
-        return filtered_edges
+        return list(self._input_edges_by_field.get((node_id, field), ()))
 
     def _get_output_edges(self, node_id: str, field: Optional[str] = None) -> list[Edge]:
         """Gets all output edges for a node. If field is provided, only edges from that field are returned."""
-        edges = [e for e in self.edges if e.source.node_id == node_id]
+        self._ensure_edge_indexes()
 
         if field is None:
-            return edges
+            return list(self._output_edges.get(node_id, ()))
+
+        return list(self._output_edges_by_field.get((node_id, field), ()))
+
+    def _has_edge(self, edge: Edge) -> bool:
+        """Determines whether the graph already has an edge, checking the shorter of its source and destination lists."""
+        self._ensure_edge_indexes()
+        output_edges = self._output_edges_by_field.get((edge.source.node_id, edge.source.field), ())
+        input_edges = self._input_edges_by_field.get((edge.destination.node_id, edge.destination.field), ())
+        return edge in (output_edges if len(output_edges) <= len(input_edges) else input_edges)
 
-        filtered_edges = [e for e in edges if e.source.field == field]
+    def _ensure_edge_indexes(self) -> None:
+        """Rebuilds the edge indexes if `edges` was changed without going through `add_edge` or `delete_edge`."""
+        if self._indexed_edges is self.edges and self._indexed_edge_count == len(self.edges):
+            return
+
+        if self._indexed_edges is not None:
+            self._version += 1
 
-        return filtered_edges
+        self._input_edges = {}
+        self._output_edges = {}
+        self._input_edges_by_field = {}
+        self._output_edges_by_field = {}
+        self._indexed_edges = self.edges
+        self._indexed_edge_count = 0
+        for edge in self.edges:
+            self._index_edge(edge)
+
+    def _index_edge(self, edge: Edge) -> None:
+        """Adds an edge to the edge indexes. The edge must already be in `edges`."""
+        src = edge.source
+        dst = edge.destination
+        self._input_edges.setdefault(dst.node_id, []).append(edge)
+        self._output_edges.setdefault(src.node_id, []).append(edge)
+        self._input_edges_by_field.setdefault((dst.node_id, dst.field), []).append(edge)
+        self._output_edges_by_field.setdefault((src.node_id, src.field), []).append(edge)
+        self._indexed_edge_count += 1
+
+    def _unindex_edge(self, edge: Edge) -> None:
+        """Removes an edge from the edge indexes. The edge must already be removed from `edges`."""
+        if self._indexed_edges is not self.edges or self._indexed_edge_count != len(self.edges) + 1:
+            # The indexes were already out of date - they are rebuilt on next use
+            return
+
+        src = edge.source
+        dst = edge.destination
+        for index, key in (
+            (self._input_edges, dst.node_id),
+            (self._output_edges, src.node_id),
+            (self._input_edges_by_field, (dst.node_id, dst.field)),
+            (self._output_edges_by_field, (src.node_id, src.field)),
+        ):
+            edges = index[key]  # type: ignore [index]
+            edges.remove(edge)
+            if not edges:
+                del index[key]  # type: ignore [attr-defined]
+        self._indexed_edge_count -= 1
+
+    def _is_reachable(self, from_node_id: str, to_node_id: str) -> bool:
+        """Determines whether there is a path of edges from one node to another. A node can always reach itself."""
+        self._ensure_edge_indexes()
+
+        visited = {from_node_id}
+        stack = [from_node_id]
+        while stack:
+            node_id = stack.pop()
+            if node_id == to_node_id:
+                return True
+            for edge in self._output_edges.get(node_id, ()):
+                next_node_id = edge.destination.node_id
+                if next_node_id not in visited:
+                    visited.add(next_node_id)
+                    stack.append(next_node_id)
+        return False
 
     def _is_iterator_connection_valid(
         self,
@@ -705,8 +864,13 @@ class Graph(BaseModel):
         if new_output is not None:
             outputs.append(new_output)
 
-        # Get input and output fields (the fields linked to the iterator's input/output)
-        input_field_types = [get_output_field_type(self.get_node(e.node_id), e.field) for e in inputs]
+        # Get input and output fields (the fields linked to the iterator's input/output). Collectors often have many
+        # inputs from the same kind of node, so we only resolve the type once per node class and field.
+        input_nodes_by_class_and_field = {(type(self.get_node(e.node_id)), e.field): e.node_id for e in inputs}
+        input_field_types = [
+            get_output_field_type(self.get_node(node_id), field)
+            for (_, field), node_id in input_nodes_by_class_and_field.items()
+        ]
         output_field_types = [get_input_field_type(self.get_node(e.node_id), e.field) for e in outputs]
 
         # Validate that all inputs are derived from or match a single type
@@ -772,6 +936,42 @@ class Graph(BaseModel):
         return g
 
 
+class _SourceGraphInfo:
+    """
+    Scheduling data derived from the source graph of a GraphExecutionState. The source graph does not change while it
+    is executed, so this is built once per session instead of on every preparation step. It is rebuilt if the graph is
+    changed through its methods.
+    """
+
+    def __init__(self, graph: Graph) -> None:
+        g = graph.nx_graph_flat()
+        self.signature = GraphExecutionState._source_graph_signature(graph)
+        self.node_ids: set[str] = set(g.nodes)
+        self.topological_order: list[str] = list(nx.topological_sort(g))
+        self.parents: dict[str, list[str]] = {n: [u for u, _ in g.in_edges(n)] for n in g.nodes}
+        self.iterators: set[str] = {n for n in g.nodes if isinstance(graph.get_node(n), IterateInvocation)}
+
+        # All ancestors of each node, built in topological order so each node's parents are done before it
+        self.ancestors: dict[str, set[str]] = {}
+        for n in self.topological_order:
+            ancestors: set[str] = set()
+            for parent in self.parents[n]:
+                ancestors.add(parent)
+                ancestors |= self.ancestors[parent]
+            self.ancestors[n] = ancestors
+        self.iterator_ancestors: dict[str, set[str]] = {n: a & self.iterators for n, a in self.ancestors.items()}
+
+        # The iterators each node is expanded over. Edges into collectors are removed, as a collector ends the scope
+        # of the iterators before it.
+        it_g = g.copy()
+        for n in g.nodes:
+            if isinstance(graph.get_node(n), CollectInvocation):
+                it_g.remove_edges_from(list(it_g.in_edges(n)))
+        self.active_iterators: dict[str, list[str]] = {
+            n: [a for a in nx.ancestors(it_g, n) if a in self.iterators] for n in g.nodes
+        }
+
+
 class GraphExecutionState(BaseModel):
     """Tracks the state of a graph execution"""
 
@@ -816,6 +1016,12 @@ class GraphExecutionState(BaseModel):
     # Optional priority; others follow in name order
     ready_order: list[str] = Field(default_factory=list)
     indegree: dict[str, int] = Field(default_factory=dict, description="Remaining unmet input count for exec nodes")
+    # Scheduling data for the source graph, built on first use (internal only)
+    _source_graph_info: Optional[_SourceGraphInfo] = PrivateAttr(default=None)
+    # The prepared iterators each exec node descends from, and the reverse mapping. These are kept up to date as exec
+    # nodes are created, so finding the exec node for an iteration does not need a path search (internal only).
+    _exec_iterator_ancestors: dict[str, frozenset[str]] = PrivateAttr(default_factory=dict)
+    _exec_iterator_descendants: dict[str, set[str]] = PrivateAttr(default_factory=dict)
 
     def _type_key(self, node_obj: BaseInvocation) -> str:
         return node_obj.__class__.__name__
@@ -867,6 +1073,20 @@ class GraphExecutionState(BaseModel):
         v.validate_self()
         return v
 
+    @staticmethod
+    def _source_graph_signature(graph: Graph) -> tuple[int, int]:
+        # The graph's version changes with every change made through its methods, including in-place ones like
+        # `update_node`, which leave the numbers of nodes and edges the same
+        return (id(graph), graph._version)
+
+    def _get_source_graph_info(self) -> _SourceGraphInfo:
+        """Gets the scheduling data for the source graph, building it if the graph has changed."""
+        info = self._source_graph_info
+        if info is None or info.signature != self._source_graph_signature(self.graph):
+            info = _SourceGraphInfo(self.graph)
+            self._source_graph_info = info
+        return info
+
     def next(self) -> Optional[BaseInvocation]:
         """Gets the next node ready to execute."""
 
@@ -876,12 +1096,11 @@ class GraphExecutionState(BaseModel):
         # If there are no prepared nodes, prepare some nodes
         next_node = self._get_next_node()
         if next_node is None:
-            base_g = self.graph.nx_graph_flat()
-            prepared_id = self._prepare(base_g)
+            prepared_id = self._prepare()
 
             # Prepare as many nodes as we can
             while prepared_id is not None:
-                prepared_id = self._prepare(base_g)
+                prepared_id = self._prepare()
                 if next_node is None:
                     next_node = self._get_next_node()
 
@@ -931,7 +1150,7 @@ class GraphExecutionState(BaseModel):
 
     def is_complete(self) -> bool:
         """Returns true if the graph is complete"""
-        node_ids = set(self.graph.nx_graph_flat().nodes)
+        node_ids = self._get_source_graph_info().node_ids
         return self.has_error() or all((k in self.executed for k in node_ids))
 
     def has_error(self) -> bool:
@@ -956,6 +1175,8 @@ class GraphExecutionState(BaseModel):
             input_collection = getattr(input_collection_prepared_node_output, input_collection_edge.source.field)
             self_iteration_count = len(input_collection)
 
+        self._ensure_exec_iterator_index()
+
         new_nodes: list[str] = []
         if self_iteration_count == 0:
             # TODO: should this raise a warning? It might just happen if an empty collection is input, and should be valid.
@@ -1004,6 +1225,7 @@ class GraphExecutionState(BaseModel):
 
             # Initialize indegree as unmet inputs only and enqueue if ready
             inputs = self.execution_graph._get_input_edges(new_node.id)
+            self._track_exec_iterators(new_node.id, inputs)
             unmet = sum(1 for e in inputs if e.source.node_id not in self.executed)
             self.indegree[new_node.id] = unmet
             self._enqueue_if_ready(new_node.id)
@@ -1012,45 +1234,63 @@ class GraphExecutionState(BaseModel):
 
         return new_nodes
 
-    def _iterator_graph(self, base: Optional[nx.DiGraph] = None) -> nx.DiGraph:
-        """Gets a DiGraph with edges to collectors removed so an ancestor search produces all active iterators for any node"""
-        g = base.copy() if base is not None else self.graph.nx_graph_flat()
-        collectors = (n for n in self.graph.nodes if isinstance(self.graph.get_node(n), CollectInvocation))
-        for c in collectors:
-            g.remove_edges_from(list(g.in_edges(c)))
-        return g
+    def _track_exec_iterators(self, node_id: str, input_edges: list[Edge]) -> None:
+        """Records the prepared iterators a new exec node descends from, given its input edges."""
+        parent_sets: list[frozenset[str]] = []
+        parent_iterators: set[str] = set()
+        for edge in input_edges:
+            parent_id = edge.source.node_id
+            parent_sets.append(self._exec_iterator_ancestors[parent_id])
+            if isinstance(self.execution_graph.nodes[parent_id], IterateInvocation):
+                parent_iterators.add(parent_id)
+
+        if not parent_iterators and len({id(a) for a in parent_sets}) == 1:
+            # Most nodes have a single line of ancestry, so they can share their parent's set
+            ancestors = parent_sets[0]
+        else:
+            ancestors = frozenset(parent_iterators.union(*parent_sets))
 
-    def _get_node_iterators(self, node_id: str, it_graph: Optional[nx.DiGraph] = None) -> list[str]:
+        self._exec_iterator_ancestors[node_id] = ancestors
+        for iterator_id in ancestors:
+            self._exec_iterator_descendants.setdefault(iterator_id, set()).add(node_id)
+
+    def _ensure_exec_iterator_index(self) -> None:
+        """Rebuilds the exec iterator index if it is out of date, e.g. after deserialization."""
+        if len(self._exec_iterator_ancestors) == len(self.execution_graph.nodes):
+            return
+        self._exec_iterator_ancestors = {}
+        self._exec_iterator_descendants = {}
+        for node_id in nx.topological_sort(self.execution_graph.nx_graph()):
+            self._track_exec_iterators(node_id, self.execution_graph._get_input_edges(node_id))
+
+    def _get_node_iterators(self, node_id: str) -> list[str]:
         """Gets iterators for a node"""
-        g = it_graph or self._iterator_graph()
-        return [n for n in nx.ancestors(g, node_id) if isinstance(self.graph.get_node(n), IterateInvocation)]
+        return self._get_source_graph_info().active_iterators[node_id]
 
-    def _prepare(self, base_g: Optional[nx.DiGraph] = None) -> Optional[str]:
-        # Get flattened source graph
-        g = base_g or self.graph.nx_graph_flat()
+    def _prepare(self) -> Optional[str]:
+        info = self._get_source_graph_info()
 
         # Find next node that:
         # - was not already prepared
         # - is not an iterate node whose inputs have not been executed
         # - does not have an unexecuted iterate ancestor
-        sorted_nodes = nx.topological_sort(g)
-
         def unprepared(n: str) -> bool:
             return n not in self.source_prepared_mapping
 
         def iter_inputs_ready(n: str) -> bool:
-            if not isinstance(self.graph.get_node(n), IterateInvocation):
+            if n not in info.iterators:
                 return True
-            return all(u in self.executed for u, _ in g.in_edges(n))
+            return all(u in self.executed for u in info.parents[n])
 
         def no_unexecuted_iter_ancestors(n: str) -> bool:
-            return not any(
-                isinstance(self.graph.get_node(a), IterateInvocation) and a not in self.executed
-                for a in nx.ancestors(g, n)
-            )
+            return all(a in self.executed for a in info.iterator_ancestors[n])
 
         next_node_id = next(
-            (n for n in sorted_nodes if unprepared(n) and iter_inputs_ready(n) and no_unexecuted_iter_ancestors(n)),
+            (
+                n
+                for n in info.topological_order
+                if unprepared(n) and iter_inputs_ready(n) and no_unexecuted_iter_ancestors(n)
+            ),
             None,
         )
 
@@ -1058,7 +1298,7 @@ class GraphExecutionState(BaseModel):
             return None
 
         # Get all parents of the next node
-        next_node_parents = [u for u, _ in g.in_edges(next_node_id)]
+        next_node_parents = info.parents[next_node_id]
 
         # Create execution nodes
         next_node = self.graph.get_node(next_node_id)
@@ -1076,17 +1316,16 @@ class GraphExecutionState(BaseModel):
         else:  # Iterators or normal nodes
             # Get all iterator combinations for this node
             # Will produce a list of lists of prepared iterator nodes, from which results can be iterated
-            it_g = self._iterator_graph(g)
-            iterator_nodes = self._get_node_iterators(next_node_id, it_g)
+            iterator_nodes = self._get_node_iterators(next_node_id)
             iterator_nodes_prepared = [list(self.source_prepared_mapping[n]) for n in iterator_nodes]
             iterator_node_prepared_combinations = list(itertools.product(*iterator_nodes_prepared))
 
             # Select the correct prepared parents for each iteration
             # For every iterator, the parent must either not be a child of that iterator, or must match the prepared iteration for that iterator
             # TODO: Handle a node mapping to none
-            eg = self.execution_graph.nx_graph_flat()
+            self._ensure_exec_iterator_index()
             prepared_parent_mappings = [
-                [(n, self._get_iteration_node(n, g, eg, it)) for n in next_node_parents]
+                [(n, self._get_iteration_node(n, it)) for n in next_node_parents]
                 for it in iterator_node_prepared_combinations
             ]  # type: ignore
 
@@ -1101,9 +1340,7 @@ class GraphExecutionState(BaseModel):
     def _get_iteration_node(
         self,
         source_node_id: str,
-        graph: nx.DiGraph,
-        execution_graph: nx.DiGraph,
-        prepared_iterator_nodes: list[str],
+        prepared_iterator_nodes: tuple[str, ...],
     ) -> Optional[str]:
         """Gets the prepared version of the specified source node that matches every iteration specified"""
         prepared_nodes = self.source_prepared_mapping[source_node_id]
@@ -1111,16 +1348,25 @@ class GraphExecutionState(BaseModel):
             return next(iter(prepared_nodes))
 
         # Check if the requested node is an iterator
-        prepared_iterator = next((n for n in prepared_nodes if n in prepared_iterator_nodes), None)
+        prepared_iterator = next(
+            (n for n in prepared_iterator_nodes if self.prepared_source_mapping[n] == source_node_id), None
+        )
         if prepared_iterator is not None:
             return prepared_iterator
 
-        # Filter to only iterator nodes that are a parent of the specified node, in tuple format (prepared, source)
-        iterator_source_node_mapping = [(n, self.prepared_source_mapping[n]) for n in prepared_iterator_nodes]
-        parent_iterators = [itn for itn in iterator_source_node_mapping if nx.has_path(graph, itn[1], source_node_id)]
+        # Filter to only prepared iterator nodes whose source is an ancestor of the specified node
+        source_ancestors = self._get_source_graph_info().ancestors[source_node_id]
+        parent_iterators = [n for n in prepared_iterator_nodes if self.prepared_source_mapping[n] in source_ancestors]
+        if not parent_iterators:
+            return next(iter(prepared_nodes), None)
 
+        # The match descends from every parent iterator. Start from the smallest set of descendants.
+        descendant_sets = sorted(
+            (self._exec_iterator_descendants.get(n, set()) for n in parent_iterators),
+            key=len,
+        )
         return next(
-            (n for n in prepared_nodes if all(nx.has_path(execution_graph, pit[0], n) for pit in parent_iterators)),
+            (n for n in descendant_sets[0] if n in prepared_nodes and all(n in d for d in descendant_sets[1:])),
             None,
         )
 
@@ -1153,11 +1399,11 @@ class GraphExecutionState(BaseModel):
 
     def _prepare_inputs(self, node: BaseInvocation):
         input_edges = self.execution_graph._get_input_edges(node.id)
-        # Inputs must be deep-copied, else if a node mutates the object, other nodes that get the same input
-        # will see the mutation.
+        # Mutable inputs must be copied, else if a node mutates the object, other nodes that get the same input
+        # will see the mutation. Immutable values are shared.
         if isinstance(node, CollectInvocation):
             output_collection = [
-                copydeep(getattr(self.results[edge.source.node_id], edge.source.field))
+                copy_input(getattr(self.results[edge.source.node_id], edge.source.field))
                 for edge in input_edges
                 if edge.destination.field == ITEM_FIELD
             ]
@@ -1167,7 +1413,7 @@ class GraphExecutionState(BaseModel):
                 setattr(
                     node,
                     edge.destination.field,
-                    copydeep(getattr(self.results[edge.source.node_id], edge.source.field)),
+                    copy_input(getattr(self.results[edge.source.node_id], edge.source.field)),
                 )
 
     # TODO: Add API for modifying underlying graph that checks if the change will be valid given the current execution state
@@ -1190,6 +1436,7 @@ class GraphExecutionState(BaseModel):
 
     def add_node(self, node: BaseInvocation) -> None:
         self.graph.add_node(node)
+        self._source_graph_info = None
 
     def update_node(self, node_id: str, new_node: BaseInvocation) -> None:
         if not self._is_node_updatable(node_id):
@@ -1197,6 +1444,7 @@ class GraphExecutionState(BaseModel):
                 f"Node {node_id} has already been prepared or executed and cannot be updated"
             )
         self.graph.update_node(node_id, new_node)
+        self._source_graph_info = None
 
     def delete_node(self, node_id: str) -> None:
         if not self._is_node_updatable(node_id):
@@ -1204,6 +1452,7 @@ class GraphExecutionState(BaseModel):
                 f"Node {node_id} has already been prepared or executed and cannot be deleted"
             )
         self.graph.delete_node(node_id)
+        self._source_graph_info = None
 
     def add_edge(self, edge: Edge) -> None:
         if not self._is_node_updatable(edge.destination.node_id):
@@ -1211,6 +1460,7 @@ class GraphExecutionState(BaseModel):
                 f"Destination node {edge.destination.node_id} has already been prepared or executed and cannot be linked to"
             )
         self.graph.add_edge(edge)
+        self._source_graph_info = None
 
     def delete_edge(self, edge: Edge) -> None:
         if not self._is_node_updatable(edge.destination.node_id):
@@ -1218,3 +1468,4 @@ class GraphExecutionState(BaseModel):
                 f"Destination node {edge.destination.node_id} has already been prepared or executed and cannot have a source edge deleted"
             )
         self.graph.delete_edge(edge)
+        self._source_graph_info = None
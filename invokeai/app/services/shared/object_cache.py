@@ -0,0 +1,147 @@
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from threading import Lock
+from typing import Any, Hashable, Optional
+
+import torch
+from PIL.Image import Image as PILImageType
+
+# Used by stores that are not given a shared cache
+DEFAULT_OBJECT_CACHE_SIZE_BYTES = 2 * 2**30
+
+
+@dataclass
+class ObjectCacheStats:
+    """The stats for one type of object in an `ObjectCache`."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    items: int = 0
+    size_bytes: int = 0
+
+
+def get_object_size(obj: Any) -> int:
+    """Estimates the memory used by an object in bytes, including the data of any tensors and images it holds."""
+    return _get_object_size(obj, set())
+
+
+def _get_object_size(obj: Any, seen: set[int]) -> int:
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, torch.Tensor):
+        return obj.nelement() * obj.element_size()
+    if isinstance(obj, PILImageType):
+        # Lazily-opened images have not loaded their pixels yet, but will once they are used
+        return obj.width * obj.height * len(obj.getbands())
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return sys.getsizeof(obj)
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(_get_object_size(v, seen) for v in obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(_get_object_size(v, seen) for v in obj.values())
+    if hasattr(obj, "__dict__"):
+        return sys.getsizeof(obj) + sum(_get_object_size(v, seen) for v in vars(obj).values())
+    return sys.getsizeof(obj)
+
+
+class ObjectCache:
+    """
+    A thread-safe LRU cache for objects like images and tensors, limited by the total size of the cached objects.
+
+    One cache is shared by several stores, which compete for the same memory budget. Each store caches its objects
+    under its own `cache_type`, and has its own stats.
+
+    :param max_size_bytes: The memory budget. Objects larger than the budget are not cached.
+    """
+
+    def __init__(self, max_size_bytes: int) -> None:
+        self._max_size_bytes = max_size_bytes
+        self._size_bytes = 0
+        # Maps (cache type, key) to (object, size in bytes), ordered from least to most recently used
+        self._entries: OrderedDict[tuple[str, Hashable], tuple[Any, int]] = OrderedDict()
+        self._stats: dict[str, ObjectCacheStats] = {}
+        self._lock = Lock()
+
+    @property
+    def max_size_bytes(self) -> int:
+        return self._max_size_bytes
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size_bytes
+
+    def get(self, cache_type: str, key: Hashable) -> Optional[Any]:
+        """Gets an object from the cache, marking it as most recently used. Returns None if it is not cached."""
+        with self._lock:
+            stats = self._get_stats(cache_type)
+            entry = self._entries.get((cache_type, key))
+            if entry is None:
+                stats.misses += 1
+                return None
+            self._entries.move_to_end((cache_type, key))
+            stats.hits += 1
+            return entry[0]
+
+    def put(self, cache_type: str, key: Hashable, obj: Any, size_bytes: Optional[int] = None) -> None:
+        """
+        Adds or replaces an object in the cache, evicting the least recently used objects to stay within the budget.
+        If the object's size is not given, it is estimated.
+        """
+        if size_bytes is None:
+            size_bytes = get_object_size(obj)
+        with self._lock:
+            self._delete((cache_type, key))
+            if size_bytes > self._max_size_bytes:
+                return
+            self._entries[(cache_type, key)] = (obj, size_bytes)
+            self._size_bytes += size_bytes
+            stats = self._get_stats(cache_type)
+            stats.items += 1
+            stats.size_bytes += size_bytes
+
+            while self._size_bytes > self._max_size_bytes:
+                (evicted_type, _), (_, evicted_size) = self._entries.popitem(last=False)
+                self._size_bytes -= evicted_size
+                evicted_stats = self._get_stats(evicted_type)
+                evicted_stats.items -= 1
+                evicted_stats.size_bytes -= evicted_size
+                evicted_stats.evictions += 1
+
+    def delete(self, cache_type: str, key: Hashable) -> None:
+        """Removes an object from the cache, if it is cached."""
+        with self._lock:
+            self._delete((cache_type, key))
+
+    def clear(self) -> None:
+        """Removes all objects from the cache. Hit, miss and eviction counts are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._size_bytes = 0
+            for stats in self._stats.values():
+                stats.items = 0
+                stats.size_bytes = 0
+
+    def get_stats(self) -> dict[str, ObjectCacheStats]:
+        """Gets a copy of the stats for each type of object."""
+        with self._lock:
+            return {cache_type: replace(stats) for cache_type, stats in self._stats.items()}
+
+    def _get_stats(self, cache_type: str) -> ObjectCacheStats:
+        stats = self._stats.get(cache_type)
+        if stats is None:
+            stats = ObjectCacheStats()
+            self._stats[cache_type] = stats
+        return stats
+
+    def _delete(self, entry_key: tuple[str, Hashable]) -> None:
+        entry = self._entries.pop(entry_key, None)
+        if entry is None:
+            return
+        self._size_bytes -= entry[1]
+        stats = self._get_stats(entry_key[0])
+        stats.items -= 1
+        stats.size_bytes -= entry[1]
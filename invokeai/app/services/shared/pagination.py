@@ -1,9 +1,50 @@
-from typing import Generic, TypeVar
+import base64
+import hashlib
+import json
+from typing import Generic, Optional, Sequence, TypeVar, Union
 
 from pydantic import BaseModel, Field
 
+from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
+
 GenericBaseModel = TypeVar("GenericBaseModel", bound=BaseModel)
 
+CursorValue = Union[str, int, float, None]
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded, or does not match the listing it is used with."""
+
+
+def _get_order_tag(order: Sequence[tuple[str, SQLiteDirection]]) -> str:
+    """Gets a short tag identifying the order of a listing, so a cursor can't be used with a listing in another order."""
+    spec = json.dumps([[column, direction.value] for column, direction in order], separators=(",", ":"))
+    return hashlib.sha256(spec.encode()).hexdigest()[:8]
+
+
+def encode_cursor(order: Sequence[tuple[str, SQLiteDirection]], values: list[CursorValue]) -> str:
+    """Encodes the sort key of the last item of a page, and the order it is a key of, as an opaque, URL-safe cursor."""
+    payload = {"o": _get_order_tag(order), "k": values}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: str, order: Sequence[tuple[str, SQLiteDirection]]) -> list[CursorValue]:
+    """Decodes a cursor created by `encode_cursor`, checking that it holds a sort key of the given order."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(payload, dict) or payload.get("o") != _get_order_tag(order):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+    values = payload.get("k")
+    if (
+        not isinstance(values, list)
+        or len(values) != len(order)
+        or not all(v is None or isinstance(v, (str, int, float)) for v in values)
+    ):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+    return values
+
 
 class CursorPaginatedResults(BaseModel, Generic[GenericBaseModel]):
     """
@@ -16,6 +57,21 @@ class CursorPaginatedResults(BaseModel, Generic[GenericBaseModel]):
     items: list[GenericBaseModel] = Field(..., description="Items")
 
 
+class KeysetPaginatedResults(BaseModel, Generic[GenericBaseModel]):
+    """
+    Keyset-paginated results. Each page is fetched from the position of the last item of the previous page, so deep
+    pages are as fast as the first.
+    Generic must be a Pydantic model
+    """
+
+    limit: int = Field(description="Limit of items to get")
+    items: list[GenericBaseModel] = Field(description="Items")
+    next_cursor: Optional[str] = Field(
+        default=None, description="The cursor to get the next page with, or null if this is the last page"
+    )
+    total: Optional[int] = Field(default=None, description="Total number of items in result, if requested")
+
+
 class OffsetPaginatedResults(BaseModel, Generic[GenericBaseModel]):
     """
     Offset-paginated results
@@ -1,10 +1,64 @@
+import sqlite3
 from enum import Enum
+from typing import Any, Sequence
 
 from invokeai.app.util.metaenum import MetaEnum
 
 sqlite_memory = ":memory:"
 
 
+def is_fts5_trigram_available(cursor: sqlite3.Cursor) -> bool:
+    """
+    Whether SQLite supports FTS5 full-text indexes with the trigram tokenizer. FTS5 is an optional extension, and the
+    trigram tokenizer requires SQLite 3.34 or later.
+    """
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp.fts5_trigram_check USING fts5 (value, tokenize = 'trigram');")
+    except sqlite3.OperationalError:
+        return False
+    cursor.execute("DROP TABLE temp.fts5_trigram_check;")
+    return True
+
+
 class SQLiteDirection(str, Enum, metaclass=MetaEnum):
     Ascending = "ASC"
     Descending = "DESC"
+
+
+def build_keyset_condition(
+    order: Sequence[tuple[str, SQLiteDirection]], values: Sequence[Any]
+) -> tuple[str, list[Any]]:
+    """
+    Builds a condition matching the rows that sort after the row with the given sort key, for keyset pagination.
+
+    :param order: The sort columns (or expressions) and their directions, as in the query's ORDER BY. The columns must \
+        uniquely identify a row, and must not be NULL.
+    :param values: The sort key of the last row of the previous page.
+    :return: The condition and its params.
+    """
+    # Runs of columns sorted in the same direction are compared as row values, which SQLite can seek to in an index.
+    # For mixed directions, this expands to (a < ?) OR (a = ? AND (b, c) > (?, ?)).
+    runs: list[tuple[list[str], SQLiteDirection, list[Any]]] = []
+    for (column, direction), value in zip(order, values, strict=True):
+        if runs and runs[-1][1] == direction:
+            runs[-1][0].append(column)
+            runs[-1][2].append(value)
+        else:
+            runs.append(([column], direction, [value]))
+
+    alternatives: list[str] = []
+    params: list[Any] = []
+    for i, (columns, direction, run_values) in enumerate(runs):
+        operator = ">" if direction == SQLiteDirection.Ascending else "<"
+        terms: list[str] = []
+        for prior_columns, _, prior_values in runs[:i]:
+            terms.extend(f"{c} = ?" for c in prior_columns)
+            params.extend(prior_values)
+        if len(columns) == 1:
+            terms.append(f"{columns[0]} {operator} ?")
+        else:
+            placeholders = ", ".join("?" for _ in columns)
+            terms.append(f"({', '.join(columns)}) {operator} ({placeholders})")
+        params.extend(run_values)
+        alternatives.append(f"({' AND '.join(terms)})")
+    return f"({' OR '.join(alternatives)})", params
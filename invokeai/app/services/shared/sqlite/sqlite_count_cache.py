@@ -0,0 +1,57 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Sequence, cast
+
+from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
+
+
+class SqliteCountCache:
+    """
+    Caches the results of `COUNT(*)` queries until the next write to the database, so paging through a listing does
+    not recount it for every page.
+
+    :param db: The database to run the queries on.
+    :param max_size: The maximum number of distinct queries (query and params) to cache.
+    """
+
+    def __init__(self, db: SqliteDatabase, max_size: int = 128) -> None:
+        self._db = db
+        self._max_size = max_size
+        self._version = db.write_version
+        self._counts: OrderedDict[tuple[str, tuple[Any, ...]], int] = OrderedDict()
+        self._lock = Lock()
+
+    def get_count(self, query: str, params: Sequence[Any]) -> int:
+        """
+        Gets the result of a count query, running it only if it has not been run since the last write.
+
+        The query runs in its own read, so this must not be called inside another `read()` or `transaction()`, whose
+        snapshot may be older than the current write version.
+        """
+        key = (query, tuple(params))
+        version = self._db.write_version
+        with self._lock:
+            if version != self._version:
+                self._counts.clear()
+                self._version = version
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+                return count
+
+        with self._db.read() as cursor:
+            cursor.execute(query, params)
+            count = cast(int, cursor.fetchone()[0])
+
+        with self._lock:
+            # If there was a write while counting, the count may already be stale
+            if self._version == version == self._db.write_version:
+                self._counts[key] = count
+                if len(self._counts) > self._max_size:
+                    self._counts.popitem(last=False)
+        return count
+
+    def clear(self) -> None:
+        """Clears all cached counts."""
+        with self._lock:
+            self._counts.clear()
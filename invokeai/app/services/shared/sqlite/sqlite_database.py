@@ -4,6 +4,7 @@ from collections.abc import Generator
 from contextlib import contextmanager
 from logging import Logger
 from pathlib import Path
+from queue import Empty, Queue
 
 from invokeai.app.services.shared.sqlite.sqlite_common import sqlite_memory
 
@@ -15,6 +16,8 @@ class SqliteDatabase:
     :param db_path: Path to the database file. If None, an in-memory database is used.
     :param logger: Logger to use for logging.
     :param verbose: Whether to log SQL statements. Provides `logger.debug` as the SQLite trace callback.
+    :param read_pool_size: Maximum number of read-only connections to open for `read()`. Ignored for in-memory \
+        databases, which cannot share their data between connections.
 
     This is a light wrapper around the `sqlite3` module, providing a few conveniences:
     - The database file is written to disk if it does not exist.
@@ -24,15 +27,28 @@ class SqliteDatabase:
     In addition to the constructor args, the instance provides the following attributes and methods:
     - `conn`: A `sqlite3.Connection` object. Note that the connection must never be closed if the database is in-memory.
     - `lock`: A shared re-entrant lock, used to approximate thread safety.
+    - `transaction()`: Serialized context manager for any DB work, including writes.
+    - `read()`: Context manager for read-only DB work, served from a bounded pool of read-only connections so that \
+        readers do not wait on the writer. The database runs in WAL mode, so readers see the last committed state.
     - `clean()`: Runs the SQL `VACUUM;` command and reports on the freed space.
+    - `write_version`: A number that increases after every committed write, for invalidating cached query results.
     """
 
-    def __init__(self, db_path: Path | None, logger: Logger, verbose: bool = False) -> None:
+    def __init__(self, db_path: Path | None, logger: Logger, verbose: bool = False, read_pool_size: int = 4) -> None:
         """Initializes the database. This is used internally by the class constructor."""
         self._logger = logger
         self._db_path = db_path
         self._verbose = verbose
         self._lock = threading.RLock()
+        self._write_version = 0
+
+        # Per-thread bookkeeping, so that `read()` inside a `transaction()` sees uncommitted writes, and nested `read()`
+        # calls reuse the same connection instead of exhausting the pool.
+        self._local = threading.local()
+        self._read_pool_size = read_pool_size if self._db_path else 0
+        self._read_pool: Queue[sqlite3.Connection] = Queue()
+        self._read_pool_lock = threading.Lock()
+        self._read_conn_count = 0
 
         if not self._db_path:
             logger.info("Initializing in-memory database")
@@ -55,6 +71,14 @@ class SqliteDatabase:
         # Set a busy timeout to prevent database lockups during writes
         self._conn.execute("PRAGMA busy_timeout = 5000;")  # 5 seconds
 
+    @property
+    def write_version(self) -> int:
+        """
+        A number that increases after every transaction that writes to the database is committed. A result computed
+        from a read that started after getting the version is current for as long as the version is unchanged.
+        """
+        return self._write_version
+
     def clean(self) -> None:
         """
         Cleans the database by running the VACUUM command, reporting on the freed space.
@@ -82,12 +106,84 @@ class SqliteDatabase:
         Acquires the RLock, yields a Cursor, then commits or rolls back.
         """
         with self._lock:
+            self._local.write_depth = getattr(self._local, "write_depth", 0) + 1
             cursor = self._conn.cursor()
+            total_changes = self._conn.total_changes
             try:
                 yield cursor
                 self._conn.commit()
+                if self._conn.total_changes != total_changes:
+                    # Bumped after the commit, so readers never cache a result under a version that predates it
+                    self._write_version += 1
             except:
                 self._conn.rollback()
                 raise
             finally:
                 cursor.close()
+                self._local.write_depth -= 1
+
+    @contextmanager
+    def read(self) -> Generator[sqlite3.Cursor, None, None]:
+        """
+        Thread-safe context manager for read-only DB work.
+        Borrows a connection from the read pool, yields a Cursor inside a read transaction (a consistent snapshot),
+        then returns the connection to the pool.
+
+        Falls back to `transaction()` when the pool is disabled (e.g. in-memory database) or when the calling thread
+        is already inside a `transaction()`, so that its own uncommitted writes are visible.
+        """
+        if self._read_pool_size <= 0 or getattr(self._local, "write_depth", 0) > 0:
+            with self.transaction() as cursor:
+                yield cursor
+            return
+
+        conn: sqlite3.Connection | None = getattr(self._local, "read_conn", None)
+        if conn is not None:
+            # Nested read on this thread - share the outer snapshot
+            cursor = conn.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+            return
+
+        conn = self._acquire_read_conn()
+        self._local.read_conn = conn
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN;")
+            yield cursor
+        finally:
+            cursor.close()
+            self._local.read_conn = None
+            try:
+                conn.rollback()
+            finally:
+                self._read_pool.put(conn)
+
+    def _acquire_read_conn(self) -> sqlite3.Connection:
+        """Gets an idle read connection from the pool, opening a new one if the pool is not yet full."""
+        try:
+            return self._read_pool.get_nowait()
+        except Empty:
+            pass
+        with self._read_pool_lock:
+            if self._read_conn_count < self._read_pool_size:
+                self._read_conn_count += 1
+                return self._open_read_conn()
+        return self._read_pool.get()
+
+    def _open_read_conn(self) -> sqlite3.Connection:
+        """Opens a new read-only connection to the database file."""
+        assert self._db_path is not None
+        uri = f"{self._db_path.resolve().as_uri()}?mode=ro"
+        # isolation_level=None puts the connection in autocommit mode; `read()` manages the transaction explicitly.
+        conn = sqlite3.connect(database=uri, uri=True, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+
+        if self._verbose:
+            conn.set_trace_callback(self._logger.debug)
+
+        conn.execute("PRAGMA busy_timeout = 5000;")
+        conn.execute("PRAGMA query_only = ON;")
+        return conn
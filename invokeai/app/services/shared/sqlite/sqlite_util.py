@@ -27,6 +27,11 @@ from invokeai.app.services.shared.sqlite_migrator.migrations.migration_21 import
 from invokeai.app.services.shared.sqlite_migrator.migrations.migration_22 import build_migration_22
 from invokeai.app.services.shared.sqlite_migrator.migrations.migration_23 import build_migration_23
 from invokeai.app.services.shared.sqlite_migrator.migrations.migration_24 import build_migration_24
+from invokeai.app.services.shared.sqlite_migrator.migrations.migration_25 import build_migration_25
+from invokeai.app.services.shared.sqlite_migrator.migrations.migration_26 import build_migration_26
+from invokeai.app.services.shared.sqlite_migrator.migrations.migration_27 import build_migration_27
+from invokeai.app.services.shared.sqlite_migrator.migrations.migration_28 import build_migration_28
+from invokeai.app.services.shared.sqlite_migrator.migrations.migration_29 import build_migration_29
 from invokeai.app.services.shared.sqlite_migrator.sqlite_migrator_impl import SqliteMigrator
 
 
@@ -44,7 +49,7 @@ def init_db(config: InvokeAIAppConfig, logger: Logger, image_files: ImageFileSto
     - Runs all migrations
     """
     db_path = None if config.use_memory_db else config.db_path
-    db = SqliteDatabase(db_path=db_path, logger=logger, verbose=config.log_sql)
+    db = SqliteDatabase(db_path=db_path, logger=logger, verbose=config.log_sql, read_pool_size=config.db_read_pool_size)
 
     migrator = SqliteMigrator(db=db)
     migrator.register_migration(build_migration_1())
@@ -71,6 +76,11 @@ def init_db(config: InvokeAIAppConfig, logger: Logger, image_files: ImageFileSto
     migrator.register_migration(build_migration_22(app_config=config, logger=logger))
     migrator.register_migration(build_migration_23(app_config=config, logger=logger))
     migrator.register_migration(build_migration_24(app_config=config, logger=logger))
+    migrator.register_migration(build_migration_25())
+    migrator.register_migration(build_migration_26())
+    migrator.register_migration(build_migration_27())
+    migrator.register_migration(build_migration_28(logger=logger))
+    migrator.register_migration(build_migration_29())
     migrator.run_migrations()
 
     return db
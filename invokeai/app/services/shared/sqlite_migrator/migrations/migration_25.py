@@ -0,0 +1,70 @@
+import sqlite3
+
+from invokeai.app.services.shared.sqlite_migrator.sqlite_migrator_common import Migration
+
+
+class Migration25Callback:
+    def __call__(self, cursor: sqlite3.Cursor) -> None:
+        self._create_session_queue_batches(cursor)
+        self._move_workflows_to_batches(cursor)
+        self._create_session_queue_batches_cleanup_trigger(cursor)
+
+    def _create_session_queue_batches(self, cursor: sqlite3.Cursor) -> None:
+        """Creates the `session_queue_batches` table, which holds data shared by every queue item in a batch."""
+
+        cursor.execute(
+            """--sql
+            CREATE TABLE IF NOT EXISTS session_queue_batches (
+                batch_id TEXT NOT NULL PRIMARY KEY,
+                -- The workflow is identical for every queue item in a batch, so we store it once here
+                workflow TEXT
+            );
+            """
+        )
+
+    def _move_workflows_to_batches(self, cursor: sqlite3.Cursor) -> None:
+        """Moves the per-item workflows to the batches table and drops the `workflow` column from `session_queue`."""
+
+        cursor.execute(
+            """--sql
+            INSERT OR IGNORE INTO session_queue_batches (batch_id, workflow)
+            SELECT batch_id, MAX(workflow)
+            FROM session_queue
+            GROUP BY batch_id;
+            """
+        )
+        cursor.execute("ALTER TABLE session_queue DROP COLUMN workflow;")
+
+    def _create_session_queue_batches_cleanup_trigger(self, cursor: sqlite3.Cursor) -> None:
+        """Deletes a batch's row once the last of its queue items is deleted."""
+
+        cursor.execute(
+            """--sql
+            CREATE TRIGGER IF NOT EXISTS tg_session_queue_batches_cleanup
+            AFTER DELETE ON session_queue FOR EACH ROW
+            WHEN NOT EXISTS (SELECT 1 FROM session_queue WHERE batch_id = OLD.batch_id)
+            BEGIN
+                DELETE FROM session_queue_batches
+                WHERE batch_id = OLD.batch_id;
+            END;
+            """
+        )
+
+
+def build_migration_25() -> Migration:
+    """
+    Build the migration from database version 24 to 25.
+
+    This migration does the following:
+        - Creates the `session_queue_batches` table.
+        - Moves each batch's workflow from its queue items into the new table, storing it once per batch.
+        - Drops the `workflow` column from the `session_queue` table.
+        - Adds a trigger that deletes a batch's row when its last queue item is deleted.
+    """
+    migration_25 = Migration(
+        from_version=24,
+        to_version=25,
+        callback=Migration25Callback(),
+    )
+
+    return migration_25
@@ -0,0 +1,155 @@
+import sqlite3
+
+from invokeai.app.services.shared.sqlite_migrator.sqlite_migrator_common import Migration
+
+
+class Migration26Callback:
+    def __call__(self, cursor: sqlite3.Cursor) -> None:
+        self._add_batch_graph_col(cursor)
+        self._make_session_nullable(cursor)
+
+    def _add_batch_graph_col(self, cursor: sqlite3.Cursor) -> None:
+        """Adds the `graph` column to the `session_queue_batches` table."""
+
+        cursor.execute("ALTER TABLE session_queue_batches ADD COLUMN graph TEXT;")
+
+    def _make_session_nullable(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Rebuilds the `session_queue` table with a nullable `session` column. SQLite cannot drop a NOT NULL constraint in
+        place, so we create a new table, copy the rows over and recreate the indices and triggers.
+        """
+
+        # Step 1: Rename the existing table. Its indices and triggers are dropped along with it in step 4.
+        cursor.execute("ALTER TABLE session_queue RENAME TO session_queue_old;")
+
+        # Step 2: Create the new table. Apart from `session`, the columns are the same as before.
+        cursor.execute(
+            """--sql
+            CREATE TABLE session_queue (
+                item_id INTEGER PRIMARY KEY AUTOINCREMENT, -- used for ordering, cursor pagination
+                batch_id TEXT NOT NULL, -- identifier of the batch this queue item belongs to
+                queue_id TEXT NOT NULL, -- identifier of the queue this queue item belongs to
+                session_id TEXT NOT NULL UNIQUE, -- duplicated data from the session column, for ease of access
+                field_values TEXT, -- NULL if no values are associated with this queue item
+                -- the session to be executed, NULL until the session is first saved - it is then built from the batch's
+                -- graph and this item's field values
+                session TEXT,
+                status TEXT NOT NULL DEFAULT 'pending', -- the status of the queue item, one of 'pending', 'in_progress', 'completed', 'failed', 'canceled'
+                priority INTEGER NOT NULL DEFAULT 0, -- the priority, higher is more important
+                error_traceback TEXT, -- any errors associated with this queue item
+                created_at DATETIME NOT NULL DEFAULT(STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW')),
+                updated_at DATETIME NOT NULL DEFAULT(STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW')), -- updated via trigger
+                started_at DATETIME, -- updated via trigger
+                completed_at DATETIME, -- updated via trigger, completed items are cleaned up on application startup
+                error_type TEXT,
+                error_message TEXT,
+                origin TEXT,
+                destination TEXT,
+                retried_from_item_id INTEGER
+            );
+            """
+        )
+
+        # Step 3: Copy the rows over, keeping the AUTOINCREMENT counter so item ids are never reused
+        cursor.execute(
+            """--sql
+            INSERT INTO session_queue (
+                item_id, batch_id, queue_id, session_id, field_values, session, status, priority, error_traceback,
+                created_at, updated_at, started_at, completed_at, error_type, error_message, origin, destination,
+                retried_from_item_id
+            )
+            SELECT
+                item_id, batch_id, queue_id, session_id, field_values, session, status, priority, error_traceback,
+                created_at, updated_at, started_at, completed_at, error_type, error_message, origin, destination,
+                retried_from_item_id
+            FROM session_queue_old;
+            """
+        )
+        cursor.execute(
+            """--sql
+            UPDATE sqlite_sequence
+            SET seq = (SELECT seq FROM sqlite_sequence WHERE name = 'session_queue_old')
+            WHERE name = 'session_queue';
+            """
+        )
+
+        # Step 4: Drop the old table
+        cursor.execute("DROP TABLE session_queue_old;")
+
+        # Step 5: Recreate the indices and triggers
+        indices = [
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_session_queue_item_id ON session_queue(item_id);",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_session_queue_session_id ON session_queue(session_id);",
+            "CREATE INDEX IF NOT EXISTS idx_session_queue_batch_id ON session_queue(batch_id);",
+            "CREATE INDEX IF NOT EXISTS idx_session_queue_created_priority ON session_queue(priority);",
+            "CREATE INDEX IF NOT EXISTS idx_session_queue_created_status ON session_queue(status);",
+        ]
+
+        triggers = [
+            """--sql
+            CREATE TRIGGER IF NOT EXISTS tg_session_queue_completed_at
+            AFTER UPDATE OF status ON session_queue
+            FOR EACH ROW
+            WHEN
+            NEW.status = 'completed'
+            OR NEW.status = 'failed'
+            OR NEW.status = 'canceled'
+            BEGIN
+            UPDATE session_queue
+            SET completed_at = STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW')
+            WHERE item_id = NEW.item_id;
+            END;
+            """,
+            """--sql
+            CREATE TRIGGER IF NOT EXISTS tg_session_queue_started_at
+            AFTER UPDATE OF status ON session_queue
+            FOR EACH ROW
+            WHEN
+            NEW.status = 'in_progress'
+            BEGIN
+            UPDATE session_queue
+            SET started_at = STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW')
+            WHERE item_id = NEW.item_id;
+            END;
+            """,
+            """--sql
+            CREATE TRIGGER IF NOT EXISTS tg_session_queue_updated_at
+            AFTER UPDATE
+            ON session_queue FOR EACH ROW
+            BEGIN
+                UPDATE session_queue
+                SET updated_at = STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW')
+                WHERE item_id = old.item_id;
+            END;
+            """,
+            """--sql
+            CREATE TRIGGER IF NOT EXISTS tg_session_queue_batches_cleanup
+            AFTER DELETE ON session_queue FOR EACH ROW
+            WHEN NOT EXISTS (SELECT 1 FROM session_queue WHERE batch_id = OLD.batch_id)
+            BEGIN
+                DELETE FROM session_queue_batches
+                WHERE batch_id = OLD.batch_id;
+            END;
+            """,
+        ]
+
+        for stmt in indices + triggers:
+            cursor.execute(stmt)
+
+
+def build_migration_26() -> Migration:
+    """
+    Build the migration from database version 25 to 26.
+
+    This migration does the following:
+        - Adds the `graph` column to the `session_queue_batches` table, which holds the batch's template graph.
+        - Makes the `session` column of the `session_queue` table nullable. Queue items created from a batch graph store
+          only their field values until their session is saved.
+    """
+    migration_26 = Migration(
+        from_version=25,
+        to_version=26,
+        callback=Migration26Callback(),
+    )
+
+    return migration_26
@@ -0,0 +1,79 @@
+import sqlite3
+
+from invokeai.app.services.shared.sqlite_migrator.sqlite_migrator_common import Migration
+
+
+class Migration27Callback:
+    def __call__(self, cursor: sqlite3.Cursor) -> None:
+        self._create_invocation_cache(cursor)
+        self._create_invocation_cache_references(cursor)
+
+    def _create_invocation_cache(self, cursor: sqlite3.Cursor) -> None:
+        """Creates the `invocation_cache` table, which holds cached invocation outputs."""
+
+        tables = [
+            """--sql
+            CREATE TABLE IF NOT EXISTS invocation_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                -- Stable digest of the invocation
+                key TEXT NOT NULL,
+                -- Empty for outputs any process may use. Outputs referencing process-local objects (tensors and
+                -- conditioning) hold the id of the process that created them.
+                scope TEXT NOT NULL DEFAULT '',
+                invocation_output TEXT NOT NULL,
+                -- Set from a counter that increases on every save and hit, so the least recently used row is the lowest
+                last_accessed INTEGER NOT NULL DEFAULT 0,
+                created_at DATETIME NOT NULL DEFAULT(STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW')),
+                UNIQUE (key, scope)
+            );
+            """
+        ]
+
+        indices = [
+            "CREATE INDEX IF NOT EXISTS idx_invocation_cache_last_accessed ON invocation_cache(last_accessed);",
+        ]
+
+        for stmt in tables + indices:
+            cursor.execute(stmt)
+
+    def _create_invocation_cache_references(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Creates the `invocation_cache_references` table, which maps the names of images, tensors and conditioning to
+        the cached outputs that reference them.
+        """
+
+        tables = [
+            """--sql
+            CREATE TABLE IF NOT EXISTS invocation_cache_references (
+                name TEXT NOT NULL,
+                cache_id INTEGER NOT NULL,
+                PRIMARY KEY (name, cache_id),
+                FOREIGN KEY (cache_id) REFERENCES invocation_cache (id) ON DELETE CASCADE
+            ) WITHOUT ROWID;
+            """
+        ]
+
+        indices = [
+            "CREATE INDEX IF NOT EXISTS idx_invocation_cache_references_cache_id ON invocation_cache_references(cache_id);",
+        ]
+
+        for stmt in tables + indices:
+            cursor.execute(stmt)
+
+
+def build_migration_27() -> Migration:
+    """
+    Build the migration from database version 26 to 27.
+
+    This migration does the following:
+        - Adds the `invocation_cache` table, which holds the persistent invocation cache.
+        - Adds the `invocation_cache_references` table, which is used to invalidate cached outputs when the objects
+          they reference are deleted.
+    """
+    migration_27 = Migration(
+        from_version=26,
+        to_version=27,
+        callback=Migration27Callback(),
+    )
+
+    return migration_27
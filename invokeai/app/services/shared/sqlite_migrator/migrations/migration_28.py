@@ -0,0 +1,180 @@
+import sqlite3
+from logging import Logger
+
+from invokeai.app.services.shared.sqlite.sqlite_common import is_fts5_trigram_available
+from invokeai.app.services.shared.sqlite_migrator.sqlite_migrator_common import Migration
+
+# The columns of `image_search` that are indexed for full-text search
+_SEARCH_COLUMNS = ["positive_prompt", "negative_prompt", "model", "loras", "seed", "scheduler", "created_at"]
+
+# Extracts the searchable fields of images. `{image}` is `new` in triggers and `images` when populating the table.
+# Metadata that is not valid JSON is treated as empty, so a bad row never fails an insert or update.
+_SELECT_SEARCH_FIELDS = """--sql
+SELECT
+    image.image_name,
+    TRIM(
+        IFNULL(json_extract(image.metadata, '$.positive_prompt'), '')
+        || ' '
+        || IFNULL(json_extract(image.metadata, '$.positive_style_prompt'), '')
+    ),
+    TRIM(
+        IFNULL(json_extract(image.metadata, '$.negative_prompt'), '')
+        || ' '
+        || IFNULL(json_extract(image.metadata, '$.negative_style_prompt'), '')
+    ),
+    json_extract(image.metadata, '$.model.name'),
+    (
+        SELECT group_concat(json_extract(lora.value, '$.model.name'), ' ')
+        FROM json_each(image.metadata, '$.loras') AS lora
+        WHERE lora.type = 'object'
+    ),
+    json_extract(image.metadata, '$.seed'),
+    json_extract(image.metadata, '$.scheduler'),
+    image.created_at
+FROM (
+    SELECT
+        {image}.image_name AS image_name,
+        {image}.created_at AS created_at,
+        CASE WHEN json_valid({image}.metadata) THEN {image}.metadata END AS metadata
+    {from_images}
+) AS image
+"""
+
+
+class Migration28Callback:
+    def __init__(self, logger: Logger) -> None:
+        self._logger = logger
+
+    def __call__(self, cursor: sqlite3.Cursor) -> None:
+        self._create_image_search(cursor)
+        if is_fts5_trigram_available(cursor):
+            self._create_images_fts(cursor)
+        else:
+            # Searches fall back to scanning `image_search` when there is no full-text index
+            self._logger.warning(
+                f"SQLite {sqlite3.sqlite_version} lacks FTS5 or its trigram tokenizer (SQLite 3.34+), so image search "
+                "will not use a full-text index"
+            )
+
+    def _create_image_search(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Creates the `image_search` table, which holds the searchable fields extracted from each image's metadata, and
+        the triggers that keep it in sync with `images`.
+        """
+
+        tables = [
+            """--sql
+            CREATE TABLE IF NOT EXISTS image_search (
+                -- Explicit, so the full-text index's rowids are not renumbered by VACUUM
+                id INTEGER PRIMARY KEY,
+                image_name TEXT NOT NULL UNIQUE,
+                positive_prompt TEXT,
+                negative_prompt TEXT,
+                model TEXT,
+                loras TEXT,
+                seed TEXT,
+                scheduler TEXT,
+                created_at TEXT
+            );
+            """
+        ]
+
+        select_new = _SELECT_SEARCH_FIELDS.format(image="new", from_images="")
+        columns = ", ".join(["image_name", *_SEARCH_COLUMNS])
+
+        triggers = [
+            f"""--sql
+            CREATE TRIGGER IF NOT EXISTS tg_images_search_insert
+            AFTER INSERT ON images FOR EACH ROW
+            BEGIN
+                INSERT INTO image_search ({columns}) {select_new};
+            END;
+            """,
+            f"""--sql
+            CREATE TRIGGER IF NOT EXISTS tg_images_search_update
+            AFTER UPDATE OF metadata, created_at ON images FOR EACH ROW
+            BEGIN
+                DELETE FROM image_search WHERE image_name = old.image_name;
+                INSERT INTO image_search ({columns}) {select_new};
+            END;
+            """,
+            """--sql
+            CREATE TRIGGER IF NOT EXISTS tg_images_search_delete
+            AFTER DELETE ON images FOR EACH ROW
+            BEGIN
+                DELETE FROM image_search WHERE image_name = old.image_name;
+            END;
+            """,
+        ]
+
+        for stmt in tables + triggers:
+            cursor.execute(stmt)
+
+        select_images = _SELECT_SEARCH_FIELDS.format(image="images", from_images="FROM images")
+        cursor.execute(f"INSERT OR IGNORE INTO image_search ({columns}) {select_images};")
+
+    def _create_images_fts(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Creates the `images_fts` full-text index over `image_search`. The trigram tokenizer supports the substring
+        matches the gallery search has always done.
+        """
+
+        columns = ", ".join(_SEARCH_COLUMNS)
+
+        tables = [
+            f"""--sql
+            CREATE VIRTUAL TABLE IF NOT EXISTS images_fts USING fts5 (
+                {columns},
+                content = 'image_search',
+                content_rowid = 'id',
+                tokenize = 'trigram'
+            );
+            """
+        ]
+
+        old_columns = ", ".join(f"old.{c}" for c in _SEARCH_COLUMNS)
+        new_columns = ", ".join(f"new.{c}" for c in _SEARCH_COLUMNS)
+
+        # `image_search` rows are only ever inserted and deleted, never updated
+        triggers = [
+            f"""--sql
+            CREATE TRIGGER IF NOT EXISTS tg_image_search_fts_insert
+            AFTER INSERT ON image_search FOR EACH ROW
+            BEGIN
+                INSERT INTO images_fts (rowid, {columns}) VALUES (new.id, {new_columns});
+            END;
+            """,
+            f"""--sql
+            CREATE TRIGGER IF NOT EXISTS tg_image_search_fts_delete
+            AFTER DELETE ON image_search FOR EACH ROW
+            BEGIN
+                INSERT INTO images_fts (images_fts, rowid, {columns}) VALUES ('delete', old.id, {old_columns});
+            END;
+            """,
+        ]
+
+        for stmt in tables + triggers:
+            cursor.execute(stmt)
+
+        # Index the existing rows in one pass
+        cursor.execute("INSERT INTO images_fts (images_fts) VALUES ('rebuild');")
+
+
+def build_migration_28(logger: Logger) -> Migration:
+    """
+    Build the migration from database version 27 to 28.
+
+    This migration does the following:
+        - Adds the `image_search` table, which holds the prompts, model, LoRAs, seed and scheduler from each image's
+          metadata, and triggers to keep it in sync with the `images` table.
+        - Adds the `images_fts` full-text index over `image_search`, and triggers to keep it in sync. Skipped if SQLite
+          lacks FTS5 or the trigram tokenizer, in which case searches scan `image_search` instead.
+        - Populates both from the existing images.
+    """
+    migration_28 = Migration(
+        from_version=27,
+        to_version=28,
+        callback=Migration28Callback(logger=logger),
+    )
+
+    return migration_28
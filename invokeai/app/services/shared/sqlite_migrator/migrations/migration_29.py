@@ -0,0 +1,42 @@
+import sqlite3
+
+from invokeai.app.services.shared.sqlite_migrator.sqlite_migrator_common import Migration
+
+
+class Migration29Callback:
+    def __call__(self, cursor: sqlite3.Cursor) -> None:
+        self._add_keyset_pagination_indices(cursor)
+
+    def _add_keyset_pagination_indices(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Adds indices matching the sort order of the paginated image and queue item listings, so that a page can be
+        found by seeking to the previous page's last item, without sorting.
+        """
+
+        indices = [
+            # Starred first, then by creation date (either direction)
+            "CREATE INDEX IF NOT EXISTS idx_images_starred_created_at_image_name ON images(starred, created_at, image_name);",
+            # By creation date (either direction)
+            "CREATE INDEX IF NOT EXISTS idx_images_created_at_image_name ON images(created_at, image_name);",
+            # By priority, then in the order the items were enqueued
+            "CREATE INDEX IF NOT EXISTS idx_session_queue_queue_id_priority_item_id ON session_queue(queue_id, priority DESC, item_id);",
+        ]
+
+        for stmt in indices:
+            cursor.execute(stmt)
+
+
+def build_migration_29() -> Migration:
+    """
+    Build the migration from database version 28 to 29.
+
+    This migration does the following:
+        - Adds composite indices for keyset pagination of images and session queue items.
+    """
+    migration_29 = Migration(
+        from_version=28,
+        to_version=29,
+        callback=Migration29Callback(),
+    )
+
+    return migration_29
@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import Optional
 
-from invokeai.app.services.shared.pagination import PaginatedResults
+from invokeai.app.services.shared.pagination import KeysetPaginatedResults, PaginatedResults
 from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
 from invokeai.app.services.workflow_records.workflow_records_common import (
     Workflow,
@@ -51,6 +51,22 @@ class WorkflowRecordsStorageBase(ABC):
         """Gets many workflows."""
         pass
 
+    @abstractmethod
+    def get_many_by_cursor(
+        self,
+        order_by: WorkflowRecordOrderBy,
+        direction: SQLiteDirection,
+        categories: Optional[list[WorkflowCategory]],
+        limit: int,
+        cursor: Optional[str],
+        query: Optional[str],
+        tags: Optional[list[str]],
+        has_been_opened: Optional[bool],
+        include_total: bool,
+    ) -> KeysetPaginatedResults[WorkflowRecordListItemDTO]:
+        """Gets the page of workflows after the cursor, or the first page if no cursor is given."""
+        pass
+
     @abstractmethod
     def counts_by_category(
         self,
@@ -2,8 +2,14 @@ from pathlib import Path
 from typing import Optional
 
 from invokeai.app.services.invoker import Invoker
-from invokeai.app.services.shared.pagination import PaginatedResults
-from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
+from invokeai.app.services.shared.pagination import (
+    KeysetPaginatedResults,
+    PaginatedResults,
+    decode_cursor,
+    encode_cursor,
+)
+from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection, build_keyset_condition
+from invokeai.app.services.shared.sqlite.sqlite_count_cache import SqliteCountCache
 from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
 from invokeai.app.services.workflow_records.workflow_records_base import WorkflowRecordsStorageBase
 from invokeai.app.services.workflow_records.workflow_records_common import (
@@ -21,11 +27,75 @@ from invokeai.app.util.misc import uuid_string
 
 SQL_TIME_FORMAT = "%Y-%m-%d %H:%M:%f"
 
+WORKFLOW_LIST_ITEM_COLS = "workflow_id, category, name, description, created_at, updated_at, opened_at, tags"
+
+
+def _get_filter_conditions(
+    categories: Optional[list[WorkflowCategory]],
+    tags: Optional[list[str]],
+    query: Optional[str],
+    has_been_opened: Optional[bool],
+) -> tuple[list[str], list[str | int]]:
+    """Builds the conditions that filter workflow listings, along with their params."""
+
+    # Start with an empty list of conditions and params
+    conditions: list[str] = []
+    params: list[str | int] = []
+
+    if categories:
+        # Categories is a list of WorkflowCategory enum values, and a single string in the DB
+
+        # Ensure all categories are valid (is this necessary?)
+        assert all(c in WorkflowCategory for c in categories)
+
+        # Construct a placeholder string for the number of categories
+        placeholders = ", ".join("?" for _ in categories)
+
+        # Construct the condition string & params
+        category_condition = f"category IN ({placeholders})"
+        category_params = [category.value for category in categories]
+
+        conditions.append(category_condition)
+        params.extend(category_params)
+
+    if tags:
+        # Tags is a list of strings, and a single string in the DB
+        # The string in the DB has no guaranteed format
+
+        # Construct a list of conditions for each tag
+        tags_conditions = ["tags LIKE ?" for _ in tags]
+        tags_conditions_joined = " OR ".join(tags_conditions)
+        tags_condition = f"({tags_conditions_joined})"
+
+        # And the params for the tags, case-insensitive
+        tags_params = [f"%{t.strip()}%" for t in tags]
+
+        conditions.append(tags_condition)
+        params.extend(tags_params)
+
+    if has_been_opened:
+        conditions.append("opened_at IS NOT NULL")
+    elif has_been_opened is False:
+        conditions.append("opened_at IS NULL")
+
+    # Ignore whitespace in the query
+    stripped_query = query.strip() if query else None
+    if stripped_query:
+        # Construct a wildcard query for the name, description, and tags
+        wildcard_query = "%" + stripped_query + "%"
+        query_condition = "(name LIKE ? OR description LIKE ? OR tags LIKE ?)"
+
+        conditions.append(query_condition)
+        params.extend([wildcard_query, wildcard_query, wildcard_query])
+
+    return conditions, params
+
 
 class SqliteWorkflowRecordsStorage(WorkflowRecordsStorageBase):
     def __init__(self, db: SqliteDatabase) -> None:
         super().__init__()
         self._db = db
+        self._counts = SqliteCountCache(db)
 
     def start(self, invoker: Invoker) -> None:
         self._invoker = invoker
@@ -33,7 +103,7 @@ class SqliteWorkflowRecordsStorage(WorkflowRecordsStorageBase):
 
     def get(self, workflow_id: str) -> WorkflowRecordDTO:
         """Gets a workflow by ID. Updates the opened_at column."""
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             cursor.execute(
                 """--sql
                 SELECT workflow_id, workflow, name, created_at, updated_at, opened_at
@@ -105,108 +175,50 @@ class SqliteWorkflowRecordsStorage(WorkflowRecordsStorageBase):
         tags: Optional[list[str]] = None,
         has_been_opened: Optional[bool] = None,
     ) -> PaginatedResults[WorkflowRecordListItemDTO]:
-        with self._db.transaction() as cursor:
-            # sanitize!
-            assert order_by in WorkflowRecordOrderBy
-            assert direction in SQLiteDirection
-
-            # We will construct the query dynamically based on the query params
-
-            # The main query to get the workflows / counts
-            main_query = """
-                    SELECT
-                        workflow_id,
-                        category,
-                        name,
-                        description,
-                        created_at,
-                        updated_at,
-                        opened_at,
-                        tags
-                    FROM workflow_library
-                    """
-            count_query = "SELECT COUNT(*) FROM workflow_library"
-
-            # Start with an empty list of conditions and params
-            conditions: list[str] = []
-            params: list[str | int] = []
+        # sanitize!
+        assert order_by in WorkflowRecordOrderBy
+        assert direction in SQLiteDirection
 
-            if categories:
-                # Categories is a list of WorkflowCategory enum values, and a single string in the DB
-
-                # Ensure all categories are valid (is this necessary?)
-                assert all(c in WorkflowCategory for c in categories)
-
-                # Construct a placeholder string for the number of categories
-                placeholders = ", ".join("?" for _ in categories)
-
-                # Construct the condition string & params
-                category_condition = f"category IN ({placeholders})"
-                category_params = [category.value for category in categories]
-
-                conditions.append(category_condition)
-                params.extend(category_params)
-
-            if tags:
-                # Tags is a list of strings, and a single string in the DB
-                # The string in the DB has no guaranteed format
-
-                # Construct a list of conditions for each tag
-                tags_conditions = ["tags LIKE ?" for _ in tags]
-                tags_conditions_joined = " OR ".join(tags_conditions)
-                tags_condition = f"({tags_conditions_joined})"
-
-                # And the params for the tags, case-insensitive
-                tags_params = [f"%{t.strip()}%" for t in tags]
-
-                conditions.append(tags_condition)
-                params.extend(tags_params)
-
-            if has_been_opened:
-                conditions.append("opened_at IS NOT NULL")
-            elif has_been_opened is False:
-                conditions.append("opened_at IS NULL")
+        # We will construct the query dynamically based on the query params
 
-            # Ignore whitespace in the query
-            stripped_query = query.strip() if query else None
-            if stripped_query:
-                # Construct a wildcard query for the name, description, and tags
-                wildcard_query = "%" + stripped_query + "%"
-                query_condition = "(name LIKE ? OR description LIKE ? OR tags LIKE ?)"
+        # The main query to get the workflows / counts
+        main_query = f"""
+                SELECT {WORKFLOW_LIST_ITEM_COLS}
+                FROM workflow_library
+                """
+        count_query = "SELECT COUNT(*) FROM workflow_library"
 
-                conditions.append(query_condition)
-                params.extend([wildcard_query, wildcard_query, wildcard_query])
+        conditions, params = _get_filter_conditions(categories, tags, query, has_been_opened)
 
-            if conditions:
-                # If there are conditions, add a WHERE clause and then join the conditions
-                main_query += " WHERE "
-                count_query += " WHERE "
+        if conditions:
+            # If there are conditions, add a WHERE clause and then join the conditions
+            main_query += " WHERE "
+            count_query += " WHERE "
 
-                all_conditions = " AND ".join(conditions)
-                main_query += all_conditions
-                count_query += all_conditions
+            all_conditions = " AND ".join(conditions)
+            main_query += all_conditions
+            count_query += all_conditions
 
-            # After this point, the query and params differ for the main query and the count query
-            main_params = params.copy()
-            count_params = params.copy()
+        # After this point, the query and params differ for the main query and the count query
+        main_params = params.copy()
 
-            # Main query also gets ORDER BY and LIMIT/OFFSET
-            main_query += f" ORDER BY {order_by.value} {direction.value}"
+        # Main query also gets ORDER BY and LIMIT/OFFSET
+        main_query += f" ORDER BY {order_by.value} {direction.value}"
 
-            if per_page:
-                main_query += " LIMIT ? OFFSET ?"
-                main_params.extend([per_page, page * per_page])
+        if per_page:
+            main_query += " LIMIT ? OFFSET ?"
+            main_params.extend([per_page, page * per_page])
 
-            # Put a ring on it
-            main_query += ";"
-            count_query += ";"
+        # Put a ring on it
+        main_query += ";"
+        count_query += ";"
 
+        with self._db.read() as cursor:
             cursor.execute(main_query, main_params)
             rows = cursor.fetchall()
-            workflows = [WorkflowRecordListItemDTOValidator.validate_python(dict(row)) for row in rows]
+        workflows = [WorkflowRecordListItemDTOValidator.validate_python(dict(row)) for row in rows]
 
-            cursor.execute(count_query, count_params)
-            total = cursor.fetchone()[0]
+        total = self._counts.get_count(count_query, params)
 
         if per_page:
             pages = total // per_page + (total % per_page > 0)
@@ -221,6 +233,62 @@ class SqliteWorkflowRecordsStorage(WorkflowRecordsStorageBase):
             total=total,
         )
 
+    def get_many_by_cursor(
+        self,
+        order_by: WorkflowRecordOrderBy,
+        direction: SQLiteDirection,
+        categories: Optional[list[WorkflowCategory]],
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        query: Optional[str] = None,
+        tags: Optional[list[str]] = None,
+        has_been_opened: Optional[bool] = None,
+        include_total: bool = False,
+    ) -> KeysetPaginatedResults[WorkflowRecordListItemDTO]:
+        # sanitize!
+        assert order_by in WorkflowRecordOrderBy
+        assert direction in SQLiteDirection
+
+        conditions, params = _get_filter_conditions(categories, tags, query, has_been_opened)
+
+        # `opened_at` may be NULL, which can't be compared. The workflow ID breaks ties, so every workflow has a unique
+        # position.
+        order = [(f"IFNULL({order_by.value}, '')", direction), ("workflow_id", direction)]
+        page_conditions = conditions.copy()
+        page_params = params.copy()
+        if cursor is not None:
+            page_condition, page_condition_params = build_keyset_condition(order, decode_cursor(cursor, order))
+            page_conditions.append(page_condition)
+            page_params.extend(page_condition_params)
+
+        where = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
+        main_query = f"""--sql
+            SELECT {WORKFLOW_LIST_ITEM_COLS}, {order[0][0]} AS sort_key
+            FROM workflow_library
+            {where}
+            ORDER BY {", ".join(f"{column} {direction.value}" for column, direction in order)}
+            LIMIT ?;
+            """
+
+        with self._db.read() as cursor_:
+            # Get one extra row to find out if there is another page
+            cursor_.execute(main_query, [*page_params, limit + 1])
+            rows = cursor_.fetchall()
+
+        next_cursor: Optional[str] = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(order, [rows[-1]["sort_key"], rows[-1]["workflow_id"]])
+
+        workflows = [WorkflowRecordListItemDTOValidator.validate_python(dict(row)) for row in rows]
+
+        total: Optional[int] = None
+        if include_total:
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            total = self._counts.get_count(f"SELECT COUNT(*) FROM workflow_library {where};", params)
+
+        return KeysetPaginatedResults(items=workflows, limit=limit, next_cursor=next_cursor, total=total)
+
     def counts_by_tag(
         self,
         tags: list[str],
@@ -230,7 +298,7 @@ class SqliteWorkflowRecordsStorage(WorkflowRecordsStorageBase):
         if not tags:
             return {}
 
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             result: dict[str, int] = {}
             # Base conditions for categories and selected tags
             base_conditions: list[str] = []
@@ -278,7 +346,7 @@ class SqliteWorkflowRecordsStorage(WorkflowRecordsStorageBase):
         categories: list[WorkflowCategory],
         has_been_opened: Optional[bool] = None,
     ) -> dict[str, int]:
-        with self._db.transaction() as cursor:
+        with self._db.read() as cursor:
             result: dict[str, int] = {}
             # Base conditions for categories
             base_conditions: list[str] = []
@@ -0,0 +1,124 @@
+import struct
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Collection, Optional, Union
+
+from PIL import PngImagePlugin
+
+# The text chunks that hold the metadata, workflow and graph of images created by Invoke
+INVOKEAI_TEXT_KEYS = ("invokeai_metadata", "invokeai_workflow", "invokeai_graph")
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_TEXT_CHUNK_TYPES = {b"tEXt", b"zTXt", b"iTXt"}
+_CHUNK_HEADER = struct.Struct(">I4s")
+_IHDR_SIZE = struct.Struct(">II")
+
+
+class InvalidPngError(ValueError):
+    """Raised when a file is not a PNG file."""
+
+    def __init__(self, message: str = "Not a PNG file") -> None:
+        super().__init__(message)
+
+
+@dataclass
+class PngHeader:
+    """The size and text of a PNG file."""
+
+    width: int
+    height: int
+    text: dict[str, str]
+
+
+def read_png_header(file: Union[str, Path, IO[bytes]], keys: Optional[Collection[str]] = None) -> PngHeader:
+    """
+    Reads the size and text chunks of a PNG file. Only chunk headers and text are read - everything else, including the
+    pixel data, is skipped over. This is much faster than opening the file with PIL when only the text is needed.
+
+    Text chunks may come before or after the pixel data, so the whole file is scanned unless all the requested text
+    chunks are found first. A truncated file gives the text that was read before the end.
+
+    :param file: The path to the file, or a binary file object positioned at the start of the file.
+    :param keys: The keywords of the text chunks to read. If not given, all text chunks are read.
+    :raises InvalidPngError: If the file is not a PNG file.
+    """
+    if isinstance(file, (str, Path)):
+        with open(file, "rb") as f:
+            return _read_png_header(f, keys)
+    return _read_png_header(file, keys)
+
+
+def read_png_text(file: Union[str, Path, IO[bytes]], keys: Optional[Collection[str]] = None) -> dict[str, str]:
+    """Reads the text chunks of a PNG file, without reading its pixel data. See `read_png_header`."""
+    return read_png_header(file, keys).text
+
+
+def _read_png_header(file: IO[bytes], keys: Optional[Collection[str]]) -> PngHeader:
+    if file.read(len(_PNG_SIGNATURE)) != _PNG_SIGNATURE:
+        raise InvalidPngError()
+
+    header = file.read(_CHUNK_HEADER.size)
+    if len(header) < _CHUNK_HEADER.size or _CHUNK_HEADER.unpack(header)[1] != b"IHDR":
+        raise InvalidPngError("PNG file has no IHDR chunk")
+    length, _ = _CHUNK_HEADER.unpack(header)
+    ihdr = file.read(length + 4)
+    if len(ihdr) < _IHDR_SIZE.size:
+        raise InvalidPngError("PNG file has a truncated IHDR chunk")
+    width, height = _IHDR_SIZE.unpack_from(ihdr)
+
+    text: dict[str, str] = {}
+    while keys is None or not all(key in text for key in keys):
+        header = file.read(_CHUNK_HEADER.size)
+        if len(header) < _CHUNK_HEADER.size:
+            break
+        length, chunk_type = _CHUNK_HEADER.unpack(header)
+        if chunk_type == b"IEND":
+            break
+        if chunk_type not in _TEXT_CHUNK_TYPES:
+            # Skip the chunk's data and CRC
+            file.seek(length + 4, 1)
+            continue
+
+        data = file.read(length)
+        file.seek(4, 1)
+        if len(data) < length:
+            break
+        chunk_text = _parse_text_chunk(chunk_type, data, keys)
+        if chunk_text is not None and chunk_text[0] not in text:
+            text[chunk_text[0]] = chunk_text[1]
+
+    return PngHeader(width=width, height=height, text=text)
+
+
+def _parse_text_chunk(chunk_type: bytes, data: bytes, keys: Optional[Collection[str]]) -> Optional[tuple[str, str]]:
+    """Parses a tEXt, zTXt or iTXt chunk into its keyword and text. Returns None if it is invalid or not wanted."""
+    keyword_bytes, separator, rest = data.partition(b"\0")
+    if not separator:
+        return None
+    keyword = keyword_bytes.decode("latin-1")
+    if keys is not None and keyword not in keys:
+        return None
+
+    try:
+        if chunk_type == b"tEXt":
+            return keyword, rest.decode("latin-1")
+        if chunk_type == b"zTXt":
+            # The compression method is always 0 (deflate)
+            return keyword, _decompress(rest[1:]).decode("latin-1")
+        # iTXt has a compression flag and method, then a language tag and translated keyword, then UTF-8 text
+        is_compressed = rest[0] == 1
+        _, _, rest = rest[2:].partition(b"\0")
+        _, _, rest = rest.partition(b"\0")
+        return keyword, (_decompress(rest) if is_compressed else rest).decode("utf-8")
+    except (IndexError, UnicodeDecodeError, zlib.error, ValueError):
+        return None
+
+
+def _decompress(data: bytes) -> bytes:
+    """Decompresses text, with the same limit as PIL to guard against decompression bombs."""
+    decompressor = zlib.decompressobj()
+    text = decompressor.decompress(data, PngImagePlugin.MAX_TEXT_CHUNK)
+    if decompressor.unconsumed_tail:
+        raise ValueError("Decompressed text chunk is too large")
+    return text
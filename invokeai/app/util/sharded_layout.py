@@ -0,0 +1,91 @@
+import hashlib
+import os
+import string
+from pathlib import Path
+from typing import Iterator, Literal, Union
+
+# In the flat layout, all the files are in one folder. In the sharded layout, they are in nested subfolders named for
+# a hash of their names, eg `ab/cd/<name>.png`, which keeps folders small when there are millions of files.
+ImageLayout = Literal["flat", "sharded"]
+
+# Two levels of 256 subfolders, so a million images makes about 15 files per folder
+SHARD_DEPTH = 2
+SHARD_WIDTH = 2
+
+# A file in a folder that holds no files in the flat layout, so files are only looked for in the sharded layout
+MIGRATED_MARKER = ".sharded"
+
+
+def get_shard(name: str) -> tuple[str, ...]:
+    """
+    Gets the subfolders that a file is stored in in the sharded layout. The hash is of the name without its extension,
+    so an image and its thumbnails have the same shard.
+    """
+    digest = hashlib.md5(Path(name).stem.encode("utf-8"), usedforsecurity=False).hexdigest()
+    return tuple(digest[i * SHARD_WIDTH : (i + 1) * SHARD_WIDTH] for i in range(SHARD_DEPTH))
+
+
+def get_sharded_path(folder: Path, name: str) -> Path:
+    """Gets the path of a file in the sharded layout."""
+    return folder.joinpath(*get_shard(name), name)
+
+
+def get_layout_path(folder: Path, name: str, layout: ImageLayout, migrated: bool = False) -> Path:
+    """
+    Gets the path of a file in a folder with a layout. In the sharded layout, a file that has not been migrated yet is
+    still found in the folder itself, unless the whole folder has been `migrated`, which saves checking where the file
+    is. A file that does not exist gets the path it should be written to.
+    """
+    if layout == "flat":
+        return folder / name
+    sharded_path = get_sharded_path(folder, name)
+    if migrated or sharded_path.exists():
+        return sharded_path
+    flat_path = folder / name
+    return flat_path if flat_path.exists() else sharded_path
+
+
+def is_migrated(folder: Path) -> bool:
+    """Checks if all the files of a folder are in the sharded layout, as marked by `mark_migrated()`."""
+    return (folder / MIGRATED_MARKER).is_file()
+
+
+def mark_migrated(folder: Path) -> None:
+    """Marks a folder as holding no files in the flat layout. Only the app's own writes may add files to it after."""
+    (folder / MIGRATED_MARKER).touch()
+
+
+def is_shard_folder(name: str) -> bool:
+    """Checks if a folder name is that of a shard."""
+    return len(name) == SHARD_WIDTH and all(c in string.hexdigits.lower() for c in name)
+
+
+def scan_layout(folder: Union[str, Path]) -> Iterator[os.DirEntry[str]]:
+    """
+    Scans the files in a folder, in both layouts, as a folder may have files in both while it is migrated. Folders other
+    than shards, and the migration marker, are skipped.
+    """
+    folders = [(str(folder), 0)]
+    while folders:
+        path, depth = folders.pop()
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    if entry.name != MIGRATED_MARKER:
+                        yield entry
+                elif depth < SHARD_DEPTH and is_shard_folder(entry.name) and entry.is_dir():
+                    folders.append((entry.path, depth + 1))
+
+
+def migrate_to_sharded_layout(folder: Path, name: str) -> bool:
+    """
+    Moves a file in the flat layout of a folder to its place in the sharded layout. Moves are atomic, so this is safe
+    while the folder is in use, and a migration that was stopped can be run again. Returns whether the file was moved.
+    """
+    flat_path = folder / name
+    sharded_path = get_sharded_path(folder, name)
+    if not flat_path.is_file():
+        return False
+    sharded_path.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(flat_path, sharded_path)
+    return True
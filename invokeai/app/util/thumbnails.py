@@ -1,16 +1,60 @@
 import os
+import threading
+from pathlib import Path
+from typing import Literal, Union, get_args
 
-from PIL import Image
+from PIL import Image, features
 
+# The size of the thumbnails made when images are saved
+DEFAULT_THUMBNAIL_SIZE = 256
 
-def get_thumbnail_name(image_name: str) -> str:
+ThumbnailSize = Literal[128, 256, 512]
+ThumbnailFormat = Literal["webp", "avif"]
+
+THUMBNAIL_SIZES: tuple[ThumbnailSize, ...] = get_args(ThumbnailSize)
+THUMBNAIL_FORMATS: tuple[ThumbnailFormat, ...] = get_args(ThumbnailFormat)
+
+
+def get_thumbnail_name(image_name: str, format: ThumbnailFormat = "webp") -> str:
     """Formats given an image name, returns the appropriate thumbnail image name"""
-    thumbnail_name = os.path.splitext(image_name)[0] + ".webp"
+    thumbnail_name = os.path.splitext(image_name)[0] + f".{format}"
     return thumbnail_name
 
 
+def get_thumbnail_subfolder(size: int, format: ThumbnailFormat) -> str:
+    """
+    Gets the subfolder of the thumbnails folder that holds thumbnails of a size and format. The default thumbnails are
+    in the thumbnails folder itself, where they have always been, and other sizes are in a subfolder named for the size.
+    """
+    return "" if size == DEFAULT_THUMBNAIL_SIZE and format == "webp" else str(size)
+
+
+def is_thumbnail_format_available(format: ThumbnailFormat) -> bool:
+    """Checks if PIL can write thumbnails in a format. WebP is always available, AVIF depends on the PIL build."""
+    return features.check(format)
+
+
 def make_thumbnail(image: Image.Image, size: int = 256) -> Image.Image:
     """Makes a thumbnail from a PIL Image"""
     thumbnail = image.copy()
     thumbnail.thumbnail(size=(size, size))
     return thumbnail
+
+
+def save_thumbnail(
+    image_path: Union[str, Path], thumbnail_path: Union[str, Path], size: int, format: ThumbnailFormat
+) -> None:
+    """
+    Makes a thumbnail from an image file and saves it. The thumbnail is written to a temporary file and then moved into
+    place, so a partially written thumbnail is never read, even if several processes make it at once.
+    """
+    thumbnail_path = Path(thumbnail_path)
+    with Image.open(image_path) as image:
+        image.thumbnail(size=(size, size))
+        thumbnail = image if format == "webp" or image.mode in ("RGB", "RGBA") else image.convert("RGBA")
+        temp_path = thumbnail_path.with_name(f".{thumbnail_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            thumbnail.save(temp_path, format.upper())
+            os.replace(temp_path, thumbnail_path)
+        finally:
+            temp_path.unlink(missing_ok=True)
@@ -13,6 +13,7 @@ from transformers import CLIPImageProcessor, CLIPVisionModelWithProjection
 from invokeai.backend.ip_adapter.ip_attention_weights import IPAttentionWeights
 from invokeai.backend.ip_adapter.resampler import Resampler
 from invokeai.backend.raw_model import RawModel
+from invokeai.backend.util.mmap_state_dict import load_state_dict_mmap
 
 
 class IPAdapterStateDict(TypedDict):
@@ -229,7 +230,7 @@ def load_ip_adapter_tensors(ip_adapter_ckpt_path: pathlib.Path, device: str) ->
                 raise RuntimeError(f"Encountered unexpected IP Adapter state dict key: '{key}'.")
     else:
         ip_adapter_diffusers_checkpoint_path = ip_adapter_ckpt_path / "ip_adapter.bin"
-        state_dict = torch.load(ip_adapter_diffusers_checkpoint_path, map_location="cpu")
+        state_dict = load_state_dict_mmap(ip_adapter_diffusers_checkpoint_path)
 
     return state_dict
 
@@ -7,7 +7,7 @@ from abc import ABC, abstractmethod
 from contextlib import contextmanager
 from logging import Logger
 from pathlib import Path
-from typing import Any, Dict, Generator, Optional, Tuple
+from typing import Any, Collection, Dict, Generator, Optional, Tuple
 
 import torch
 
@@ -116,6 +116,24 @@ class ModelLoaderBase(ABC):
         """
         pass
 
+    @abstractmethod
+    def prefetch_model(
+        self,
+        model_config: AnyModelConfig,
+        submodel_type: Optional[SubModelType] = None,
+        keep: Collection[str] = (),
+    ) -> bool:
+        """
+        Load a model into the RAM cache ahead of its use, if there is room for it without dropping locked models or the
+        models in `keep`. Returns whether the model is in the cache.
+
+        :param model_config: Model configuration, as returned by ModelConfigRecordStore
+        :param submodel_type: an ModelType enum indicating the portion of
+               the model to retrieve (e.g. ModelType.Vae)
+        :param keep: The cache keys of models that will be needed soon
+        """
+        pass
+
     @abstractmethod
     def get_size_fs(
         self, config: AnyModelConfig, model_path: Path, submodel_type: Optional[SubModelType] = None
@@ -3,7 +3,7 @@
 
 from logging import Logger
 from pathlib import Path
-from typing import Optional
+from typing import Collection, Optional
 
 from invokeai.app.services.config import InvokeAIAppConfig
 from invokeai.backend.model_manager.configs.base import Diffusers_Config_Base
@@ -57,6 +57,41 @@ class ModelLoader(ModelLoaderBase):
             cache_record = self._load_and_cache(model_config, submodel_type)
         return LoadedModel(config=model_config, cache_record=cache_record, cache=self._ram_cache)
 
+    def prefetch_model(
+        self,
+        model_config: AnyModelConfig,
+        submodel_type: Optional[SubModelType] = None,
+        keep: Collection[str] = (),
+    ) -> bool:
+        """
+        Load a model into the RAM cache ahead of its use, if there is room for it without dropping locked models or the
+        models in `keep`. Returns whether the model is in the cache.
+
+        :param model config: Configuration record for this model
+        :param submodel_type: an ModelType enum indicating the portion of
+               the model to retrieve (e.g. ModelType.Vae)
+        :param keep: The cache keys of models that will be needed soon
+        """
+        model_path = self._get_model_path(model_config)
+
+        if not model_path.exists():
+            raise FileNotFoundError(f"Files for model '{model_config.name}' not found at {model_path}")
+
+        cache_key = get_model_cache_key(model_config.key, submodel_type)
+        with self._ram_cache.loading(cache_key):
+            if self._ram_cache.contains(cache_key):
+                return True
+
+            model_config.path = str(model_path)
+            if not self._ram_cache.can_make_room(self.get_size_fs(model_config, model_path, submodel_type), keep):
+                return False
+
+            # This runs on a background thread, so torch's weight init is not skipped - `skip_torch_weight_init()`
+            # patches torch globally, which would affect modules created by invocations at the same time.
+            loaded_model = self._load_model(model_config, submodel_type)
+            self._ram_cache.put(cache_key, model=loaded_model, keep=keep, prefetched=True)
+        return True
+
     @property
     def ram_cache(self) -> ModelCache:
         """Return the ram cache associated with this loader."""
@@ -68,21 +103,22 @@ class ModelLoader(ModelLoaderBase):
 
     def _load_and_cache(self, config: AnyModelConfig, submodel_type: Optional[SubModelType] = None) -> CacheRecord:
         stats_name = ":".join([config.base, config.type, config.name, (submodel_type or "")])
+        cache_key = get_model_cache_key(config.key, submodel_type)
         try:
-            return self._ram_cache.get(key=get_model_cache_key(config.key, submodel_type), stats_name=stats_name)
+            return self._ram_cache.get(key=cache_key, stats_name=stats_name)
         except IndexError:
             pass
 
-        config.path = str(self._get_model_path(config))
-        self._ram_cache.make_room(self.get_size_fs(config, Path(config.path), submodel_type))
-        loaded_model = self._load_model(config, submodel_type)
+        # If the prefetcher is loading the model, this waits for it rather than loading the model again
+        with self._ram_cache.loading(cache_key):
+            if not self._ram_cache.contains(cache_key):
+                config.path = str(self._get_model_path(config))
+                self._ram_cache.make_room(self.get_size_fs(config, Path(config.path), submodel_type))
+                loaded_model = self._load_model(config, submodel_type)
 
-        self._ram_cache.put(
-            get_model_cache_key(config.key, submodel_type),
-            model=loaded_model,
-        )
+                self._ram_cache.put(cache_key, model=loaded_model)
 
-        return self._ram_cache.get(key=get_model_cache_key(config.key, submodel_type), stats_name=stats_name)
+        return self._ram_cache.get(key=cache_key, stats_name=stats_name)
 
     def get_size_fs(
         self, config: AnyModelConfig, model_path: Path, submodel_type: Optional[SubModelType] = None
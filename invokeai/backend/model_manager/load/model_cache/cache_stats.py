@@ -12,4 +12,6 @@ class CacheStats(object):
     in_cache: int = 0  # number of models in cache
     cleared: int = 0  # number of models cleared to make space
     cache_size: int = 0  # total size of cache
+    prefetched: int = 0  # number of models loaded ahead of their use by the prefetcher (only in prefetch stats)
+    prefetch_hits: int = 0  # number of cache hits on models loaded by the prefetcher
     loaded_model_sizes: Dict[str, int] = field(default_factory=dict)
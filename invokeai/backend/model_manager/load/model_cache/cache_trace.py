@@ -0,0 +1,152 @@
+"""Recording of model cache traces, and replaying them against eviction policies offline."""
+
+import json
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Literal, Optional, Union
+
+from invokeai.backend.model_manager.load.model_cache.eviction_policy import EvictionPolicy
+from invokeai.backend.model_manager.load.model_cache.model_cache import CacheEntrySnapshot, ModelCache
+
+CacheTraceEventType = Literal["hit", "miss", "evict"]
+
+
+@dataclass
+class CacheTraceEvent:
+    """An event in a model cache trace. The size is 0 for evictions."""
+
+    event: CacheTraceEventType
+    key: str
+    size: int = 0
+    time: float = field(default_factory=time.time)
+
+
+class CacheTraceRecorder:
+    """
+    Records the hits, misses and evictions of a model cache to a file, as JSON lines.
+
+    A miss is only recorded once the model has been loaded and retrieved from the cache, so that its size is known. The
+    retrieval right after a miss is not recorded as a hit.
+
+    The cache's callbacks run while it holds its lock, so they only queue the events. They are written to the file by a
+    background thread.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._pending_misses: set[str] = set()
+        self._known_keys: set[str] = set()
+        # None tells the writer thread to stop
+        self._queue: queue.Queue[Optional[CacheTraceEvent]] = queue.Queue()
+
+    def attach(self, cache: ModelCache) -> Callable[[], None]:
+        """Starts recording the events of a cache. Returns a function that stops recording, once the recorded events
+        are written."""
+        writer_thread = threading.Thread(target=self._write_events, name="CacheTraceWriter", daemon=True)
+        writer_thread.start()
+        unsubscribers = [
+            cache.on_cache_hit(self._on_cache_hit),
+            cache.on_cache_miss(self._on_cache_miss),
+            cache.on_cache_models_cleared(self._on_cache_models_cleared),
+        ]
+
+        def detach() -> None:
+            for unsubscribe in unsubscribers:
+                unsubscribe()
+            self._queue.put(None)
+            writer_thread.join()
+
+        return detach
+
+    def _on_cache_hit(self, model_key: str, cache_snapshot: dict[str, CacheEntrySnapshot]) -> None:
+        event: CacheTraceEventType = "miss" if model_key in self._pending_misses else "hit"
+        self._pending_misses.discard(model_key)
+        self._known_keys = set(cache_snapshot)
+        self._queue.put(CacheTraceEvent(event=event, key=model_key, size=cache_snapshot[model_key].total_bytes))
+
+    def _on_cache_miss(self, model_key: str, cache_snapshot: dict[str, CacheEntrySnapshot]) -> None:
+        self._pending_misses.add(model_key)
+        self._known_keys = set(cache_snapshot)
+
+    def _on_cache_models_cleared(
+        self, models_cleared: int, bytes_requested: int, bytes_freed: int, cache_snapshot: dict[str, CacheEntrySnapshot]
+    ) -> None:
+        # The cache reports how many models were dropped, not which, so they are the known models that are now missing
+        evicted = sorted(self._known_keys - set(cache_snapshot))
+        self._known_keys = set(cache_snapshot)
+        for key in evicted:
+            self._queue.put(CacheTraceEvent(event="evict", key=key))
+
+    def _write_events(self) -> None:
+        while True:
+            # Events that were queued together are written in one go
+            batch = [self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            events = [event for event in batch if event is not None]
+            if events:
+                # Events are rare, so the file is only opened to write them, and needs no closing
+                with open(self._path, "a") as f:
+                    for event in events:
+                        f.write(json.dumps(asdict(event)) + "\n")
+            if None in batch:
+                return
+
+
+def read_cache_trace(path: Union[str, Path]) -> Iterator[CacheTraceEvent]:
+    """Reads the events of a trace file written by CacheTraceRecorder."""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield CacheTraceEvent(**json.loads(line))
+
+
+@dataclass
+class CacheSimulationResult:
+    """The result of replaying a trace against a cache."""
+
+    cache_size: int
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    bytes_loaded: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+
+def simulate_cache(events: Iterable[CacheTraceEvent], policy: EvictionPolicy, cache_size: int) -> CacheSimulationResult:
+    """
+    Replays the requests in a trace against a simulated cache of the given size in bytes, with an eviction policy. The
+    hits and misses of the trace are its requests. Its evictions are ignored, as the simulated cache makes its own.
+
+    Models are not locked in the simulation, so any model but the one requested may be dropped to make room. A model
+    that is larger than the cache is still loaded, as it is by ModelCache.
+    """
+    result = CacheSimulationResult(cache_size=cache_size)
+    sizes: dict[str, int] = {}
+    for event in events:
+        if event.event == "evict":
+            continue
+        if event.key in sizes:
+            result.hits += 1
+            policy.on_use(event.key)
+            continue
+
+        result.misses += 1
+        result.bytes_loaded += event.size
+        bytes_to_free = sum(sizes.values()) + event.size - cache_size
+        for key in policy.get_eviction_order(sizes.keys()):
+            if bytes_to_free <= 0:
+                break
+            bytes_to_free -= sizes.pop(key)
+            policy.on_remove(key, evicted=True)
+            result.evictions += 1
+        sizes[event.key] = event.size
+        policy.on_add(event.key, event.size)
+    return result
@@ -0,0 +1,161 @@
+"""Policies that choose which models a model cache drops, or offloads, when it needs room."""
+
+from abc import ABC, abstractmethod
+from itertools import count
+from typing import Callable, Iterable
+
+GB = 2**30
+
+
+class EvictionPolicy(ABC):
+    """
+    Chooses the order in which a cache drops models to make room for another.
+
+    The cache tells the policy when each model is added, used and removed, and asks it for the order in which to drop
+    models. The cache skips models that it can't drop, e.g. because they are locked.
+    """
+
+    @abstractmethod
+    def on_add(self, key: str, size: int) -> None:
+        """Called when a model of the given size in bytes is added to the cache."""
+        pass
+
+    @abstractmethod
+    def on_use(self, key: str) -> None:
+        """Called when a model in the cache is used."""
+        pass
+
+    @abstractmethod
+    def on_remove(self, key: str, evicted: bool) -> None:
+        """Called when a model is removed from the cache. `evicted` is True if it was dropped to make room."""
+        pass
+
+    @abstractmethod
+    def get_eviction_order(self, keys: Iterable[str]) -> list[str]:
+        """Gets the keys of models in the cache in the order they should be dropped, first to last."""
+        pass
+
+
+class LRUEvictionPolicy(EvictionPolicy):
+    """Drops the least recently used model first."""
+
+    def __init__(self) -> None:
+        self._clock = count()
+        self._last_use: dict[str, int] = {}
+
+    def on_add(self, key: str, size: int) -> None:
+        self._last_use[key] = next(self._clock)
+
+    def on_use(self, key: str) -> None:
+        self._last_use[key] = next(self._clock)
+
+    def on_remove(self, key: str, evicted: bool) -> None:
+        self._last_use.pop(key, None)
+
+    def get_eviction_order(self, keys: Iterable[str]) -> list[str]:
+        return sorted(keys, key=lambda key: self._last_use.get(key, -1))
+
+
+class SmallestFirstEvictionPolicy(EvictionPolicy):
+    """Drops the smallest model first."""
+
+    def __init__(self) -> None:
+        self._sizes: dict[str, int] = {}
+
+    def on_add(self, key: str, size: int) -> None:
+        self._sizes[key] = size
+
+    def on_use(self, key: str) -> None:
+        pass
+
+    def on_remove(self, key: str, evicted: bool) -> None:
+        self._sizes.pop(key, None)
+
+    def get_eviction_order(self, keys: Iterable[str]) -> list[str]:
+        return sorted(keys, key=lambda key: self._sizes.get(key, 0))
+
+
+class GreedyDualSizeFrequencyEvictionPolicy(EvictionPolicy):
+    """
+    GreedyDual-Size-Frequency (GDSF). Each model has a priority of `L + frequency * cost / size`, and the model with the
+    lowest priority is dropped first. `L` starts at 0 and is raised to the priority of each model that is dropped, so
+    models that were used often a long time ago eventually age out.
+
+    The cost of every model is 1 here, which keeps small, frequently used models, like text encoders, over large models
+    that are rarely used. Subclasses may weigh models by another cost.
+
+    Use counts are kept for models that are dropped, so a model that is used often keeps its priority when it is
+    loaded again.
+    """
+
+    def __init__(self) -> None:
+        self._inflation = 0.0
+        self._sizes: dict[str, int] = {}
+        self._frequencies: dict[str, int] = {}
+        self._priorities: dict[str, float] = {}
+
+    def get_cost(self, size: int) -> float:
+        """Gets the cost of loading a model of the given size in bytes."""
+        return 1.0
+
+    def on_add(self, key: str, size: int) -> None:
+        self._sizes[key] = size
+        self._frequencies[key] = self._frequencies.get(key, 0) + 1
+        self._update_priority(key)
+
+    def on_use(self, key: str) -> None:
+        if key not in self._sizes:
+            return
+        self._frequencies[key] += 1
+        self._update_priority(key)
+
+    def on_remove(self, key: str, evicted: bool) -> None:
+        priority = self._priorities.pop(key, None)
+        if evicted and priority is not None:
+            self._inflation = max(self._inflation, priority)
+        self._sizes.pop(key, None)
+
+    def get_eviction_order(self, keys: Iterable[str]) -> list[str]:
+        return sorted(keys, key=lambda key: self._priorities.get(key, 0.0))
+
+    def _update_priority(self, key: str) -> None:
+        size = max(self._sizes[key], 1)
+        self._priorities[key] = self._inflation + self._frequencies[key] * self.get_cost(size) / size
+
+
+class ReloadCostEvictionPolicy(GreedyDualSizeFrequencyEvictionPolicy):
+    """
+    GDSF, with the cost of a model being the time it takes to load it again: a fixed overhead to build the model, plus
+    its size divided by the disk bandwidth. Compared to plain GDSF, large models are dropped less eagerly, by how much
+    depending on how fast the disk is.
+    """
+
+    def __init__(self, disk_bandwidth_gb: float = 1.0, load_overhead_seconds: float = 0.5) -> None:
+        """
+        Args:
+            disk_bandwidth_gb: The speed at which models are read from disk, in GB per second.
+            load_overhead_seconds: The time it takes to load a model, besides reading it.
+        """
+        super().__init__()
+        self._disk_bandwidth = disk_bandwidth_gb * GB
+        self._load_overhead_seconds = load_overhead_seconds
+
+    def get_cost(self, size: int) -> float:
+        return self._load_overhead_seconds + size / self._disk_bandwidth
+
+
+# The policies that can be selected in the app config, by name
+EVICTION_POLICIES: dict[str, Callable[[], EvictionPolicy]] = {
+    "lru": LRUEvictionPolicy,
+    "smallest_first": SmallestFirstEvictionPolicy,
+    "gdsf": GreedyDualSizeFrequencyEvictionPolicy,
+    "reload_cost": ReloadCostEvictionPolicy,
+}
+
+
+def build_eviction_policy(name: str) -> EvictionPolicy:
+    """Builds an eviction policy by name."""
+    try:
+        return EVICTION_POLICIES[name]()
+    except KeyError as e:
+        raise ValueError(f"Unknown eviction policy '{name}', expected one of {list(EVICTION_POLICIES)}") from e
@@ -2,10 +2,11 @@ import gc
 import logging
 import threading
 import time
+from contextlib import contextmanager
 from dataclasses import dataclass
 from functools import wraps
 from logging import Logger
-from typing import Any, Callable, Dict, List, Optional, Protocol
+from typing import Any, Callable, Collection, Dict, Iterator, Optional, Protocol
 
 import psutil
 import torch
@@ -19,6 +20,11 @@ from invokeai.backend.model_manager.load.model_cache.cached_model.cached_model_o
 from invokeai.backend.model_manager.load.model_cache.cached_model.cached_model_with_partial_load import (
     CachedModelWithPartialLoad,
 )
+from invokeai.backend.model_manager.load.model_cache.eviction_policy import (
+    EvictionPolicy,
+    LRUEvictionPolicy,
+    SmallestFirstEvictionPolicy,
+)
 from invokeai.backend.model_manager.load.model_cache.torch_module_autocast.torch_module_autocast import (
     apply_custom_layers_to_model,
 )
@@ -62,6 +68,14 @@ class CacheEntrySnapshot:
     current_vram_bytes: int
 
 
+@dataclass
+class _LoadingLock:
+    """The lock held while a model is loaded, and the number of threads that hold it or wait for it."""
+
+    lock: threading.Lock
+    users: int = 0
+
+
 class CacheMissCallback(Protocol):
     def __call__(
         self,
@@ -103,12 +117,13 @@ class ModelCache:
     the execution_device.
 
     Models are moved between the storage_device and the execution_device as necessary. Cache size limits are enforced
-    on both the storage_device and the execution_device. The execution_device cache uses a smallest-first offload
-    policy. The storage_device cache uses a least-recently-used (LRU) offload policy.
+    on both the storage_device and the execution_device. The policies that choose which models are dropped from the
+    storage_device and offloaded from the execution_device are pluggable (see `eviction_policy.py`). By default, the
+    execution_device cache uses a smallest-first offload policy, and the storage_device cache uses a
+    least-recently-used (LRU) policy.
 
-    Note: Neither of these offload policies has really been compared against alternatives. It's likely that different
-    policies would be better, although the optimal policies are likely heavily dependent on usage patterns and HW
-    configuration.
+    The optimal policies are likely heavily dependent on usage patterns and HW configuration. To compare them for a
+    workload, record a trace of the cache with `CacheTraceRecorder` and replay it with `simulate_cache()`.
 
     The cache returns context manager generators designed to load the model into the execution device (often GPU) within
     the context, and unload outside the context.
@@ -132,6 +147,8 @@ class ModelCache:
         storage_device: torch.device | str = "cpu",
         log_memory_usage: bool = False,
         logger: Optional[Logger] = None,
+        ram_eviction_policy: Optional[EvictionPolicy] = None,
+        vram_offload_policy: Optional[EvictionPolicy] = None,
     ):
         """Initialize the model RAM cache.
 
@@ -151,6 +168,10 @@ class ModelCache:
             snapshots, so it is recommended to disable this feature unless you are actively inspecting the model cache's
             behaviour.
         :param logger: InvokeAILogger to use (otherwise creates one)
+        :param ram_eviction_policy: The policy that chooses which models are dropped from RAM to make room (LRU if
+            unset).
+        :param vram_offload_policy: The policy that chooses which models are offloaded from VRAM to make room
+            (smallest-first if unset).
         """
         self._enable_partial_loading = enable_partial_loading
         self._keep_ram_copy_of_weights = keep_ram_copy_of_weights
@@ -166,9 +187,17 @@ class ModelCache:
         )
         self._log_memory_usage = log_memory_usage
         self._stats: Optional[CacheStats] = None
+        # Models loaded by the prefetcher are counted here rather than in the stats of the session that is running
+        self._prefetch_stats = CacheStats()
 
         self._cached_models: Dict[str, CacheRecord] = {}
-        self._cache_stack: List[str] = []
+        self._ram_eviction_policy = ram_eviction_policy or LRUEvictionPolicy()
+        self._vram_offload_policy = vram_offload_policy or SmallestFirstEvictionPolicy()
+        # The keys of models that were added by the prefetcher and have not been used yet
+        self._prefetched_keys: set[str] = set()
+        # Locks held while a model is loaded, so a model that two threads need at once is only loaded once. A lock is
+        # dropped once no thread holds it or waits for it.
+        self._loading_locks: dict[str, _LoadingLock] = {}
 
         self._ram_cache_size_bytes = self._calc_ram_available_to_model_cache()
 
@@ -218,9 +247,22 @@ class ModelCache:
         """Set the CacheStats object for collecting cache statistics."""
         self._stats = stats
 
+    @property
+    @synchronized
+    def prefetch_stats(self) -> CacheStats:
+        """Return the CacheStats of the models loaded by the prefetcher, and the models dropped to make room for them.
+        Hits on prefetched models are counted in `stats`, as they are hits of the session that uses them."""
+        return self._prefetch_stats
+
     @synchronized
-    def put(self, key: str, model: AnyModel) -> None:
-        """Add a model to the cache."""
+    def put(self, key: str, model: AnyModel, keep: Collection[str] = (), prefetched: bool = False) -> None:
+        """Add a model to the cache.
+
+        :param key: Model key
+        :param model: The model
+        :param keep: The keys of models that must not be dropped to make room for this one, as well as locked models.
+        :param prefetched: Whether the model was loaded ahead of its use by the prefetcher.
+        """
         if key in self._cached_models:
             self._logger.debug(
                 f"Attempted to add model {key} ({model.__class__.__name__}), but it already exists in the cache. No action necessary."
@@ -228,7 +270,7 @@ class ModelCache:
             return
 
         size = calc_model_size_by_data(self._logger, model)
-        self.make_room(size)
+        self.make_room(size, keep=keep, prefetched=prefetched)
 
         # Inject custom modules into the model.
         if isinstance(model, torch.nn.Module):
@@ -252,7 +294,12 @@ class ModelCache:
 
         cache_record = CacheRecord(key=key, cached_model=wrapped_model)
         self._cached_models[key] = cache_record
-        self._cache_stack.append(key)
+        for policy in (self._ram_eviction_policy, self._vram_offload_policy):
+            policy.on_add(key, size)
+        if prefetched:
+            self._prefetched_keys.add(key)
+            self._prefetch_stats.prefetched += 1
+            self._prefetch_stats.in_cache = len(self._cached_models)
         self._logger.debug(
             f"Added model {key} (Type: {model.__class__.__name__}, Wrap mode: {wrapped_model.__class__.__name__}, Model size: {size / MB:.2f}MB)"
         )
@@ -293,6 +340,11 @@ class ModelCache:
 
         cache_entry = self._cached_models[key]
 
+        if key in self._prefetched_keys:
+            self._prefetched_keys.discard(key)
+            if self.stats:
+                self.stats.prefetch_hits += 1
+
         # more stats
         if self.stats:
             stats_name = stats_name or key
@@ -302,15 +354,40 @@ class ModelCache:
                 self.stats.loaded_model_sizes.get(stats_name, 0), cache_entry.cached_model.total_bytes()
             )
 
-        # This moves the entry to the top (right end) of the stack.
-        self._cache_stack = [k for k in self._cache_stack if k != key]
-        self._cache_stack.append(key)
+        for policy in (self._ram_eviction_policy, self._vram_offload_policy):
+            policy.on_use(key)
 
         self._logger.debug(f"Cache hit: {key} (Type: {cache_entry.cached_model.model.__class__.__name__})")
         for cb in self._on_cache_hit_callbacks:
             cb(model_key=key, cache_snapshot=self._get_cache_snapshot())
         return cache_entry
 
+    @synchronized
+    def contains(self, key: str) -> bool:
+        """Check if a model is in the cache. Unlike `get()`, this does not count as a use of the model."""
+        return key in self._cached_models
+
+    @contextmanager
+    def loading(self, key: str) -> Iterator[None]:
+        """Hold the lock for loading a model, while it is loaded and added to the cache.
+
+        A model that is needed by two threads at once, e.g. by the prefetcher and an invocation, is only loaded once.
+        The thread that waits for the lock must check if the model was added to the cache while it waited.
+        """
+        with self._lock:
+            loading_lock = self._loading_locks.get(key)
+            if loading_lock is None:
+                loading_lock = self._loading_locks[key] = _LoadingLock(lock=threading.Lock())
+            loading_lock.users += 1
+        try:
+            with loading_lock.lock:
+                yield
+        finally:
+            with self._lock:
+                loading_lock.users -= 1
+                if loading_lock.users == 0:
+                    del self._loading_locks[key]
+
     @synchronized
     def lock(self, cache_entry: CacheRecord, working_mem_bytes: Optional[int]) -> None:
         """Lock a model for use and move it into VRAM."""
@@ -594,9 +671,8 @@ class ModelCache:
             f"Offloading unlocked models with goal of making room for {vram_bytes_required / MB:.2f}MB of VRAM."
         )
         vram_bytes_freed = 0
-        # TODO(ryand): Give more thought to the offloading policy used here.
-        cache_entries_increasing_size = sorted(self._cached_models.values(), key=lambda x: x.cached_model.total_bytes())
-        for cache_entry in cache_entries_increasing_size:
+        offload_order = self._vram_offload_policy.get_eviction_order(self._cached_models.keys())
+        for cache_entry in [self._cached_models[key] for key in offload_order]:
             # We do not fully trust the count of bytes freed, so we check again on each iteration.
             vram_available = self._get_vram_available(working_mem_bytes)
             vram_bytes_to_free = vram_bytes_required - vram_available
@@ -684,9 +760,22 @@ class ModelCache:
         self._logger.debug(log)
 
     @synchronized
-    def make_room(self, bytes_needed: int) -> None:
+    def can_make_room(self, bytes_needed: int, keep: Collection[str] = ()) -> bool:
+        """Check if a model of the indicated size fits in the cache without dropping locked models or those in `keep`."""
+        ram_bytes_droppable = sum(
+            cache_entry.cached_model.total_bytes()
+            for key, cache_entry in self._cached_models.items()
+            if not cache_entry.is_locked and key not in keep
+        )
+        return bytes_needed <= self._get_ram_available() + ram_bytes_droppable
+
+    @synchronized
+    def make_room(self, bytes_needed: int, keep: Collection[str] = (), prefetched: bool = False) -> None:
         """Make enough room in the cache to accommodate a new model of indicated size.
 
+        Locked models and those in `keep` are not dropped. If the room is `prefetched`, i.e. made for a model loaded by
+        the prefetcher, the dropped models are counted in `prefetch_stats`.
+
         Note: This function deletes all of the cache's internal references to a model in order to free it. If there are
         external references to the model, there's nothing that the cache can do about it, and those models will not be
         garbage-collected.
@@ -698,22 +787,20 @@ class ModelCache:
         ram_bytes_to_free = max(0, bytes_needed - ram_bytes_available)
 
         ram_bytes_freed = 0
-        pos = 0
         models_cleared = 0
-        while ram_bytes_freed < ram_bytes_to_free and pos < len(self._cache_stack):
-            model_key = self._cache_stack[pos]
+        for model_key in self._ram_eviction_policy.get_eviction_order(self._cached_models.keys()):
+            if ram_bytes_freed >= ram_bytes_to_free:
+                break
             cache_entry = self._cached_models[model_key]
 
-            if not cache_entry.is_locked:
+            if not cache_entry.is_locked and model_key not in keep:
                 ram_bytes_freed += cache_entry.cached_model.total_bytes()
                 self._logger.debug(
                     f"Dropping {model_key} from RAM cache to free {(cache_entry.cached_model.total_bytes() / MB):.2f}MB."
                 )
-                self._delete_cache_entry(cache_entry)
+                self._delete_cache_entry(cache_entry, evicted=True)
                 del cache_entry
                 models_cleared += 1
-            else:
-                pos += 1
 
         if models_cleared > 0:
             # There would likely be some 'garbage' to be collected regardless of whether a model was cleared or not, but
@@ -727,7 +814,9 @@ class ModelCache:
             #
             # Keep in mind that gc is only responsible for handling reference cycles. Most objects should be cleaned up
             # immediately when their reference count hits 0.
-            if self.stats:
+            if prefetched:
+                self._prefetch_stats.cleared += models_cleared
+            elif self.stats:
                 self.stats.cleared = models_cleared
             for cb in self._on_cache_models_cleared_callbacks:
                 cb(
@@ -742,7 +831,12 @@ class ModelCache:
         self._logger.debug(f"Dropped {models_cleared} models to free {ram_bytes_freed / MB:.2f}MB of RAM.")
         self._log_cache_state(title="After dropping models:")
 
-    def _delete_cache_entry(self, cache_entry: CacheRecord) -> None:
-        """Delete cache_entry from the cache if it exists. No exception is thrown if it doesn't exist."""
-        self._cache_stack = [key for key in self._cache_stack if key != cache_entry.key]
-        self._cached_models.pop(cache_entry.key, None)
+    def _delete_cache_entry(self, cache_entry: CacheRecord, evicted: bool = False) -> None:
+        """Delete cache_entry from the cache if it exists. No exception is thrown if it doesn't exist.
+
+        :param evicted: Whether the entry is deleted to make room for other models.
+        """
+        if self._cached_models.pop(cache_entry.key, None) is not None:
+            for policy in (self._ram_eviction_policy, self._vram_offload_policy):
+                policy.on_remove(cache_entry.key, evicted)
+        self._prefetched_keys.discard(cache_entry.key)
@@ -5,9 +5,6 @@ from logging import Logger
 from pathlib import Path
 from typing import Optional
 
-import torch
-from safetensors.torch import load_file
-
 from invokeai.app.services.config import InvokeAIAppConfig
 from invokeai.backend.model_manager.configs.factory import AnyModelConfig
 from invokeai.backend.model_manager.load.load_default import ModelLoader
@@ -43,6 +40,7 @@ from invokeai.backend.patches.lora_conversions.flux_onetrainer_lora_conversion_u
 )
 from invokeai.backend.patches.lora_conversions.sd_lora_conversion_utils import lora_model_from_sd_state_dict
 from invokeai.backend.patches.lora_conversions.sdxl_lora_conversion_utils import convert_sdxl_keys_to_diffusers_format
+from invokeai.backend.util.mmap_state_dict import load_state_dict_mmap
 
 
 @ModelLoaderRegistry.register(base=BaseModelType.Flux, type=ModelType.LoRA, format=ModelFormat.OMI)
@@ -75,11 +73,8 @@ class LoRALoader(ModelLoader):
         model_path = Path(config.path)
         assert self._model_base is not None
 
-        # Load the state dict from the model file.
-        if model_path.suffix == ".safetensors":
-            state_dict = load_file(model_path.absolute().as_posix(), device="cpu")
-        else:
-            state_dict = torch.load(model_path, map_location="cpu")
+        # Load the state dict from the model file. Its tensors are mapped from the file until they are converted.
+        state_dict = load_state_dict_mmap(model_path)
 
         # Strip 'bundle_emb' keys - these are unused and currently cause downstream errors.
         # To revisit later to determine if they're needed/useful.
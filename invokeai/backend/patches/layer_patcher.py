@@ -1,14 +1,23 @@
 import re
 from contextlib import contextmanager
-from typing import Dict, Iterable, Optional, Tuple
+from typing import Any, Dict, Iterable, Optional, Tuple
 
 import torch
 
 from invokeai.backend.patches.layers.base_layer_patch import BaseLayerPatch
 from invokeai.backend.patches.layers.flux_control_lora_layer import FluxControlLoRALayer
+from invokeai.backend.patches.lora_patch_cache import (
+    LoRAPatchCache,
+    LoRAPatchCacheKey,
+    ResidentPatches,
+    get_resident_patches,
+    pop_resident_patches,
+    set_resident_patches,
+)
 from invokeai.backend.patches.model_patch_raw import ModelPatchRaw
 from invokeai.backend.patches.pad_with_zeros import pad_with_zeros
 from invokeai.backend.util import InvokeAILogger
+from invokeai.backend.util.calc_tensor_size import calc_tensors_size
 from invokeai.backend.util.devices import TorchDevice
 from invokeai.backend.util.original_weights_storage import OriginalWeightsStorage
 
@@ -26,10 +35,38 @@ class LayerPatcher:
         force_direct_patching: bool = False,
         force_sidecar_patching: bool = False,
         suppress_warning_layers: Optional[re.Pattern] = None,
+        patch_cache: Optional[LoRAPatchCache] = None,
+        patch_cache_key: Optional[LoRAPatchCacheKey] = None,
     ):
         """Apply 'smart' model patching that chooses whether to use direct patching or a sidecar wrapper for each
         module.
+
+        If a `patch_cache` is given, with the `patch_cache_key` that identifies the patches, directly patched layers are
+        left patched on exit, and are reused as they are if the model is patched with the same key next. See
+        LoRAPatchCache.
         """
+        resident = get_resident_patches(model)
+        if resident is not None and resident.in_use:
+            # The model is in use with patches that are left applied, by an enclosing patcher, so it is patched on top
+            # of them as usual.
+            pass
+        elif patch_cache is not None and patch_cache_key is not None and not force_sidecar_patching:
+            with LayerPatcher._apply_cached_model_patches(
+                model=model,
+                patches=patches,
+                prefix=prefix,
+                dtype=dtype,
+                cached_weights=cached_weights,
+                force_direct_patching=force_direct_patching,
+                suppress_warning_layers=suppress_warning_layers,
+                patch_cache=patch_cache,
+                patch_cache_key=patch_cache_key,
+            ):
+                yield
+            return
+        else:
+            # Patches left applied by a previous patcher would be taken for the original weights
+            LayerPatcher.remove_resident_patches(model)
 
         # original_weights are stored for unpatching layers that are directly patched.
         original_weights = OriginalWeightsStorage(cached_weights)
@@ -53,15 +90,193 @@ class LayerPatcher:
             yield
         finally:
             # Restore directly patched layers.
-            for param_key, weight in original_weights.get_changed_weights():
-                cur_param = model.get_parameter(param_key)
-                cur_param.data = weight.to(dtype=cur_param.dtype, device=cur_param.device, copy=True)
+            LayerPatcher._restore_original_weights(model, original_weights)
 
             # Clear patches from all patched modules.
             # Note: This logic assumes no nested modules in original_modules.
             for orig_module in original_modules.values():
                 orig_module.clear_patches()
 
+    @staticmethod
+    @torch.no_grad()
+    @contextmanager
+    def _apply_cached_model_patches(
+        model: torch.nn.Module,
+        patches: Iterable[Tuple[ModelPatchRaw, float]],
+        prefix: str,
+        dtype: torch.dtype,
+        cached_weights: Optional[Dict[str, torch.Tensor]],
+        force_direct_patching: bool,
+        suppress_warning_layers: Optional[re.Pattern],
+        patch_cache: LoRAPatchCache,
+        patch_cache_key: LoRAPatchCacheKey,
+    ):
+        """Apply model patches, reusing the patches left applied to the model or the patched weights in the cache."""
+        resident = get_resident_patches(model)
+        if resident is not None:
+            if resident.key == patch_cache_key and resident.is_intact(model):
+                # The model is still patched with these patches, so there is nothing to do. The patches are not even
+                # loaded.
+                resident.in_use = True
+                try:
+                    yield
+                finally:
+                    resident.in_use = False
+                return
+            LayerPatcher.remove_resident_patches(model)
+
+        original_weights = OriginalWeightsStorage(cached_weights)
+        original_modules: dict[str, torch.nn.Module] = {}
+        keep_resident = False
+        try:
+            patched_weights = patch_cache.get_patched_weights(patch_cache_key)
+            if patched_weights is not None and LayerPatcher._can_copy_patched_weights(
+                model, patched_weights, force_direct_patching
+            ):
+                LayerPatcher._copy_patched_weights(model, patched_weights, original_weights)
+            else:
+                for patch, patch_weight in patches:
+                    LayerPatcher.apply_smart_model_patch(
+                        model=model,
+                        prefix=prefix,
+                        patch=patch,
+                        patch_weight=patch_weight,
+                        original_weights=original_weights,
+                        original_modules=original_modules,
+                        dtype=dtype,
+                        force_direct_patching=force_direct_patching,
+                        force_sidecar_patching=False,
+                        suppress_warning_layers=suppress_warning_layers,
+                    )
+                if len(original_modules) == 0:
+                    LayerPatcher._save_patched_weights(model, original_weights, patch_cache, patch_cache_key)
+
+            # Sidecar patches are cheap to apply, and keep the LoRA layers on the device, so the patches are only left
+            # applied if all the layers were patched directly. They are also only left applied if the original weights
+            # are in the model cache's RAM copy, so that no copies of them are held outside the cache's budget.
+            keep_resident = len(original_modules) == 0 and LayerPatcher._are_original_weights_cached(
+                original_weights, cached_weights
+            )
+            yield
+        except BaseException:
+            keep_resident = False
+            raise
+        finally:
+            if keep_resident:
+                LayerPatcher._leave_patches_resident(model, patch_cache_key, original_weights)
+            else:
+                LayerPatcher._restore_original_weights(model, original_weights)
+                for orig_module in original_modules.values():
+                    orig_module.clear_patches()
+
+    @staticmethod
+    @torch.no_grad()
+    def remove_resident_patches(model: torch.nn.Module) -> None:
+        """Restore the original weights of a model whose patches were left applied by a previous patcher."""
+        resident = pop_resident_patches(model)
+        if resident is None:
+            return
+        if resident.hook_handle is not None:
+            resident.hook_handle.remove()
+        for param_key, weight in resident.original_weights.get_changed_weights():
+            if model.get_parameter(param_key).data_ptr() == weight.data_ptr():
+                # The model cache already reset the parameter to its RAM copy, e.g. when it offloaded the model. It
+                # must keep sharing the RAM copy's memory.
+                continue
+            # Otherwise the parameter may hold the patched weights, even if it was moved to another device since.
+            LayerPatcher._restore_original_weight(model, param_key, weight)
+
+    @staticmethod
+    def _restore_original_weights(model: torch.nn.Module, original_weights: OriginalWeightsStorage) -> None:
+        for param_key, weight in original_weights.get_changed_weights():
+            LayerPatcher._restore_original_weight(model, param_key, weight)
+
+    @staticmethod
+    def _restore_original_weight(model: torch.nn.Module, param_key: str, weight: torch.Tensor) -> None:
+        cur_param = model.get_parameter(param_key)
+        cur_param.data = weight.to(dtype=cur_param.dtype, device=cur_param.device, copy=True)
+
+    @staticmethod
+    def _leave_patches_resident(
+        model: torch.nn.Module, patch_cache_key: LoRAPatchCacheKey, original_weights: OriginalWeightsStorage
+    ) -> None:
+        params: dict[str, tuple[torch.nn.Parameter, int, int]] = {}
+        for param_key, _ in original_weights.get_changed_weights():
+            param = model.get_parameter(param_key)
+            params[param_key] = (param, param.data_ptr(), param._version)
+        if len(params) == 0:
+            return
+        resident = ResidentPatches(key=patch_cache_key, original_weights=original_weights, params=params)
+
+        def remove_unless_in_use(module: torch.nn.Module, args: Any) -> None:
+            # The model is run without the patches, so they must be removed first
+            if not resident.in_use:
+                LayerPatcher.remove_resident_patches(module)
+
+        resident.hook_handle = model.register_forward_pre_hook(remove_unless_in_use)
+        set_resident_patches(model, resident)
+
+    @staticmethod
+    def _are_original_weights_cached(
+        original_weights: OriginalWeightsStorage, cached_weights: Optional[Dict[str, torch.Tensor]]
+    ) -> bool:
+        """Whether the original weights of all the patched parameters are in the model cache's RAM copy, rather than
+        copies made by the patcher."""
+        if cached_weights is None:
+            return False
+        return all(param_key in cached_weights for param_key, _ in original_weights.get_changed_weights())
+
+    @staticmethod
+    def _can_copy_patched_weights(
+        model: torch.nn.Module, patched_weights: Dict[str, torch.Tensor], force_direct_patching: bool
+    ) -> bool:
+        """Whether the patched weights can be copied into the model. Like apply_smart_model_patch(), layers that are on
+        the CPU are not patched directly, unless forced.
+        """
+        for param_key in patched_weights:
+            try:
+                param = model.get_parameter(param_key)
+            except AttributeError:
+                return False
+            if param.device.type == "cpu" and not force_direct_patching:
+                return False
+        return True
+
+    @staticmethod
+    @torch.no_grad()
+    def _copy_patched_weights(
+        model: torch.nn.Module, patched_weights: Dict[str, torch.Tensor], original_weights: OriginalWeightsStorage
+    ) -> None:
+        for param_key, weight in patched_weights.items():
+            module_key, param_name = LayerPatcher._split_parent_key(param_key)
+            module = model.get_submodule(module_key)
+            param = module.get_parameter(param_name)
+            original_weights.save(param_key, param)
+            if param.shape != weight.shape:
+                # FLUX control LoRAs change the shape of the layers they patch.
+                weight = weight.to(device=param.device, copy=True)
+                setattr(module, param_name, torch.nn.Parameter(weight, requires_grad=param.requires_grad))
+            else:
+                param.copy_(weight)
+
+    @staticmethod
+    def _save_patched_weights(
+        model: torch.nn.Module,
+        original_weights: OriginalWeightsStorage,
+        patch_cache: LoRAPatchCache,
+        patch_cache_key: LoRAPatchCacheKey,
+    ) -> None:
+        params = {param_key: model.get_parameter(param_key) for param_key, _ in original_weights.get_changed_weights()}
+        if len(params) == 0 or calc_tensors_size(list(params.values())) > patch_cache.max_bytes:
+            return
+        patch_cache.put_patched_weights(
+            patch_cache_key,
+            {
+                param_key: param.detach().to(device=TorchDevice.CPU_DEVICE, copy=True)
+                for param_key, param in params.items()
+            },
+        )
+
     @staticmethod
     @torch.no_grad()
     def apply_smart_model_patch(
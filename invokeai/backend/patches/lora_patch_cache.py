@@ -0,0 +1,147 @@
+"""A cache of LoRA-patched weights, so that a model can be patched with the same LoRAs again without recomputing them."""
+
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
+import torch
+from torch.utils.hooks import RemovableHandle
+
+from invokeai.backend.util.calc_tensor_size import calc_tensors_size
+from invokeai.backend.util.original_weights_storage import OriginalWeightsStorage
+
+# The patches left applied to each model. They are kept here rather than in a LoRAPatchCache, so that any patcher can
+# find and remove them, even if it is not given the cache.
+_resident_patches: weakref.WeakKeyDictionary[torch.nn.Module, "ResidentPatches"] = weakref.WeakKeyDictionary()
+_resident_patches_lock = threading.Lock()
+
+# The model key, the prefix of the patched layers, the LoRA keys and weights in the order they are applied, and dtype
+LoRAPatchCacheKey = tuple[str, str, tuple[tuple[str, float], ...], str]
+
+
+def make_lora_patch_cache_key(
+    model_key: str, prefix: str, loras: Sequence[tuple[str, float]], dtype: torch.dtype
+) -> LoRAPatchCacheKey:
+    """Makes the key of a stack of LoRAs applied to a model.
+
+    Args:
+        model_key: The cache key of the patched model, e.g. `<key>:unet`.
+        prefix: The prefix of the layers that are patched.
+        loras: The keys and weights of the LoRAs, in the order they are applied.
+        dtype: The dtype the patches are applied in.
+    """
+    return (model_key, prefix, tuple((key, float(weight)) for key, weight in loras), str(dtype))
+
+
+@dataclass
+class ResidentPatches:
+    """The patches that are left applied to a model after use, and what is needed to remove them."""
+
+    key: LoRAPatchCacheKey
+    original_weights: OriginalWeightsStorage
+    # The patched parameters, with their data pointer and version at the time they were patched. If any differ, the
+    # parameter has been replaced or changed since, e.g. by the model cache moving the model between devices.
+    params: dict[str, tuple[torch.nn.Parameter, int, int]]
+    # Whether the patches are in use, by a patcher that requested the same LoRAs
+    in_use: bool = False
+    hook_handle: Optional[RemovableHandle] = field(default=None, repr=False)
+
+    def is_intact(self, model: torch.nn.Module) -> bool:
+        """Whether all the patched parameters are still as they were left."""
+        return all(self.is_param_intact(model, param_key) for param_key in self.params)
+
+    def is_param_intact(self, model: torch.nn.Module, param_key: str) -> bool:
+        """Whether a patched parameter is still as it was left."""
+        param, data_ptr, version = self.params[param_key]
+        try:
+            current = model.get_parameter(param_key)
+        except AttributeError:
+            return False
+        return current is param and current.data_ptr() == data_ptr and current._version == version
+
+
+class LoRAPatchCache:
+    """
+    Keeps LoRA patches applied to models between uses, and the patched weights of recent LoRA stacks in RAM.
+
+    When a model is used with a stack of LoRAs, the patches are left applied afterwards. If the model is used with the
+    same stack again, as is common in a queue of similar sessions, patching and unpatching are skipped entirely, and
+    the LoRAs aren't even loaded. If it is used with another stack, or without the patcher, the original weights are
+    restored first. Patches are only left applied if the model cache keeps a RAM copy of the model's weights, which
+    holds the original weights, and resets the weights to it when the model is offloaded.
+
+    The patched weights of each stack are also kept in a byte-bounded RAM store, so that switching back to a recently
+    used stack copies its weights instead of recomputing every layer's patch. The patched weights are stored, rather
+    than the deltas, so that reapplying them is an exact copy of the first application.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Args:
+            max_bytes: The maximum size of the patched weights kept in RAM. Pass 0 to keep none in RAM. Patches are still
+                left applied to models between uses.
+        """
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._patched_weights: OrderedDict[LoRAPatchCacheKey, tuple[dict[str, torch.Tensor], int]] = OrderedDict()
+        self._cur_bytes = 0
+
+    @property
+    def max_bytes(self) -> int:
+        """The maximum size of the patched weights kept in RAM."""
+        return self._max_bytes
+
+    @property
+    def cur_bytes(self) -> int:
+        """The size of the patched weights kept in RAM."""
+        return self._cur_bytes
+
+    def get_patched_weights(self, key: LoRAPatchCacheKey) -> Optional[dict[str, torch.Tensor]]:
+        """Gets the patched weights of a LoRA stack, by parameter key, if they are in RAM."""
+        with self._lock:
+            entry = self._patched_weights.get(key)
+            if entry is None:
+                return None
+            self._patched_weights.move_to_end(key)
+            return entry[0]
+
+    def put_patched_weights(self, key: LoRAPatchCacheKey, weights: dict[str, torch.Tensor]) -> bool:
+        """Keeps the patched weights of a LoRA stack in RAM, dropping the least recently used stacks to make room.
+        Returns False if the weights are larger than the store.
+        """
+        size = calc_tensors_size(list(weights.values()))
+        with self._lock:
+            if key in self._patched_weights:
+                self._cur_bytes -= self._patched_weights.pop(key)[1]
+            if size > self._max_bytes:
+                return False
+            while self._cur_bytes + size > self._max_bytes:
+                _, (_, dropped_size) = self._patched_weights.popitem(last=False)
+                self._cur_bytes -= dropped_size
+            self._patched_weights[key] = (weights, size)
+            self._cur_bytes += size
+            return True
+
+    def clear(self) -> None:
+        """Drops the patched weights in RAM. Patches that are left applied to models stay applied."""
+        with self._lock:
+            self._patched_weights.clear()
+            self._cur_bytes = 0
+
+
+def get_resident_patches(model: torch.nn.Module) -> Optional[ResidentPatches]:
+    """Gets the patches that are left applied to a model."""
+    with _resident_patches_lock:
+        return _resident_patches.get(model)
+
+
+def set_resident_patches(model: torch.nn.Module, resident: ResidentPatches) -> None:
+    with _resident_patches_lock:
+        _resident_patches[model] = resident
+
+
+def pop_resident_patches(model: torch.nn.Module) -> Optional[ResidentPatches]:
+    with _resident_patches_lock:
+        return _resident_patches.pop(model, None)
@@ -7,6 +7,7 @@ import torch
 from diffusers import UNet2DConditionModel
 
 from invokeai.app.services.session_processor.session_processor_common import CanceledException
+from invokeai.backend.patches.layer_patcher import LayerPatcher
 from invokeai.backend.util.original_weights_storage import OriginalWeightsStorage
 
 if TYPE_CHECKING:
@@ -68,6 +69,8 @@ class ExtensionsManager:
         if self._is_canceled and self._is_canceled():
             raise CanceledException
 
+        # Patches left applied by a previous patcher would be taken for the original weights
+        LayerPatcher.remove_resident_patches(unet)
         original_weights = OriginalWeightsStorage(cached_weights)
         try:
             with ExitStack() as exit_stack:
@@ -5,12 +5,12 @@ from typing import Optional, Union
 
 import torch
 from compel.embeddings_provider import BaseTextualInversionManager
-from safetensors.torch import load_file
 from transformers import CLIPTokenizer
 from typing_extensions import Self
 
 from invokeai.backend.raw_model import RawModel
 from invokeai.backend.util.calc_tensor_size import calc_tensors_size
+from invokeai.backend.util.mmap_state_dict import load_state_dict_mmap
 
 
 class TextualInversionModelRaw(RawModel):
@@ -29,10 +29,7 @@ class TextualInversionModelRaw(RawModel):
 
         result = cls()  # TODO:
 
-        if file_path.suffix == ".safetensors":
-            state_dict = load_file(file_path.absolute().as_posix(), device="cpu")
-        else:
-            state_dict = torch.load(file_path, map_location="cpu")
+        state_dict = load_state_dict_mmap(file_path)
 
         # both v1 and v2 format embeddings
         # difference mostly in metadata
@@ -6,18 +6,47 @@
 import argparse
 import datetime
 import enum
-import glob
 import locale
 import os
 import shutil
 import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Callable, Iterator, Optional, Sequence, TypeVar
 
-import PIL
-import PIL.ImageOps
-import PIL.PngImagePlugin
 import yaml
 
+from invokeai.app.util.sharded_layout import (
+    ImageLayout,
+    get_layout_path,
+    mark_migrated,
+    migrate_to_sharded_layout,
+    scan_layout,
+)
+from invokeai.app.util.thumbnails import (
+    DEFAULT_THUMBNAIL_SIZE,
+    THUMBNAIL_FORMATS,
+    THUMBNAIL_SIZES,
+    ThumbnailFormat,
+    ThumbnailSize,
+    get_thumbnail_name,
+    get_thumbnail_subfolder,
+    is_thumbnail_format_available,
+    save_thumbnail,
+)
+
+T = TypeVar("T")
+
+# The number of files or records handled in one batch
+DEFAULT_BATCH_SIZE = 1000
+
+
+def batched(items: Sequence[T], batch_size: int) -> Iterator[Sequence[T]]:
+    """Splits a sequence into batches of at most `batch_size` items."""
+    for start in range(0, len(items), batch_size):
+        yield items[start : start + batch_size]
+
 
 class ConfigMapper:
     """Configuration loader."""
@@ -33,6 +62,7 @@ class ConfigMapper:
 
     DEFAULT_OUTDIR = "outputs"
     DEFAULT_DB_DIR = "databases"
+    DEFAULT_MODELS_DIR = "models"
 
     database_path = None
     database_backup_dir = None
@@ -40,6 +70,8 @@ class ConfigMapper:
     archive_path = None
     thumbnails_path = None
     thumbnails_archive_path = None
+    model_images_path = None
+    image_layout: ImageLayout = "flat"
 
     def load(self):
         """Read paths from yaml config and validate."""
@@ -57,7 +89,8 @@ class ConfigMapper:
             print(f"Unable to find invokeai.yaml at {yaml_path}!")
             return False
         if os.path.exists(yaml_path):
-            db_dir, outdir = self.__load_paths_from_yaml_file(yaml_path)
+            db_dir, outdir, models_dir, image_layout = self.__load_paths_from_yaml_file(yaml_path)
+            self.image_layout = image_layout
 
             if db_dir is None:
                 db_dir = self.DEFAULT_DB_DIR
@@ -80,6 +113,10 @@ class ConfigMapper:
                 self.outputs_path = os.path.join(invoke_root, outdir, "images")
                 self.archive_path = os.path.join(invoke_root, outdir, "images-archive")
 
+            if models_dir is None:
+                models_dir = self.DEFAULT_MODELS_DIR
+            self.model_images_path = os.path.join(invoke_root, models_dir, "model_images")
+
             self.thumbnails_path = os.path.join(self.outputs_path, "thumbnails")
             self.thumbnails_archive_path = os.path.join(self.archive_path, "thumbnails")
 
@@ -89,6 +126,7 @@ class ConfigMapper:
             text = f"Found {self.YAML_FILENAME} file at {yaml_path}:"
             text += f"\n  Database : {self.database_path} - {'Exists!' if db_exists else 'Not Found!'}"
             text += f"\n  Outputs  : {self.outputs_path}- {'Exists!' if outdir_exists else 'Not Found!'}"
+            text += f"\n  Layout   : {self.image_layout}"
             print(text)
 
             if db_exists and outdir_exists:
@@ -111,30 +149,30 @@ class ConfigMapper:
                 yamlinfo = yaml.safe_load(file)
                 db_dir = yamlinfo.get("InvokeAI", {}).get("Paths", {}).get("db_dir", None)
                 outdir = yamlinfo.get("InvokeAI", {}).get("Paths", {}).get("outdir", None)
-                return db_dir, outdir
+                models_dir = yamlinfo.get("models_dir", None)
+                image_layout = yamlinfo.get("image_layout", "flat")
+                return db_dir, outdir, models_dir, image_layout
         except Exception:
             print(f"Failed to load paths from yaml file! {yaml_path}!")
-            return None, None
+            return None, None, None, "flat"
 
 
 class MaintenanceStats:
     """DTO for tracking work progress."""
 
     def __init__(self):  # noqa D107
-        pass
-
-    time_start = datetime.datetime.utcnow()
-    count_orphaned_db_entries_cleaned = 0
-    count_orphaned_disk_files_cleaned = 0
-    count_orphaned_thumbnails_cleaned = 0
-    count_thumbnails_regenerated = 0
-    count_errors = 0
-
-    @staticmethod
-    def get_elapsed_time_string():
+        self.time_start = datetime.datetime.utcnow()
+        self.count_orphaned_db_entries_cleaned = 0
+        self.count_orphaned_disk_files_cleaned = 0
+        self.count_orphaned_thumbnails_cleaned = 0
+        self.count_thumbnails_regenerated = 0
+        self.count_files_migrated = 0
+        self.count_errors = 0
+
+    def get_elapsed_time_string(self):
         """Get a friendly time string for the  time elapsed since processing start."""
         time_now = datetime.datetime.utcnow()
-        total_seconds = (time_now - MaintenanceStats.time_start).total_seconds()
+        total_seconds = (time_now - self.time_start).total_seconds()
         hours = int((total_seconds) / 3600)
         minutes = int(((total_seconds) % 3600) / 60)
         seconds = total_seconds % 60
@@ -179,21 +217,11 @@ class DatabaseMapper:
             db_files.append(row[0])
         return db_files
 
-    def remove_image_file_record(self, filename: str):
-        """Remove an image file reference from the database by filename."""
-        sanitized_filename = str.replace(filename, "'", "''")  # prevent injection
-        sql_command = f"DELETE FROM images WHERE image_name='{sanitized_filename}'"
-        self.cursor.execute(sql_command)
+    def remove_image_file_records(self, filenames: Sequence[str]):
+        """Remove image file references from the database by filename, in one transaction."""
+        self.cursor.executemany("DELETE FROM images WHERE image_name=?", [(filename,) for filename in filenames])
         self.connection.commit()
 
-    def does_image_exist(self, image_filename):
-        """Check database if a image name already exists and return a boolean."""
-        sanitized_filename = str.replace(image_filename, "'", "''")  # prevent injection
-        sql_get_image_by_name = f"SELECT image_name FROM images WHERE image_name='{sanitized_filename}'"
-        self.cursor.execute(sql_get_image_by_name)
-        rows = self.cursor.fetchall()
-        return True if len(rows) > 0 else False
-
     def disconnect(self):
         """Disconnect from the db, cleaning up connections and cursors."""
         if self.cursor is not None:
@@ -205,8 +233,18 @@ class DatabaseMapper:
 class PhysicalFileMapper:
     """Containing class for script functionality."""
 
-    def __init__(self, outputs_path, thumbnails_path, archive_path, thumbnails_archive_path):  # noqa D107
+    def __init__(  # noqa D107
+        self,
+        outputs_path,
+        thumbnails_path,
+        archive_path,
+        thumbnails_archive_path,
+        layout: ImageLayout = "flat",
+        model_images_path: Optional[str] = None,
+    ):
         self.outputs_path = outputs_path
+        self.model_images_path = model_images_path
+        self.layout = layout
         self.archive_path = archive_path
         self.thumbnails_path = thumbnails_path
         self.thumbnails_archive_path = thumbnails_archive_path
@@ -226,48 +264,105 @@ class PhysicalFileMapper:
             print("Created!")
 
     def get_image_path_for_image_name(self, image_filename):  # noqa D102
-        return os.path.join(self.outputs_path, image_filename)
+        return str(get_layout_path(Path(self.outputs_path), image_filename, self.layout))
 
     def image_file_exists(self, image_filename):  # noqa D102
         return os.path.exists(self.get_image_path_for_image_name(image_filename))
 
-    def get_thumbnail_path_for_image(self, image_filename):  # noqa D102
-        return os.path.join(self.thumbnails_path, os.path.splitext(image_filename)[0]) + ".webp"
+    def get_thumbnail_path_for_image(self, image_filename, size=DEFAULT_THUMBNAIL_SIZE, format="webp"):  # noqa D102
+        thumbnails_path = Path(self.thumbnails_path, get_thumbnail_subfolder(size, format))
+        return str(get_layout_path(thumbnails_path, get_thumbnail_name(image_filename, format), self.layout))
 
     def get_image_name_from_thumbnail_path(self, thumbnail_path):  # noqa D102
         return os.path.splitext(os.path.basename(thumbnail_path))[0] + ".png"
 
-    def thumbnail_exists_for_filename(self, image_filename):  # noqa D102
-        return os.path.exists(self.get_thumbnail_path_for_image(image_filename))
-
-    def archive_image(self, image_filename):  # noqa D102
-        if self.image_file_exists(image_filename):
-            image_path = self.get_image_path_for_image_name(image_filename)
-            shutil.move(image_path, self.archive_path)
-
-    def archive_thumbnail_by_image_filename(self, image_filename):  # noqa D102
-        if self.thumbnail_exists_for_filename(image_filename):
-            thumbnail_path = self.get_thumbnail_path_for_image(image_filename)
-            shutil.move(thumbnail_path, self.thumbnails_archive_path)
-
-    def get_all_png_filenames_in_directory(self, directory_path):  # noqa D102
-        filepaths = glob.glob(directory_path + "/*.png", recursive=False)
-        filenames = []
-        for filepath in filepaths:
-            filenames.append(os.path.basename(filepath))
-        return filenames
-
-    def get_all_thumbnails_with_full_path(self, thumbnails_directory):  # noqa D102
-        return glob.glob(thumbnails_directory + "/*.webp", recursive=False)
+    def scan_image_filenames(self) -> set[str]:
+        """Get the names of all the image files in the outputs directory and its shards, with one directory scan."""
+        return {entry.name for entry in scan_layout(self.outputs_path) if entry.name.endswith(".png")}
+
+    def get_thumbnail_folders(self) -> list[str]:
+        """Get the thumbnails directory and those of its size subfolders that exist."""
+        if not os.path.isdir(self.thumbnails_path):
+            return []
+        subfolders = (os.path.join(self.thumbnails_path, str(size)) for size in THUMBNAIL_SIZES)
+        return [self.thumbnails_path, *(subfolder for subfolder in subfolders if os.path.isdir(subfolder))]
+
+    def scan_thumbnail_paths(self) -> dict[str, list[str]]:
+        """
+        Get the paths of all the thumbnail files, in every size and format, by the name of the image they were made from.
+        The thumbnails directory and each of its size subfolders are scanned once.
+        """
+        thumbnail_paths: dict[str, list[str]] = {}
+        thumbnail_extensions = tuple(f".{format}" for format in THUMBNAIL_FORMATS)
+        for folder in self.get_thumbnail_folders():
+            for entry in scan_layout(folder):
+                if entry.name.endswith(thumbnail_extensions):
+                    image_name = self.get_image_name_from_thumbnail_path(entry.path)
+                    thumbnail_paths.setdefault(image_name, []).append(entry.path)
+        return thumbnail_paths
+
+    def get_sharded_folders(self) -> list[tuple[str, tuple[str, ...]]]:
+        """Get the directories that the sharded layout applies to, with the extensions of the files in them."""
+        thumbnail_extensions = tuple(f".{format}" for format in THUMBNAIL_FORMATS)
+        folders: list[tuple[str, tuple[str, ...]]] = [
+            (self.outputs_path, (".png",)),
+            *((folder, thumbnail_extensions) for folder in self.get_thumbnail_folders()),
+        ]
+        if self.model_images_path is not None and os.path.isdir(self.model_images_path):
+            folders.append((self.model_images_path, (".webp",)))
+        return folders
+
+    def scan_unmigrated_files(self) -> list[tuple[str, str]]:
+        """
+        Get the image, thumbnail and model image files that are not in the sharded layout yet, with the directories
+        they are in.
+        """
+        files: list[tuple[str, str]] = []
+        for folder, extensions in self.get_sharded_folders():
+            with os.scandir(folder) as entries:
+                files.extend((folder, e.name) for e in entries if e.name.endswith(extensions) and e.is_file())
+        return files
+
+    def mark_migrated_folders(self) -> list[str]:
+        """Mark the directories that have no files left in the flat layout as migrated. Returns the marked directories."""
+        unmigrated_folders = {folder for folder, _ in self.scan_unmigrated_files()}
+        migrated_folders = [folder for folder, _ in self.get_sharded_folders() if folder not in unmigrated_folders]
+        for folder in migrated_folders:
+            mark_migrated(Path(folder))
+        return migrated_folders
+
+    def migrate_files(self, files: Sequence[tuple[str, str]]) -> list[tuple[str, Exception]]:
+        """Move a batch of files to the sharded layout. Returns the files that could not be moved."""
+        errors: list[tuple[str, Exception]] = []
+        for folder, name in files:
+            try:
+                migrate_to_sharded_layout(Path(folder), name)
+            except Exception as ex:
+                errors.append((os.path.join(folder, name), ex))
+        return errors
+
+    def get_archive_path_for_thumbnail(self, thumbnail_path):  # noqa D102
+        # Thumbnails in size subfolders are archived to the same subfolder, as their names are not unique
+        subfolder = os.path.relpath(os.path.dirname(thumbnail_path), self.thumbnails_path)
+        return os.path.normpath(os.path.join(self.thumbnails_archive_path, subfolder))
+
+    def archive_files(self, files: Sequence[tuple[str, str]]) -> list[tuple[str, Exception]]:
+        """Move a batch of files to their archive directories. Returns the files that could not be moved."""
+        errors: list[tuple[str, Exception]] = []
+        for path, archive_path in files:
+            try:
+                os.makedirs(archive_path, exist_ok=True)
+                shutil.move(path, archive_path)
+            except Exception as ex:
+                errors.append((path, ex))
+        return errors
 
-    def generate_thumbnail_for_image_name(self, image_filename):  # noqa D102
+    def generate_thumbnail_for_image_name(self, image_filename, size=DEFAULT_THUMBNAIL_SIZE, format="webp"):  # noqa D102
         # create thumbnail
         file_path = self.get_image_path_for_image_name(image_filename)
-        thumb_path = self.get_thumbnail_path_for_image(image_filename)
-        thumb_size = 256, 256
-        with PIL.Image.open(file_path) as source_image:
-            source_image.thumbnail(thumb_size)
-            source_image.save(thumb_path, "webp")
+        thumb_path = self.get_thumbnail_path_for_image(image_filename, size, format)
+        os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+        save_thumbnail(file_path, thumb_path, size, format)
 
 
 class MaintenanceOperation(str, enum.Enum):
@@ -277,6 +372,7 @@ class MaintenanceOperation(str, enum.Enum):
     CleanOrphanedDbEntries = "clean"
     CleanOrphanedDiskFiles = "archive"
     ReGenerateThumbnails = "thumbnails"
+    ShardOutputs = "shard"
     All = "all"
 
 
@@ -285,12 +381,28 @@ class InvokeAIDatabaseMaintenanceApp:
 
     _operation: MaintenanceOperation
     _headless: bool = False
-    __stats: MaintenanceStats = MaintenanceStats()
-
-    def __init__(self, operation: MaintenanceOperation = MaintenanceOperation.Ask):
+    __stats: MaintenanceStats
+
+    def __init__(
+        self,
+        operation: MaintenanceOperation = MaintenanceOperation.Ask,
+        workers: Optional[int] = None,
+        thumbnail_sizes: Sequence[ThumbnailSize] = (DEFAULT_THUMBNAIL_SIZE,),
+        thumbnail_formats: Sequence[ThumbnailFormat] = ("webp",),
+        dry_run: bool = False,
+        quiet: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ):
         """Initialize maintenance app."""
         self._operation = MaintenanceOperation(operation)
         self._headless = operation != MaintenanceOperation.Ask
+        self._dry_run = dry_run
+        self._quiet = quiet
+        self._batch_size = batch_size
+        self._workers = workers
+        self._thumbnail_sizes = thumbnail_sizes
+        self._thumbnail_formats = thumbnail_formats
+        self.__stats = MaintenanceStats()
 
     def ask_for_operation(self) -> MaintenanceOperation:
         """Ask user to choose the operation to perform."""
@@ -310,16 +422,20 @@ class InvokeAIDatabaseMaintenanceApp:
             print("3) Re-Generate Missing Thumbnail Files")
             print("     For files found in the outputs directory, re-generate a thumbnail if it")
             print("     not found in the thumbnails directory.")
+            print("4) Migrate Outputs to the Sharded Layout")
+            print("     Move image and thumbnail files into nested subfolders, which keeps folders")
+            print("     small when there are millions of images.")
             print()
             print("(CTRL-C to quit)")
 
             try:
-                input_option = int(input("Specify desired operation number (1-3): "))
+                input_option = int(input("Specify desired operation number (1-4): "))
 
                 operations = [
                     MaintenanceOperation.CleanOrphanedDbEntries,
                     MaintenanceOperation.CleanOrphanedDiskFiles,
                     MaintenanceOperation.ReGenerateThumbnails,
+                    MaintenanceOperation.ShardOutputs,
                 ]
                 return operations[input_option - 1]
             except (IndexError, ValueError):
@@ -334,6 +450,53 @@ class InvokeAIDatabaseMaintenanceApp:
             if str.lower(input_choice) == "n":
                 return False
 
+    def print_item(self, message: str):
+        """Print a message about a single file or record, unless running quietly."""
+        if not self._quiet:
+            print(message)
+
+    def archive_files(self, file_mapper: PhysicalFileMapper, files: Sequence[tuple[str, str]], description: str) -> int:
+        """
+        Archive files in parallel batches, or only report them in a dry run. Each file is given with the directory it is
+        moved to. Returns the number of files archived, or that would be archived.
+        """
+        if self._dry_run:
+            for path, archive_path in files:
+                self.print_item(f"Would archive {description} {path} to {archive_path}")
+            return len(files)
+        return self.move_files(file_mapper.archive_files, files, f"archive {description}", f"Archived {description}s")
+
+    def move_files(
+        self,
+        move: Callable[[Sequence[tuple[str, str]]], list[tuple[str, Exception]]],
+        files: Sequence[tuple[str, str]],
+        action: str,
+        done: str,
+    ) -> int:
+        """Move files in parallel batches. Returns the number of files that were moved."""
+        count_moved = 0
+        with ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="move") as executor:
+            jobs = {executor.submit(move, batch): batch for batch in batched(files, self._batch_size)}
+            for job in as_completed(jobs):
+                errors = job.result()
+                for path, ex in errors:
+                    print(f"Error found trying to {action} {path}, error was:")
+                    print(ex)
+                self.__stats.count_errors += len(errors)
+                count_moved += len(jobs[job]) - len(errors)
+                self.print_item(f"{done}: {len(jobs[job]) - len(errors)}")
+        return count_moved
+
+    def get_thumbnails_to_archive(
+        self, file_mapper: PhysicalFileMapper, thumbnail_paths: dict[str, list[str]], image_names: Sequence[str]
+    ) -> list[tuple[str, str]]:
+        """Get the thumbnails of some images, with the directories they are archived to."""
+        return [
+            (thumbnail_path, file_mapper.get_archive_path_for_thumbnail(thumbnail_path))
+            for image_name in image_names
+            for thumbnail_path in thumbnail_paths.get(image_name, [])
+        ]
+
     def clean_orphaned_db_entries(
         self, config: ConfigMapper, file_mapper: PhysicalFileMapper, db_mapper: DatabaseMapper
     ):
@@ -366,26 +529,33 @@ class InvokeAIDatabaseMaintenanceApp:
             if not self.ask_to_continue():
                 raise KeyboardInterrupt
 
-        file_mapper.create_archive_directories()
-        db_mapper.backup(config.TIMESTAMP_STRING)
+        if not self._dry_run:
+            file_mapper.create_archive_directories()
+            db_mapper.backup(config.TIMESTAMP_STRING)
         db_mapper.connect()
-        db_files = db_mapper.get_all_image_files()
-        for db_file in db_files:
+        db_files = set(db_mapper.get_all_image_files())
+        orphaned_db_files = sorted(db_files - file_mapper.scan_image_filenames())
+        print(f"Found {len(orphaned_db_files)} orphaned image db entries")
+
+        # SQLite has a single writer, so the records are removed in batches on this thread
+        for batch in batched(orphaned_db_files, self._batch_size):
+            if self._dry_run:
+                for db_file in batch:
+                    self.print_item(f"Would clean orphaned image db entry {db_file}")
+                self.__stats.count_orphaned_db_entries_cleaned += len(batch)
+                continue
             try:
-                if not file_mapper.image_file_exists(db_file):
-                    print(f"Found orphaned image db entry {db_file}. Cleaning ...", end="")
-                    db_mapper.remove_image_file_record(db_file)
-                    print("Cleaned!")
-                    if file_mapper.thumbnail_exists_for_filename(db_file):
-                        print("A thumbnail was found, archiving ...", end="")
-                        file_mapper.archive_thumbnail_by_image_filename(db_file)
-                        print("Archived!")
-                    self.__stats.count_orphaned_db_entries_cleaned += 1
+                db_mapper.remove_image_file_records(batch)
+                self.print_item(f"Cleaned {len(batch)} orphaned image db entries")
+                self.__stats.count_orphaned_db_entries_cleaned += len(batch)
             except Exception as ex:
-                print("An error occurred cleaning db entry, error was:")
+                print("An error occurred cleaning db entries, error was:")
                 print(ex)
                 self.__stats.count_errors += 1
 
+        thumbnails = self.get_thumbnails_to_archive(file_mapper, file_mapper.scan_thumbnail_paths(), orphaned_db_files)
+        self.__stats.count_orphaned_thumbnails_cleaned += self.archive_files(file_mapper, thumbnails, "thumbnail")
+
     def clean_orphaned_disk_files(
         self, config: ConfigMapper, file_mapper: PhysicalFileMapper, db_mapper: DatabaseMapper
     ):
@@ -421,42 +591,24 @@ class InvokeAIDatabaseMaintenanceApp:
 
             print()
 
-        file_mapper.create_archive_directories()
-        db_mapper.backup(config.TIMESTAMP_STRING)
+        if not self._dry_run:
+            file_mapper.create_archive_directories()
+            db_mapper.backup(config.TIMESTAMP_STRING)
         db_mapper.connect()
-        phys_files = file_mapper.get_all_png_filenames_in_directory(config.outputs_path)
-        for phys_file in phys_files:
-            try:
-                if not db_mapper.does_image_exist(phys_file):
-                    print(f"Found orphaned file {phys_file}, archiving...", end="")
-                    file_mapper.archive_image(phys_file)
-                    print("Archived!")
-                    if file_mapper.thumbnail_exists_for_filename(phys_file):
-                        print("Related thumbnail exists, archiving...", end="")
-                        file_mapper.archive_thumbnail_by_image_filename(phys_file)
-                        print("Archived!")
-                    else:
-                        print("No matching thumbnail existed to be cleaned.")
-                    self.__stats.count_orphaned_disk_files_cleaned += 1
-            except Exception as ex:
-                print("Error found trying to archive file or thumbnail, error was:")
-                print(ex)
-                self.__stats.count_errors += 1
+        phys_files = file_mapper.scan_image_filenames()
+        db_files = set(db_mapper.get_all_image_files())
+        thumbnail_paths = file_mapper.scan_thumbnail_paths()
 
-        thumb_filepaths = file_mapper.get_all_thumbnails_with_full_path(config.thumbnails_path)
-        # archive any remaining orphaned thumbnails
-        for thumb_filepath in thumb_filepaths:
-            try:
-                thumb_src_image_name = file_mapper.get_image_name_from_thumbnail_path(thumb_filepath)
-                if not file_mapper.image_file_exists(thumb_src_image_name):
-                    print(f"Found orphaned thumbnail {thumb_filepath}, archiving...", end="")
-                    file_mapper.archive_thumbnail_by_image_filename(thumb_src_image_name)
-                    print("Archived!")
-                    self.__stats.count_orphaned_thumbnails_cleaned += 1
-            except Exception as ex:
-                print("Error found trying to archive thumbnail, error was:")
-                print(ex)
-                self.__stats.count_errors += 1
+        orphaned_phys_files = sorted(phys_files - db_files)
+        print(f"Found {len(orphaned_phys_files)} orphaned image files")
+        images = [(file_mapper.get_image_path_for_image_name(f), file_mapper.archive_path) for f in orphaned_phys_files]
+        self.__stats.count_orphaned_disk_files_cleaned += self.archive_files(file_mapper, images, "image")
+
+        # The thumbnails of the orphaned files are archived with any others whose image file does not exist
+        orphaned_thumbnail_images = sorted(set(thumbnail_paths) - (phys_files & db_files))
+        thumbnails = self.get_thumbnails_to_archive(file_mapper, thumbnail_paths, orphaned_thumbnail_images)
+        print(f"Found {len(thumbnails)} orphaned thumbnail files")
+        self.__stats.count_orphaned_thumbnails_cleaned += self.archive_files(file_mapper, thumbnails, "thumbnail")
 
     def regenerate_thumbnails(self, config: ConfigMapper, file_mapper: PhysicalFileMapper, *args):
         """Create missing thumbnails for any valid general images both in the db and on disk."""
@@ -487,34 +639,113 @@ class InvokeAIDatabaseMaintenanceApp:
 
             print()
 
-        phys_files = file_mapper.get_all_png_filenames_in_directory(config.outputs_path)
-        for phys_file in phys_files:
-            try:
-                if not file_mapper.thumbnail_exists_for_filename(phys_file):
-                    print(f"Found file without thumbnail {phys_file}...Regenerating Thumbnail...", end="")
-                    file_mapper.generate_thumbnail_for_image_name(phys_file)
-                    print("Done!")
+        phys_files = sorted(file_mapper.scan_image_filenames())
+        thumbnail_paths = {path for paths in file_mapper.scan_thumbnail_paths().values() for path in paths}
+        missing_thumbnails = [
+            (phys_file, size, format)
+            for phys_file in phys_files
+            for size in self._thumbnail_sizes
+            for format in self._thumbnail_formats
+            if file_mapper.get_thumbnail_path_for_image(phys_file, size, format) not in thumbnail_paths
+        ]
+        print(f"Found {len(missing_thumbnails)} missing thumbnails")
+        if self._dry_run:
+            for phys_file, size, format in missing_thumbnails:
+                self.print_item(f"Would regenerate {size}px {format} thumbnail for {phys_file}")
+            self.__stats.count_thumbnails_regenerated += len(missing_thumbnails)
+            return
+
+        # Thumbnails are made in separate processes, as decoding and resizing images is CPU-bound
+        with ProcessPoolExecutor(max_workers=self._workers) as executor:
+            jobs = {
+                executor.submit(file_mapper.generate_thumbnail_for_image_name, phys_file, size, format): (
+                    phys_file,
+                    size,
+                    format,
+                )
+                for phys_file, size, format in missing_thumbnails
+            }
+            for job in as_completed(jobs):
+                phys_file, size, format = jobs[job]
+                try:
+                    job.result()
+                    self.print_item(f"Regenerated {size}px {format} thumbnail for {phys_file}")
                     self.__stats.count_thumbnails_regenerated += 1
-            except Exception as ex:
-                print("Error found trying to regenerate thumbnail, error was:")
-                print(ex)
-                self.__stats.count_errors += 1
+                except Exception as ex:
+                    print(f"Error found trying to regenerate {size}px {format} thumbnail for {phys_file}, error was:")
+                    print(ex)
+                    self.__stats.count_errors += 1
+
+    def shard_outputs(self, config: ConfigMapper, file_mapper: PhysicalFileMapper, *args):
+        """Move images, thumbnails and model images to the sharded layout."""
+        if config.image_layout != "sharded":
+            print("The outputs can only be migrated to the sharded layout when it is used by the app. Set")
+            print("`image_layout: sharded` in invokeai.yaml first - the app still finds images that have")
+            print("not been migrated - then run this operation again.")
+            self.__stats.count_errors += 1
+            return
 
-    def main(self):  # noqa D107
+        if self._headless:
+            print(
+                f"Migrating images and thumbnails in {config.outputs_path}, and model images in "
+                f"{config.model_images_path}, to the sharded layout..."
+            )
+        else:
+            print()
+            print("===============================================================================")
+            print("= Migrate Outputs to the Sharded Layout")
+            print()
+            print("This operation moves images and thumbnails from the outputs/images directory, and")
+            print("model images from the models/model_images directory, into nested subfolders named")
+            print("for a hash of their names, eg outputs/images/ab/cd/<name>.png.")
+            print()
+            print(f"Outputs/Images Directory         : {config.outputs_path}")
+            print(f"Model Images Directory           : {config.model_images_path}")
+
+            print("\nNotes about this operation:")
+            print("- The app can keep running while this operation runs, as it finds images in")
+            print("  both layouts.")
+            print("- If this operation is stopped, run it again to migrate the remaining files.")
+            print("- Restart the app afterwards, so it stops looking for files in the flat layout.")
+
+            if not self.ask_to_continue():
+                raise KeyboardInterrupt
+
+            print()
+
+        files = file_mapper.scan_unmigrated_files()
+        print(f"Found {len(files)} files to migrate")
+        if self._dry_run:
+            for folder, name in files:
+                self.print_item(f"Would migrate {os.path.join(folder, name)}")
+            self.__stats.count_files_migrated += len(files)
+            return
+        self.__stats.count_files_migrated += self.move_files(file_mapper.migrate_files, files, "migrate", "Migrated")
+        # The app only looks for files in the flat layout of folders that are not marked, so marked folders are
+        # faster to serve from once the app restarts
+        for folder in file_mapper.mark_migrated_folders():
+            self.print_item(f"Marked {folder} as migrated")
+
+    def main(self) -> bool:
+        """Run the maintenance operations. Returns whether they ran without errors."""
         print("\n===============================================================================")
         print("Database and outputs Maintenance for Invoke AI 3.0.0 +")
+        if self._dry_run:
+            print("Dry run - no changes will be made")
         print("===============================================================================\n")
 
         config_mapper = ConfigMapper()
         if not config_mapper.load():
             print("\nInvalid configuration...exiting.\n")
-            return
+            return False
 
         file_mapper = PhysicalFileMapper(
             config_mapper.outputs_path,
             config_mapper.thumbnails_path,
             config_mapper.archive_path,
             config_mapper.thumbnails_archive_path,
+            config_mapper.image_layout,
+            config_mapper.model_images_path,
         )
         db_mapper = DatabaseMapper(config_mapper.database_path, config_mapper.database_backup_dir)
 
@@ -530,20 +761,35 @@ class InvokeAIDatabaseMaintenanceApp:
             operations_to_perform.append(self.clean_orphaned_disk_files)
         if op in [MaintenanceOperation.ReGenerateThumbnails, MaintenanceOperation.All]:
             operations_to_perform.append(self.regenerate_thumbnails)
+        # Migrating changes the layout of the outputs rather than cleaning them, so it is not part of `all`
+        if op == MaintenanceOperation.ShardOutputs:
+            operations_to_perform.append(self.shard_outputs)
 
-        for operation in operations_to_perform:
-            operation(config_mapper, file_mapper, db_mapper)
-
+        try:
+            for operation in operations_to_perform:
+                operation(config_mapper, file_mapper, db_mapper)
+        finally:
+            db_mapper.disconnect()
+
+        # In a dry run, the counts are of what would have been done
+        done = "to clean" if self._dry_run else "cleaned"
+        archived = "to archive" if self._dry_run else "archived"
+        regenerated = "to regenerate" if self._dry_run else "regenerated"
+        migrated = "to migrate" if self._dry_run else "migrated"
         print("\n===============================================================================")
-        print(f"= Maintenance Complete - Elapsed Time: {MaintenanceStats.get_elapsed_time_string()}")
+        print(f"= Maintenance Complete - Elapsed Time: {self.__stats.get_elapsed_time_string()}")
+        if self._dry_run:
+            print("= Dry run - no changes were made")
         print()
-        print(f"Orphaned db entries cleaned             : {self.__stats.count_orphaned_db_entries_cleaned}")
-        print(f"Orphaned disk files archived            : {self.__stats.count_orphaned_disk_files_cleaned}")
-        print(f"Orphaned thumbnail files archived       : {self.__stats.count_orphaned_thumbnails_cleaned}")
-        print(f"Thumbnails regenerated                  : {self.__stats.count_thumbnails_regenerated}")
+        print(f"Orphaned db entries {done:<20}: {self.__stats.count_orphaned_db_entries_cleaned}")
+        print(f"Orphaned disk files {archived:<20}: {self.__stats.count_orphaned_disk_files_cleaned}")
+        print(f"Orphaned thumbnail files {archived:<15}: {self.__stats.count_orphaned_thumbnails_cleaned}")
+        print(f"Thumbnails {regenerated:<29}: {self.__stats.count_thumbnails_regenerated}")
+        print(f"Files {migrated:<34}: {self.__stats.count_files_migrated}")
         print(f"Errors during operation                 : {self.__stats.count_errors}")
 
         print()
+        return self.__stats.count_errors == 0
 
 
 def main():  # noqa D107
@@ -556,21 +802,71 @@ def main():  # noqa D107
   clean       Clean database of dangling entries
   archive     Archive orphaned image files
   thumbnails  Regenerate missing image thumbnails
+  shard       Migrate images and thumbnails to the sharded layout
+
+Passing an operation other than "ask" runs it without asking for confirmation, so it can be scheduled, eg:
+  python -m invokeai.backend.util.db_maintenance --root ~/invokeai --operation all --quiet
 """,
     )
     parser.add_argument("--root", default=".", type=Path, help="InvokeAI root directory")
     parser.add_argument(
         "--operation", default="ask", choices=[x.value for x in MaintenanceOperation], help="Operation to perform."
     )
+    parser.add_argument(
+        "--workers",
+        default=None,
+        type=int,
+        help="Number of processes that regenerate thumbnails. Defaults to one per CPU.",
+    )
+    parser.add_argument(
+        "--thumbnail-sizes",
+        nargs="+",
+        default=[DEFAULT_THUMBNAIL_SIZE],
+        type=int,
+        choices=THUMBNAIL_SIZES,
+        help="Sizes of the thumbnails to regenerate. Other sizes are also made on demand by the app.",
+    )
+    parser.add_argument(
+        "--thumbnail-formats",
+        nargs="+",
+        default=["webp"],
+        choices=[f for f in THUMBNAIL_FORMATS if is_thumbnail_format_available(f)],
+        help="Formats of the thumbnails to regenerate.",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Report what the operation would do, without changing anything."
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Only print a summary, not every file or record. Useful with cron, along with --operation.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        default=DEFAULT_BATCH_SIZE,
+        type=int,
+        help="Number of files or records handled in one batch.",
+    )
     args = parser.parse_args()
     try:
         os.chdir(args.root)
-        app = InvokeAIDatabaseMaintenanceApp(args.operation)
-        app.main()
+        app = InvokeAIDatabaseMaintenanceApp(
+            args.operation,
+            workers=args.workers,
+            thumbnail_sizes=args.thumbnail_sizes,
+            thumbnail_formats=args.thumbnail_formats,
+            dry_run=args.dry_run,
+            quiet=args.quiet,
+            batch_size=args.batch_size,
+        )
+        # A non-zero exit status lets scheduled runs report failures
+        sys.exit(0 if app.main() else 1)
     except KeyboardInterrupt:
         print("\n\nUser cancelled execution.")
+        sys.exit(1)
     except FileNotFoundError:
         print(f"Invalid root directory '{args.root}'.")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
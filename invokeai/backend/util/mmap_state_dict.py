@@ -0,0 +1,27 @@
+"""Zero-copy loading of state dicts from memory-mapped files."""
+
+import zipfile
+from pathlib import Path
+from typing import Any, Union, cast
+
+import torch
+from safetensors.torch import load_file
+
+
+def load_state_dict_mmap(path: Union[str, Path]) -> dict[str, Any]:
+    """
+    Loads a state dict from a safetensors file or a torch checkpoint, with its tensors mapped from the file instead of
+    copied into memory.
+
+    No bytes are read until a tensor's data is used, so keys can be converted and tensors split or sliced before any are
+    copied. Tensors that are used as they are stay backed by the page cache, so the weights are not in memory twice, and
+    the OS can drop them and read them again under memory pressure. Casting a tensor to another dtype or device copies
+    it as usual. The maps are private, so writes to the tensors are not written to the file.
+
+    `safetensors.torch.load_file()` already maps the file on the CPU. Torch checkpoints are mapped if they are in the
+    zip format that `torch.save()` has used since torch 1.6. Older checkpoints can't be mapped, and are read into memory.
+    """
+    path = Path(path)
+    if path.suffix == ".safetensors":
+        return load_file(path, device="cpu")
+    return cast(dict[str, Any], torch.load(path, map_location="cpu", mmap=zipfile.is_zipfile(path)))
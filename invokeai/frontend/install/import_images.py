@@ -27,6 +27,7 @@ from prompt_toolkit.shortcuts import message_dialog
 
 from invokeai.app.services.config.config_default import get_config
 from invokeai.app.util.misc import uuid_string
+from invokeai.app.util.png_metadata import read_png_header
 
 app_config = get_config()
 
@@ -495,11 +496,9 @@ class MediaImportProcessor:
 
     def get_file_details(self, filepath):
         """Retrieve the embedded metedata fields and dimensions from an image file."""
-        with PIL.Image.open(filepath) as img:
-            img.load()
-            png_width, png_height = img.size
-            img_info = img.info
-        return img_info, png_width, png_height
+        # Only the file's header and text chunks are read, the pixels are not decoded
+        png_header = read_png_header(filepath)
+        return png_header.text, png_header.width, png_header.height
 
     def select_board_option(self, board_names, timestamp_string):
         """Allow the user to choose how a board is selected for imported files."""
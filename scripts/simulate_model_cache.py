@@ -0,0 +1,63 @@
+"""Replays a model cache trace against eviction policies and cache sizes, to compare them for a workload.
+
+Record a trace by setting `cache_trace_file` in `invokeai.yaml` and generating as usual, then run e.g.:
+
+    python scripts/simulate_model_cache.py ~/invokeai/model_cache_trace.jsonl --cache-sizes-gb 8 16 32
+"""
+
+import argparse
+
+from invokeai.backend.model_manager.load.model_cache.cache_trace import read_cache_trace, simulate_cache
+from invokeai.backend.model_manager.load.model_cache.eviction_policy import (
+    EVICTION_POLICIES,
+    GB,
+    ReloadCostEvictionPolicy,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a model cache trace against eviction policies.")
+    parser.add_argument("trace", type=str, help="The trace file, as written by the model cache.")
+    parser.add_argument(
+        "--cache-sizes-gb", type=float, nargs="+", default=[8, 16, 32], help="The RAM cache sizes to simulate, in GB."
+    )
+    parser.add_argument(
+        "--policies",
+        type=str,
+        nargs="+",
+        choices=list(EVICTION_POLICIES),
+        default=list(EVICTION_POLICIES),
+        help="The eviction policies to simulate.",
+    )
+    parser.add_argument(
+        "--disk-bandwidth-gb",
+        type=float,
+        default=1.0,
+        help="The disk bandwidth in GB/s, used by the reload_cost policy and to estimate load times.",
+    )
+    parser.add_argument(
+        "--load-overhead-seconds",
+        type=float,
+        default=0.5,
+        help="The time to load a model besides reading it, used by the reload_cost policy and to estimate load times.",
+    )
+    args = parser.parse_args()
+
+    events = list(read_cache_trace(args.trace))
+    print(f"{'policy':<16}{'cache':>10}{'hit rate':>10}{'misses':>8}{'evictions':>11}{'loaded':>12}{'load time':>11}")
+    for cache_size_gb in args.cache_sizes_gb:
+        for name in args.policies:
+            if name == "reload_cost":
+                policy = ReloadCostEvictionPolicy(args.disk_bandwidth_gb, args.load_overhead_seconds)
+            else:
+                policy = EVICTION_POLICIES[name]()
+            result = simulate_cache(events, policy, int(cache_size_gb * GB))
+            load_time = result.misses * args.load_overhead_seconds + result.bytes_loaded / (args.disk_bandwidth_gb * GB)
+            print(
+                f"{name:<16}{cache_size_gb:>8.1f}GB{result.hit_rate:>10.1%}{result.misses:>8}{result.evictions:>11}"
+                f"{result.bytes_loaded / GB:>10.2f}GB{load_time:>10.1f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
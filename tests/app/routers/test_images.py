@@ -1,3 +1,4 @@
+import asyncio
 import os
 from pathlib import Path
 from typing import Any
@@ -8,7 +9,7 @@ from fastapi.testclient import TestClient
 
 from invokeai.app.api.dependencies import ApiDependencies
 from invokeai.app.api_app import app
-from invokeai.app.services.board_records.board_records_common import BoardRecord
+from invokeai.app.services.board_records.board_records_common import BoardRecord, BoardRecordNotFoundException
 from invokeai.app.services.invoker import Invoker
 
 
@@ -74,6 +75,36 @@ def test_download_images_with_empty_image_list_and_no_board_id(
     assert response.status_code == 400
 
 
+def test_stream_images_download(tmp_path: Path, monkeypatch: Any, mock_invoker: Invoker, client: TestClient) -> None:
+    prepare_download_images_test(monkeypatch, mock_invoker)
+    zip_file_data = [b"zip ", b"file"]
+
+    def mock_stream(image_names, board_id, bulk_download_item_id):
+        assert (image_names, board_id, bulk_download_item_id) == (["test.png"], None, "test")
+        return iter(zip_file_data)
+
+    monkeypatch.setattr(mock_invoker.services.bulk_download, "stream", mock_stream)
+
+    response = client.post("/api/v1/images/download/stream", json={"image_names": ["test.png"]})
+
+    assert response.status_code == 200
+    assert response.content == b"zip file"
+    assert response.headers["content-type"] == "application/zip"
+    assert response.headers["content-disposition"] == 'attachment; filename="test.zip"'
+
+
+def test_stream_images_download_not_found(monkeypatch: Any, mock_invoker: Invoker, client: TestClient) -> None:
+    prepare_download_images_test(monkeypatch, mock_invoker)
+
+    def mock_stream(*args, **kwargs):
+        raise BoardRecordNotFoundException()
+
+    monkeypatch.setattr(mock_invoker.services.bulk_download, "stream", mock_stream)
+
+    assert client.post("/api/v1/images/download/stream", json={"board_id": "test"}).status_code == 404
+    assert client.post("/api/v1/images/download/stream", json={"image_names": []}).status_code == 400
+
+
 def test_get_bulk_download_image(tmp_path: Path, monkeypatch: Any, mock_invoker: Invoker, client: TestClient) -> None:
     mock_file: Path = tmp_path / "test.zip"
     mock_file.write_text("contents")
@@ -117,3 +148,125 @@ def test_get_bulk_download_image_image_deleted_after_response(
     client.get("/api/v1/images/download/test.zip")
 
     assert not (tmp_path / "test.zip").exists()
+
+
+def prepare_image_file_test(monkeypatch: Any, mock_invoker: Invoker, tmp_path: Path) -> bytes:
+    content = bytes(range(256)) * 16
+    (tmp_path / "test.png").write_bytes(content)
+    (tmp_path / "test.webp").write_bytes(content[:100])
+
+    def mock_get_path(image_name: str, thumbnail: bool = False) -> str:
+        return str(tmp_path / (f"{Path(image_name).stem}.webp" if thumbnail else image_name))
+
+    def mock_get_thumbnail_path(image_name: str, size: int = 256, format: str = "webp") -> str:
+        if size != 256:
+            (tmp_path / f"{size}.{format}").write_bytes(content[:size])
+            return str(tmp_path / f"{size}.{format}")
+        return mock_get_path(image_name, thumbnail=True)
+
+    monkeypatch.setattr(mock_invoker.services.images, "get_path", mock_get_path)
+    monkeypatch.setattr(mock_invoker.services.images, "get_thumbnail_path", mock_get_thumbnail_path)
+    monkeypatch.setattr("invokeai.app.api.routers.images.ApiDependencies", MockApiDependencies(mock_invoker))
+    return content
+
+
+def test_get_image_full(monkeypatch: Any, mock_invoker: Invoker, tmp_path: Path, client: TestClient) -> None:
+    content = prepare_image_file_test(monkeypatch, mock_invoker, tmp_path)
+
+    response = client.get("/api/v1/images/i/test.png/full")
+    assert response.status_code == 200
+    assert response.content == content
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["content-disposition"] == 'inline; filename="test.png"'
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "etag" in response.headers and "last-modified" in response.headers
+
+    head = client.head("/api/v1/images/i/test.png/full")
+    assert head.status_code == 200
+    assert head.content == b""
+    assert head.headers["content-length"] == str(len(content))
+    assert head.headers["etag"] == response.headers["etag"]
+
+
+def test_get_image_full_waits_off_the_event_loop(
+    monkeypatch: Any, mock_invoker: Invoker, tmp_path: Path, client: TestClient
+) -> None:
+    prepare_image_file_test(monkeypatch, mock_invoker, tmp_path)
+    get_path = mock_invoker.services.images.get_path
+
+    def mock_get_path(image_name: str, thumbnail: bool = False) -> str:
+        # Getting the path waits for the image to be written, so it must not run on the event loop
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        return get_path(image_name, thumbnail)
+
+    monkeypatch.setattr(mock_invoker.services.images, "get_path", mock_get_path)
+    assert client.get("/api/v1/images/i/test.png/full").status_code == 200
+
+
+def test_get_image_full_not_modified(
+    monkeypatch: Any, mock_invoker: Invoker, tmp_path: Path, client: TestClient
+) -> None:
+    prepare_image_file_test(monkeypatch, mock_invoker, tmp_path)
+    etag = client.get("/api/v1/images/i/test.png/full").headers["etag"]
+
+    response = client.get("/api/v1/images/i/test.png/full", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    response = client.get("/api/v1/images/i/test.png/full", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+
+    # The file changed, so the client's copy is stale
+    (tmp_path / "test.png").write_bytes(b"changed")
+    response = client.get("/api/v1/images/i/test.png/full", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.content == b"changed"
+
+
+def test_get_image_full_range(monkeypatch: Any, mock_invoker: Invoker, tmp_path: Path, client: TestClient) -> None:
+    content = prepare_image_file_test(monkeypatch, mock_invoker, tmp_path)
+
+    response = client.get("/api/v1/images/i/test.png/full", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.content == content[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(content)}"
+
+    response = client.get("/api/v1/images/i/test.png/full", headers={"Range": f"bytes={len(content)}-"})
+    assert response.status_code == 416
+
+
+def test_get_image_thumbnail(monkeypatch: Any, mock_invoker: Invoker, tmp_path: Path, client: TestClient) -> None:
+    content = prepare_image_file_test(monkeypatch, mock_invoker, tmp_path)
+
+    response = client.get("/api/v1/images/i/test.png/thumbnail")
+    assert response.status_code == 200
+    assert response.content == content[:100]
+    assert response.headers["content-type"] == "image/webp"
+
+    last_modified = response.headers["last-modified"]
+    response = client.get("/api/v1/images/i/test.png/thumbnail", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+
+def test_get_image_thumbnail_size(monkeypatch: Any, mock_invoker: Invoker, tmp_path: Path, client: TestClient) -> None:
+    content = prepare_image_file_test(monkeypatch, mock_invoker, tmp_path)
+    # AVIF support depends on the PIL build, and the thumbnail itself is mocked
+    monkeypatch.setattr("invokeai.app.api.routers.images.is_thumbnail_format_available", lambda format: True)
+
+    response = client.get("/api/v1/images/i/test.png/thumbnail", params={"size": 512, "format": "avif"})
+    assert response.status_code == 200
+    assert response.content == content[:512]
+    assert response.headers["content-type"] == "image/avif"
+
+    monkeypatch.setattr("invokeai.app.api.routers.images.is_thumbnail_format_available", lambda format: False)
+    assert client.get("/api/v1/images/i/test.png/thumbnail", params={"format": "avif"}).status_code == 400
+    assert client.get("/api/v1/images/i/test.png/thumbnail", params={"size": 100}).status_code == 400
+    assert client.get("/api/v1/images/i/test.png/thumbnail", params={"format": "gif"}).status_code == 422
+
+
+def test_get_image_full_not_found(monkeypatch: Any, mock_invoker: Invoker, tmp_path: Path, client: TestClient) -> None:
+    prepare_image_file_test(monkeypatch, mock_invoker, tmp_path)
+    assert client.get("/api/v1/images/i/missing.png/full").status_code == 404
+    assert client.get("/api/v1/images/i/missing.png/thumbnail").status_code == 404
@@ -1,9 +1,18 @@
 import platform
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from threading import Event, Thread
 
 import pytest
+from PIL import Image
 
+from invokeai.app.services.image_files.image_files_common import ImageFileNotFoundException, ImageFileSaveException
 from invokeai.app.services.image_files.image_files_disk import DiskImageFileStorage
+from invokeai.app.services.invoker import Invoker
+from invokeai.app.services.shared.object_cache import ObjectCache
+from invokeai.app.util.sharded_layout import ImageLayout, get_shard, is_migrated, mark_migrated
+from invokeai.app.util.thumbnails import is_thumbnail_format_available, save_thumbnail
 
 
 @pytest.fixture
@@ -29,7 +38,8 @@ def image_names() -> list[str]:
         ]
 
 
-def test_directory_traversal_protection(tmp_path: Path, image_names: list[str]):
+@pytest.mark.parametrize("layout", ["flat", "sharded"])
+def test_directory_traversal_protection(tmp_path: Path, image_names: list[str], layout: ImageLayout):
     """Test that the image file storage prevents directory traversal attacks.
 
     There are two safeguards in the `DiskImageFileStorage.get_path` method:
@@ -39,7 +49,7 @@ def test_directory_traversal_protection(tmp_path: Path, image_names: list[str]):
     This test checks the first safeguard. I'd like to check the second but I cannot figure out a test case that would
     pass the first check but fail the second check.
     """
-    image_files_disk = DiskImageFileStorage(tmp_path)
+    image_files_disk = DiskImageFileStorage(tmp_path, layout=layout)
     for name in image_names:
         with pytest.raises(ValueError, match="Invalid image name, potential directory traversal detected"):
             image_files_disk.get_path(name)
@@ -49,3 +59,271 @@ def test_image_paths_relative_to_storage_dir(tmp_path: Path):
     image_files_disk = DiskImageFileStorage(tmp_path)
     path = image_files_disk.get_path("foo.png")
     assert path.is_relative_to(tmp_path)
+
+
+def test_sharded_layout(tmp_path: Path, mock_invoker: Invoker, image: Image.Image):
+    image_files_disk = DiskImageFileStorage(tmp_path, layout="sharded")
+    image_files_disk.start(mock_invoker)
+
+    image_files_disk.save(image, "foo.png")
+    shard = Path(*get_shard("foo.png"))
+    assert image_files_disk.get_path("foo.png") == tmp_path.resolve() / shard / "foo.png"
+    assert (
+        image_files_disk.get_path("foo.png", thumbnail=True) == tmp_path.resolve() / "thumbnails" / shard / "foo.webp"
+    )
+    assert image_files_disk.get_path("foo.png").exists()
+    assert (
+        image_files_disk.get_thumbnail_path("foo.png", 512)
+        == tmp_path.resolve() / "thumbnails/512" / shard / "foo.webp"
+    )
+
+    # Images that have not been migrated are still found
+    image.save(tmp_path / "bar.png")
+    assert image_files_disk.get_path("bar.png") == tmp_path.resolve() / "bar.png"
+    assert image_files_disk.get("bar.png").size == image.size
+    image_files_disk.delete("bar.png")
+    assert not (tmp_path / "bar.png").exists()
+    image_files_disk.stop(mock_invoker)
+
+
+def test_sharded_layout_in_migrated_folder(tmp_path: Path, mock_invoker: Invoker):
+    mark_migrated(tmp_path)
+    (tmp_path / "bar.png").write_bytes(b"png")
+    image_files_disk = DiskImageFileStorage(tmp_path, layout="sharded")
+    image_files_disk.start(mock_invoker)
+
+    # Files are not looked for in the flat layout of a migrated folder
+    assert image_files_disk.get_path("bar.png") == tmp_path.resolve() / Path(*get_shard("bar.png")) / "bar.png"
+    # The thumbnails folders are new, so they are migrated too
+    assert is_migrated(tmp_path / "thumbnails")
+    image_files_disk.stop(mock_invoker)
+
+
+@pytest.fixture
+def image() -> Image.Image:
+    return Image.new("RGB", (64, 64), color=(255, 0, 0))
+
+
+def test_save_in_background(tmp_path: Path, mock_invoker: Invoker, image: Image.Image):
+    image_files_disk = DiskImageFileStorage(tmp_path, save_threads=2)
+    image_files_disk.start(mock_invoker)
+
+    image_files_disk.save(image, "foo.png", metadata='{"seed": 1}', session_id="session")
+    assert image_files_disk.get("foo.png") is image
+
+    image_files_disk.flush_session("session")
+    assert image_files_disk.get_path("foo.png").exists()
+    assert image_files_disk.get_path("foo.png", thumbnail=True).exists()
+    with Image.open(image_files_disk.get_path("foo.png")) as saved:
+        assert saved.info["invokeai_metadata"] == '{"seed": 1}'
+    image_files_disk.stop(mock_invoker)
+
+
+def test_pending_image_is_readable(
+    tmp_path: Path, mock_invoker: Invoker, image: Image.Image, monkeypatch: pytest.MonkeyPatch
+):
+    # The cache is too small to hold the image, so it can only be read while pending
+    image_files_disk = DiskImageFileStorage(tmp_path, cache=ObjectCache(0), save_threads=1)
+    image_files_disk.start(mock_invoker)
+
+    written = Event()
+
+    def make_thumbnail(image: Image.Image, size: int) -> Image.Image:
+        written.wait(timeout=10)
+        return image.copy()
+
+    monkeypatch.setattr("invokeai.app.services.image_files.image_files_disk.make_thumbnail", make_thumbnail)
+
+    image_files_disk.save(image, "foo.png", session_id="session")
+    assert image_files_disk.get("foo.png") is image
+    assert not image_files_disk.get_path("foo.png", thumbnail=True).exists()
+
+    written.set()
+    image_files_disk.flush(["foo.png"])
+    assert image_files_disk.get_path("foo.png", thumbnail=True).exists()
+    assert image_files_disk.get("foo.png") is not image
+    image_files_disk.stop(mock_invoker)
+
+
+def test_background_save_errors_are_raised_by_flush(tmp_path: Path, mock_invoker: Invoker):
+    image_files_disk = DiskImageFileStorage(tmp_path, save_threads=1)
+    image_files_disk.start(mock_invoker)
+
+    # PNG does not support CMYK, so the write fails
+    image_files_disk.save(Image.new("CMYK", (8, 8)), "foo.png", session_id="session")
+    image_files_disk.save(Image.new("RGB", (8, 8)), "bar.png", session_id="session")
+
+    # Waiting for the images leaves the error for the session to report
+    image_files_disk.wait_for_pending(["foo.png"])
+    with pytest.raises(ImageFileSaveException, match="foo.png"):
+        image_files_disk.flush_session("session")
+    # Errors are only raised once, and images that failed to be written are not readable
+    image_files_disk.flush_session("session")
+    with pytest.raises(ImageFileNotFoundException):
+        image_files_disk.get("foo.png")
+    assert image_files_disk.get_path("bar.png").exists()
+    image_files_disk.stop(mock_invoker)
+
+
+def test_background_save_errors_are_raised_by_their_session(tmp_path: Path, mock_invoker: Invoker):
+    image_files_disk = DiskImageFileStorage(tmp_path, save_threads=1)
+    image_files_disk.start(mock_invoker)
+
+    image_files_disk.save(Image.new("CMYK", (8, 8)), "foo.png", session_id="foo")
+    image_files_disk.save(Image.new("RGB", (8, 8)), "bar.png", session_id="bar")
+
+    image_files_disk.flush_session("bar")
+    with pytest.raises(ImageFileSaveException, match="foo.png"):
+        image_files_disk.flush_session("foo")
+    image_files_disk.stop(mock_invoker)
+
+
+def test_save_outside_session_is_not_in_background(tmp_path: Path, mock_invoker: Invoker, image: Image.Image):
+    image_files_disk = DiskImageFileStorage(tmp_path, save_threads=1)
+    image_files_disk.start(mock_invoker)
+
+    image_files_disk.save(image, "foo.png")
+    assert image_files_disk.get_path("foo.png").exists()
+    with pytest.raises(ImageFileSaveException):
+        image_files_disk.save(Image.new("CMYK", (8, 8)), "bar.png")
+    image_files_disk.stop(mock_invoker)
+
+
+def test_save_without_threads(tmp_path: Path, mock_invoker: Invoker, image: Image.Image):
+    image_files_disk = DiskImageFileStorage(tmp_path)
+    image_files_disk.start(mock_invoker)
+
+    image_files_disk.save(image, "foo.png")
+    assert image_files_disk.get_path("foo.png").exists()
+
+    with pytest.raises(ImageFileSaveException):
+        image_files_disk.save(Image.new("CMYK", (8, 8)), "bar.png")
+    with pytest.raises(ImageFileNotFoundException):
+        image_files_disk.get("bar.png")
+
+
+@pytest.mark.slow
+def test_benchmark_save_in_background(tmp_path: Path, mock_invoker: Invoker):
+    images = [Image.effect_noise((2048, 2048), 64).convert("RGB") for _ in range(4)]
+
+    for save_threads in [0, 2]:
+        image_files_disk = DiskImageFileStorage(tmp_path / str(save_threads), save_threads=save_threads)
+        image_files_disk.start(mock_invoker)
+
+        start = time.perf_counter()
+        for i, image in enumerate(images):
+            image_files_disk.save(image, f"{i}.png", session_id="session")
+        blocked_elapsed = time.perf_counter() - start
+        image_files_disk.flush()
+        total_elapsed = time.perf_counter() - start
+        image_files_disk.stop(mock_invoker)
+
+        print(
+            f"\n{len(images)} 2048px images with {save_threads} save threads: "
+            f"caller blocked {blocked_elapsed * 1000:.1f}ms, written after {total_elapsed * 1000:.1f}ms"
+        )
+
+
+def test_get_workflow_reads_text_chunks(tmp_path: Path, mock_invoker: Invoker, image: Image.Image):
+    cache = ObjectCache(2**30)
+    image_files_disk = DiskImageFileStorage(tmp_path, cache=cache)
+    image_files_disk.start(mock_invoker)
+    image_files_disk.save(image, "foo.png", workflow='{"nodes": []}', graph='{"edges": []}')
+    cache.clear()
+
+    assert image_files_disk.get_workflow("foo.png") == '{"nodes": []}'
+    assert image_files_disk.get_graph("foo.png") == '{"edges": []}'
+    # The image is not opened or cached just to read its text
+    assert cache.size_bytes == 0
+    with pytest.raises(ImageFileNotFoundException):
+        image_files_disk.get_workflow("missing.png")
+
+
+@pytest.mark.skipif(not is_thumbnail_format_available("avif"), reason="PIL cannot write AVIF (Pillow 11.2+)")
+def test_get_thumbnail_path(tmp_path: Path, mock_invoker: Invoker):
+    image_files_disk = DiskImageFileStorage(tmp_path)
+    image_files_disk.start(mock_invoker)
+    image_files_disk.save(Image.new("RGB", (1024, 512)), "foo.png")
+
+    default_path = image_files_disk.get_thumbnail_path("foo.png")
+    assert default_path == image_files_disk.get_path("foo.png", thumbnail=True)
+
+    large_path = image_files_disk.get_thumbnail_path("foo.png", 512)
+    assert large_path == tmp_path / "thumbnails" / "512" / "foo.webp"
+    with Image.open(large_path) as thumbnail:
+        assert (thumbnail.format, thumbnail.size) == ("WEBP", (512, 256))
+
+    small_path = image_files_disk.get_thumbnail_path("foo.png", 128, "avif")
+    assert small_path == tmp_path / "thumbnails" / "128" / "foo.avif"
+    with Image.open(small_path) as thumbnail:
+        assert (thumbnail.format, thumbnail.size) == ("AVIF", (128, 64))
+    assert sorted(p.name for p in small_path.parent.iterdir()) == ["foo.avif"]
+
+    # A missing default thumbnail is made again
+    default_path.unlink()
+    assert image_files_disk.get_thumbnail_path("foo.png").exists()
+
+    image_files_disk.delete("foo.png")
+    assert not large_path.exists() and not small_path.exists()
+    with pytest.raises(ImageFileNotFoundException):
+        image_files_disk.get_thumbnail_path("foo.png", 512)
+    image_files_disk.stop(mock_invoker)
+
+
+def test_get_thumbnail_path_makes_thumbnail_once(
+    tmp_path: Path, mock_invoker: Invoker, image: Image.Image, monkeypatch: pytest.MonkeyPatch
+):
+    image_files_disk = DiskImageFileStorage(tmp_path, thumbnail_threads=4)
+    image_files_disk.start(mock_invoker)
+    image_files_disk.save(image, "foo.png")
+
+    calls: list[Path] = []
+    started = Event()
+    release = Event()
+
+    def mock_save_thumbnail(image_path: Path, thumbnail_path: Path, size: int, format: str) -> None:
+        calls.append(thumbnail_path)
+        started.set()
+        release.wait(timeout=10)
+        save_thumbnail(image_path, thumbnail_path, size, format)  # type: ignore
+
+    monkeypatch.setattr("invokeai.app.services.image_files.image_files_disk.save_thumbnail", mock_save_thumbnail)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        paths = [executor.submit(image_files_disk.get_thumbnail_path, "foo.png", 512) for _ in range(4)]
+        started.wait(timeout=10)
+        release.set()
+        assert len({p.result() for p in paths}) == 1
+    assert len(calls) == 1
+    image_files_disk.stop(mock_invoker)
+
+
+def test_get_thumbnail_path_with_a_job_that_is_already_done(
+    tmp_path: Path, mock_invoker: Invoker, image: Image.Image, monkeypatch: pytest.MonkeyPatch
+):
+    image_files_disk = DiskImageFileStorage(tmp_path)
+    image_files_disk.start(mock_invoker)
+    image_files_disk.save(image, "foo.png")
+
+    def submit_and_wait(fn, *args) -> Future[None]:
+        future: Future[None] = Future()
+        future.set_result(fn(*args))
+        return future
+
+    # The job finishes before `get_thumbnail_path()` registers its callback, which then runs right away
+    executor = image_files_disk._DiskImageFileStorage__thumbnail_executor  # type: ignore
+    monkeypatch.setattr(executor, "submit", submit_and_wait)
+
+    thumbnail_paths: list[Path] = []
+
+    def get_thumbnail_paths() -> None:
+        for size in (256, 512):
+            thumbnail_paths.append(image_files_disk.get_thumbnail_path("foo.png", size))
+
+    # In a daemon thread, so a deadlock fails the test rather than hanging it
+    caller = Thread(target=get_thumbnail_paths, daemon=True)
+    caller.start()
+    caller.join(timeout=10)
+    assert not caller.is_alive()
+    assert len(thumbnail_paths) == 2 and all(path.exists() for path in thumbnail_paths)
+    image_files_disk.stop(mock_invoker)
@@ -0,0 +1,375 @@
+import json
+import sqlite3
+import time
+from logging import Logger
+from typing import Any, Optional
+
+import pytest
+
+from invokeai.app.services.config.config_default import InvokeAIAppConfig
+from invokeai.app.services.image_records.image_records_common import ImageCategory, ResourceOrigin
+from invokeai.app.services.image_records.image_records_sqlite import SqliteImageRecordStorage
+from invokeai.app.services.shared.pagination import InvalidCursorError
+from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
+from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
+from invokeai.app.services.shared.sqlite_migrator.migrations import migration_28
+from invokeai.app.services.shared.sqlite_migrator.migrations.migration_28 import Migration28Callback
+from tests.fixtures.sqlite_database import create_mock_sqlite_database
+
+
+@pytest.fixture
+def db() -> SqliteDatabase:
+    return create_mock_sqlite_database(InvokeAIAppConfig(use_memory_db=True), Logger("test_image_records_sqlite"))
+
+
+@pytest.fixture
+def image_records(db: SqliteDatabase) -> SqliteImageRecordStorage:
+    return SqliteImageRecordStorage(db=db)
+
+
+def make_metadata(
+    positive_prompt: str, negative_prompt: str = "", model: str = "sdxl-base", loras: Optional[list[str]] = None
+) -> str:
+    metadata: dict[str, Any] = {
+        "positive_prompt": positive_prompt,
+        "negative_prompt": negative_prompt,
+        "model": {"key": "abc", "hash": "def", "name": model, "base": "sdxl", "type": "main"},
+        "loras": [{"model": {"key": name, "hash": name, "name": name}, "weight": 0.75} for name in loras or []],
+        "seed": 123456789,
+        "scheduler": "euler_a",
+    }
+    return json.dumps(metadata)
+
+
+def save_image(
+    image_records: SqliteImageRecordStorage, image_name: str, metadata: Optional[str], starred: bool = False
+) -> None:
+    image_records.save(
+        image_name=image_name,
+        image_origin=ResourceOrigin.INTERNAL,
+        image_category=ImageCategory.GENERAL,
+        width=512,
+        height=512,
+        has_workflow=False,
+        starred=starred,
+        metadata=metadata,
+    )
+
+
+def search(image_records: SqliteImageRecordStorage, search_term: str, starred_first: bool = False) -> list[str]:
+    names = image_records.get_image_names(search_term=search_term, starred_first=starred_first).image_names
+    page = image_records.get_many(search_term=search_term, starred_first=starred_first, limit=100)
+    # Both search paths return the same images in the same order
+    assert [r.image_name for r in page.items] == names
+    assert page.total == len(names)
+    return names
+
+
+def test_search_matches_metadata_fields(image_records: SqliteImageRecordStorage):
+    save_image(image_records, "cat.png", make_metadata("A fluffy Cat on a sofa", "blurry", loras=["pixel-art"]))
+    save_image(image_records, "dog.png", make_metadata("a dog in the park", model="flux-dev"))
+    save_image(image_records, "none.png", None)
+
+    assert search(image_records, "fluffy cat") == ["cat.png"]
+    # Matches are substrings and case-insensitive
+    assert search(image_records, "LUFF") == ["cat.png"]
+    assert search(image_records, "blurry") == ["cat.png"]
+    assert search(image_records, "flux") == ["dog.png"]
+    assert search(image_records, "pixel-art") == ["cat.png"]
+    assert sorted(search(image_records, "euler")) == ["cat.png", "dog.png"]
+    assert search(image_records, "giraffe") == []
+
+
+def test_search_matches_created_at(image_records: SqliteImageRecordStorage):
+    save_image(image_records, "cat.png", make_metadata("a cat"))
+    created_at = image_records.get("cat.png").created_at
+    assert search(image_records, str(created_at)[:10]) == ["cat.png"]
+
+
+def test_search_escapes_query_syntax(image_records: SqliteImageRecordStorage):
+    save_image(image_records, "quoted.png", make_metadata('a "quoted" (prompt) AND NOT* more'))
+    save_image(image_records, "other.png", make_metadata("something else"))
+
+    assert search(image_records, '"quoted"') == ["quoted.png"]
+    assert search(image_records, "(prompt) AND NOT*") == ["quoted.png"]
+
+
+def test_search_short_terms(image_records: SqliteImageRecordStorage):
+    save_image(image_records, "cat.png", make_metadata("a cat"))
+    save_image(image_records, "dog.png", make_metadata("a dog"))
+
+    # Terms too short for the trigram index are still matched
+    assert search(image_records, "og") == ["dog.png"]
+    assert sorted(search(image_records, "a")) == ["cat.png", "dog.png"]
+
+
+def test_search_tracks_updates_and_deletes(db: SqliteDatabase, image_records: SqliteImageRecordStorage):
+    save_image(image_records, "cat.png", make_metadata("a cat"))
+    assert search(image_records, "cat") == ["cat.png"]
+
+    with db.transaction() as cursor:
+        cursor.execute("UPDATE images SET metadata = ? WHERE image_name = 'cat.png';", (make_metadata("a tiger"),))
+    assert search(image_records, "cat") == []
+    assert search(image_records, "tiger") == ["cat.png"]
+
+    image_records.delete("cat.png")
+    assert search(image_records, "tiger") == []
+    with db.read() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM image_search;")
+        assert cursor.fetchone()[0] == 0
+        # The full-text index is consistent with its content table
+        cursor.execute("INSERT INTO images_fts (images_fts, rank) VALUES ('integrity-check', 1);")
+
+
+def test_search_orders_by_rank(image_records: SqliteImageRecordStorage):
+    save_image(image_records, "once.png", make_metadata("a castle by the sea, with a moat"))
+    save_image(image_records, "twice.png", make_metadata("castle, castle on a hill"), starred=True)
+    save_image(image_records, "thrice.png", make_metadata("castle castle castle"))
+
+    assert search(image_records, "castle") == ["thrice.png", "twice.png", "once.png"]
+    assert search(image_records, "castle", starred_first=True) == ["twice.png", "thrice.png", "once.png"]
+    assert image_records.get_image_names(search_term="castle", starred_first=True).starred_count == 1
+
+
+def test_search_ignores_invalid_metadata(db: SqliteDatabase, image_records: SqliteImageRecordStorage):
+    save_image(image_records, "bad.png", "{not json")
+    save_image(image_records, "cat.png", make_metadata("a cat"))
+    assert search(image_records, "cat") == ["cat.png"]
+
+
+def test_migration_28_indexes_existing_images():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    cursor.execute(
+        """--sql
+        CREATE TABLE images (
+            image_name TEXT NOT NULL PRIMARY KEY,
+            metadata TEXT,
+            created_at DATETIME NOT NULL DEFAULT(STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW'))
+        );
+        """
+    )
+    cursor.executemany(
+        "INSERT INTO images (image_name, metadata) VALUES (?, ?);",
+        [("cat.png", make_metadata("a cat", loras=["fur"])), ("bad.png", "{not json"), ("none.png", None)],
+    )
+
+    Migration28Callback(logger=Logger("test_migration_28"))(cursor)
+
+    cursor.execute("SELECT image_name, positive_prompt, loras FROM image_search ORDER BY image_name;")
+    assert cursor.fetchall() == [("bad.png", "", None), ("cat.png", "a cat", "fur"), ("none.png", "", None)]
+    cursor.execute(
+        """--sql
+        SELECT image_search.image_name FROM images_fts
+        INNER JOIN image_search ON image_search.id = images_fts.rowid
+        WHERE images_fts MATCH '"fur"';
+        """
+    )
+    assert cursor.fetchall() == [("cat.png",)]
+
+
+def test_search_without_fts5(monkeypatch: pytest.MonkeyPatch):
+    # E.g. SQLite older than 3.34, which has no trigram tokenizer
+    monkeypatch.setattr(migration_28, "is_fts5_trigram_available", lambda cursor: False)
+    db = create_mock_sqlite_database(InvokeAIAppConfig(use_memory_db=True), Logger("test_image_records_sqlite"))
+    image_records = SqliteImageRecordStorage(db=db)
+    with db.read() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'images_fts';")
+        assert cursor.fetchone()[0] == 0
+
+    save_image(image_records, "cat.png", make_metadata("A fluffy Cat on a sofa"))
+    save_image(image_records, "dog.png", make_metadata("a dog in the park"))
+
+    assert search(image_records, "fluffy cat") == ["cat.png"]
+    assert search(image_records, "og") == ["dog.png"]
+    image_records.delete("cat.png")
+    assert search(image_records, "fluffy") == []
+
+
+def get_all_by_cursor(image_records: SqliteImageRecordStorage, limit: int, **kwargs: Any) -> list[str]:
+    names: list[str] = []
+    cursor: Optional[str] = None
+    while True:
+        page = image_records.get_many_by_cursor(limit=limit, cursor=cursor, **kwargs)
+        assert len(page.items) <= limit
+        names.extend(r.image_name for r in page.items)
+        if page.next_cursor is None:
+            return names
+        cursor = page.next_cursor
+
+
+@pytest.mark.parametrize("starred_first", [True, False])
+@pytest.mark.parametrize("order_dir", [SQLiteDirection.Descending, SQLiteDirection.Ascending])
+def test_get_many_by_cursor_pages_through_all_images(
+    db: SqliteDatabase, image_records: SqliteImageRecordStorage, starred_first: bool, order_dir: SQLiteDirection
+):
+    for i in range(23):
+        save_image(image_records, f"{i:02d}.png", make_metadata(f"image {i}"), starred=i % 5 == 0)
+    # Some images share a creation date, so the image name must break the tie
+    with db.transaction() as cursor:
+        cursor.execute("UPDATE images SET created_at = '2024-01-01 00:00:00.000' WHERE image_name < '10';")
+
+    expected = image_records.get_many(limit=100, starred_first=starred_first, order_dir=order_dir).items
+    names = get_all_by_cursor(image_records, 4, starred_first=starred_first, order_dir=order_dir)
+    assert sorted(names) == sorted(r.image_name for r in expected)
+    assert len(set(names)) == 23
+    if starred_first:
+        assert all(name in {"00.png", "05.png", "10.png", "15.png", "20.png"} for name in names[:5])
+
+
+def test_get_many_by_cursor_with_search(image_records: SqliteImageRecordStorage):
+    for i in range(10):
+        save_image(image_records, f"castle-{i}.png", make_metadata("castle " * (i % 3 + 1)))
+        save_image(image_records, f"dog-{i}.png", make_metadata("a dog"))
+
+    names = get_all_by_cursor(image_records, 3, search_term="castle", starred_first=False)
+    assert sorted(names) == sorted(f"castle-{i}.png" for i in range(10))
+
+
+def test_get_many_by_cursor_with_search_is_stable(image_records: SqliteImageRecordStorage):
+    for i in range(6):
+        save_image(image_records, f"castle-{i}.png", make_metadata("castle " * (i + 1)))
+    kwargs: dict[str, Any] = {"search_term": "castle", "starred_first": False, "order_dir": SQLiteDirection.Ascending}
+
+    first_page = image_records.get_many_by_cursor(limit=3, **kwargs)
+    assert first_page.next_cursor is not None
+    # Adding matches changes the rank of every match, but not the position of the cursor
+    for i in range(6):
+        save_image(image_records, f"new-{i}.png", make_metadata("castle " * (6 - i)))
+    second_page = image_records.get_many_by_cursor(limit=3, cursor=first_page.next_cursor, **kwargs)
+
+    names = [r.image_name for r in first_page.items + second_page.items]
+    assert names == [f"castle-{i}.png" for i in range(6)]
+
+
+def test_get_many_by_cursor_counts_until_next_write(image_records: SqliteImageRecordStorage):
+    for i in range(5):
+        save_image(image_records, f"{i}.png", make_metadata("a cat"))
+
+    page = image_records.get_many_by_cursor(limit=2)
+    assert page.total is None
+    assert image_records.get_many_by_cursor(limit=2, include_total=True).total == 5
+    assert image_records.get_many_by_cursor(limit=2, include_total=True, search_term="dog").total == 0
+
+    save_image(image_records, "dog.png", make_metadata("a dog"))
+    assert image_records.get_many_by_cursor(limit=2, include_total=True).total == 6
+    assert image_records.get_many_by_cursor(limit=2, include_total=True, search_term="dog").total == 1
+    image_records.delete("dog.png")
+    assert image_records.get_many(limit=2).total == 5
+
+
+def test_get_many_by_cursor_rejects_invalid_cursors(image_records: SqliteImageRecordStorage):
+    for i in range(3):
+        save_image(image_records, f"{i}.png", make_metadata("a cat"))
+    page = image_records.get_many_by_cursor(limit=1, starred_first=True)
+    assert page.next_cursor is not None
+
+    with pytest.raises(InvalidCursorError):
+        image_records.get_many_by_cursor(limit=1, cursor="not a cursor")
+    # The cursor holds the sort key of a listing with a different order
+    with pytest.raises(InvalidCursorError):
+        image_records.get_many_by_cursor(limit=1, cursor=page.next_cursor, starred_first=False)
+    # The cursor has as many keys as a listing in the other direction, but was made for this one
+    with pytest.raises(InvalidCursorError):
+        image_records.get_many_by_cursor(
+            limit=1, cursor=page.next_cursor, starred_first=True, order_dir=SQLiteDirection.Ascending
+        )
+
+
+def test_get_many_by_cursor_uses_index(db: SqliteDatabase):
+    with db.read() as cursor:
+        cursor.execute(
+            """--sql
+            EXPLAIN QUERY PLAN
+            SELECT image_name FROM images
+            ORDER BY starred DESC, created_at DESC, image_name DESC
+            LIMIT 10;
+            """
+        )
+        plan = " ".join(row[3] for row in cursor.fetchall())
+    assert "idx_images_starred_created_at_image_name" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.slow
+def test_benchmark_search(db: SqliteDatabase, image_records: SqliteImageRecordStorage):
+    count = 500_000
+    subjects = ["cat", "dog", "castle", "forest", "robot", "portrait", "city", "ocean", "mountain", "spaceship"]
+    styles = ["oil painting", "photograph", "watercolor", "pixel art", "charcoal sketch", "3d render"]
+
+    start = time.perf_counter()
+    with db.transaction() as cursor:
+        cursor.executemany(
+            """--sql
+            INSERT INTO images (image_name, image_origin, image_category, width, height, metadata, has_workflow)
+            VALUES (?, 'internal', 'general', 512, 512, ?, FALSE);
+            """,
+            (
+                (
+                    f"{i:08d}.png",
+                    make_metadata(
+                        f"a {styles[i % len(styles)]} of a {subjects[i % len(subjects)]} number {i}",
+                        "blurry, lowres",
+                        loras=[f"lora-{i % 50}"],
+                    ),
+                )
+                for i in range(count)
+            ),
+        )
+    print(f"\nInserted and indexed {count} images in {time.perf_counter() - start:.2f}s")
+
+    like_query = """--sql
+    SELECT images.image_name
+    FROM images
+    LEFT JOIN board_images ON board_images.image_name = images.image_name
+    WHERE images.metadata LIKE ? OR images.created_at LIKE ?
+    ORDER BY images.starred DESC, images.created_at DESC
+    LIMIT 100;
+    """
+
+    for term in ["spaceship", "number 123456", "lora-7"]:
+        start = time.perf_counter()
+        with db.read() as cursor:
+            cursor.execute(like_query, (f"%{term}%", f"%{term}%"))
+            cursor.fetchall()
+        like_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        image_records.get_many(search_term=term, limit=100)
+        match_elapsed = time.perf_counter() - start
+
+        print(f"Search '{term}': LIKE {like_elapsed * 1000:.1f}ms, MATCH {match_elapsed * 1000:.1f}ms")
+
+
+@pytest.mark.slow
+def test_benchmark_deep_pages(db: SqliteDatabase, image_records: SqliteImageRecordStorage):
+    count = 200_000
+    with db.transaction() as cursor:
+        cursor.executemany(
+            """--sql
+            INSERT INTO images (image_name, image_origin, image_category, width, height, has_workflow, starred)
+            VALUES (?, 'internal', 'general', 512, 512, FALSE, ?);
+            """,
+            ((f"{i:08d}.png", i % 100 == 0) for i in range(count)),
+        )
+
+    limit = 100
+    pages = 50
+    offset = count - pages * limit
+
+    start = time.perf_counter()
+    for page in range(pages):
+        image_records.get_many(offset=offset + page * limit, limit=limit)
+    offset_elapsed = time.perf_counter() - start
+
+    # Get the cursor for the same position
+    cursor_ = image_records.get_many_by_cursor(limit=offset).next_cursor
+    start = time.perf_counter()
+    for _ in range(pages):
+        cursor_ = image_records.get_many_by_cursor(limit=limit, cursor=cursor_).next_cursor
+    cursor_elapsed = time.perf_counter() - start
+
+    print(
+        f"\n{pages} pages of {limit} from offset {offset} of {count} images: "
+        f"offset {offset_elapsed * 1000:.1f}ms, cursor {cursor_elapsed * 1000:.1f}ms"
+    )
@@ -0,0 +1,101 @@
+# pyright: reportPrivateUsage=false
+import time
+
+import pytest
+
+from invokeai.app.services.image_records.image_records_common import ImageCategory, ResourceOrigin
+from invokeai.app.services.image_records.image_records_sqlite import SqliteImageRecordStorage
+from invokeai.app.services.images.images_default import ImageService
+from invokeai.app.services.invocation_services import InvocationServices
+from invokeai.app.services.invoker import Invoker
+from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
+from invokeai.app.services.urls.urls_default import LocalUrlService
+
+
+@pytest.fixture
+def db(mock_services: InvocationServices) -> SqliteDatabase:
+    return mock_services.board_image_records._db  # type: ignore
+
+
+@pytest.fixture
+def images(mock_services: InvocationServices, db: SqliteDatabase) -> ImageService:
+    mock_services.image_records = SqliteImageRecordStorage(db=db)
+    mock_services.urls = LocalUrlService()
+    images = ImageService()
+    images.start(Invoker(services=mock_services))
+    return images
+
+
+def save_images(mock_services: InvocationServices, count: int, board_every: int = 2) -> tuple[list[str], str]:
+    board_id = mock_services.board_records.save("board").board_id
+    image_names: list[str] = []
+    for i in range(count):
+        image_name = f"{i:04d}.png"
+        mock_services.image_records.save(
+            image_name=image_name,
+            image_origin=ResourceOrigin.INTERNAL,
+            image_category=ImageCategory.GENERAL,
+            width=512,
+            height=512,
+            has_workflow=False,
+        )
+        if i % board_every == 0:
+            mock_services.board_image_records.add_image_to_board(board_id=board_id, image_name=image_name)
+        image_names.append(image_name)
+    return image_names, board_id
+
+
+def count_queries(db: SqliteDatabase) -> list[str]:
+    queries: list[str] = []
+    db._conn.set_trace_callback(lambda q: queries.append(q) if "SELECT" in q else None)
+    return queries
+
+
+def test_get_many_by_names(mock_services: InvocationServices, db: SqliteDatabase, images: ImageService):
+    image_names, board_id = save_images(mock_services, 50)
+    requested = list(reversed(image_names)) + ["missing.png"]
+
+    queries = count_queries(db)
+    dtos = images.get_many_by_names(requested)
+
+    # Order is kept, and missing images are skipped
+    assert [dto.image_name for dto in dtos] == list(reversed(image_names))
+    assert all(dto.board_id == (board_id if int(dto.image_name[:4]) % 2 == 0 else None) for dto in dtos)
+    # One query for the records and one for the boards
+    assert len(queries) == 2
+    assert dtos[0] == images.get_dto(dtos[0].image_name)
+
+
+def test_get_many_uses_batched_board_lookup(
+    mock_services: InvocationServices, db: SqliteDatabase, images: ImageService
+):
+    _, board_id = save_images(mock_services, 30)
+
+    queries = count_queries(db)
+    page = images.get_many(limit=20)
+    assert len(page.items) == 20
+    assert {dto.board_id for dto in page.items} == {board_id, None}
+    # The page, its count and the boards
+    assert len(queries) == 3
+
+
+@pytest.mark.slow
+def test_benchmark_get_many_by_names(mock_services: InvocationServices, db: SqliteDatabase, images: ImageService):
+    image_names, _ = save_images(mock_services, 500)
+
+    queries = count_queries(db)
+    start = time.perf_counter()
+    for name in image_names:
+        images.get_dto(name)
+    per_name_elapsed = time.perf_counter() - start
+    per_name_queries = len(queries)
+
+    queries.clear()
+    start = time.perf_counter()
+    images.get_many_by_names(image_names)
+    batched_elapsed = time.perf_counter() - start
+
+    print(
+        f"\n{len(image_names)} DTOs: per name {per_name_elapsed * 1000:.1f}ms ({per_name_queries} queries), "
+        f"batched {batched_elapsed * 1000:.1f}ms ({len(queries)} queries)"
+    )
@@ -62,6 +62,17 @@ def test_load_from_path(mock_context: InvocationContext, embedding_file: Path) -
     assert torch.equal(loaded_model_1.model["emb_params"], loaded_model_3.model["emb_params"])
 
 
+def test_load_from_path_with_other_suffix(
+    mock_context: InvocationContext, embedding_file: Path, tmp_path: Path
+) -> None:
+    # Files that aren't torch checkpoints are loaded as safetensors, whatever their suffix
+    sft_file = tmp_path / "test_embedding.sft"
+    sft_file.write_bytes(embedding_file.read_bytes())
+    loaded_model = mock_context.models.load_local_model(sft_file)
+    assert isinstance(loaded_model.model, dict)
+    assert "emb_params" in loaded_model.model
+
+
 @pytest.mark.skip(reason="This requires a test model to load")
 def test_load_from_dir(mock_context: InvocationContext, vae_directory: Path) -> None:
     loaded_model = mock_context.models.load_local_model(vae_directory)
@@ -0,0 +1,127 @@
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+
+from invokeai.app.invocations.model import (
+    CLIPField,
+    LoRAField,
+    LoRALoaderInvocation,
+    MainModelLoaderInvocation,
+    ModelIdentifierField,
+)
+from invokeai.app.services.invocation_services import InvocationServices
+from invokeai.app.services.invoker import Invoker
+from invokeai.app.services.model_manager import ModelManagerServiceBase
+from invokeai.app.services.model_prefetch.model_prefetch_default import ModelPrefetchService, get_model_identifiers
+from invokeai.app.services.session_queue.session_queue_common import DEFAULT_QUEUE_ID, Batch, SessionQueueItem
+from invokeai.app.services.session_queue.session_queue_sqlite import SqliteSessionQueue
+from invokeai.app.services.shared.graph import Graph
+from invokeai.backend.model_manager.load.model_cache.cache_stats import CacheStats
+from invokeai.backend.model_manager.taxonomy import SubModelType
+from tests.backend.model_manager.model_manager_fixtures import *  # noqa F403
+from tests.fixtures.sqlite_database import create_mock_sqlite_database
+
+
+@pytest.fixture
+def invoker(mock_services: InvocationServices, mm2_model_manager: ModelManagerServiceBase) -> Invoker:
+    db = create_mock_sqlite_database(mock_services.configuration, mock_services.logger)
+    mock_services.session_queue = SqliteSessionQueue(db=db)
+    invoker = Invoker(services=mock_services)
+    # The model manager fixture is already started
+    mock_services.model_manager = mm2_model_manager
+    return invoker
+
+
+@pytest.fixture
+def prefetch_service(invoker: Invoker):
+    service = ModelPrefetchService(lookahead=1)
+    service.start(invoker)
+    yield service
+    service.stop()
+
+
+def identifier(invoker: Invoker, key: str) -> ModelIdentifierField:
+    return ModelIdentifierField.from_config(invoker.services.model_manager.store.get_model(key))
+
+
+def enqueue(invoker: Invoker, graph: Graph) -> None:
+    asyncio.run(invoker.services.session_queue.enqueue_batch(DEFAULT_QUEUE_ID, Batch(graph=graph), prepend=False))
+
+
+def dequeue(invoker: Invoker) -> SessionQueueItem:
+    queue_item = invoker.services.session_queue.dequeue()
+    assert queue_item is not None
+    return queue_item
+
+
+def test_get_model_identifiers(invoker: Invoker):
+    main = identifier(invoker, "test_config_2")
+    lora = identifier(invoker, "test_config_5")
+    clip = CLIPField(
+        tokenizer=main.model_copy(update={"submodel_type": SubModelType.Tokenizer}),
+        text_encoder=main.model_copy(update={"submodel_type": SubModelType.TextEncoder}),
+        loras=[LoRAField(lora=lora, weight=0.5)],
+        skipped_layers=0,
+    )
+    node = LoRALoaderInvocation(id="1", lora=lora, clip=clip)
+
+    identifiers = list(get_model_identifiers(node))
+
+    assert [(i.key, i.submodel_type) for i in identifiers] == [
+        ("test_config_5", None),
+        ("test_config_2", SubModelType.Tokenizer),
+        ("test_config_2", SubModelType.TextEncoder),
+        ("test_config_5", None),
+    ]
+
+
+def test_get_targets(invoker: Invoker, prefetch_service: ModelPrefetchService):
+    graph = Graph()
+    graph.add_node(MainModelLoaderInvocation(id="1", model=identifier(invoker, "test_config_3")))
+    enqueue(invoker, graph)
+    graph = Graph()
+    graph.add_node(LoRALoaderInvocation(id="1", lora=identifier(invoker, "test_config_4")))
+    enqueue(invoker, graph)
+    enqueue(invoker, graph)
+    queue_item = dequeue(invoker)
+
+    # The usual submodels of an SDXL main model, then the model in the next queued session
+    targets = prefetch_service.get_targets(queue_item)
+    assert [cache_key for cache_key, _, _ in targets] == [
+        "test_config_3:text_encoder",
+        "test_config_3:text_encoder_2",
+        "test_config_3:unet",
+        "test_config_3:vae",
+        "test_config_4",
+    ]
+
+    # Once a model is used, the submodels that were loaded for it are prefetched
+    with pytest.raises(IndexError):
+        invoker.services.model_manager.load.ram_cache.get("test_config_3:unet")
+    targets = prefetch_service.get_targets(queue_item)
+    assert [cache_key for cache_key, _, _ in targets] == ["test_config_3:unet", "test_config_4"]
+
+
+def test_prefetch(invoker: Invoker, prefetch_service: ModelPrefetchService, embedding_file: Path):
+    key = invoker.services.model_manager.install.register_path(embedding_file)
+    ram_cache = invoker.services.model_manager.load.ram_cache
+    ram_cache.stats = CacheStats()
+    prefetched = ram_cache.prefetch_stats.prefetched
+    graph = Graph()
+    graph.add_node(LoRALoaderInvocation(id="1", lora=identifier(invoker, key)))
+    enqueue(invoker, graph)
+
+    prefetch_service.prefetch(dequeue(invoker))
+    for _ in range(100):
+        if ram_cache.contains(key):
+            break
+        time.sleep(0.05)
+    assert ram_cache.contains(key)
+    assert ram_cache.prefetch_stats.prefetched == prefetched + 1
+    assert ram_cache.stats.prefetched == 0
+
+    invoker.services.model_manager.load.load_model(invoker.services.model_manager.store.get_model(key))
+    assert ram_cache.stats.misses == 0
+    assert ram_cache.stats.prefetch_hits == 1
@@ -0,0 +1,377 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from invokeai.app.services.events.events_common import BatchEnqueueProgressEvent
+from invokeai.app.services.invocation_services import InvocationServices
+from invokeai.app.services.invoker import Invoker
+from invokeai.app.services.session_queue import session_queue_sqlite
+from invokeai.app.services.session_queue.session_queue_common import (
+    DEFAULT_QUEUE_ID,
+    Batch,
+    BatchDatum,
+    create_session_nfv_tuples,
+)
+from invokeai.app.services.session_queue.session_queue_sqlite import SqliteSessionQueue
+from invokeai.app.services.shared.graph import Graph, GraphExecutionState
+from invokeai.app.services.workflow_records.workflow_records_common import WorkflowWithoutID
+from tests.fixtures.sqlite_database import create_mock_sqlite_database
+from tests.test_nodes import PromptTestInvocation, TestEventService
+
+
+@pytest.fixture
+def session_queue(mock_services: InvocationServices) -> SqliteSessionQueue:
+    db = create_mock_sqlite_database(mock_services.configuration, mock_services.logger)
+    session_queue = SqliteSessionQueue(db=db)
+    mock_services.session_queue = session_queue
+    session_queue.start(Invoker(services=mock_services))
+    return session_queue
+
+
+def make_batch(runs: int = 1) -> Batch:
+    g = Graph()
+    g.add_node(PromptTestInvocation(id="1", prompt="Banana sushi"))
+    return Batch(graph=g, runs=runs)
+
+
+def enqueue(session_queue: SqliteSessionQueue, batch: Batch, prepend: bool = False) -> list[int]:
+    result = asyncio.run(session_queue.enqueue_batch(DEFAULT_QUEUE_ID, batch, prepend=prepend))
+    return sorted(result.item_ids)
+
+
+def test_dequeue_order(session_queue: SqliteSessionQueue):
+    first = enqueue(session_queue, make_batch(runs=2))
+    prepended = enqueue(session_queue, make_batch(runs=2), prepend=True)
+
+    dequeued = []
+    while (queue_item := session_queue.dequeue()) is not None:
+        assert queue_item.status == "in_progress"
+        assert queue_item.started_at is not None
+        dequeued.append(queue_item.item_id)
+        session_queue.complete_queue_item(queue_item.item_id)
+
+    # Higher priority first, then FIFO within a priority
+    assert dequeued == prepended + first
+
+
+def test_list_queue_items_by_cursor(session_queue: SqliteSessionQueue):
+    first = enqueue(session_queue, make_batch(runs=5))
+    prepended = enqueue(session_queue, make_batch(runs=3), prepend=True)
+    session_queue.cancel_queue_item(first[0])
+
+    item_ids: list[int] = []
+    cursor = None
+    while True:
+        page = session_queue.list_queue_items_by_cursor(DEFAULT_QUEUE_ID, limit=3, cursor=cursor, include_total=True)
+        assert page.total == 8
+        item_ids.extend(item.item_id for item in page.items)
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+
+    # Same order as the queue is processed in
+    assert item_ids == prepended + first
+
+    pending = session_queue.list_queue_items_by_cursor(DEFAULT_QUEUE_ID, limit=10, status="pending", include_total=True)
+    assert [item.item_id for item in pending.items] == prepended + first[1:]
+    assert pending.total == 7
+    assert pending.next_cursor is None
+
+
+def test_dequeue_empty(session_queue: SqliteSessionQueue):
+    assert session_queue.dequeue() is None
+
+
+def test_canceled_items_are_not_dequeued(session_queue: SqliteSessionQueue):
+    batch = make_batch(runs=3)
+    item_ids = enqueue(session_queue, batch)
+    session_queue.cancel_queue_item(item_ids[0])
+    session_queue.cancel_by_batch_ids(DEFAULT_QUEUE_ID, [batch.batch_id])
+    assert session_queue.dequeue() is None
+
+
+def test_deleted_items_are_not_dequeued(session_queue: SqliteSessionQueue):
+    enqueue(session_queue, make_batch(runs=3))
+    session_queue.clear(DEFAULT_QUEUE_ID)
+    assert session_queue.dequeue() is None
+
+
+def test_retried_items_are_dequeued(session_queue: SqliteSessionQueue):
+    item_ids = enqueue(session_queue, make_batch(runs=1))
+    session_queue.cancel_queue_item(item_ids[0])
+    result = session_queue.retry_items_by_id(DEFAULT_QUEUE_ID, item_ids)
+    assert result.retried_item_ids == item_ids
+
+    queue_item = session_queue.dequeue()
+    assert queue_item is not None
+    assert queue_item.retried_from_item_id == item_ids[0]
+
+
+def test_stale_index_entries_are_skipped(session_queue: SqliteSessionQueue):
+    item_ids = enqueue(session_queue, make_batch(runs=2))
+    # Change the status behind the queue's back - the index entry is now stale
+    with session_queue._db.transaction() as cursor:
+        cursor.execute("UPDATE session_queue SET status = 'canceled' WHERE item_id = ?", (item_ids[0],))
+
+    queue_item = session_queue.dequeue()
+    assert queue_item is not None
+    assert queue_item.item_id == item_ids[1]
+
+
+def test_failed_claim_keeps_the_item_ready(session_queue: SqliteSessionQueue, monkeypatch: pytest.MonkeyPatch):
+    item_ids = enqueue(session_queue, make_batch(runs=1))
+
+    def locked():
+        raise sqlite3.OperationalError("database is locked")
+
+    with monkeypatch.context() as m:
+        m.setattr(session_queue._db, "transaction", locked)
+        with pytest.raises(sqlite3.OperationalError):
+            session_queue.dequeue()
+
+    queue_item = session_queue.dequeue()
+    assert queue_item is not None
+    assert queue_item.item_id == item_ids[0]
+
+
+def test_wait_for_ready_wakes_on_enqueue(session_queue: SqliteSessionQueue):
+    ready: list[bool] = []
+    waiter = threading.Thread(target=lambda: ready.append(session_queue.wait_for_ready(timeout=5)))
+    waiter.start()
+    time.sleep(0.05)
+    enqueue(session_queue, make_batch())
+    waiter.join(timeout=5)
+    assert ready == [True]
+
+
+def test_wait_for_ready_wakes_on_wake_waiters(session_queue: SqliteSessionQueue):
+    ready: list[bool] = []
+    waiter = threading.Thread(target=lambda: ready.append(session_queue.wait_for_ready(timeout=5)))
+    waiter.start()
+    time.sleep(0.05)
+    session_queue.wake_waiters()
+    waiter.join(timeout=5)
+    assert ready == [False]
+
+
+def test_enqueue_in_chunks(session_queue: SqliteSessionQueue, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(session_queue_sqlite, "ENQUEUE_CHUNK_SIZE", 2)
+    events = session_queue._SqliteSessionQueue__invoker.services.events
+    assert isinstance(events, TestEventService)
+
+    result = asyncio.run(session_queue.enqueue_batch(DEFAULT_QUEUE_ID, make_batch(runs=5), prepend=False))
+
+    assert result.enqueued == 5
+    assert result.item_ids == sorted(result.item_ids, reverse=True)
+    assert len(set(result.item_ids)) == 5
+    progress = [e for e in events.events if isinstance(e, BatchEnqueueProgressEvent)]
+    assert [e.enqueued for e in progress] == [2, 4, 5]
+    assert all(e.requested == 5 for e in progress)
+
+
+def test_enqueue_stops_when_the_batch_is_canceled(session_queue: SqliteSessionQueue, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(session_queue_sqlite, "ENQUEUE_CHUNK_SIZE", 2)
+    events = session_queue._SqliteSessionQueue__invoker.services.events
+    batch = make_batch(runs=5)
+    # Cancel the batch as soon as its first chunk is inserted
+    monkeypatch.setattr(
+        events,
+        "emit_batch_enqueue_progress",
+        lambda **kwargs: session_queue.cancel_by_batch_ids(DEFAULT_QUEUE_ID, [batch.batch_id]),
+    )
+
+    result = asyncio.run(session_queue.enqueue_batch(DEFAULT_QUEUE_ID, batch, prepend=False))
+
+    assert result.enqueued == 2
+    assert session_queue.dequeue() is None
+    with session_queue._db.read() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM session_queue WHERE batch_id = ?", (batch.batch_id,))
+        assert cursor.fetchone()[0] == 2
+
+
+def test_enqueue_stops_when_the_batch_is_deleted(session_queue: SqliteSessionQueue, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(session_queue_sqlite, "ENQUEUE_CHUNK_SIZE", 2)
+    events = session_queue._SqliteSessionQueue__invoker.services.events
+    batch = make_batch(runs=5)
+    monkeypatch.setattr(events, "emit_batch_enqueue_progress", lambda **kwargs: session_queue.clear(DEFAULT_QUEUE_ID))
+
+    asyncio.run(session_queue.enqueue_batch(DEFAULT_QUEUE_ID, batch, prepend=False))
+
+    assert session_queue.dequeue() is None
+    with session_queue._db.read() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM session_queue_batches WHERE batch_id = ?", (batch.batch_id,))
+        assert cursor.fetchone()[0] == 0
+
+
+def test_enqueue_continues_when_some_items_are_canceled(
+    session_queue: SqliteSessionQueue, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(session_queue_sqlite, "ENQUEUE_CHUNK_SIZE", 3)
+    events = session_queue._SqliteSessionQueue__invoker.services.events
+    batch = make_batch(runs=7)
+
+    def cancel_and_delete_newest_items(enqueued: int, **kwargs) -> None:
+        if enqueued == 3:
+            item_ids = sorted(session_queue.get_queue_item_ids(DEFAULT_QUEUE_ID).item_ids)
+            session_queue.cancel_queue_item(item_ids[-1])
+            session_queue.delete_queue_item(item_ids[-2])
+
+    monkeypatch.setattr(events, "emit_batch_enqueue_progress", cancel_and_delete_newest_items)
+
+    result = asyncio.run(session_queue.enqueue_batch(DEFAULT_QUEUE_ID, batch, prepend=False))
+
+    assert result.enqueued == 7
+    assert all(session_queue.dequeue() is not None for _ in range(5))
+    assert session_queue.dequeue() is None
+
+
+def test_failed_enqueue_leaves_nothing_to_run(session_queue: SqliteSessionQueue, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(session_queue_sqlite, "ENQUEUE_CHUNK_SIZE", 2)
+    iter_values_to_insert = session_queue_sqlite.iter_values_to_insert
+
+    def fail_after_first_chunk(**kwargs):
+        values = iter_values_to_insert(**kwargs)
+        yield next(values)
+        yield next(values)
+        raise RuntimeError("Failed to build queue item")
+
+    monkeypatch.setattr(session_queue_sqlite, "iter_values_to_insert", fail_after_first_chunk)
+    batch = make_batch(runs=5)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(session_queue.enqueue_batch(DEFAULT_QUEUE_ID, batch, prepend=False))
+
+    assert session_queue.dequeue() is None
+    with session_queue._db.read() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM session_queue WHERE batch_id = ?", (batch.batch_id,))
+        assert cursor.fetchone()[0] == 0
+
+
+def test_workflow_is_stored_once_per_batch(session_queue: SqliteSessionQueue):
+    batch = make_batch(runs=3)
+    batch.workflow = WorkflowWithoutID.model_validate(
+        {
+            "name": "test",
+            "author": "",
+            "description": "",
+            "version": "",
+            "contact": "",
+            "tags": "",
+            "notes": "",
+            "exposedFields": [],
+            "meta": {"version": "3.0.0", "category": "user"},
+            "nodes": [],
+            "edges": [],
+            "form": None,
+        }
+    )
+    item_ids = enqueue(session_queue, batch)
+
+    with session_queue._db.read() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM session_queue_batches WHERE batch_id = ?", (batch.batch_id,))
+        assert cursor.fetchone()[0] == 1
+
+    assert session_queue.get_queue_item(item_ids[0]).workflow == batch.workflow
+    queue_item = session_queue.dequeue()
+    assert queue_item is not None
+    assert queue_item.workflow == batch.workflow
+
+
+def test_batch_row_is_deleted_with_its_last_item(session_queue: SqliteSessionQueue):
+    batch = make_batch(runs=2)
+    item_ids = enqueue(session_queue, batch)
+
+    def count_batch_rows() -> int:
+        with session_queue._db.read() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM session_queue_batches WHERE batch_id = ?", (batch.batch_id,))
+            return cursor.fetchone()[0]
+
+    session_queue.delete_queue_item(item_ids[0])
+    assert count_batch_rows() == 1
+    session_queue.delete_queue_item(item_ids[1])
+    assert count_batch_rows() == 0
+
+
+def test_sessions_are_built_from_the_batch_graph(session_queue: SqliteSessionQueue):
+    batch = make_batch()
+    batch.data = [[BatchDatum(node_path="1", field_name="prompt", items=["Grape sushi", "Apple sushi"])]]
+    item_ids = enqueue(session_queue, batch)
+
+    with session_queue._db.read() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM session_queue WHERE session IS NOT NULL")
+        assert cursor.fetchone()[0] == 0
+
+    queue_items = [session_queue.get_queue_item(item_id) for item_id in item_ids]
+    assert [q.session.graph.get_node("1").prompt for q in queue_items] == ["Grape sushi", "Apple sushi"]
+    assert all(q.session.id == q.session_id for q in queue_items)
+
+    # Once saved, the stored session is used as-is
+    session = queue_items[0].session
+    session.graph.get_node("1").prompt = "Saved sushi"
+    session_queue.set_queue_item_session(item_ids[0], session)
+    assert session_queue.get_queue_item(item_ids[0]).session.graph.get_node("1").prompt == "Saved sushi"
+    assert session_queue.get_queue_item(item_ids[1]).session.graph.get_node("1").prompt == "Apple sushi"
+
+
+@pytest.mark.slow
+def test_benchmark_enqueue_and_drain(session_queue: SqliteSessionQueue):
+    count = 10_000
+    session_queue._SqliteSessionQueue__invoker.services.configuration.max_queue_size = count
+
+    start = time.perf_counter()
+    item_ids = enqueue(session_queue, make_batch(runs=count))
+    enqueue_time = time.perf_counter() - start
+    assert len(item_ids) == count
+
+    start = time.perf_counter()
+    drained = 0
+    while (queue_item := session_queue.dequeue()) is not None:
+        session_queue.complete_queue_item(queue_item.item_id)
+        drained += 1
+    drain_time = time.perf_counter() - start
+    assert drained == count
+
+    print(f"\nEnqueued {count} items in {enqueue_time:.2f}s, drained in {drain_time:.2f}s")
+
+
+@pytest.mark.slow
+def test_benchmark_batch_graph_storage(session_queue: SqliteSessionQueue):
+    count = 2_000
+    session_queue._SqliteSessionQueue__invoker.services.configuration.max_queue_size = count
+    g = Graph()
+    for i in range(50):
+        g.add_node(PromptTestInvocation(id=str(i), prompt=f"Prompt {i}"))
+    batch = Batch(
+        graph=g, data=[[BatchDatum(node_path="0", field_name="prompt", items=[f"Item {i}" for i in range(count)])]]
+    )
+
+    # Today's layout stored the full session JSON in every row
+    start = time.perf_counter()
+    full_session_bytes = sum(len(s) + len(f) for _, s, f in create_session_nfv_tuples(batch, count))
+    full_session_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    item_ids = enqueue(session_queue, batch)
+    enqueue_time = time.perf_counter() - start
+    assert len(item_ids) == count
+
+    with session_queue._db.read() as cursor:
+        cursor.execute("SELECT SUM(LENGTH(field_values) + IFNULL(LENGTH(session), 0)) FROM session_queue")
+        item_bytes = cursor.fetchone()[0]
+        cursor.execute("SELECT SUM(LENGTH(graph)) FROM session_queue_batches")
+        delta_bytes = item_bytes + cursor.fetchone()[0]
+
+    start = time.perf_counter()
+    queue_items = session_queue.list_all_queue_items(DEFAULT_QUEUE_ID)
+    read_time = time.perf_counter() - start
+    assert all(isinstance(q.session, GraphExecutionState) for q in queue_items)
+    assert delta_bytes < full_session_bytes
+
+    print(
+        f"\nFull sessions: {full_session_bytes / 1e6:.2f}MB, serialized in {full_session_time:.2f}s"
+        f"\nGraph + deltas: {delta_bytes / 1e6:.2f}MB, enqueued in {enqueue_time:.2f}s"
+        f"\nMaterialized {count} sessions in {read_time:.2f}s"
+    )
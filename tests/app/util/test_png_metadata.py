@@ -0,0 +1,103 @@
+import io
+import time
+from pathlib import Path
+
+import pytest
+from PIL import Image, PngImagePlugin
+
+from invokeai.app.util.png_metadata import INVOKEAI_TEXT_KEYS, InvalidPngError, read_png_header, read_png_text
+
+
+def make_png(pnginfo: PngImagePlugin.PngInfo, size: tuple[int, int] = (32, 16)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color=(0, 128, 255)).save(buffer, "PNG", pnginfo=pnginfo)
+    return buffer.getvalue()
+
+
+def test_read_png_header():
+    pnginfo = PngImagePlugin.PngInfo()
+    pnginfo.add_text("invokeai_metadata", '{"seed": 1}')
+    pnginfo.add_text("invokeai_workflow", '{"nodes": []}' * 100, zip=True)
+    pnginfo.add_itxt("invokeai_graph", '{"label": "ünïcödé"}')
+    pnginfo.add_itxt("other", "compressed", zip=True)
+    data = make_png(pnginfo)
+
+    header = read_png_header(io.BytesIO(data))
+
+    assert (header.width, header.height) == (32, 16)
+    with Image.open(io.BytesIO(data)) as image:
+        assert header.text == {k: v for k, v in image.info.items() if isinstance(v, str)}
+    assert header.text["invokeai_graph"] == '{"label": "ünïcödé"}'
+
+
+def test_read_png_text_keys(tmp_path: Path):
+    pnginfo = PngImagePlugin.PngInfo()
+    pnginfo.add_text("invokeai_workflow", "workflow")
+    pnginfo.add_text("other", "other")
+    path = tmp_path / "image.png"
+    path.write_bytes(make_png(pnginfo))
+
+    assert read_png_text(path, keys=INVOKEAI_TEXT_KEYS) == {"invokeai_workflow": "workflow"}
+    assert read_png_text(str(path), keys=["missing"]) == {}
+
+
+def test_read_png_text_after_pixel_data():
+    data = make_png(PngImagePlugin.PngInfo())
+    # Move the IEND chunk after a text chunk, as some tools write text after the pixel data
+    chunk = PngImagePlugin.putchunk  # type: ignore
+    buffer = io.BytesIO()
+    buffer.write(data[:-12])
+    chunk(buffer, b"tEXt", b"invokeai_graph\0graph")
+    buffer.write(data[-12:])
+
+    assert read_png_text(io.BytesIO(buffer.getvalue())) == {"invokeai_graph": "graph"}
+
+
+def test_read_png_text_truncated():
+    pnginfo = PngImagePlugin.PngInfo()
+    pnginfo.add_text("invokeai_metadata", "metadata")
+    data = make_png(pnginfo)
+
+    # The text comes before the pixel data, which is cut off
+    assert read_png_text(io.BytesIO(data[: len(data) // 2 + 60])) == {"invokeai_metadata": "metadata"}
+
+
+def test_read_png_text_not_png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8)).save(buffer, "WEBP")
+
+    with pytest.raises(InvalidPngError):
+        read_png_text(io.BytesIO(buffer.getvalue()))
+    with pytest.raises(InvalidPngError):
+        read_png_text(io.BytesIO(b""))
+
+
+@pytest.mark.slow
+def test_benchmark_read_png_text(tmp_path: Path):
+    pnginfo = PngImagePlugin.PngInfo()
+    pnginfo.add_text("invokeai_workflow", '{"nodes": []}' * 1000)
+    path = tmp_path / "image.png"
+    Image.effect_noise((4096, 4096), 64).convert("RGB").save(path, "PNG", pnginfo=pnginfo, compress_level=1)
+
+    start = time.perf_counter()
+    for _ in range(20):
+        with Image.open(path) as image:
+            image.load()
+            assert "invokeai_workflow" in image.info
+    pil_load_elapsed = (time.perf_counter() - start) / 20
+
+    start = time.perf_counter()
+    for _ in range(20):
+        with Image.open(path) as image:
+            assert "invokeai_workflow" in image.info
+    pil_open_elapsed = (time.perf_counter() - start) / 20
+
+    start = time.perf_counter()
+    for _ in range(20):
+        assert "invokeai_workflow" in read_png_text(path, keys=["invokeai_workflow"])
+    chunk_elapsed = (time.perf_counter() - start) / 20
+
+    print(
+        f"\n16 MP workflow read: PIL loaded {pil_load_elapsed * 1000:.2f}ms, PIL opened {pil_open_elapsed * 1000:.2f}ms, "
+        f"text chunks {chunk_elapsed * 1000:.2f}ms"
+    )
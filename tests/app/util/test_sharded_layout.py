@@ -0,0 +1,57 @@
+from pathlib import Path
+
+from invokeai.app.util.sharded_layout import (
+    get_layout_path,
+    get_shard,
+    get_sharded_path,
+    is_migrated,
+    is_shard_folder,
+    mark_migrated,
+    migrate_to_sharded_layout,
+    scan_layout,
+)
+
+
+def test_get_shard():
+    shard = get_shard("foo.png")
+    assert len(shard) == 2 and all(is_shard_folder(folder) for folder in shard)
+    # An image and its thumbnails share a shard
+    assert get_shard("foo.webp") == shard
+    assert get_shard("bar.png") != shard
+
+
+def test_get_layout_path(tmp_path: Path):
+    assert get_layout_path(tmp_path, "foo.png", "flat") == tmp_path / "foo.png"
+    # Files that do not exist are written to the sharded layout
+    assert get_layout_path(tmp_path, "foo.png", "sharded") == get_sharded_path(tmp_path, "foo.png")
+    # Files that have not been migrated are still found
+    (tmp_path / "foo.png").write_bytes(b"png")
+    assert get_layout_path(tmp_path, "foo.png", "sharded") == tmp_path / "foo.png"
+
+
+def test_get_layout_path_in_migrated_folder(tmp_path: Path):
+    assert not is_migrated(tmp_path)
+    mark_migrated(tmp_path)
+    assert is_migrated(tmp_path)
+    # Files are not looked for in the flat layout
+    (tmp_path / "foo.png").write_bytes(b"png")
+    assert get_layout_path(tmp_path, "foo.png", "sharded", migrated=True) == get_sharded_path(tmp_path, "foo.png")
+    assert list(scan_layout(tmp_path)) != [] and all(e.name == "foo.png" for e in scan_layout(tmp_path))
+
+
+def test_migrate_to_sharded_layout(tmp_path: Path):
+    for name in ["a.png", "b.png", "c.png"]:
+        (tmp_path / name).write_bytes(name.encode())
+    (tmp_path / "thumbnails").mkdir()
+    (tmp_path / "thumbnails" / "a.webp").write_bytes(b"webp")
+
+    assert migrate_to_sharded_layout(tmp_path, "a.png")
+    assert migrate_to_sharded_layout(tmp_path, "b.png")
+    # Running the migration again skips files that were moved
+    assert not migrate_to_sharded_layout(tmp_path, "a.png")
+
+    assert get_layout_path(tmp_path, "a.png", "sharded").read_bytes() == b"a.png"
+    assert get_layout_path(tmp_path, "a.png", "sharded") == get_sharded_path(tmp_path, "a.png")
+    assert get_layout_path(tmp_path, "c.png", "sharded") == tmp_path / "c.png"
+    # Files in both layouts are scanned, and other folders are skipped
+    assert sorted(entry.name for entry in scan_layout(tmp_path)) == ["a.png", "b.png", "c.png"]
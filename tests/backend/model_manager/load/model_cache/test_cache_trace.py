@@ -0,0 +1,114 @@
+import threading
+from pathlib import Path
+from typing import Any
+
+import pytest
+import torch
+
+from invokeai.backend.model_manager.load.model_cache import cache_trace
+from invokeai.backend.model_manager.load.model_cache.cache_trace import (
+    CacheTraceEvent,
+    CacheTraceRecorder,
+    read_cache_trace,
+    simulate_cache,
+)
+from invokeai.backend.model_manager.load.model_cache.eviction_policy import (
+    GreedyDualSizeFrequencyEvictionPolicy,
+    LRUEvictionPolicy,
+)
+from invokeai.backend.model_manager.load.model_cache.model_cache import ModelCache
+
+MODEL_SIZE = 256 * 256 * 4
+
+
+def load(cache: ModelCache, key: str) -> None:
+    try:
+        cache.get(key)
+    except IndexError:
+        cache.put(key, torch.nn.Linear(256, 256, bias=False))
+        cache.get(key)
+
+
+def test_record_trace(tmp_path: Path):
+    cache = ModelCache(
+        execution_device_working_mem_gb=0,
+        enable_partial_loading=False,
+        keep_ram_copy_of_weights=True,
+        max_ram_cache_size_gb=2.5 * MODEL_SIZE / 2**30,
+        execution_device="cpu",
+    )
+    trace_path = tmp_path / "trace.jsonl"
+    detach = CacheTraceRecorder(trace_path).attach(cache)
+
+    for key in ["a", "a", "b", "c"]:
+        load(cache, key)
+    detach()
+    load(cache, "d")
+
+    events = [(e.event, e.key, e.size) for e in read_cache_trace(trace_path)]
+    assert events == [
+        ("miss", "a", MODEL_SIZE),
+        ("hit", "a", MODEL_SIZE),
+        ("miss", "b", MODEL_SIZE),
+        ("evict", "a", 0),
+        ("miss", "c", MODEL_SIZE),
+    ]
+
+
+def test_record_trace_writes_off_the_cache_thread(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    cache = ModelCache(
+        execution_device_working_mem_gb=0,
+        enable_partial_loading=False,
+        keep_ram_copy_of_weights=True,
+        max_ram_cache_size_gb=2.5 * MODEL_SIZE / 2**30,
+        execution_device="cpu",
+    )
+    writer_threads: set[threading.Thread] = set()
+
+    def recording_open(*args: Any, **kwargs: Any):
+        writer_threads.add(threading.current_thread())
+        return open(*args, **kwargs)
+
+    monkeypatch.setattr(cache_trace, "open", recording_open, raising=False)
+    trace_path = tmp_path / "trace.jsonl"
+    detach = CacheTraceRecorder(trace_path).attach(cache)
+    for key in ["a", "b", "c"]:
+        load(cache, key)
+    detach()
+
+    # The cache's callbacks run under its lock, so the file is not written from them
+    assert writer_threads and threading.current_thread() not in writer_threads
+    assert len(list(read_cache_trace(trace_path))) == 4
+
+
+def make_trace(requests: list[tuple[str, int]]) -> list[CacheTraceEvent]:
+    return [CacheTraceEvent(event="hit", key=key, size=size) for key, size in requests]
+
+
+def test_simulate_cache():
+    # A small text encoder that is used often, and two large models that are used in turn
+    trace = make_trace([("clip", 1)] * 3 + [("a", 5), ("b", 5)]) * 5
+
+    lru = simulate_cache(trace, LRUEvictionPolicy(), cache_size=10)
+    gdsf = simulate_cache(trace, GreedyDualSizeFrequencyEvictionPolicy(), cache_size=10)
+
+    # LRU drops the text encoder every time, GDSF keeps it
+    assert lru.misses == 15
+    assert gdsf.misses == 11
+    assert gdsf.hit_rate > lru.hit_rate
+    assert gdsf.bytes_loaded == 1 + 10 * 5
+
+
+def test_simulate_cache_ignores_evictions():
+    trace = make_trace([("a", 1), ("b", 1)]) + [CacheTraceEvent(event="evict", key="a")] + make_trace([("a", 1)])
+
+    result = simulate_cache(trace, LRUEvictionPolicy(), cache_size=10)
+
+    assert (result.hits, result.misses, result.evictions) == (1, 2, 0)
+
+
+@pytest.mark.parametrize("cache_size", [0, 4])
+def test_simulate_cache_loads_models_larger_than_the_cache(cache_size: int):
+    result = simulate_cache(make_trace([("a", 5), ("a", 5)]), LRUEvictionPolicy(), cache_size=cache_size)
+
+    assert (result.hits, result.misses) == (1, 1)
@@ -0,0 +1,97 @@
+from typing import get_args
+
+import pytest
+import torch
+
+from invokeai.app.services.config.config_default import CACHE_EVICTION_POLICY
+from invokeai.backend.model_manager.load.model_cache.eviction_policy import (
+    EVICTION_POLICIES,
+    GB,
+    EvictionPolicy,
+    GreedyDualSizeFrequencyEvictionPolicy,
+    LRUEvictionPolicy,
+    ReloadCostEvictionPolicy,
+    SmallestFirstEvictionPolicy,
+    build_eviction_policy,
+)
+from invokeai.backend.model_manager.load.model_cache.model_cache import ModelCache
+
+
+def add(policy: EvictionPolicy, sizes: dict[str, int]) -> EvictionPolicy:
+    for key, size in sizes.items():
+        policy.on_add(key, size)
+    return policy
+
+
+def test_lru():
+    policy = add(LRUEvictionPolicy(), {"a": 1, "b": 1, "c": 1})
+    policy.on_use("a")
+    assert policy.get_eviction_order(["a", "b", "c"]) == ["b", "c", "a"]
+
+
+def test_smallest_first():
+    policy = add(SmallestFirstEvictionPolicy(), {"a": 3, "b": 1, "c": 2})
+    policy.on_use("b")
+    assert policy.get_eviction_order(["a", "b", "c"]) == ["b", "c", "a"]
+
+
+def test_gdsf_keeps_small_frequently_used_models():
+    policy = add(GreedyDualSizeFrequencyEvictionPolicy(), {"clip": GB // 4, "flux": 12 * GB})
+    policy.on_use("clip")
+    policy.on_use("flux")
+    # FLUX was used last, but is much larger
+    assert policy.get_eviction_order(["clip", "flux"]) == ["flux", "clip"]
+
+
+def test_gdsf_ages_out_old_uses():
+    policy = add(GreedyDualSizeFrequencyEvictionPolicy(), {"a": 1, "b": 1})
+    for _ in range(3):
+        policy.on_use("a")
+    policy.on_remove("b", evicted=True)
+
+    # The priority of the new model starts from that of the evicted one, so it outranks "a" after a few uses
+    policy.on_add("c", 1)
+    assert policy.get_eviction_order(["a", "c"]) == ["c", "a"]
+    for _ in range(4):
+        policy.on_use("c")
+    assert policy.get_eviction_order(["a", "c"]) == ["a", "c"]
+
+
+def test_reload_cost_weighs_models_by_load_time():
+    sizes = {"clip": GB // 4, "flux": 12 * GB}
+    gdsf = add(GreedyDualSizeFrequencyEvictionPolicy(), sizes)
+    reload_cost = add(ReloadCostEvictionPolicy(disk_bandwidth_gb=1, load_overhead_seconds=0.5), sizes)
+    for policy in (gdsf, reload_cost):
+        for _ in range(2):
+            policy.on_use("flux")
+
+    assert gdsf.get_eviction_order(["clip", "flux"]) == ["flux", "clip"]
+    # FLUX takes 12s to read again, so it is kept
+    assert reload_cost.get_eviction_order(["clip", "flux"]) == ["clip", "flux"]
+
+
+def test_build_eviction_policy():
+    assert set(EVICTION_POLICIES) == set(get_args(CACHE_EVICTION_POLICY))
+    assert isinstance(build_eviction_policy("gdsf"), GreedyDualSizeFrequencyEvictionPolicy)
+    with pytest.raises(ValueError):
+        build_eviction_policy("fifo")
+
+
+def test_model_cache_uses_eviction_policy():
+    small, large = torch.nn.Linear(256, 256, bias=False), torch.nn.Linear(512, 512, bias=False)
+    model_size = 512 * 512 * 4
+    cache = ModelCache(
+        execution_device_working_mem_gb=0,
+        enable_partial_loading=False,
+        keep_ram_copy_of_weights=True,
+        max_ram_cache_size_gb=1.5 * model_size / GB,
+        execution_device="cpu",
+        ram_eviction_policy=SmallestFirstEvictionPolicy(),
+    )
+    cache.put("large", large)
+    cache.put("small", small)
+
+    # LRU would drop "large"
+    cache.make_room(model_size // 2)
+    assert cache.contains("large")
+    assert not cache.contains("small")
@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+import torch
+
+from invokeai.backend.model_manager.load.model_cache.cache_stats import CacheStats
+from invokeai.backend.model_manager.load.model_cache.model_cache import ModelCache
+from invokeai.backend.util.calc_tensor_size import calc_tensor_size
+
+# Each model is a little over 1MB
+MODEL_SIZE = 2 * calc_tensor_size(torch.empty(256, 512))
+
+
+def make_model() -> torch.nn.Module:
+    return torch.nn.Sequential(torch.nn.Linear(512, 256, bias=False), torch.nn.Linear(256, 512, bias=False))
+
+
+@pytest.fixture
+def model_cache() -> ModelCache:
+    # Room for three models
+    cache = ModelCache(
+        execution_device_working_mem_gb=0,
+        enable_partial_loading=False,
+        keep_ram_copy_of_weights=True,
+        max_ram_cache_size_gb=3.5 * MODEL_SIZE / 2**30,
+        execution_device="cpu",
+    )
+    cache.stats = CacheStats()
+    return cache
+
+
+def test_make_room_skips_models_to_keep(model_cache: ModelCache):
+    for key in ["a", "b", "c"]:
+        model_cache.put(key, make_model())
+
+    # "a" is the least recently used, but is needed soon
+    model_cache.make_room(MODEL_SIZE, keep={"a"})
+
+    assert model_cache.contains("a")
+    assert not model_cache.contains("b")
+    assert model_cache.contains("c")
+
+
+def test_can_make_room(model_cache: ModelCache):
+    for key in ["a", "b", "c"]:
+        model_cache.put(key, make_model())
+
+    assert model_cache.can_make_room(MODEL_SIZE)
+    assert model_cache.can_make_room(MODEL_SIZE, keep={"a", "b"})
+    assert not model_cache.can_make_room(MODEL_SIZE, keep={"a", "b", "c"})
+    # Nothing is dropped by the check
+    assert all(model_cache.contains(key) for key in ["a", "b", "c"])
+
+
+def test_prefetch_stats(model_cache: ModelCache):
+    model_cache.put("a", make_model(), prefetched=True)
+    model_cache.put("b", make_model())
+    # Prefetched models are not counted in the stats of the running session
+    assert model_cache.stats is not None
+    assert model_cache.stats.prefetched == 0
+    assert model_cache.prefetch_stats.prefetched == 1
+
+    model_cache.get("a")
+    model_cache.get("a")
+    model_cache.get("b")
+    assert model_cache.stats.hits == 3
+    assert model_cache.stats.prefetch_hits == 1
+
+
+def test_models_dropped_for_prefetched_models_are_counted_as_prefetches(model_cache: ModelCache):
+    for key in ["a", "b", "c"]:
+        model_cache.put(key, make_model())
+
+    model_cache.put("d", make_model(), prefetched=True)
+    assert model_cache.stats is not None
+    assert model_cache.stats.cleared == 0
+    assert model_cache.prefetch_stats.cleared == 1
+
+    model_cache.put("e", make_model())
+    assert model_cache.stats.cleared == 1
+    assert model_cache.prefetch_stats.cleared == 1
+
+
+def test_loading_loads_a_model_once(model_cache: ModelCache):
+    loads: list[str] = []
+    started = threading.Barrier(4)
+
+    def load() -> None:
+        started.wait()
+        with model_cache.loading("a"):
+            if not model_cache.contains("a"):
+                loads.append("a")
+                model_cache.put("a", make_model())
+
+    threads = [threading.Thread(target=load) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == ["a"]
+    assert model_cache.contains("a")
+    # The lock is dropped once no thread needs it
+    assert model_cache._loading_locks == {}
@@ -0,0 +1,255 @@
+from typing import Iterator, Optional
+
+import pytest
+import torch
+
+from invokeai.backend.patches.layer_patcher import LayerPatcher
+from invokeai.backend.patches.layers.lora_layer import LoRALayer
+from invokeai.backend.patches.lora_patch_cache import (
+    LoRAPatchCache,
+    LoRAPatchCacheKey,
+    get_resident_patches,
+    make_lora_patch_cache_key,
+)
+from invokeai.backend.patches.model_patch_raw import ModelPatchRaw
+from tests.backend.patches.test_layer_patcher import DummyModuleWithOneLayer
+
+IN_FEATURES = 4
+OUT_FEATURES = 8
+RANK = 2
+
+
+def make_lora(value: float) -> ModelPatchRaw:
+    return ModelPatchRaw(
+        {
+            "linear_layer_1": LoRALayer.from_state_dict_values(
+                values={
+                    "lora_down.weight": torch.full((RANK, IN_FEATURES), value),
+                    "lora_up.weight": torch.ones((OUT_FEATURES, RANK)),
+                },
+            )
+        }
+    )
+
+
+class CountingPatches:
+    """An iterable of patches that counts how many times it is iterated, i.e. the LoRAs are loaded."""
+
+    def __init__(self, patches: list[tuple[ModelPatchRaw, float]]):
+        self.patches = patches
+        self.num_iterations = 0
+
+    def __iter__(self) -> Iterator[tuple[ModelPatchRaw, float]]:
+        self.num_iterations += 1
+        return iter(self.patches)
+
+
+def key_for(lora_key: str, weight: float) -> LoRAPatchCacheKey:
+    return make_lora_patch_cache_key("model:unet", "", [(lora_key, weight)], torch.float32)
+
+
+def apply_cached(
+    model: torch.nn.Module,
+    patches: CountingPatches,
+    cache: LoRAPatchCache,
+    key: LoRAPatchCacheKey,
+    cached_weights: Optional[dict[str, torch.Tensor]],
+):
+    return LayerPatcher.apply_smart_model_patches(
+        model=model,
+        patches=patches,
+        prefix="",
+        dtype=torch.float32,
+        cached_weights=cached_weights,
+        force_direct_patching=True,
+        patch_cache=cache,
+        patch_cache_key=key,
+    )
+
+
+@pytest.fixture
+def model() -> DummyModuleWithOneLayer:
+    return DummyModuleWithOneLayer(IN_FEATURES, OUT_FEATURES, device="cpu", dtype=torch.float32)
+
+
+@pytest.fixture
+def ram_copy(model: DummyModuleWithOneLayer) -> dict[str, torch.Tensor]:
+    """The model cache's RAM copy of the model's weights. The model is treated as if it were on another device."""
+    return {key: value.clone() for key, value in model.state_dict().items()}
+
+
+@torch.no_grad()
+def test_patches_are_left_applied_and_reused(model: DummyModuleWithOneLayer, ram_copy: dict[str, torch.Tensor]):
+    cache = LoRAPatchCache(max_bytes=2**20)
+    orig_weight = model.linear_layer_1.weight.detach().clone()
+    patches = CountingPatches([(make_lora(1.0), 0.5)])
+    expected_weight = orig_weight + RANK * 0.5
+
+    with apply_cached(model, patches, cache, key_for("a", 0.5), ram_copy):
+        torch.testing.assert_close(model.linear_layer_1.weight, expected_weight)
+
+    # The patches are still applied after exit...
+    torch.testing.assert_close(model.linear_layer_1.weight, expected_weight)
+    assert get_resident_patches(model) is not None
+
+    # ...and are used as they are with the same key, without loading the LoRAs again.
+    with apply_cached(model, patches, cache, key_for("a", 0.5), ram_copy):
+        torch.testing.assert_close(model.linear_layer_1.weight, expected_weight)
+        # Running the model with the patches in use does not remove them
+        model(torch.randn(1, IN_FEATURES))
+        torch.testing.assert_close(model.linear_layer_1.weight, expected_weight)
+    assert patches.num_iterations == 1
+
+    LayerPatcher.remove_resident_patches(model)
+    torch.testing.assert_close(model.linear_layer_1.weight, orig_weight)
+    assert get_resident_patches(model) is None
+
+
+@torch.no_grad()
+def test_other_patches_restore_the_original_weights_first(
+    model: DummyModuleWithOneLayer, ram_copy: dict[str, torch.Tensor]
+):
+    cache = LoRAPatchCache(max_bytes=2**20)
+    orig_weight = model.linear_layer_1.weight.detach().clone()
+
+    with apply_cached(model, CountingPatches([(make_lora(1.0), 0.5)]), cache, key_for("a", 0.5), ram_copy):
+        pass
+    with apply_cached(model, CountingPatches([(make_lora(1.0), 2.0)]), cache, key_for("a", 2.0), ram_copy):
+        torch.testing.assert_close(model.linear_layer_1.weight, orig_weight + RANK * 2.0)
+
+    # Patching without the cache removes the resident patches first, and leaves none behind.
+    with LayerPatcher.apply_smart_model_patches(
+        model=model,
+        patches=[(make_lora(1.0), 1.0)],
+        prefix="",
+        dtype=torch.float32,
+        force_direct_patching=True,
+    ):
+        torch.testing.assert_close(model.linear_layer_1.weight, orig_weight + RANK * 1.0)
+    torch.testing.assert_close(model.linear_layer_1.weight, orig_weight)
+    assert get_resident_patches(model) is None
+
+
+@torch.no_grad()
+def test_running_the_model_unpatched_removes_the_patches(
+    model: DummyModuleWithOneLayer, ram_copy: dict[str, torch.Tensor]
+):
+    cache = LoRAPatchCache(max_bytes=2**20)
+    x = torch.randn(1, IN_FEATURES)
+    expected_output = model(x)
+
+    with apply_cached(model, CountingPatches([(make_lora(1.0), 0.5)]), cache, key_for("a", 0.5), ram_copy):
+        pass
+
+    torch.testing.assert_close(model(x), expected_output)
+    assert get_resident_patches(model) is None
+
+
+@torch.no_grad()
+def test_patches_are_removed_after_the_model_is_moved(
+    model: DummyModuleWithOneLayer, ram_copy: dict[str, torch.Tensor]
+):
+    cache = LoRAPatchCache(max_bytes=0)
+    patches = CountingPatches([(make_lora(1.0), 0.5)])
+    orig_weight = model.linear_layer_1.weight.detach().clone()
+    x = torch.randn(1, IN_FEATURES)
+    expected_output = model(x)
+
+    with apply_cached(model, patches, cache, key_for("a", 0.5), ram_copy):
+        pass
+    resident = get_resident_patches(model)
+    assert resident is not None and resident.is_intact(model)
+
+    # The patched weights move with the model, e.g. to the CPU and back
+    for param in model.parameters():
+        param.data = param.data.clone()
+    assert not resident.is_intact(model)
+
+    # The patches are applied once, not on top of the moved patched weights...
+    with apply_cached(model, patches, cache, key_for("a", 0.5), ram_copy):
+        torch.testing.assert_close(model.linear_layer_1.weight, orig_weight + RANK * 0.5)
+    assert patches.num_iterations == 2
+
+    # ...and don't leak into a session without them.
+    for param in model.parameters():
+        param.data = param.data.clone()
+    torch.testing.assert_close(model(x), expected_output)
+    torch.testing.assert_close(model.linear_layer_1.weight, orig_weight)
+
+
+@torch.no_grad()
+def test_patches_are_removed_after_the_model_is_offloaded(
+    model: DummyModuleWithOneLayer, ram_copy: dict[str, torch.Tensor]
+):
+    cache = LoRAPatchCache(max_bytes=0)
+    patches = CountingPatches([(make_lora(1.0), 0.5)])
+    orig_weight = model.linear_layer_1.weight.detach().clone()
+    x = torch.randn(1, IN_FEATURES)
+    expected_output = model(x)
+
+    with apply_cached(model, patches, cache, key_for("a", 0.5), ram_copy):
+        pass
+
+    # The model cache resets the weights to its RAM copy when it offloads the model...
+    model.load_state_dict(ram_copy, assign=True)
+    torch.testing.assert_close(model(x), expected_output)
+    assert get_resident_patches(model) is None
+    # ...and they still share its memory.
+    assert model.linear_layer_1.weight.data_ptr() == ram_copy["linear_layer_1.weight"].data_ptr()
+
+    # Loaded again, the model is patched from scratch
+    model.load_state_dict({key: value.clone() for key, value in ram_copy.items()}, assign=True)
+    with apply_cached(model, patches, cache, key_for("a", 0.5), ram_copy):
+        torch.testing.assert_close(model.linear_layer_1.weight, orig_weight + RANK * 0.5)
+    assert patches.num_iterations == 2
+
+
+@torch.no_grad()
+def test_patches_are_not_left_applied_without_a_ram_copy(model: DummyModuleWithOneLayer):
+    cache = LoRAPatchCache(max_bytes=2**20)
+    orig_weight = model.linear_layer_1.weight.detach().clone()
+
+    # The patcher would have to hold copies of the original weights
+    with apply_cached(model, CountingPatches([(make_lora(1.0), 0.5)]), cache, key_for("a", 0.5), None):
+        torch.testing.assert_close(model.linear_layer_1.weight, orig_weight + RANK * 0.5)
+    torch.testing.assert_close(model.linear_layer_1.weight, orig_weight)
+    assert get_resident_patches(model) is None
+
+
+@torch.no_grad()
+def test_patched_weights_are_copied_from_ram(model: DummyModuleWithOneLayer, ram_copy: dict[str, torch.Tensor]):
+    cache = LoRAPatchCache(max_bytes=2**20)
+    patches_a = CountingPatches([(make_lora(0.3), 0.7)])
+    patches_b = CountingPatches([(make_lora(1.0), 2.0)])
+
+    with apply_cached(model, patches_a, cache, key_for("a", 0.7), ram_copy):
+        weight_a = model.linear_layer_1.weight.detach().clone()
+    with apply_cached(model, patches_b, cache, key_for("b", 2.0), ram_copy):
+        pass
+    assert cache.cur_bytes == 2 * OUT_FEATURES * IN_FEATURES * 4
+
+    # Switching back to "a" copies its patched weights rather than recomputing them, with identical results.
+    with apply_cached(model, patches_a, cache, key_for("a", 0.7), ram_copy):
+        assert torch.equal(model.linear_layer_1.weight, weight_a)
+    assert patches_a.num_iterations == 1
+
+
+def test_lora_patch_cache_drops_least_recently_used_weights():
+    cache = LoRAPatchCache(max_bytes=2 * 64)
+
+    assert cache.put_patched_weights(key_for("a", 1.0), {"w": torch.zeros(16)})
+    assert cache.put_patched_weights(key_for("b", 1.0), {"w": torch.zeros(16)})
+    assert cache.get_patched_weights(key_for("a", 1.0)) is not None
+    assert cache.put_patched_weights(key_for("c", 1.0), {"w": torch.zeros(16)})
+
+    assert cache.get_patched_weights(key_for("b", 1.0)) is None
+    assert cache.get_patched_weights(key_for("a", 1.0)) is not None
+    assert cache.cur_bytes == 2 * 64
+
+    # Weights larger than the cache are not kept
+    assert not cache.put_patched_weights(key_for("d", 1.0), {"w": torch.zeros(48)})
+    assert cache.cur_bytes == 2 * 64
+
+    cache.clear()
+    assert cache.cur_bytes == 0
+    assert cache.get_patched_weights(key_for("a", 1.0)) is None
@@ -0,0 +1,217 @@
+import glob
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from invokeai.app.util.sharded_layout import ImageLayout, get_sharded_path, is_migrated
+from invokeai.backend.util.db_maintenance import (
+    ConfigMapper,
+    DatabaseMapper,
+    InvokeAIDatabaseMaintenanceApp,
+    MaintenanceOperation,
+    PhysicalFileMapper,
+)
+
+
+def make_config(tmp_path: Path) -> ConfigMapper:
+    config = ConfigMapper()
+    config.database_path = str(tmp_path / "databases" / "invokeai.db")
+    config.database_backup_dir = str(tmp_path / "databases" / "backup")
+    config.outputs_path = str(tmp_path / "outputs" / "images")
+    config.archive_path = str(tmp_path / "outputs" / "images-archive")
+    config.thumbnails_path = str(tmp_path / "outputs" / "images" / "thumbnails")
+    config.thumbnails_archive_path = str(tmp_path / "outputs" / "images-archive" / "thumbnails")
+    return config
+
+
+def make_outputs(config: ConfigMapper, db_names: list[str], file_names: list[str], thumbnail_names: list[str]) -> None:
+    Path(config.database_path).parent.mkdir(parents=True)
+    with sqlite3.connect(config.database_path) as conn:
+        conn.execute("CREATE TABLE images (image_name TEXT PRIMARY KEY)")
+        conn.executemany("INSERT INTO images VALUES (?)", [(name,) for name in db_names])
+    Path(config.thumbnails_path, "512").mkdir(parents=True)
+    for name in file_names:
+        Image.new("RGB", (600, 400)).save(Path(config.outputs_path, name))
+    for name in thumbnail_names:
+        Path(config.thumbnails_path, name.replace(".png", ".webp")).write_bytes(b"webp")
+        Path(config.thumbnails_path, "512", name.replace(".png", ".webp")).write_bytes(b"webp")
+
+
+def run(
+    config: ConfigMapper, operation: MaintenanceOperation, layout: ImageLayout = "flat", **kwargs
+) -> InvokeAIDatabaseMaintenanceApp:
+    app = InvokeAIDatabaseMaintenanceApp(operation, **kwargs)
+    file_mapper = PhysicalFileMapper(
+        config.outputs_path, config.thumbnails_path, config.archive_path, config.thumbnails_archive_path, layout
+    )
+    db_mapper = DatabaseMapper(config.database_path, config.database_backup_dir)
+    try:
+        app.clean_orphaned_db_entries(config, file_mapper, db_mapper)
+        app.clean_orphaned_disk_files(config, file_mapper, db_mapper)
+        app.regenerate_thumbnails(config, file_mapper, db_mapper)
+    finally:
+        db_mapper.disconnect()
+    return app
+
+
+def get_db_names(config: ConfigMapper) -> set[str]:
+    with sqlite3.connect(config.database_path) as conn:
+        return {row[0] for row in conn.execute("SELECT image_name FROM images")}
+
+
+def get_files(path: str) -> set[str]:
+    return {str(p.relative_to(path)) for p in Path(path).rglob("*") if p.is_file()}
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> ConfigMapper:
+    config = make_config(tmp_path)
+    make_outputs(
+        config,
+        # a.png is missing its file and c.png is missing its record
+        db_names=["a.png", "b.png", "d.png"],
+        file_names=["b.png", "c.png", "d.png"],
+        # b.png is missing its thumbnails and e.png has no file or record
+        thumbnail_names=["a.png", "c.png", "d.png", "e.png"],
+    )
+    return config
+
+
+def test_clean_and_archive(config: ConfigMapper):
+    app = run(config, MaintenanceOperation.All, batch_size=1, workers=2, quiet=True)
+    stats = app._InvokeAIDatabaseMaintenanceApp__stats  # type: ignore
+
+    assert get_db_names(config) == {"b.png", "d.png"}
+    assert get_files(config.archive_path) == {
+        "c.png",
+        "thumbnails/a.webp",
+        "thumbnails/c.webp",
+        "thumbnails/e.webp",
+        "thumbnails/512/a.webp",
+        "thumbnails/512/c.webp",
+        "thumbnails/512/e.webp",
+    }
+    assert get_files(config.outputs_path) == {
+        "b.png",
+        "d.png",
+        "thumbnails/b.webp",
+        "thumbnails/d.webp",
+        "thumbnails/512/d.webp",
+    }
+    assert stats.count_orphaned_db_entries_cleaned == 1
+    assert stats.count_orphaned_disk_files_cleaned == 1
+    assert stats.count_orphaned_thumbnails_cleaned == 6
+    assert stats.count_thumbnails_regenerated == 1
+    assert stats.count_errors == 0
+    assert len(list(Path(config.database_backup_dir).iterdir())) == 1
+
+
+def test_dry_run(config: ConfigMapper, capsys: pytest.CaptureFixture[str]):
+    files_before = get_files(config.outputs_path)
+
+    app = run(config, MaintenanceOperation.All, dry_run=True)
+    stats = app._InvokeAIDatabaseMaintenanceApp__stats  # type: ignore
+
+    assert get_db_names(config) == {"a.png", "b.png", "d.png"}
+    assert get_files(config.outputs_path) == files_before
+    assert not Path(config.archive_path).exists()
+    assert not Path(config.database_backup_dir).exists()
+    # The counts are of what would be done, so the thumbnails of a.png are counted by both clean operations
+    assert stats.count_orphaned_db_entries_cleaned == 1
+    assert stats.count_orphaned_disk_files_cleaned == 1
+    assert stats.count_orphaned_thumbnails_cleaned == 2 + 6
+    assert stats.count_thumbnails_regenerated == 1
+    output = capsys.readouterr().out
+    assert "Would clean orphaned image db entry a.png" in output
+    assert "Would regenerate 256px webp thumbnail for b.png" in output
+
+
+def test_shard_outputs(config: ConfigMapper, tmp_path: Path):
+    config.model_images_path = str(tmp_path / "models" / "model_images")
+    Path(config.model_images_path).mkdir(parents=True)
+    Path(config.model_images_path, "model.webp").write_bytes(b"webp")
+    file_mapper = PhysicalFileMapper(
+        config.outputs_path,
+        config.thumbnails_path,
+        config.archive_path,
+        config.thumbnails_archive_path,
+        "sharded",
+        config.model_images_path,
+    )
+    app = InvokeAIDatabaseMaintenanceApp(MaintenanceOperation.ShardOutputs, quiet=True)
+    stats = app._InvokeAIDatabaseMaintenanceApp__stats  # type: ignore
+
+    # The app must use the sharded layout before the files are migrated
+    app.shard_outputs(config, file_mapper)
+    assert stats.count_errors == 1 and stats.count_files_migrated == 0
+
+    config.image_layout = "sharded"
+    app.shard_outputs(config, file_mapper)
+    assert stats.count_files_migrated == 3 + 4 + 4 + 1
+    assert file_mapper.scan_unmigrated_files() == []
+    assert get_sharded_path(Path(config.outputs_path), "b.png").exists()
+    assert get_sharded_path(Path(config.thumbnails_path, "512"), "a.webp").exists()
+    assert get_sharded_path(Path(config.model_images_path), "model.webp").exists()
+    # Folders with no files left in the flat layout are marked, so the app stops looking for files there
+    assert all(is_migrated(Path(folder)) for folder, _ in file_mapper.get_sharded_folders())
+
+    # The other operations find the migrated files
+    app = run(config, MaintenanceOperation.All, dry_run=True, layout="sharded")
+    stats = app._InvokeAIDatabaseMaintenanceApp__stats  # type: ignore
+    assert stats.count_orphaned_db_entries_cleaned == 1
+    assert stats.count_orphaned_disk_files_cleaned == 1
+    assert stats.count_thumbnails_regenerated == 1
+
+
+def image_record_exists(db_mapper: DatabaseMapper, image_name: str) -> bool:
+    """The per-file lookup the clean operation used to make, as a baseline for the set-based scan."""
+    db_mapper.cursor.execute("SELECT 1 FROM images WHERE image_name = ?", (image_name,))
+    return db_mapper.cursor.fetchone() is not None
+
+
+@pytest.mark.slow
+def test_benchmark_clean_orphaned_disk_files(tmp_path: Path):
+    config = make_config(tmp_path)
+    names = [f"{i:06d}.png" for i in range(20000)]
+    make_outputs(config, db_names=names[::2], file_names=[], thumbnail_names=names)
+    for name in names:
+        Path(config.outputs_path, name).write_bytes(b"png")
+
+    file_mapper = PhysicalFileMapper(
+        config.outputs_path, config.thumbnails_path, config.archive_path, config.thumbnails_archive_path
+    )
+    db_mapper = DatabaseMapper(config.database_path, config.database_backup_dir)
+    db_mapper.connect()
+    start = time.perf_counter()
+    per_file_orphans = [
+        (name, os.path.exists(file_mapper.get_thumbnail_path_for_image(name)))
+        for name in (os.path.basename(path) for path in glob.glob(config.outputs_path + "/*.png"))
+        if not image_record_exists(db_mapper, name)
+    ]
+    per_file_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    thumbnail_paths = file_mapper.scan_thumbnail_paths()
+    set_based_orphans = [
+        (name, name in thumbnail_paths)
+        for name in file_mapper.scan_image_filenames() - set(db_mapper.get_all_image_files())
+    ]
+    set_based_elapsed = time.perf_counter() - start
+    db_mapper.disconnect()
+    assert sorted(per_file_orphans) == sorted(set_based_orphans)
+
+    app = InvokeAIDatabaseMaintenanceApp(MaintenanceOperation.CleanOrphanedDiskFiles, quiet=True)
+    start = time.perf_counter()
+    app.clean_orphaned_disk_files(config, file_mapper, db_mapper)
+    archive_elapsed = time.perf_counter() - start
+    db_mapper.disconnect()
+
+    assert len(get_files(config.archive_path)) == len(set_based_orphans) * 3
+    print(
+        f"\n{len(names)} images: finding orphans per file {per_file_elapsed * 1000:.0f}ms, "
+        f"set-based {set_based_elapsed * 1000:.0f}ms, archiving them {archive_elapsed * 1000:.0f}ms"
+    )
@@ -0,0 +1,156 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import torch
+from safetensors.torch import load_file, save_file
+
+from invokeai.backend.util.mmap_state_dict import load_state_dict_mmap
+
+
+def _make_state_dict() -> dict[str, torch.Tensor]:
+    return {
+        # A single byte first, so the following tensors may be unaligned
+        "flag": torch.tensor([1], dtype=torch.uint8),
+        "weight": torch.randn(8, 4),
+        "bias": torch.randn(4).to(torch.bfloat16),
+        "half": torch.randn(2, 3).to(torch.float16),
+        "ids": torch.arange(5, dtype=torch.int64),
+        "scalar": torch.tensor(2.0),
+        "empty": torch.zeros(0, 3),
+    }
+
+
+@pytest.fixture(params=["model.safetensors", "model.pt", "model.ckpt"])
+def state_dict_path(request: pytest.FixtureRequest, tmp_path: Path) -> Path:
+    path = tmp_path / request.param
+    state_dict = _make_state_dict()
+    if path.suffix == ".safetensors":
+        save_file(state_dict, path, metadata={"format": "pt"})
+    else:
+        torch.save(state_dict, path)
+    return path
+
+
+def test_load_state_dict_mmap(state_dict_path: Path):
+    expected = _load_copy(state_dict_path)
+
+    state_dict = load_state_dict_mmap(state_dict_path)
+
+    assert state_dict.keys() == expected.keys()
+    for key, tensor in expected.items():
+        assert state_dict[key].dtype == tensor.dtype
+        assert state_dict[key].shape == tensor.shape
+        assert torch.equal(state_dict[key], tensor)
+
+
+def test_load_state_dict_mmap_legacy_checkpoint(tmp_path: Path):
+    # Checkpoints saved before torch 1.6 are not zip files, and can't be mapped
+    path = tmp_path / "model.ckpt"
+    state_dict = _make_state_dict()
+    torch.save(state_dict, path, _use_new_zipfile_serialization=False)
+
+    loaded = load_state_dict_mmap(path)
+
+    assert loaded.keys() == state_dict.keys()
+    for key, tensor in state_dict.items():
+        assert torch.equal(loaded[key], tensor)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Tensors are mapped differently on Windows")
+def test_load_state_dict_mmap_does_not_copy(state_dict_path: Path):
+    file_bytes = state_dict_path.read_bytes()
+
+    state_dict = load_state_dict_mmap(state_dict_path)
+
+    # The tensors are as far apart in memory as they are in the file, so they are views of a single map of it
+    weight_offset = file_bytes.find(state_dict["weight"].numpy().tobytes())
+    for key in ["half", "ids"]:
+        offset = file_bytes.find(state_dict[key].numpy().tobytes())
+        assert offset != -1
+        assert state_dict[key].data_ptr() - state_dict["weight"].data_ptr() == offset - weight_offset
+
+
+def test_load_state_dict_mmap_does_not_write_to_file(state_dict_path: Path):
+    expected = _load_copy(state_dict_path)["weight"]
+
+    state_dict = load_state_dict_mmap(state_dict_path)
+    state_dict["weight"].add_(1)
+
+    assert torch.equal(_load_copy(state_dict_path)["weight"], expected)
+    assert torch.equal(load_state_dict_mmap(state_dict_path)["weight"], expected)
+
+
+def _load_copy(path: Path) -> dict[str, torch.Tensor]:
+    if path.suffix == ".safetensors":
+        return load_file(path)
+    return torch.load(path, map_location="cpu")
+
+
+# Loads a state dict into a module, as the model loaders do, and uses every weight. Prints the time, the peak RSS over
+# that of the process after its imports, and how much of the RSS is private memory rather than page cache, in MB.
+_BENCHMARK_SCRIPT = """
+import json, re, sys, time
+import torch
+from invokeai.backend.util.mmap_state_dict import load_state_dict_mmap
+
+def read_status_mb(field):
+    with open("/proc/self/status") as f:
+        return int(re.search(field + r":\\s+(\\d+) kB", f.read()).group(1)) / 1024
+
+loaders = {"torch.load": lambda path: torch.load(path, map_location="cpu"), "mmap": load_state_dict_mmap}
+loader = loaders[sys.argv[2]]
+# Resets the peak RSS of the process to its current RSS
+with open("/proc/self/clear_refs", "w") as f:
+    f.write("5")
+rss_before = read_status_mb("VmRSS")
+anon_before = read_status_mb("RssAnon")
+start = time.perf_counter()
+state_dict = loader(sys.argv[1])
+with torch.device("meta"):
+    model = torch.nn.ModuleList(torch.nn.Linear(1024, 1024, bias=False) for _ in range(len(state_dict)))
+model.load_state_dict({f"{i}.weight": state_dict[f"{i}.weight"] for i in range(len(state_dict))}, assign=True)
+checksum = sum(float(p.sum()) for p in model.parameters())
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, read_status_mb("VmHWM") - rss_before, read_status_mb("RssAnon") - anon_before]))
+"""
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(sys.platform != "linux", reason="Peak RSS is measured with /proc/self/status")
+def test_benchmark_load_state_dict_mmap(tmp_path: Path):
+    # 128 layers of 4MB, in bfloat16 so no cast is needed
+    state_dict = {f"{i}.weight": torch.randn(1024, 1024).to(torch.bfloat16) for i in range(128)}
+    results: dict[str, tuple[float, float, float]] = {}
+    for file_name in ["model.pt", "model.safetensors"]:
+        path = tmp_path / file_name
+        if path.suffix == ".safetensors":
+            save_file(state_dict, path)
+        else:
+            torch.save(state_dict, path)
+        file_mb = path.stat().st_size / 2**20
+        for loader in ["torch.load", "mmap"] if path.suffix == ".pt" else ["mmap"]:
+            results[f"{loader} ({file_name})"] = _run_benchmark(path, loader)
+
+    print(f"\n{file_mb:.0f}MB checkpoint, in the page cache:")
+    for name, (elapsed, peak_rss_mb, private_mb) in results.items():
+        print(f"{name}: {elapsed * 1000:.0f}ms, peak RSS +{peak_rss_mb:.0f}MB, of which private {private_mb:.0f}MB")
+    # torch.load() copies the weights into private memory, so they are in memory twice with the page cache
+    assert results["mmap (model.pt)"][2] < file_mb / 4 < results["torch.load (model.pt)"][2]
+    assert results["mmap (model.safetensors)"][2] < file_mb / 4
+
+
+def _run_benchmark(path: Path, loader: str) -> tuple[float, float, float]:
+    # Each load runs in a new process, so that their peak RSS can be compared
+    output = subprocess.run(
+        [sys.executable, "-c", _BENCHMARK_SCRIPT, str(path), loader],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": str(Path(__file__).parents[3])},
+    ).stdout
+    elapsed, peak_rss_mb, private_mb = json.loads(output.strip().splitlines()[-1])
+    return elapsed, peak_rss_mb, private_mb
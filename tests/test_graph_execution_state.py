@@ -1,16 +1,21 @@
+import time
 from typing import Optional
 from unittest.mock import Mock
 
 import pytest
+from pydantic import BaseModel
 
 from invokeai.app.invocations.baseinvocation import BaseInvocation, BaseInvocationOutput, InvocationContext
 from invokeai.app.invocations.collections import RangeInvocation
+from invokeai.app.invocations.fields import ImageField
 from invokeai.app.invocations.math import AddInvocation, MultiplyInvocation
+from invokeai.app.services.shared import graph as graph_module
 from invokeai.app.services.shared.graph import (
     CollectInvocation,
     Graph,
     GraphExecutionState,
     IterateInvocation,
+    copy_input,
 )
 
 # This import must happen before other invoke imports or test in other files(!!) break
@@ -22,6 +27,10 @@ from tests.test_nodes import (
 )
 
 
+class MutableTestField(BaseModel):
+    items: list[str]
+
+
 @pytest.fixture
 def simple_graph() -> Graph:
     g = Graph()
@@ -225,3 +234,140 @@ def test_graph_iterate_execution_order(execution_number: int):
     _ = invoke_next(g)
     assert _[1].item == "Dinosaur Sushi"
     _ = invoke_next(g)
+
+
+def make_iterate_chain_graph(count: int) -> Graph:
+    graph = Graph()
+    graph.add_node(PromptCollectionTestInvocation(id="1", collection=[f"Prompt {i}" for i in range(count)]))
+    graph.add_node(IterateInvocation(id="2"))
+    graph.add_node(PromptTestInvocation(id="3"))
+    graph.add_node(PromptTestInvocation(id="5"))
+    graph.add_node(PromptTestInvocation(id="6"))
+    graph.add_node(CollectInvocation(id="4"))
+    graph.add_edge(create_edge("1", "collection", "2", "collection"))
+    graph.add_edge(create_edge("2", "item", "3", "prompt"))
+    graph.add_edge(create_edge("3", "prompt", "5", "prompt"))
+    graph.add_edge(create_edge("5", "prompt", "6", "prompt"))
+    graph.add_edge(create_edge("6", "prompt", "4", "item"))
+    return graph
+
+
+def test_graph_state_rebuilds_exec_iterator_index():
+    g = GraphExecutionState(graph=make_iterate_chain_graph(5))
+    for _ in range(8):
+        invoke_next(g)
+
+    # The index is private state, and is rebuilt from the execution graph when it is missing
+    g._exec_iterator_ancestors.clear()
+    g._exec_iterator_descendants.clear()
+    while not g.is_complete():
+        assert invoke_next(g)[0] is not None
+
+    # Each chain must be fed by its own iteration
+    for node_id in g.source_prepared_mapping["6"]:
+        parent_id = g.execution_graph._get_input_edges(node_id)[0].source.node_id
+        assert g.results[node_id].prompt == g.results[parent_id].prompt
+    collector = g.source_prepared_mapping["4"]
+    assert sorted(g.results[next(iter(collector))].collection) == [f"Prompt {i}" for i in range(5)]
+
+
+def test_graph_state_rebuilds_source_graph_info_after_graph_changes():
+    graph = Graph()
+    graph.add_node(PromptTestInvocation(id="1", prompt="a"))
+    graph.add_node(PromptTestInvocation(id="2", prompt="b"))
+    graph.add_node(PromptTestInvocation(id="3"))
+    graph.add_edge(create_edge("1", "prompt", "3", "prompt"))
+    g = GraphExecutionState(graph=graph)
+    assert g._get_source_graph_info().parents["3"] == ["1"]
+
+    # Replacing an edge leaves the numbers of nodes and edges the same
+    g.graph.delete_edge(create_edge("1", "prompt", "3", "prompt"))
+    g.graph.add_edge(create_edge("2", "prompt", "3", "prompt"))
+    assert g._get_source_graph_info().parents["3"] == ["2"]
+
+    g.graph.update_node("2", PromptTestInvocation(id="2", prompt="c"))
+    info = g._get_source_graph_info()
+    assert g._get_source_graph_info() is info
+
+
+@pytest.mark.slow
+def test_benchmark_iterate_collect():
+    count = 500
+    graph = make_iterate_chain_graph(count)
+
+    g = GraphExecutionState(graph=graph)
+    start = time.perf_counter()
+    while not g.is_complete():
+        n = g.next()
+        assert n is not None
+        g.complete(n.id, n.invoke(Mock(InvocationContext)))
+    elapsed = time.perf_counter() - start
+
+    collector = g.source_prepared_mapping["4"]
+    assert len(g.results[next(iter(collector))].collection) == count
+    print(f"\nExecuted a {count}-item iterate/collect graph in {elapsed:.2f}s")
+
+
+def test_copy_input_shares_immutable_values():
+    image = ImageField(image_name="image")
+    assert copy_input(image) is image
+
+    images = [image, ImageField(image_name="other")]
+    copied_images = copy_input(images)
+    assert copied_images is not images
+    assert all(a is b for a, b in zip(copied_images, images, strict=True))
+
+    mutable = MutableTestField(items=["a"])
+    copied_mutable = copy_input(mutable)
+    assert copied_mutable == mutable
+    assert copied_mutable is not mutable
+    assert copied_mutable.items is not mutable.items
+
+
+def make_image_collect_graph_state(count: int) -> GraphExecutionState:
+    graph = Graph()
+    graph.add_node(PromptCollectionTestInvocation(id="1", collection=[f"Prompt {i}" for i in range(count)]))
+    graph.add_node(IterateInvocation(id="2"))
+    graph.add_node(TextToImageTestInvocation(id="3"))
+    graph.add_node(CollectInvocation(id="4"))
+    graph.add_edge(create_edge("1", "collection", "2", "collection"))
+    graph.add_edge(create_edge("2", "item", "3", "prompt"))
+    graph.add_edge(create_edge("3", "image", "4", "item"))
+
+    g = GraphExecutionState(graph=graph)
+    while not g.is_complete():
+        invoke_next(g)
+    return g
+
+
+def test_collect_shares_image_outputs():
+    g = make_image_collect_graph_state(3)
+    collector_id = next(iter(g.source_prepared_mapping["4"]))
+    image_outputs = [g.results[n].image for n in g.source_prepared_mapping["3"]]
+    assert all(any(image is output for output in image_outputs) for image in g.results[collector_id].collection)
+
+
+@pytest.mark.slow
+def test_benchmark_collect_images(monkeypatch: pytest.MonkeyPatch):
+    count = 1000
+    rounds = 20
+    g = make_image_collect_graph_state(count)
+    collector = g.execution_graph.get_node(next(iter(g.source_prepared_mapping["4"])))
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        g._prepare_inputs(collector)
+    shared_time = (time.perf_counter() - start) / rounds
+    assert len(collector.collection) == count
+
+    # Deep-copy every input, as was done before immutable values were shared
+    monkeypatch.setattr(graph_module, "copy_input", graph_module.copydeep)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        g._prepare_inputs(collector)
+    deep_copy_time = (time.perf_counter() - start) / rounds
+
+    print(
+        f"\nPrepared a {count}-image collect in {shared_time * 1000:.2f}ms, "
+        f"{deep_copy_time * 1000:.2f}ms with deep copies"
+    )
@@ -1,5 +1,9 @@
 # pyright: reportPrivateUsage=false
+import time
 from contextlib import suppress
+from unittest.mock import Mock
+
+import pytest
 
 from invokeai.app.invocations.fields import ImageField
 from invokeai.app.invocations.primitives import ImageOutput
@@ -181,3 +185,44 @@ def test_invocation_cache_memory_status():
     assert status.hits == 0
     assert status.misses == 0
     assert status.max_size == 0
+
+
+def test_invocation_cache_memory_indexes_referenced_names():
+    cache = MemoryInvocationCache(max_cache_size=2)
+    cache.save(1, ImageOutput(image=ImageField(image_name="foo"), width=512, height=512))
+    cache.save(2, ImageOutput(image=ImageField(image_name="foo"), width=512, height=512))
+    assert cache._keys_by_name == {"foo": {1, 2}}
+    cache.save(3, ImageOutput(image=ImageField(image_name="bar"), width=512, height=512))
+    # The evicted item is removed from the index
+    assert cache._keys_by_name == {"foo": {2}, "bar": {3}}
+    cache.delete(2)
+    assert cache._keys_by_name == {"bar": {3}}
+    cache.clear()
+    assert cache._keys_by_name == {}
+
+
+def test_invocation_cache_memory_matches_whole_names():
+    with suppress(AttributeError):
+        cache = MemoryInvocationCache(max_cache_size=5)
+        output = ImageOutput(image=ImageField(image_name="foobar"), width=512, height=512)
+        cache.save(1, output)
+        cache._delete_by_match("foo")
+        assert cache.get(1) == output
+
+
+@pytest.mark.slow
+def test_benchmark_invocation_cache_memory_deletes_by_match():
+    count = 5000
+    deletes = 500
+    cache = MemoryInvocationCache(max_cache_size=count)
+    cache._invoker = Mock()
+    for i in range(count):
+        cache.save(i, ImageOutput(image=ImageField(image_name=f"{i:08d}-image.png"), width=512, height=512))
+
+    start = time.perf_counter()
+    for i in range(deletes):
+        cache._delete_by_match(f"{i:08d}-image.png")
+    elapsed = time.perf_counter() - start
+
+    assert len(cache._cache) == count - deletes
+    print(f"\nInvalidated {deletes} images in a {count}-item cache in {elapsed * 1000:.2f}ms")
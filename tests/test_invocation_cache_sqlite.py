@@ -0,0 +1,167 @@
+# pyright: reportPrivateUsage=false
+import os
+from logging import Logger
+from pathlib import Path
+
+import pytest
+
+from invokeai.app.invocations.fields import ImageField, LatentsField
+from invokeai.app.invocations.primitives import ImageOutput, LatentsOutput
+from invokeai.app.services.config.config_default import InvokeAIAppConfig
+from invokeai.app.services.invocation_cache import invocation_cache_sqlite
+from invokeai.app.services.invocation_cache.invocation_cache_common import get_object_references
+from invokeai.app.services.invocation_cache.invocation_cache_sqlite import SqliteInvocationCache
+from invokeai.app.services.invoker import Invoker
+from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
+from tests.fixtures.sqlite_database import create_mock_sqlite_database
+from tests.test_nodes import PromptTestInvocation
+
+
+@pytest.fixture
+def db() -> SqliteDatabase:
+    return create_mock_sqlite_database(InvokeAIAppConfig(use_memory_db=True), Logger("test_invocation_cache_sqlite"))
+
+
+def make_image_output(image_name: str) -> ImageOutput:
+    return ImageOutput(image=ImageField(image_name=image_name), width=512, height=512)
+
+
+def test_invocation_cache_sqlite_max_cache_size(db: SqliteDatabase):
+    cache = SqliteInvocationCache(db=db)
+    cache.save("1", make_image_output("foo"))
+    assert cache.get("1") is None
+    assert cache._hits == 0
+    assert cache._misses == 0
+    assert cache.get_status().size == 0
+
+
+def test_invocation_cache_sqlite_creates_stable_keys():
+    key1 = SqliteInvocationCache.create_key(PromptTestInvocation(prompt="foo"))
+    key2 = SqliteInvocationCache.create_key(PromptTestInvocation(prompt="foo"))
+    key3 = SqliteInvocationCache.create_key(PromptTestInvocation(prompt="bar"))
+
+    assert key1 == key2
+    assert key1 != key3
+    # Keys are hex digests, not process-randomized hashes
+    assert isinstance(key1, str) and len(key1) == 64
+
+
+def test_invocation_cache_sqlite_adds_invocation(db: SqliteDatabase):
+    output_1 = make_image_output("foo")
+    output_2 = make_image_output("bar")
+    cache = SqliteInvocationCache(db=db, max_cache_size=5)
+    cache.save("1", output_1)
+    cache.save("2", output_2)
+    assert cache.get("1") == output_1
+    assert cache.get("2") == output_2
+    assert cache.get("3") is None
+    assert cache._hits == 2
+    assert cache._misses == 1
+
+
+def test_invocation_cache_sqlite_is_lru(db: SqliteDatabase):
+    cache = SqliteInvocationCache(db=db, max_cache_size=2)
+    cache.save("1", make_image_output("foo"))
+    cache.save("2", make_image_output("bar"))
+    assert cache.get("1") is not None
+    cache.save("3", make_image_output("baz"))
+    assert cache.get("2") is None
+    assert cache.get("1") is not None
+    assert cache.get("3") is not None
+    assert cache.get_status().size == 2
+
+
+def test_invocation_cache_sqlite_survives_restart(db: SqliteDatabase, mock_invoker: Invoker):
+    image_output = make_image_output("foo")
+    latents_output = LatentsOutput(latents=LatentsField(latents_name="bar"), width=64, height=64)
+    cache = SqliteInvocationCache(db=db, max_cache_size=5)
+    cache.save("image", image_output)
+    cache.save("latents", latents_output)
+    assert cache.get("latents") == latents_output
+
+    # Outputs referencing tensors are only valid in the process that saved them
+    mock_invoker.services.tensors = mock_invoker.services.images  # type: ignore
+    mock_invoker.services.conditioning = mock_invoker.services.images  # type: ignore
+    restarted = SqliteInvocationCache(db=db, max_cache_size=5)
+    assert restarted.get("latents") is None
+    restarted.start(mock_invoker)
+    assert restarted.get("image") == image_output
+    assert restarted.get_status().size == 1
+
+
+def test_invocation_cache_sqlite_deletes_by_match(db: SqliteDatabase, mock_invoker: Invoker):
+    cache = SqliteInvocationCache(db=db, max_cache_size=5)
+    cache._invoker = mock_invoker
+    output_1 = make_image_output("foo")
+    output_2 = make_image_output("bar")
+    cache.save("1", output_1)
+    cache.save("2", output_2)
+    cache._delete_by_match("bar")
+    assert cache.get("1") == output_1
+    assert cache.get("2") is None
+    cache._delete_by_match("foo")
+    assert cache.get("1") is None
+    assert cache.get_status().size == 0
+    # shouldn't raise on empty cache
+    cache._delete_by_match("foo")
+
+
+def test_invocation_cache_sqlite_disables_and_clears(db: SqliteDatabase):
+    cache = SqliteInvocationCache(db=db, max_cache_size=5)
+    cache.save("1", make_image_output("foo"))
+    cache.disable()
+    assert cache.get("1") is None
+    assert not cache.get_status().enabled
+    cache.enable()
+    assert cache.get("1") is not None
+    cache.clear()
+    status = cache.get_status()
+    assert status.size == 0
+    assert status.hits == 0
+    assert status.misses == 0
+    assert status.enabled
+
+
+def test_get_object_references():
+    output = LatentsOutput(latents=LatentsField(latents_name="foo", seed=1), width=64, height=64)
+    assert get_object_references(output) == {("latents_name", "foo")}
+    assert get_object_references(make_image_output("bar")) == {("image_name", "bar")}
+
+
+def test_invocation_cache_sqlite_hits_do_not_write(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    # An in-memory database reads through `transaction()`, so this needs one on disk
+    db = create_mock_sqlite_database(InvokeAIAppConfig(db_dir=tmp_path), Logger("test_invocation_cache_sqlite"))
+    cache = SqliteInvocationCache(db=db, max_cache_size=5)
+    output = make_image_output("foo")
+    cache.save("1", output)
+
+    def fail_transaction():
+        raise AssertionError("A cache hit must not take the write lock")
+
+    with monkeypatch.context() as m:
+        m.setattr(db, "transaction", fail_transaction)
+        assert cache.get("1") == output
+    assert cache._hits == 1
+
+
+def test_invocation_cache_sqlite_keeps_scopes_of_live_processes(
+    db: SqliteDatabase, mock_invoker: Invoker, monkeypatch: pytest.MonkeyPatch
+):
+    latents_output = LatentsOutput(latents=LatentsField(latents_name="foo"), width=64, height=64)
+    live = SqliteInvocationCache(db=db, max_cache_size=5)
+    live.save("1", latents_output)
+    dead = SqliteInvocationCache(db=db, max_cache_size=5)
+    dead._scope = f"{os.getpid() + 1}:{dead._scope.partition(':')[2]}"
+    dead.save("1", latents_output)
+    monkeypatch.setattr(invocation_cache_sqlite.psutil, "pid_exists", lambda pid: pid == os.getpid())
+
+    # Starting another process only deletes the outputs of processes that are gone
+    mock_invoker.services.tensors = mock_invoker.services.images  # type: ignore
+    mock_invoker.services.conditioning = mock_invoker.services.images  # type: ignore
+    SqliteInvocationCache(db=db, max_cache_size=5).start(mock_invoker)
+    assert live.get("1") == latents_output
+    assert dead.get("1") is None
+
+    # A process deletes its own scoped outputs when it stops
+    live.stop(mock_invoker)
+    assert live.get("1") is None
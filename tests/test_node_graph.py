@@ -507,6 +507,48 @@ def test_graph_can_deserialize():
     assert g2.edges[0].destination.field == "image"
 
 
+def test_graph_edge_indexes_follow_edge_changes():
+    g = Graph()
+    g.add_node(TextToImageTestInvocation(id="1", prompt="Banana sushi"))
+    g.add_node(ESRGANInvocation(id="2"))
+    g.add_node(ImageToImageTestInvocation(id="3"))
+    e1 = create_edge("1", "image", "2", "image")
+    e2 = create_edge("1", "image", "3", "image")
+    g.add_edge(e1)
+    g.add_edge(e2)
+
+    assert g._get_output_edges("1") == [e1, e2]
+    assert g._get_output_edges("1", "image") == [e1, e2]
+    assert g._get_input_edges("2", "image") == [e1]
+    assert g._get_input_edges("2", "strength") == []
+
+    g.delete_edge(e1)
+    assert g._get_output_edges("1") == [e2]
+    assert g._get_input_edges("2") == []
+
+    g.delete_node("3")
+    assert g._get_output_edges("1") == []
+    assert g.edges == []
+
+    # Edges changed directly are picked up on next use
+    g.edges.append(e1)
+    assert g._get_input_edges("2") == [e1]
+    g.edges = []
+    assert g._get_input_edges("2") == []
+
+
+def test_graph_edge_indexes_are_not_serialized():
+    g = Graph()
+    g.add_node(TextToImageTestInvocation(id="1", prompt="Banana sushi"))
+    g.add_node(ESRGANInvocation(id="2"))
+    g.add_edge(create_edge("1", "image", "2", "image"))
+
+    assert set(g.model_dump().keys()) == {"id", "nodes", "edges"}
+    g2 = TypeAdapter(Graph).validate_json(g.model_dump_json())
+    assert g2 == g
+    assert g2._get_input_edges("2") == g.edges
+
+
 def test_invocation_decorator():
     invocation_type = "test_invocation_decorator"
     title = "Test Invocation"
@@ -0,0 +1,97 @@
+import threading
+
+import torch
+from PIL import Image
+
+from invokeai.app.services.shared.object_cache import ObjectCache, get_object_size
+
+
+def test_object_cache_evicts_by_size():
+    cache = ObjectCache(max_size_bytes=100)
+    cache.put("tensors", "a", "a", size_bytes=40)
+    cache.put("tensors", "b", "b", size_bytes=40)
+    cache.put("images", "c", "c", size_bytes=40)
+    assert cache.get("tensors", "a") is None
+    assert cache.get("tensors", "b") == "b"
+    assert cache.get("images", "c") == "c"
+    assert cache.size_bytes == 80
+
+
+def test_object_cache_is_lru():
+    cache = ObjectCache(max_size_bytes=100)
+    cache.put("tensors", "a", "a", size_bytes=40)
+    cache.put("tensors", "b", "b", size_bytes=40)
+    assert cache.get("tensors", "a") == "a"
+    cache.put("tensors", "c", "c", size_bytes=40)
+    assert cache.get("tensors", "a") == "a"
+    assert cache.get("tensors", "b") is None
+
+
+def test_object_cache_skips_objects_larger_than_budget():
+    cache = ObjectCache(max_size_bytes=100)
+    cache.put("tensors", "a", "a", size_bytes=40)
+    cache.put("images", "big", "big", size_bytes=101)
+    assert cache.get("images", "big") is None
+    # Nothing was evicted to make room for it
+    assert cache.get("tensors", "a") == "a"
+
+
+def test_object_cache_replaces_and_deletes():
+    cache = ObjectCache(max_size_bytes=100)
+    cache.put("tensors", "a", "a", size_bytes=40)
+    cache.put("tensors", "a", "A", size_bytes=60)
+    assert cache.get("tensors", "a") == "A"
+    assert cache.size_bytes == 60
+    cache.delete("tensors", "a")
+    assert cache.get("tensors", "a") is None
+    assert cache.size_bytes == 0
+
+
+def test_object_cache_stats_are_per_type():
+    cache = ObjectCache(max_size_bytes=100)
+    cache.put("tensors", "a", "a", size_bytes=60)
+    cache.get("tensors", "a")
+    cache.put("images", "b", "b", size_bytes=30)
+    cache.get("images", "missing")
+    cache.put("images", "c", "c", size_bytes=30)
+
+    stats = cache.get_stats()
+    assert (stats["tensors"].hits, stats["tensors"].misses, stats["tensors"].evictions) == (1, 0, 1)
+    assert (stats["tensors"].items, stats["tensors"].size_bytes) == (0, 0)
+    assert (stats["images"].hits, stats["images"].misses, stats["images"].evictions) == (0, 1, 0)
+    assert (stats["images"].items, stats["images"].size_bytes) == (2, 60)
+
+    cache.clear()
+    stats = cache.get_stats()
+    assert stats["images"].items == 0
+    assert stats["images"].misses == 1
+    assert cache.size_bytes == 0
+
+
+def test_object_cache_is_thread_safe():
+    cache = ObjectCache(max_size_bytes=1000)
+
+    def work(thread_id: int):
+        for i in range(1000):
+            cache.put("tensors", (thread_id, i), i, size_bytes=10)
+            cache.get("tensors", (thread_id, i - 5))
+
+    threads = [threading.Thread(target=work, args=(t,)) for t in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = cache.get_stats()["tensors"]
+    assert cache.size_bytes == stats.size_bytes == 1000
+    assert stats.items == 100
+    assert stats.evictions == 8 * 1000 - 100
+
+
+def test_get_object_size():
+    assert get_object_size(torch.zeros(4, 64, 64, dtype=torch.float16)) == 4 * 64 * 64 * 2
+    assert get_object_size(Image.new("RGBA", (64, 32))) == 64 * 32 * 4
+    # Tensors held by other objects are counted, once
+    tensor = torch.zeros(1024, dtype=torch.float32)
+    assert get_object_size([tensor, tensor, {"t": tensor}]) > 4096
+    assert get_object_size([tensor, tensor, {"t": tensor}]) < 2 * 4096
@@ -8,6 +8,7 @@ import torch
 from invokeai.app.services.object_serializer.object_serializer_common import ObjectNotFoundError
 from invokeai.app.services.object_serializer.object_serializer_disk import ObjectSerializerDisk
 from invokeai.app.services.object_serializer.object_serializer_forward_cache import ObjectSerializerForwardCache
+from invokeai.app.services.shared.object_cache import ObjectCache, get_object_size
 
 
 @dataclass
@@ -26,8 +27,10 @@ def obj_serializer(tmp_path: Path):
 
 @pytest.fixture
 def fwd_cache(tmp_path: Path):
+    # Room for two objects
     return ObjectSerializerForwardCache(
-        ObjectSerializerDisk[MockDataclass](tmp_path, safe_globals=[MockDataclass]), max_cache_size=2
+        ObjectSerializerDisk[MockDataclass](tmp_path, safe_globals=[MockDataclass]),
+        cache=ObjectCache(2 * get_object_size(MockDataclass(foo="bar"))),
     )
 
 
@@ -167,11 +170,20 @@ def test_obj_serializer_fwd_cache_respects_cache_size(fwd_cache: ObjectSerialize
     obj_2_name = fwd_cache.save(obj_2)
     obj_3 = MockDataclass(foo="qux")
     obj_3_name = fwd_cache.save(obj_3)
-    assert obj_1_name not in fwd_cache._cache
-    assert obj_2_name in fwd_cache._cache
-    assert obj_3_name in fwd_cache._cache
-    # apparently qsize is "not reliable"?
-    assert fwd_cache._cache_ids.qsize() == 2
+    assert fwd_cache._cache.get("objects", obj_1_name) is None
+    assert fwd_cache._cache.get("objects", obj_2_name) is obj_2
+    assert fwd_cache._cache.get("objects", obj_3_name) is obj_3
+    assert fwd_cache._cache.get_stats()["objects"].items == 2
+
+
+def test_obj_serializer_fwd_cache_is_lru(fwd_cache: ObjectSerializerForwardCache[MockDataclass]):
+    obj_1_name = fwd_cache.save(MockDataclass(foo="bar"))
+    obj_2_name = fwd_cache.save(MockDataclass(foo="baz"))
+    # Loading refreshes the object, so the next save evicts the other one
+    fwd_cache.load(obj_1_name)
+    fwd_cache.save(MockDataclass(foo="qux"))
+    assert fwd_cache._cache.get("objects", obj_1_name) is not None
+    assert fwd_cache._cache.get("objects", obj_2_name) is None
 
 
 def test_obj_serializer_fwd_cache_calls_delete_callback(fwd_cache: ObjectSerializerForwardCache[MockDataclass]):
@@ -8,9 +8,12 @@ from invokeai.app.services.session_queue.session_queue_common import (
     BatchDataCollection,
     BatchDatum,
     NodeFieldValue,
+    SessionQueueReadyIndex,
     calc_session_count,
     create_session_nfv_tuples,
+    materialize_session,
     prepare_values_to_insert,
+    serialize_batch_graph,
 )
 from invokeai.app.services.shared.graph import Graph, GraphExecutionState
 from tests.test_nodes import PromptTestInvocation
@@ -127,9 +130,10 @@ def test_prepare_values_to_insert(batch_data_collection, batch_graph):
     values = prepare_values_to_insert(queue_id="default", batch=b, priority=0, max_new_queue_items=1000)
     assert len(values) == 8
 
-    GraphExecutionStateValidator = TypeAdapter(GraphExecutionState)
-    # graph should be serialized
-    ges = GraphExecutionStateValidator.validate_json(values[0][1])
+    # sessions are not serialized - they are built from the batch graph and field values
+    assert all(v[1] is None for v in values)
+    graph_json = serialize_batch_graph(b.graph)
+    ges = materialize_session(session_id=values[0][2], graph_raw=graph_json, field_values_raw=values[0][4])
 
     # graph values should be populated
     assert ges.graph.get_node("1").prompt == "Banana sushi"
@@ -137,8 +141,8 @@ def test_prepare_values_to_insert(batch_data_collection, batch_graph):
     assert ges.graph.get_node("3").prompt == "Orange sushi"
     assert ges.graph.get_node("4").prompt == "Nissan"
 
-    # session ids should match deserialized graph
-    assert [v[2] for v in values] == [GraphExecutionStateValidator.validate_json(v[1]).id for v in values]
+    # session ids should match materialized graph
+    assert [v[2] for v in values] == [materialize_session(v[2], graph_json, v[4]).id for v in values]
 
     # should unique session ids
     sids = [v[2] for v in values]
@@ -154,6 +158,17 @@ def test_prepare_values_to_insert(batch_data_collection, batch_graph):
     assert all(v[5] == 0 for v in values)
 
 
+def test_materialize_session_matches_serialized_session(batch_data_collection, batch_graph):
+    b = Batch(graph=batch_graph, data=batch_data_collection, runs=1)
+    graph_json = serialize_batch_graph(b.graph)
+    GraphExecutionStateValidator = TypeAdapter(GraphExecutionState)
+    for session_id, session_json, field_values_json in create_session_nfv_tuples(batch=b, maximum=1000):
+        materialized = materialize_session(session_id, graph_json, field_values_json)
+        serialized = GraphExecutionStateValidator.validate_json(session_json)
+        assert materialized.id == serialized.id
+        assert materialized.graph == serialized.graph
+
+
 def test_prepare_values_to_insert_with_priority(batch_data_collection, batch_graph):
     b = Batch(graph=batch_graph, data=batch_data_collection, runs=2)
     values = prepare_values_to_insert(queue_id="default", batch=b, priority=1, max_new_queue_items=1000)
@@ -252,3 +267,35 @@ def test_cannot_create_bad_batch_fields_exist(
                 ],
             ],
         )
+
+
+def test_ready_index_order():
+    index = SessionQueueReadyIndex()
+    index.add([(1, 0), (2, 0), (3, 1), (4, 1)])
+    assert [index.pop() for _ in range(5)] == [3, 4, 1, 2, None]
+
+
+def test_ready_index_discard():
+    index = SessionQueueReadyIndex()
+    index.add([(1, 0), (2, 0), (3, 0)])
+    index.discard([1, 3, 99])
+    assert len(index) == 1
+    assert 2 in index
+    assert index.pop() == 2
+    assert index.pop() is None
+
+
+def test_ready_index_reset():
+    index = SessionQueueReadyIndex()
+    index.add([(1, 0)])
+    index.reset([(5, 0), (6, 2)])
+    assert [index.pop() for _ in range(3)] == [6, 5, None]
+
+
+def test_ready_index_wait():
+    index = SessionQueueReadyIndex()
+    assert index.wait(timeout=0) is False
+    index.notify()
+    assert index.wait(timeout=0) is False
+    index.add([(1, 0)])
+    assert index.wait(timeout=0) is True
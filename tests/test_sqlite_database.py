@@ -0,0 +1,99 @@
+import sqlite3
+import threading
+from logging import Logger
+from pathlib import Path
+
+import pytest
+
+from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
+
+
+@pytest.fixture
+def logger() -> Logger:
+    return Logger("test_sqlite_database")
+
+
+@pytest.fixture
+def file_db(tmp_path: Path, logger: Logger) -> SqliteDatabase:
+    db = SqliteDatabase(db_path=tmp_path / "test.db", logger=logger, verbose=False, read_pool_size=2)
+    with db.transaction() as cursor:
+        cursor.execute("CREATE TABLE test (id INTEGER PRIMARY KEY, value TEXT);")
+    return db
+
+
+def test_read_sees_committed_writes(file_db: SqliteDatabase):
+    with file_db.transaction() as cursor:
+        cursor.execute("INSERT INTO test (value) VALUES ('a');")
+    with file_db.read() as cursor:
+        cursor.execute("SELECT value FROM test;")
+        assert [row["value"] for row in cursor.fetchall()] == ["a"]
+
+
+def test_read_inside_transaction_sees_uncommitted_writes(file_db: SqliteDatabase):
+    with file_db.transaction() as cursor:
+        cursor.execute("INSERT INTO test (value) VALUES ('a');")
+        with file_db.read() as read_cursor:
+            read_cursor.execute("SELECT COUNT(*) FROM test;")
+            assert read_cursor.fetchone()[0] == 1
+
+
+def test_read_connections_are_read_only(file_db: SqliteDatabase):
+    with pytest.raises(sqlite3.OperationalError):
+        with file_db.read() as cursor:
+            cursor.execute("INSERT INTO test (value) VALUES ('a');")
+
+
+def test_read_does_not_wait_for_writer(file_db: SqliteDatabase):
+    writer_started = threading.Event()
+    release_writer = threading.Event()
+
+    def hold_writer():
+        with file_db.transaction() as cursor:
+            cursor.execute("INSERT INTO test (value) VALUES ('uncommitted');")
+            writer_started.set()
+            release_writer.wait(timeout=5)
+
+    writer = threading.Thread(target=hold_writer)
+    writer.start()
+    try:
+        assert writer_started.wait(timeout=5)
+        with file_db.read() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM test;")
+            # The writer has not committed yet, so the reader sees the last committed state
+            assert cursor.fetchone()[0] == 0
+    finally:
+        release_writer.set()
+        writer.join()
+
+
+def test_nested_reads_share_a_connection(file_db: SqliteDatabase):
+    with file_db.read() as outer:
+        with file_db.read() as inner:
+            assert outer.connection is inner.connection
+
+
+def test_read_pool_is_bounded(file_db: SqliteDatabase):
+    connections: set[sqlite3.Connection] = set()
+
+    def read():
+        for _ in range(10):
+            with file_db.read() as cursor:
+                connections.add(cursor.connection)
+                cursor.execute("SELECT COUNT(*) FROM test;")
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(connections) <= 2
+
+
+def test_read_falls_back_to_writer_for_memory_db(logger: Logger):
+    db = SqliteDatabase(db_path=None, logger=logger, verbose=False)
+    with db.transaction() as cursor:
+        cursor.execute("CREATE TABLE test (id INTEGER PRIMARY KEY);")
+        cursor.execute("INSERT INTO test DEFAULT VALUES;")
+    with db.read() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM test;")
+        assert cursor.fetchone()[0] == 1